@@ -0,0 +1,131 @@
+"""
+Inscripción masiva de pares (estudiante, curso) respetando Curso.cupo_maximo.
+
+El cupo se reserva sobre el contador `Curso.inscritos` con un UPDATE
+condicional (`inscritos + n <= cupo_maximo`): solo bloquea la fila del curso
+hasta el final de la transacción, así que peticiones simultáneas sobre el
+mismo curso se ordenan entre sí sin bloquear la tabla, y peticiones sobre
+cursos distintos no se esperan. Las inscripciones ya existentes se comprueban
+después de reservar, con el bloqueo tomado, y sus plazas se devuelven.
+
+Un par tampoco entra si el curso se cruza con el horario de otro curso del
+estudiante en el periodo (ver horarios.py): incluidos los admitidos antes en
+el mismo lote.
+"""
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import F
+
+from .horarios import franjas_por_curso, indice_estudiantes
+from .models import Curso, Estudiante, InscripcionCurso
+
+MAX_PARES = 5000
+
+INSCRITO = 'inscrito'
+YA_INSCRITO = 'ya_inscrito'
+SIN_CUPO = 'sin_cupo'
+DUPLICADO = 'duplicado'
+CURSO_INEXISTENTE = 'curso_inexistente'
+ESTUDIANTE_INEXISTENTE = 'estudiante_inexistente'
+PERIODO_CERRADO = 'periodo_cerrado'
+CHOQUE_HORARIO = 'choque_horario'
+
+
+def reservar_cupos(curso_id, cantidad):
+    """Suma hasta `cantidad` al contador sin pasar del cupo; devuelve las plazas obtenidas"""
+    cursos = Curso._base_manager.filter(pk=curso_id)
+    while cantidad > 0:
+        if cursos.filter(inscritos__lte=F('cupo_maximo') - cantidad).update(inscritos=F('inscritos') + cantidad):
+            return cantidad
+        fila = cursos.values('inscritos', 'cupo_maximo').first()
+        if fila is None:
+            return 0
+        # Otra transacción pudo tomar plazas entre medias: se reintenta con lo que queda
+        cantidad = min(cantidad - 1, fila['cupo_maximo'] - fila['inscritos'])
+    return 0
+
+
+def liberar_cupos(curso_id, cantidad):
+    if cantidad > 0:
+        Curso._base_manager.filter(pk=curso_id).update(inscritos=F('inscritos') - cantidad)
+
+
+def inscribir(pares):
+    """
+    Inscribe los pares (estudiante_id, curso_id) en una transacción.
+    Devuelve un resultado por par, en el mismo orden: {'estudiante', 'curso', 'estado'}.
+    """
+    pares = [(int(estudiante_id), int(curso_id)) for estudiante_id, curso_id in pares]
+    if len(pares) > MAX_PARES:
+        raise ValueError(f'Máximo {MAX_PARES} pares por lote')
+
+    estados = {}
+    vistos = set()
+    duplicados = set()
+    for indice, par in enumerate(pares):
+        if par in vistos:
+            duplicados.add(indice)
+        vistos.add(par)
+
+    estudiantes = set(Estudiante.objects.filter(pk__in={e for e, _ in vistos}).values_list('pk', flat=True))
+    cursos = {curso_id: (periodo_id, cerrado) for curso_id, periodo_id, cerrado in Curso.objects.filter(
+        pk__in={c for _, c in vistos}
+    ).values_list('pk', 'periodo_id', 'periodo__cerrado')}
+    for estudiante_id, curso_id in vistos:
+        if curso_id not in cursos:
+            estados[(estudiante_id, curso_id)] = CURSO_INEXISTENTE
+        elif cursos[curso_id][1]:
+            estados[(estudiante_id, curso_id)] = PERIODO_CERRADO
+        elif estudiante_id not in estudiantes:
+            estados[(estudiante_id, curso_id)] = ESTUDIANTE_INEXISTENTE
+
+    # Candidatos por curso en el orden recibido: si no hay cupo para todos, entran los primeros
+    candidatos = {}
+    for par in dict.fromkeys(pares):
+        if par not in estados:
+            candidatos.setdefault(par[1], []).append(par)
+
+    # Horarios de los cursos pedidos y de lo que ya cursa cada estudiante en esos periodos
+    franjas, _ = franjas_por_curso({'curso_id__in': list(candidatos)})
+    ocupados = indice_estudiantes({e for pares_curso in candidatos.values() for e, _ in pares_curso},
+                                  {cursos[curso_id][0] for curso_id in candidatos})
+
+    with transaction.atomic():
+        nuevos = []
+        # Orden fijo de cursos: dos lotes simultáneos no se bloquean mutuamente
+        for curso_id in sorted(candidatos):
+            pares_curso = candidatos[curso_id]
+            reservadas = reservar_cupos(curso_id, len(pares_curso))
+            existentes = set(InscripcionCurso.con_archivados.filter(
+                curso_id=curso_id, estudiante_id__in=[e for e, _ in pares_curso]
+            ).values_list('estudiante_id', 'curso_id'))
+
+            pendientes = []
+            for par in pares_curso:
+                if par in existentes:
+                    estados[par] = YA_INSCRITO
+                elif ocupados.choque_franjas(par[0], franjas.get(curso_id, ())):
+                    estados[par] = CHOQUE_HORARIO
+                else:
+                    estados[par] = SIN_CUPO
+                    pendientes.append(par)
+            admitidos = pendientes[:reservadas]
+            liberar_cupos(curso_id, reservadas - len(admitidos))
+            for par in admitidos:
+                estados[par] = INSCRITO
+                ocupados.agregar_franjas(par[0], franjas.get(curso_id, ()), curso_id)
+            nuevos += [InscripcionCurso(estudiante_id=e, curso_id=c) for e, c in admitidos]
+
+        # Las plazas ya se sumaron a Curso.inscritos al reservarlas
+        InscripcionCurso.objects.bulk_create(nuevos, ignore_conflicts=True, contar=False)
+
+    return [
+        {'estudiante': estudiante_id, 'curso': curso_id,
+         'estado': DUPLICADO if indice in duplicados else estados[(estudiante_id, curso_id)]}
+        for indice, (estudiante_id, curso_id) in enumerate(pares)
+    ]
+
+
+def resumen(resultados):
+    return dict(Counter(resultado['estado'] for resultado in resultados))
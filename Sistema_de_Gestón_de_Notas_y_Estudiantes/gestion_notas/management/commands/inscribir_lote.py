@@ -0,0 +1,47 @@
+import csv
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from gestion_notas.inscripciones import MAX_PARES, inscribir, resumen
+
+
+class Command(BaseCommand):
+    help = ('Inscribe pares (estudiante, curso) desde un CSV con columnas estudiante,curso (ids), '
+            'respetando el cupo máximo de cada curso')
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help="Ruta del CSV, o '-' para leer de la entrada estándar")
+        parser.add_argument('--salida', default='', help='CSV con el resultado de cada par')
+        parser.add_argument('--lote', type=int, default=1000,
+                            help=f'Pares por transacción (máximo {MAX_PARES})')
+
+    def handle(self, *args, **options):
+        if not 1 <= options['lote'] <= MAX_PARES:
+            raise CommandError(f'--lote debe estar entre 1 y {MAX_PARES}')
+
+        archivo = sys.stdin if options['archivo'] == '-' else open(options['archivo'], newline='', encoding='utf-8')
+        try:
+            pares = [(fila['estudiante'], fila['curso']) for fila in csv.DictReader(archivo)]
+        except KeyError:
+            raise CommandError('El CSV debe tener las columnas estudiante y curso')
+        finally:
+            if archivo is not sys.stdin:
+                archivo.close()
+
+        resultados = []
+        for inicio in range(0, len(pares), options['lote']):
+            try:
+                resultados += inscribir(pares[inicio:inicio + options['lote']])
+            except ValueError as error:
+                raise CommandError(f'Fila inválida cerca de la línea {inicio + 2}: {error}')
+            self.stdout.write(f'  {len(resultados)}/{len(pares)} pares procesados...')
+
+        if options['salida']:
+            with open(options['salida'], 'w', newline='', encoding='utf-8') as salida:
+                escritor = csv.DictWriter(salida, fieldnames=['estudiante', 'curso', 'estado'])
+                escritor.writeheader()
+                escritor.writerows(resultados)
+
+        totales = ', '.join(f'{estado}: {cantidad}' for estado, cantidad in sorted(resumen(resultados).items()))
+        self.stdout.write(self.style.SUCCESS(f'{len(resultados)} pares procesados ({totales or "ninguno"})'))
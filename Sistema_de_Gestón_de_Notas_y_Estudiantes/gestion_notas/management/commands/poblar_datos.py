@@ -0,0 +1,499 @@
+# management/commands/poblar_datos.py
+# Guardar en: gestion_notas/management/commands/poblar_datos.py
+
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from gestion_notas.models import (
+    Administrador,
+    Calificacion,
+    ConfiguracionEvaluacion,
+    CuboRendimiento,
+    Curso,
+    Estudiante,
+    FranjaHorario,
+    HistorialAcademico,
+    InscripcionCurso,
+    Materia,
+    Notificacion,
+    PeriodoAcademico,
+    Profesor,
+    Programa,
+    RegistroAcumulado,
+    TipoEvaluacion,
+)
+from gestion_notas.horarios import sincronizar_franjas
+from gestion_notas.signals import sin_versionado
+from datetime import date
+import math
+import random
+
+Usuario = get_user_model()
+
+PROGRAMAS = [
+    ('Ingeniería de Sistemas', 'ISC'),
+    ('Ingeniería de Software', 'ISW'),
+    ('Ingeniería Industrial', 'IND'),
+    ('Administración de Empresas', 'ADM'),
+]
+
+TIPOS_EVALUACION = [
+    ('Parcial', 'Examen parcial escrito'),
+    ('Taller', 'Trabajo práctico o taller'),
+    ('Participación', 'Participación en clase'),
+    ('Proyecto Final', 'Proyecto final del curso'),
+    ('Quiz', 'Evaluación corta'),
+]
+
+# Configuración estándar: 40% Parcial, 30% Taller, 20% Proyecto, 10% Participación
+CONFIG_ESTANDAR = [
+    ('Parcial', 40),
+    ('Taller', 30),
+    ('Proyecto Final', 20),
+    ('Participación', 10),
+]
+
+NOMBRES = [
+    'Juan', 'María', 'Carlos', 'Ana', 'Pedro', 'Laura', 'Diego', 'Sara', 'Luis', 'Camila',
+    'Andrés', 'Valentina', 'Jorge', 'Daniela', 'Felipe', 'Natalia', 'Santiago', 'Paula',
+    'Miguel', 'Juliana', 'Sebastián', 'Carolina', 'David', 'Isabella', 'Óscar', 'Mariana',
+]
+
+APELLIDOS = [
+    'Pérez', 'López', 'Gómez', 'Rojas', 'Castro', 'Sánchez', 'Méndez', 'García', 'Rodríguez',
+    'González', 'Martínez', 'Ramírez', 'Torres', 'Hernández', 'Velasco', 'Díaz', 'Moreno',
+    'Muñoz', 'Ortiz', 'Vargas', 'Jiménez', 'Cárdenas', 'Benavides', 'Erazo', 'Burbano',
+]
+
+AREAS = [
+    'Programación', 'Cálculo', 'Bases de Datos', 'Redes', 'Arquitectura de Software',
+    'Estadística', 'Gestión de Proyectos', 'Física', 'Contabilidad', 'Investigación de Operaciones',
+    'Ingeniería de Requerimientos', 'Sistemas Operativos', 'Ética', 'Economía', 'Electiva',
+]
+
+ESPECIALIDADES = [
+    ('Ingeniería de Software', 'Magister en Ingeniería'),
+    ('Bases de Datos', 'Doctor en Ciencias de la Computación'),
+    ('Arquitectura de Software', 'Magister en Sistemas'),
+    ('Redes de Computadores', 'Especialista en Redes'),
+    ('Matemáticas', 'Magister en Matemáticas'),
+    ('Administración', 'Magister en Administración'),
+]
+
+DIAS = ['Lun-Mie', 'Mar-Jue', 'Mie-Vie', 'Lun', 'Vie']
+HORAS = ['07:00-09:00', '08:00-10:00', '10:00-12:00', '14:00-16:00', '16:00-18:00', '18:00-20:00']
+OBSERVACIONES = ['Excelente trabajo', 'Buen desempeño', 'Cumple con los objetivos', 'Puede mejorar', '']
+
+SEMESTRES = 10
+MATERIAS_POR_SEMESTRE = 4
+CUPO_CURSO = 35
+
+
+class Command(BaseCommand):
+    help = 'Poblar la base de datos con datos de ejemplo (o sintéticos a gran escala con --estudiantes N)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--estudiantes', type=int, default=8, help='Número de estudiantes')
+        parser.add_argument('--profesores', type=int, default=4, help='Número de profesores')
+        parser.add_argument('--periodos', type=int, default=3,
+                            help='Número de periodos académicos (el último queda activo)')
+        parser.add_argument('--seed', type=int, default=2025, help='Semilla para datos reproducibles')
+        parser.add_argument('--lote', type=int, default=2000, help='Filas por bulk_create')
+        parser.add_argument('--limpiar', action='store_true', help='Eliminar los datos existentes antes de poblar')
+
+    def handle(self, *args, **options):
+        if options['estudiantes'] < 0 or options['profesores'] < 1 or options['periodos'] < 1:
+            raise CommandError('Se necesita al menos un profesor y un periodo')
+
+        self.seed = options['seed']
+        self.lote = options['lote']
+        self.password_hash = make_password('password123')
+
+        self.stdout.write('Iniciando población de datos...')
+
+        if options['limpiar']:
+            self.limpiar_datos()
+
+        # Crear datos
+        self.crear_programas()
+        self.crear_periodos(options['periodos'])
+        self.crear_tipos_evaluacion()
+        self.crear_administradores()
+        self.crear_profesores(options['profesores'])
+        self.crear_estudiantes(options['estudiantes'])
+        self.crear_materias()
+        self.crear_cursos()
+        self.crear_configuracion_evaluaciones()
+        self.crear_inscripciones()
+        self.crear_calificaciones()
+        self.crear_notificaciones()
+        self.cerrar_periodos_anteriores()
+
+        self.stdout.write(self.style.SUCCESS('¡Datos creados exitosamente!'))
+
+    def rng(self, *clave):
+        """Generador aleatorio determinista por entidad: el mismo índice produce los mismos datos"""
+        return random.Random('-'.join(str(parte) for parte in (self.seed,) + clave))
+
+    def insertar(self, modelo, objetos):
+        """bulk_create por lotes ignorando filas que ya existen (reejecuciones idempotentes)"""
+        for inicio in range(0, len(objetos), self.lote):
+            with transaction.atomic():
+                modelo.objects.bulk_create(objetos[inicio:inicio + self.lote], ignore_conflicts=True)
+
+    def limpiar_datos(self):
+        self.stdout.write('Limpiando datos existentes...')
+        # Sin señales por fila: se borra todo y la caché se vacía al final
+        with sin_versionado():
+            Calificacion.objects.all().delete()
+            InscripcionCurso.con_archivados.all().delete()
+            ConfiguracionEvaluacion.objects.all().delete()
+            FranjaHorario.objects.all().delete()
+            CuboRendimiento.objects.all().delete()
+            Curso.con_archivados.all().delete()
+        RegistroAcumulado.objects.all().delete()
+        HistorialAcademico.objects.all().delete()
+        Materia.objects.all().delete()
+        Estudiante.objects.all().delete()
+        Profesor.objects.all().delete()
+        Administrador.objects.all().delete()
+        Usuario.objects.filter(is_superuser=False).delete()
+        TipoEvaluacion.objects.all().delete()
+        PeriodoAcademico.con_archivados.all().delete()
+        Programa.objects.all().delete()
+        cache.clear()
+
+    def crear_programas(self):
+        self.stdout.write('Creando programas...')
+        for nombre, codigo in PROGRAMAS:
+            Programa.objects.get_or_create(
+                codigo=codigo,
+                defaults={'nombre': nombre, 'descripcion': f'Programa de {nombre}'}
+            )
+        self.programas = list(Programa.objects.filter(codigo__in=[c for _, c in PROGRAMAS]).order_by('codigo'))
+
+    def crear_periodos(self, cantidad):
+        self.stdout.write('Creando periodos académicos...')
+        hoy = timezone.localdate()
+        # Semestres consecutivos terminando en el actual, del más antiguo al más reciente
+        actual = hoy.year * 2 + (0 if hoy.month <= 6 else 1)
+        self.periodos = []
+        for n in range(actual - cantidad + 1, actual + 1):
+            anio, mitad = divmod(n, 2)
+            inicio, fin = (date(anio, 1, 15), date(anio, 6, 15)) if mitad == 0 else (date(anio, 8, 1), date(anio, 12, 15))
+            periodo, _ = PeriodoAcademico.objects.get_or_create(
+                nombre=f'{anio}-{mitad + 1}',
+                defaults={'fecha_inicio': inicio, 'fecha_fin': fin, 'activo': False}
+            )
+            self.periodos.append(periodo)
+
+        PeriodoAcademico.objects.exclude(id=self.periodos[-1].id).filter(activo=True).update(activo=False)
+        PeriodoAcademico.objects.filter(id=self.periodos[-1].id).update(activo=True)
+
+    def crear_tipos_evaluacion(self):
+        self.stdout.write('Creando tipos de evaluación...')
+        for nombre, descripcion in TIPOS_EVALUACION:
+            TipoEvaluacion.objects.get_or_create(
+                nombre=nombre,
+                defaults={'descripcion': descripcion}
+            )
+        self.tipos = {t.nombre: t for t in TipoEvaluacion.objects.filter(nombre__in=[n for n, _ in TIPOS_EVALUACION])}
+
+    def crear_administradores(self):
+        self.stdout.write('Creando administradores...')
+
+        # Crear superusuario si no existe
+        if not Usuario.objects.filter(username='admin').exists():
+            Usuario.objects.create_superuser(
+                username='admin',
+                email='admin@ucc.edu.co',
+                password='admin123',
+                first_name='Administrador',
+                last_name='Sistema',
+                documento='1000000000',
+                rol='administrador'
+            )
+            self.stdout.write(self.style.SUCCESS('Superusuario creado: admin/admin123'))
+
+        admin_user, _ = Usuario.objects.get_or_create(
+            username='mtorres',
+            defaults={
+                'email': 'mtorres@ucc.edu.co',
+                'password': self.password_hash,
+                'first_name': 'Miguel',
+                'last_name': 'Torres',
+                'documento': '1000000001',
+                'rol': 'administrador',
+            }
+        )
+        Administrador.objects.get_or_create(
+            usuario=admin_user,
+            defaults={'cargo': 'Director Académico', 'departamento': 'Coordinación Académica'}
+        )
+
+    def crear_usuarios(self, prefijo, usernames, datos_usuario):
+        """Crea en lote los usuarios que falten y devuelve {username: id}"""
+        # Filtra por prefijo y no con username__in: SQLite limita el número de parámetros por consulta
+        def ids_existentes():
+            return {
+                username: usuario_id
+                for username, usuario_id in Usuario.objects.filter(username__startswith=prefijo).values_list('username', 'id')
+                if username in buscados
+            }
+
+        buscados = set(usernames)
+        existentes = ids_existentes()
+        nuevos = [Usuario(password=self.password_hash, **datos_usuario(u)) for u in usernames if u not in existentes]
+        self.insertar(Usuario, nuevos)
+        return ids_existentes() if nuevos else existentes
+
+    def crear_profesores(self, cantidad):
+        self.stdout.write(f'Creando {cantidad} profesores...')
+        usernames = [f'prof{n:05d}' for n in range(cantidad)]
+
+        def datos_usuario(username):
+            n = int(username[4:])
+            rng = self.rng('prof', n)
+            return {
+                'username': username,
+                'email': f'{username}@ucc.edu.co',
+                'first_name': rng.choice(NOMBRES),
+                'last_name': f'{rng.choice(APELLIDOS)} {rng.choice(APELLIDOS)}',
+                'documento': f'3{n:09d}',
+                'rol': 'profesor',
+            }
+
+        ids = self.crear_usuarios('prof', usernames, datos_usuario)
+        perfiles = []
+        for username, usuario_id in ids.items():
+            especialidad, titulo = self.rng('prof', username).choice(ESPECIALIDADES)
+            perfiles.append(Profesor(usuario_id=usuario_id, especialidad=especialidad, titulo_academico=titulo))
+        self.insertar(Profesor, perfiles)
+
+        usuarios = set(ids.values())
+        self.profesores = [
+            (profesor_id, usuario_id)
+            for profesor_id, usuario_id in Profesor.objects.filter(
+                usuario__username__startswith='prof'
+            ).order_by('usuario__username').values_list('id', 'usuario_id')
+            if usuario_id in usuarios
+        ]
+
+    def crear_estudiantes(self, cantidad):
+        self.stdout.write(f'Creando {cantidad} estudiantes...')
+        usernames = [f'est{n:06d}' for n in range(cantidad)]
+
+        def datos_usuario(username):
+            n = int(username[3:])
+            rng = self.rng('est', n)
+            nombre = rng.choice(NOMBRES)
+            return {
+                'username': username,
+                'email': f'{username}@ucc.edu.co',
+                'first_name': nombre,
+                'last_name': f'{rng.choice(APELLIDOS)} {rng.choice(APELLIDOS)}',
+                'documento': f'2{n:09d}',
+                'rol': 'estudiante',
+            }
+
+        ids = self.crear_usuarios('est', usernames, datos_usuario)
+        anio_actual = timezone.localdate().year
+        perfiles = []
+        for username, usuario_id in ids.items():
+            n = int(username[3:])
+            rng = self.rng('est', n, 'perfil')
+            semestre = rng.randint(1, SEMESTRES)
+            anio_ingreso = anio_actual - (semestre - 1) // 2
+            perfiles.append(Estudiante(
+                usuario_id=usuario_id,
+                programa=self.programas[rng.randrange(len(self.programas))],
+                semestre=semestre,
+                codigo_estudiantil=f'{anio_ingreso}{n:06d}',
+                estado='activo',
+                fecha_ingreso=date(anio_ingreso, 1, 15),
+            ))
+        self.insertar(Estudiante, perfiles)
+
+        usuarios = set(ids.values())
+        self.estudiantes = [
+            (estudiante_id, programa_id, semestre)
+            for estudiante_id, usuario_id, programa_id, semestre in Estudiante.objects.filter(
+                usuario__username__startswith='est'
+            ).values_list('id', 'usuario_id', 'programa_id', 'semestre').iterator(chunk_size=self.lote)
+            if usuario_id in usuarios
+        ]
+
+    def crear_materias(self):
+        self.stdout.write('Creando materias...')
+        materias = []
+        for programa in self.programas:
+            for semestre in range(1, SEMESTRES + 1):
+                for k in range(MATERIAS_POR_SEMESTRE):
+                    rng = self.rng('materia', programa.codigo, semestre, k)
+                    materias.append(Materia(
+                        codigo=f'{programa.codigo}-{semestre:02d}{k}',
+                        nombre=f'{AREAS[(semestre * MATERIAS_POR_SEMESTRE + k) % len(AREAS)]} {semestre}',
+                        creditos=rng.choice([2, 3, 3, 4]),
+                        programa=programa,
+                        semestre_sugerido=semestre,
+                        descripcion=f'Materia del semestre {semestre} de {programa.nombre}',
+                    ))
+        self.insertar(Materia, materias)
+
+        # {(programa_id, semestre): [materia_id, ...]}
+        self.materias = {}
+        for materia_id, programa_id, semestre in Materia.objects.filter(
+            programa__in=self.programas
+        ).values_list('id', 'programa_id', 'semestre_sugerido'):
+            self.materias.setdefault((programa_id, semestre), []).append(materia_id)
+
+    def semestre_en_periodo(self, semestre_actual, indice_periodo):
+        """Semestre que cursaba el estudiante en el periodo `indice_periodo` (0 = el más antiguo)"""
+        return semestre_actual - (len(self.periodos) - 1 - indice_periodo)
+
+    def crear_cursos(self):
+        self.stdout.write('Creando cursos...')
+        # Tamaño de cada cohorte (programa, semestre) por periodo, para decidir cuántos grupos abrir
+        cohortes = {}
+        for _, programa_id, semestre in self.estudiantes:
+            for indice in range(len(self.periodos)):
+                sem = self.semestre_en_periodo(semestre, indice)
+                if sem >= 1:
+                    clave = (indice, programa_id, sem)
+                    cohortes[clave] = cohortes.get(clave, 0) + 1
+
+        cursos = []
+        for (indice, programa_id, semestre), tamano in cohortes.items():
+            periodo = self.periodos[indice]
+            for materia_id in self.materias.get((programa_id, semestre), []):
+                for g in range(max(1, math.ceil(tamano / CUPO_CURSO))):
+                    rng = self.rng('curso', periodo.id, materia_id, g)
+                    profesor_id, _ = self.profesores[rng.randrange(len(self.profesores))]
+                    cursos.append(Curso(
+                        materia_id=materia_id,
+                        periodo=periodo,
+                        profesor_id=profesor_id,
+                        grupo=self.nombre_grupo(g),
+                        horario=f'{rng.choice(DIAS)} {rng.choice(HORAS)}',
+                        aula=f'Aula {rng.randint(1, 5)}{rng.randint(0, 3)}{rng.randint(1, 9)}',
+                        cupo_maximo=CUPO_CURSO,
+                    ))
+        self.insertar(Curso, cursos)
+        sincronizar_franjas(Curso.con_archivados.filter(periodo__in=self.periodos))
+
+        # {(periodo_id, materia_id): [(curso_id, profesor_usuario_id), ...]} ordenado por grupo
+        self.cursos = {}
+        for curso_id, periodo_id, materia_id, profesor_usuario_id in Curso.objects.filter(
+            periodo__in=self.periodos
+        ).order_by('grupo').values_list('id', 'periodo_id', 'materia_id', 'profesor__usuario_id'):
+            self.cursos.setdefault((periodo_id, materia_id), []).append((curso_id, profesor_usuario_id))
+
+    def nombre_grupo(self, indice):
+        letras = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+        return letras[indice] if indice < len(letras) else f'{indice + 1:02d}'
+
+    def crear_configuracion_evaluaciones(self):
+        self.stdout.write('Creando configuración de evaluaciones...')
+        configuraciones = [
+            ConfiguracionEvaluacion(curso_id=curso_id, tipo_evaluacion=self.tipos[tipo_nombre], porcentaje=porcentaje)
+            for grupos in self.cursos.values()
+            for curso_id, _ in grupos
+            for tipo_nombre, porcentaje in CONFIG_ESTANDAR
+        ]
+        self.insertar(ConfiguracionEvaluacion, configuraciones)
+
+    def crear_inscripciones(self):
+        self.stdout.write('Creando inscripciones...')
+        contadores = {}
+        inscripciones = []
+        for estudiante_id, programa_id, semestre in sorted(self.estudiantes):
+            for indice, periodo in enumerate(self.periodos):
+                sem = self.semestre_en_periodo(semestre, indice)
+                for materia_id in self.materias.get((programa_id, sem), []):
+                    grupos = self.cursos.get((periodo.id, materia_id))
+                    if not grupos:
+                        continue
+                    # Reparte la cohorte entre los grupos en orden
+                    n = contadores.get((periodo.id, materia_id), 0)
+                    contadores[(periodo.id, materia_id)] = n + 1
+                    curso_id, _ = grupos[min(n // CUPO_CURSO, len(grupos) - 1)]
+                    inscripciones.append(InscripcionCurso(estudiante_id=estudiante_id, curso_id=curso_id))
+
+            if len(inscripciones) >= self.lote:
+                self.insertar(InscripcionCurso, inscripciones)
+                inscripciones = []
+        self.insertar(InscripcionCurso, inscripciones)
+
+    def crear_calificaciones(self):
+        self.stdout.write('Creando calificaciones...')
+        profesor_de_curso = {curso_id: usuario_id for grupos in self.cursos.values() for curso_id, usuario_id in grupos}
+        periodo_actual = self.periodos[-1]
+        tipos = [self.tipos[nombre] for nombre, _ in CONFIG_ESTANDAR]
+
+        # Solo inscripciones sin notas: una reejecución no vuelve a generarlas
+        pendientes = InscripcionCurso.objects.filter(
+            curso__periodo__in=self.periodos, calificaciones__isnull=True
+        ).order_by('id').values_list('id', 'curso_id', 'curso__periodo_id', 'estudiante_id')
+
+        calificaciones = []
+        for inscripcion_id, curso_id, periodo_id, estudiante_id in pendientes.iterator(chunk_size=self.lote):
+            rng = self.rng('notas', inscripcion_id)
+            # Nivel del estudiante (estable entre materias) más variación por evaluación
+            nivel = self.rng('nivel', estudiante_id).uniform(2.2, 4.6)
+            # En el periodo actual solo se han registrado las primeras evaluaciones
+            registradas = tipos if periodo_id != periodo_actual.id else tipos[:rng.randint(0, len(tipos))]
+            for tipo in registradas:
+                nota = min(5.0, max(0.0, rng.gauss(nivel, 0.6)))
+                calificaciones.append(Calificacion(
+                    inscripcion_id=inscripcion_id,
+                    tipo_evaluacion=tipo,
+                    nota=round(nota, 2),
+                    observaciones=rng.choice(OBSERVACIONES),
+                    registrada_por_id=profesor_de_curso[curso_id],
+                ))
+
+            if len(calificaciones) >= self.lote:
+                self.insertar(Calificacion, calificaciones)
+                calificaciones = []
+        self.insertar(Calificacion, calificaciones)
+
+    def crear_notificaciones(self):
+        self.stdout.write('Creando notificaciones...')
+        mensajes = [
+            ('nueva_nota', 'Nueva nota publicada', 'Tu nota del parcial ha sido publicada'),
+            ('modificacion_nota', 'Nota modificada', 'Se actualizó tu calificación'),
+            ('general', 'Recordatorio', 'Tienes una entrega pendiente'),
+            ('inscripcion', 'Inscripción exitosa', 'Te has inscrito correctamente al curso'),
+        ]
+
+        # Solo para estudiantes que aún no tienen notificaciones
+        usuarios = Usuario.objects.filter(
+            rol='estudiante', username__startswith='est', notificaciones__isnull=True
+        ).values_list('id', flat=True)
+
+        notificaciones = []
+        for usuario_id in usuarios.iterator(chunk_size=self.lote):
+            rng = self.rng('notif', usuario_id)
+            for tipo, titulo, mensaje in rng.sample(mensajes, 2):
+                notificaciones.append(Notificacion(
+                    usuario_id=usuario_id,
+                    tipo=tipo,
+                    titulo=titulo,
+                    mensaje=mensaje,
+                    leida=rng.choice([True, False])
+                ))
+        self.insertar(Notificacion, notificaciones)
+
+        self.stdout.write(self.style.SUCCESS('Notificaciones creadas'))
+
+    def cerrar_periodos_anteriores(self):
+        """Los periodos ya terminados quedan cerrados, con su historial congelado"""
+        self.stdout.write('Cerrando periodos anteriores...')
+        for periodo in self.periodos[:-1]:
+            periodo.refresh_from_db(fields=['cerrado'])
+            if not periodo.cerrado:
+                total = periodo.cerrar(lote=self.lote)
+                self.stdout.write(f'  {periodo.nombre}: {total} registros de historial')
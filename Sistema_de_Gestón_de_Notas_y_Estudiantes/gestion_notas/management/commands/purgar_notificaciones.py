@@ -0,0 +1,58 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from gestion_notas.forms import archive_queryset
+from gestion_notas.models import Notificacion
+
+
+class Command(BaseCommand):
+    help = 'Elimina (o archiva) en lotes las notificaciones leídas más antiguas que la política de retención'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int,
+                            default=getattr(settings, 'NOTIFICACIONES_RETENCION_DIAS', 180),
+                            help='Antigüedad mínima en días de las notificaciones leídas a purgar')
+        parser.add_argument('--lote', type=int, default=1000,
+                            help='Filas por sentencia DELETE/UPDATE')
+        parser.add_argument('--pausa', type=float, default=0.0,
+                            help='Segundos de espera entre lotes para no acaparar la tabla')
+        parser.add_argument('--archivar', action='store_true',
+                            help='Archivar en lugar de eliminar')
+        parser.add_argument('--simular', action='store_true',
+                            help='Solo contar las notificaciones afectadas')
+
+    def handle(self, *args, **options):
+        if options['dias'] < 0 or options['lote'] < 1:
+            raise CommandError('--dias debe ser >= 0 y --lote >= 1')
+
+        limite = timezone.now() - timedelta(days=options['dias'])
+        pendientes = Notificacion.con_archivados.filter(leida=True, fecha_creacion__lt=limite)
+        if options['archivar']:
+            pendientes = pendientes.filter(archived=False)
+
+        if options['simular']:
+            self.stdout.write(f'{pendientes.count()} notificaciones leídas anteriores a {limite:%d/%m/%Y}')
+            return
+
+        accion = 'archivadas' if options['archivar'] else 'eliminadas'
+        total = 0
+        while True:
+            ids = list(pendientes.order_by('id').values_list('id', flat=True)[:options['lote']])
+            if not ids:
+                break
+
+            lote = Notificacion.con_archivados.filter(id__in=ids)
+            if options['archivar']:
+                total += archive_queryset(lote, archived=True)
+            else:
+                total += lote.delete()[0]
+
+            self.stdout.write(f'  {total} notificaciones {accion}...')
+            if options['pausa']:
+                time.sleep(options['pausa'])
+
+        self.stdout.write(self.style.SUCCESS(f'Retención aplicada: {total} notificaciones {accion}'))
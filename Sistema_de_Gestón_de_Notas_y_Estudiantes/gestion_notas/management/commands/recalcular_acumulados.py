@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from gestion_notas.models import HistorialAcademico, RegistroAcumulado
+
+
+class Command(BaseCommand):
+    help = ('Reconstruye el promedio acumulado de cada estudiante a partir de HistorialAcademico '
+            '(normalmente se mantiene solo al cerrar cada periodo)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=1000, help='Registros de historial por lote')
+
+    def handle(self, *args, **options):
+        if options['lote'] < 1:
+            raise CommandError('--lote debe ser >= 1')
+
+        with transaction.atomic():
+            RegistroAcumulado.objects.all().delete()
+            # Los lotes se suman al acumulado existente, así que un estudiante puede quedar entre dos lotes
+            registros = HistorialAcademico.objects.order_by('estudiante_id', 'id').iterator(chunk_size=options['lote'])
+            lote = []
+            for registro in registros:
+                lote.append(registro)
+                if len(lote) == options['lote']:
+                    RegistroAcumulado.objects.acumular(lote, lote=options['lote'])
+                    lote = []
+            if lote:
+                RegistroAcumulado.objects.acumular(lote, lote=options['lote'])
+
+        total = RegistroAcumulado.objects.count()
+        self.stdout.write(self.style.SUCCESS(f'{total} registros acumulados recalculados'))
@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from gestion_notas.models import Curso, InscripcionCurso
+
+
+class Command(BaseCommand):
+    help = ('Recalcula InscripcionCurso.promedio_almacenado por lotes de cursos; solo escribe las '
+            'inscripciones cuyo promedio cambió (carga inicial o verificación tras cambios masivos)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--curso', type=int, action='append', default=[],
+                            help='Limitar a estos cursos (se puede repetir)')
+        parser.add_argument('--lote', type=int, default=50, help='Cursos por lote')
+        parser.add_argument('--pausa', type=float, default=0.0,
+                            help='Segundos de espera entre lotes para no acaparar la base')
+
+    def handle(self, *args, **options):
+        if options['lote'] < 1:
+            raise CommandError('--lote debe ser >= 1')
+
+        cursos = Curso.con_archivados.order_by('id')
+        if options['curso']:
+            cursos = cursos.filter(id__in=options['curso'])
+        ids = list(cursos.values_list('id', flat=True))
+
+        total = 0
+        for inicio in range(0, len(ids), options['lote']):
+            with transaction.atomic():
+                total += InscripcionCurso.con_archivados.filter(
+                    curso_id__in=ids[inicio:inicio + options['lote']]
+                ).recalcular_promedios()
+            self.stdout.write(f'  {min(inicio + options["lote"], len(ids))}/{len(ids)} cursos...')
+            if options['pausa']:
+                time.sleep(options['pausa'])
+
+        self.stdout.write(self.style.SUCCESS(f'{total} promedios actualizados en {len(ids)} cursos'))
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from gestion_notas.models import Curso
+
+
+class Command(BaseCommand):
+    help = ('Compara Curso.inscritos con las inscripciones activas y corrige los cursos desfasados '
+            '(p. ej. tras cargas con señales desconectadas o SQL manual)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--periodo', type=int, action='append', default=[],
+                            help='Limitar a los cursos de estos periodos (se puede repetir)')
+        parser.add_argument('--lote', type=int, default=500, help='Cursos por transacción')
+        parser.add_argument('--simular', action='store_true', help='Solo listar los desfases, sin corregirlos')
+
+    def handle(self, *args, **options):
+        if options['lote'] < 1:
+            raise CommandError('--lote debe ser >= 1')
+
+        cursos = Curso.con_archivados.order_by('id')
+        if options['periodo']:
+            cursos = cursos.filter(periodo_id__in=options['periodo'])
+        ids = list(cursos.values_list('id', flat=True))
+
+        total = 0
+        for inicio in range(0, len(ids), options['lote']):
+            lote = Curso.con_archivados.filter(id__in=ids[inicio:inicio + options['lote']])
+            with transaction.atomic():
+                desfasados = list(lote.desfasados().select_for_update(of=('self',))
+                                  .values_list('id', 'inscritos', 'inscritos_reales'))
+                for curso_id, guardado, real in desfasados:
+                    self.stdout.write(f'  curso {curso_id}: {guardado} -> {real}')
+                if desfasados and not options['simular']:
+                    lote.recontar_inscritos()
+            total += len(desfasados)
+
+        accion = 'desfasados' if options['simular'] else 'corregidos'
+        self.stdout.write(self.style.SUCCESS(f'{total} cursos {accion} de {len(ids)}'))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from gestion_notas.auditoria import rotar_logs
+
+
+class Command(BaseCommand):
+    help = 'Mueve los logs de actividad antiguos a la tabla de archivo o a archivos NDJSON comprimidos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--meses', type=int, default=6,
+                            help='Meses que se conservan en la tabla principal (por defecto 6)')
+        parser.add_argument('--destino', choices=['tabla', 'ndjson'], default='tabla',
+                            help='Tabla de archivo o archivos NDJSON comprimidos')
+        parser.add_argument('--directorio', default=None,
+                            help='Directorio para los NDJSON (por defecto logs/actividad)')
+        parser.add_argument('--lote', type=int, default=5000,
+                            help='Registros movidos por transacción')
+
+    def handle(self, *args, **options):
+        if options['meses'] < 0:
+            raise CommandError('--meses debe ser mayor o igual a 0')
+
+        self.stdout.write(f"Rotando logs con más de {options['meses']} meses hacia {options['destino']}...")
+        movidos = rotar_logs(
+            meses=options['meses'],
+            destino=options['destino'],
+            directorio=options['directorio'],
+            lote=options['lote'],
+        )
+
+        for particion, total in sorted(movidos.items()):
+            self.stdout.write(f'  {particion}: {total} registros')
+
+        self.stdout.write(self.style.SUCCESS(f'Rotación completada: {sum(movidos.values())} registros movidos'))
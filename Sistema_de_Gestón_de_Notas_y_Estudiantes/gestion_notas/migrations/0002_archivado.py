@@ -0,0 +1,67 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_notas', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='curso',
+            name='archived',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='curso',
+            name='archived_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='inscripcioncurso',
+            name='archived',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='inscripcioncurso',
+            name='archived_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='notificacion',
+            name='archived',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='notificacion',
+            name='archived_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='periodoacademico',
+            name='archived',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='periodoacademico',
+            name='archived_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='periodoacademico',
+            index=models.Index(condition=models.Q(('archived', False)), fields=['-fecha_inicio'], name='periodo_activo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='curso',
+            index=models.Index(condition=models.Q(('archived', False)), fields=['periodo'], name='curso_periodo_activo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inscripcioncurso',
+            index=models.Index(condition=models.Q(('archived', False)), fields=['estudiante', 'curso'], name='insc_est_curso_activo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notificacion',
+            index=models.Index(condition=models.Q(('archived', False)), fields=['usuario', '-fecha_creacion'], name='notif_usuario_activa_idx'),
+        ),
+    ]
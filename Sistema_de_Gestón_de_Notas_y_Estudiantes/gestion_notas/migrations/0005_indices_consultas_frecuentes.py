@@ -0,0 +1,23 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_notas', '0004_notificacion_leida_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='curso',
+            index=models.Index(fields=['periodo', 'profesor'], name='curso_periodo_profesor_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='curso',
+            index=models.Index(fields=['periodo', 'materia'], name='curso_periodo_materia_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inscripcioncurso',
+            index=models.Index(fields=['curso', 'estudiante'], name='insc_curso_est_idx'),
+        ),
+    ]
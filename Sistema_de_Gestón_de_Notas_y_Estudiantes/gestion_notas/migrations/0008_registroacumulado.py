@@ -0,0 +1,31 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_notas', '0007_historialacademico'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegistroAcumulado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('suma_ponderada', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('creditos_cursados', models.PositiveIntegerField(default=0)),
+                ('creditos_aprobados', models.PositiveIntegerField(default=0)),
+                ('cursos_reprobados', models.PositiveIntegerField(default=0)),
+                ('promedio_acumulado', models.DecimalField(blank=True, decimal_places=2, max_digits=3, null=True)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+                ('estudiante', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='acumulado', to='gestion_notas.estudiante')),
+                ('programa', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='gestion_notas.programa')),
+            ],
+            options={
+                'verbose_name': 'Registro Acumulado',
+                'verbose_name_plural': 'Registros Acumulados',
+                'indexes': [models.Index(fields=['programa', '-promedio_acumulado', '-creditos_aprobados'], name='acumulado_ranking_idx')],
+            },
+        ),
+    ]
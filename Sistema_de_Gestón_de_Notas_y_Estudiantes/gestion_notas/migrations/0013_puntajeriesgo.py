@@ -0,0 +1,36 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_notas', '0012_cuborendimiento'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PuntajeRiesgo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('puntaje', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('nivel', models.CharField(choices=[('bajo', 'Bajo'), ('medio', 'Medio'), ('alto', 'Alto')], max_length=10)),
+                ('promedio_parcial', models.DecimalField(blank=True, decimal_places=2, max_digits=3, null=True)),
+                ('promedio_anterior', models.DecimalField(blank=True, decimal_places=2, max_digits=3, null=True)),
+                ('tendencia', models.DecimalField(blank=True, decimal_places=2, max_digits=3, null=True)),
+                ('evaluaciones_faltantes', models.PositiveIntegerField(default=0)),
+                ('cursos', models.PositiveIntegerField(default=0)),
+                ('cursos_en_riesgo', models.PositiveIntegerField(default=0)),
+                ('fecha_calculo', models.DateTimeField()),
+                ('estudiante', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='puntajes_riesgo', to='gestion_notas.estudiante')),
+                ('periodo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='gestion_notas.periodoacademico')),
+                ('programa', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='gestion_notas.programa')),
+            ],
+            options={
+                'verbose_name': 'Puntaje de Riesgo',
+                'verbose_name_plural': 'Puntajes de Riesgo',
+                'indexes': [models.Index(fields=['periodo', '-puntaje'], name='riesgo_periodo_puntaje_idx'), models.Index(fields=['periodo', 'programa', '-puntaje'], name='riesgo_programa_idx')],
+                'constraints': [models.UniqueConstraint(fields=('periodo', 'estudiante'), name='riesgo_periodo_est_uniq')],
+            },
+        ),
+    ]
@@ -1,7 +1,332 @@
-from django.db import models
+import logging
+import threading
+from collections import Counter
+from decimal import Decimal
+
+from django.db import connection, models, transaction
 from django.contrib.auth.models import AbstractUser
+from django.core.exceptions import NON_FIELD_ERRORS, ValidationError
 from django.core.validators import MinValueValidator, MaxValueValidator
-from django.db.models import Avg, Sum
+from django.db.models import Avg, Sum, Q, F, Count, OuterRef, Subquery, Window
+from django.db.models.functions import Coalesce, Rank
+from django.utils import timezone
+
+from .metricas import NOTIFICACIONES_CREADAS, PROMEDIO_SEGUNDOS
+
+logger = logging.getLogger('gestion_notas.horarios')
+
+
+class ArchivadoQuerySet(models.QuerySet):
+    """QuerySet con filtros de archivado"""
+    def activos(self):
+        return self.filter(archived=False)
+
+    def archivados(self):
+        return self.filter(archived=True)
+
+
+class ArchivadoManager(models.Manager.from_queryset(ArchivadoQuerySet)):
+    """Manager que incluye los registros archivados"""
+    pass
+
+
+class ActivosManager(ArchivadoManager):
+    """Manager por defecto: excluye los registros archivados"""
+    def get_queryset(self):
+        return super().get_queryset().filter(archived=False)
+
+
+class VersionadoQuerySet(models.QuerySet):
+    """
+    Incrementa las versiones de datos (ver versiones.py) también en las escrituras
+    masivas, que no disparan post_save/post_delete.
+    """
+    def update(self, **kwargs):
+        from .versiones import afectados_por_queryset, incrementar
+        afectados = afectados_por_queryset(self, kwargs)
+        filas = super().update(**kwargs)
+        if filas:
+            incrementar(afectados)
+            recalcular_promedios_de_cursos(self.model, afectados['curso'])
+        return filas
+
+    def bulk_create(self, objs, *args, **kwargs):
+        from .versiones import afectados_por_instancias, incrementar
+        objs = super().bulk_create(objs, *args, **kwargs)
+        afectados = afectados_por_instancias(self.model, objs)
+        incrementar(afectados)
+        recalcular_promedios_de_cursos(self.model, afectados['curso'])
+        return objs
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        from .versiones import afectados_por_instancias, incrementar
+        objs = list(objs)
+        filas = super().bulk_update(objs, fields, *args, **kwargs)
+        if filas:
+            afectados = afectados_por_instancias(self.model, objs)
+            incrementar(afectados)
+            recalcular_promedios_de_cursos(self.model, afectados['curso'])
+        return filas
+
+
+def conteo_inscritos():
+    return Coalesce(Subquery(
+        InscripcionCurso.objects.filter(curso=OuterRef('pk')).order_by().values('curso')
+        .annotate(total=Count('*')).values('total')
+    ), 0)
+
+
+class CursoQuerySet(VersionadoQuerySet, ArchivadoQuerySet):
+    """QuerySet de cursos: archivado y versiones de datos"""
+    def con_inscritos_reales(self):
+        """Anota `inscritos_reales`: las inscripciones activas contadas en la base"""
+        return self.annotate(inscritos_reales=conteo_inscritos())
+
+    def desfasados(self):
+        """Cursos cuyo contador `inscritos` no coincide con las inscripciones activas"""
+        return self.con_inscritos_reales().exclude(inscritos=F('inscritos_reales'))
+
+    def recontar_inscritos(self):
+        """Corrige el contador `inscritos` donde no coincide con las inscripciones activas; devuelve cuántos"""
+        desfasados = list(self.desfasados().values_list('pk', flat=True))
+        # _base_manager: el contador no cambia las versiones de datos
+        return Curso._base_manager.filter(pk__in=desfasados).update(inscritos=conteo_inscritos())
+
+    def update(self, **kwargs):
+        filas = super().update(**kwargs)
+        if filas and {'horario', 'aula', 'periodo', 'periodo_id'} & set(kwargs):
+            from .horarios import sincronizar_franjas
+            sincronizar_franjas(Curso.con_archivados.filter(pk__in=self.values('pk')))
+        return filas
+
+
+class InscripcionQuerySet(VersionadoQuerySet, ArchivadoQuerySet):
+    """QuerySet de inscripciones con precargas para calcular promedios sin N+1"""
+    # Curso.inscritos, el cubo y el ranking se mantienen aquí para las escrituras masivas y en signals.py
+    # para save/delete
+    def update(self, **kwargs):
+        recontar = {'archived', 'curso', 'curso_id'} & set(kwargs)
+        mover = recontar or {'estudiante', 'estudiante_id'} & set(kwargs)
+        antes = list(self.order_by().values_list('pk', 'curso_id', 'estudiante_id')) if mover else []
+        filas = super().update(**kwargs)
+        if filas and mover:
+            pares = {(curso_id, estudiante_id) for _, curso_id, estudiante_id in antes}
+            pares.update(InscripcionCurso._base_manager.filter(pk__in=[pk for pk, _, _ in antes])
+                         .values_list('curso_id', 'estudiante_id'))
+            if recontar:
+                Curso.con_archivados.filter(pk__in={curso_id for curso_id, _ in pares}).recontar_inscritos()
+            refrescar_agregados(pares)
+        return filas
+
+    def bulk_create(self, objs, *args, contar=True, **kwargs):
+        """`contar=False` si las plazas ya se reservaron en Curso.inscritos (ver inscripciones.py)"""
+        objs = super().bulk_create(objs, *args, **kwargs)
+        if contar and objs:
+            cursos = Counter(obj.curso_id for obj in objs if not obj.archived)
+            if kwargs.get('ignore_conflicts') or kwargs.get('update_conflicts'):
+                # No se sabe qué filas se insertaron: se recuentan esos cursos
+                Curso.con_archivados.filter(pk__in=cursos).recontar_inscritos()
+            else:
+                with transaction.atomic():
+                    for curso_id, cantidad in sorted(cursos.items()):
+                        Curso._base_manager.filter(pk=curso_id).update(inscritos=F('inscritos') + cantidad)
+        refrescar_agregados((obj.curso_id, obj.estudiante_id) for obj in objs)
+        return objs
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        filas = super().bulk_update(objs, fields, *args, **kwargs)
+        if filas and {'archived', 'curso', 'curso_id'} & set(fields):
+            Curso.con_archivados.filter(pk__in={obj.curso_id for obj in objs}).recontar_inscritos()
+        if filas and {'archived', 'curso', 'curso_id', 'estudiante', 'estudiante_id'} & set(fields):
+            refrescar_agregados((obj.curso_id, obj.estudiante_id) for obj in objs)
+        return filas
+
+    def con_pesos(self):
+        """Precarga calificaciones y pesos del curso: calcular_promedio() no hace consultas"""
+        return self.prefetch_related('calificaciones', 'curso__configuracion_evaluaciones')
+
+    def con_notas(self):
+        """Precarga todo lo que muestran las vistas de notas (curso, estudiante, calificaciones y pesos)"""
+        return self.select_related(
+            'curso__materia', 'curso__periodo', 'curso__profesor__usuario',
+            'estudiante__usuario', 'estudiante__programa',
+        ).prefetch_related(
+            'calificaciones__tipo_evaluacion', 'curso__configuracion_evaluaciones__tipo_evaluacion',
+        )
+
+    def promedios_calculados(self, pesos=None):
+        """
+        {inscripcion_id: (promedio almacenado, promedio calculado)} con tres consultas.
+        `pesos` ({curso_id: {tipo_evaluacion_id: porcentaje}}) reemplaza la configuración de esos cursos.
+        """
+        filas = list(self.order_by().values_list('id', 'curso_id', 'promedio_almacenado'))
+        inscripciones = {inscripcion_id: curso for inscripcion_id, curso, _ in filas}
+        almacenados = {inscripcion_id: almacenado for inscripcion_id, _, almacenado in filas}
+        pesos_cursos = {curso: {} for curso in set(inscripciones.values())}
+        for curso, tipo_id, porcentaje in ConfiguracionEvaluacion.objects.filter(
+            curso_id__in=pesos_cursos
+        ).values_list('curso_id', 'tipo_evaluacion_id', 'porcentaje'):
+            pesos_cursos[curso][tipo_id] = porcentaje
+        pesos_cursos.update(pesos or {})
+
+        notas = {}
+        for inscripcion_id, tipo_id, nota in Calificacion.objects.filter(
+            inscripcion_id__in=inscripciones
+        ).values_list('inscripcion_id', 'tipo_evaluacion_id', 'nota'):
+            notas.setdefault(inscripcion_id, {})[tipo_id] = nota
+
+        return {
+            inscripcion_id: (almacenados[inscripcion_id],
+                             promedio_ponderado(notas.get(inscripcion_id), pesos_cursos[curso]))
+            for inscripcion_id, curso in inscripciones.items()
+        }
+
+    def recalcular_promedios(self, lote=500):
+        """Guarda promedio_almacenado solo en las inscripciones cuyo promedio cambió; devuelve cuántas"""
+        cambios = [
+            InscripcionCurso(pk=inscripcion_id, promedio_almacenado=decimal_promedio(calculado))
+            for inscripcion_id, (almacenado, calculado) in self.promedios_calculados().items()
+            if almacenado != decimal_promedio(calculado)
+        ]
+        # _base_manager: un campo derivado no incrementa versiones ni vuelve a disparar el recálculo
+        InscripcionCurso._base_manager.bulk_update(cambios, ['promedio_almacenado'], batch_size=lote)
+        if cambios:
+            refrescar_agregados(InscripcionCurso._base_manager.filter(
+                pk__in=[cambio.pk for cambio in cambios]
+            ).values_list('curso_id', 'estudiante_id'))
+        return len(cambios)
+
+
+def promedio_ponderado(notas, pesos):
+    """
+    Promedio ponderado a partir de {tipo_evaluacion_id: nota} y {tipo_evaluacion_id: porcentaje}.
+    Devuelve None si no hay notas y 0.0 si ninguna nota tiene peso configurado.
+    """
+    if not notas:
+        return None
+    
+    total_ponderado = 0
+    total_porcentaje = 0
+    
+    for tipo_id, nota in notas.items():
+        porcentaje = pesos.get(tipo_id)
+        if porcentaje is not None:
+            peso = float(porcentaje) / 100
+            total_ponderado += float(nota) * peso
+            total_porcentaje += peso
+    
+    return round(total_ponderado, 2) if total_porcentaje > 0 else 0.0
+
+
+def decimal_promedio(promedio):
+    """Promedio (float de promedio_ponderado) como Decimal de dos cifras, o None"""
+    return Decimal(str(promedio)).quantize(Decimal('0.01')) if promedio is not None else None
+
+
+def recalcular_promedios_de_cursos(model, cursos):
+    """Tras una escritura masiva de notas o pesos, recalcula los promedios almacenados de esos cursos"""
+    if model in (Calificacion, ConfiguracionEvaluacion) and cursos:
+        InscripcionCurso.con_archivados.filter(curso_id__in=cursos).recalcular_promedios()
+
+
+class RefrescoPendiente:
+    """Celdas del cubo y posiciones del ranking acumuladas en una transacción; se refrescan al confirmarla"""
+
+    def __init__(self):
+        self.celdas = set()
+        self.estudiantes = {}
+        self.aplicado = False
+
+    def __call__(self):
+        self.aplicado = True
+        CuboRendimiento.objects.refrescar(celdas=self.celdas)
+        PosicionRanking.objects.refrescar(self.estudiantes)
+
+
+PENDIENTES = threading.local()
+
+
+def refrescar_agregados(pares, celdas=()):
+    """
+    Programa para el commit el refresco de las celdas del cubo y las posiciones del ranking de los
+    (curso_id, estudiante_id) que cambiaron, más las `celdas` dadas. Las celdas se resuelven ahora (un
+    estudiante borrado en cascada ya no existirá); el recálculo se hace una vez por transacción.
+    """
+    pares = {(curso_id, estudiante_id) for curso_id, estudiante_id in pares if None not in (curso_id, estudiante_id)}
+    celdas = set(celdas)
+    if not (pares or celdas):
+        return
+    cursos = {pk: (materia_id, periodo_id) for pk, materia_id, periodo_id in Curso.con_archivados.filter(
+        pk__in={curso_id for curso_id, _ in pares}).values_list('id', 'materia_id', 'periodo_id')}
+    ubicaciones = {pk: (programa_id, semestre) for pk, programa_id, semestre in Estudiante.objects.filter(
+        pk__in={estudiante_id for _, estudiante_id in pares}).values_list('id', 'programa_id', 'semestre')}
+
+    conexion = transaction.get_connection()
+    pendiente = getattr(PENDIENTES, 'refresco', None)
+    # Se reutiliza mientras siga esperando el commit; si su savepoint se deshizo, Django ya lo descartó
+    nuevo = pendiente is None or pendiente.aplicado or not any(
+        funcion is pendiente for _, funcion, _ in conexion.run_on_commit)
+    if nuevo:
+        pendiente = PENDIENTES.refresco = RefrescoPendiente()
+    pendiente.celdas |= celdas
+    for curso_id, estudiante_id in pares:
+        if curso_id not in cursos:
+            continue
+        materia_id, periodo_id = cursos[curso_id]
+        pendiente.estudiantes.setdefault(periodo_id, set()).add(estudiante_id)
+        if estudiante_id in ubicaciones:
+            pendiente.celdas.add((periodo_id, materia_id, *ubicaciones[estudiante_id]))
+    if nuevo:
+        # Fuera de una transacción on_commit lo ejecuta en el acto
+        transaction.on_commit(pendiente)
+
+
+def estado_segun_promedio(promedio):
+    """Pendiente (sin notas), Aprobado o Reprobado"""
+    if promedio is None:
+        return "Pendiente"
+    return "Aprobado" if promedio >= 3.0 else "Reprobado"
+
+
+class Archivable(models.Model):
+    """Modelo base para registros que pueden archivarse"""
+    archived = models.BooleanField(default=False)
+    archived_at = models.DateTimeField(null=True, blank=True)
+
+    objects = ActivosManager()
+    con_archivados = ArchivadoManager()
+
+    class Meta:
+        abstract = True
+
+    def _perform_unique_checks(self, unique_checks):
+        """
+        Como el de Django, pero contra _base_manager: `objects` (el manager por defecto) no ve las filas
+        archivadas y la restricción de la base sí
+        """
+        errors = {}
+        for model_class, unique_check in unique_checks:
+            lookup_kwargs = {}
+            for field_name in unique_check:
+                campo = self._meta.get_field(field_name)
+                valor = getattr(self, campo.attname)
+                if valor is None or (valor == '' and connection.features.interprets_empty_strings_as_nulls):
+                    continue
+                if campo.primary_key and not self._state.adding:
+                    continue
+                lookup_kwargs[str(field_name)] = valor
+            if len(unique_check) != len(lookup_kwargs):
+                continue
+            existentes = model_class._base_manager.filter(**lookup_kwargs)
+            pk = self._get_pk_val(model_class._meta)
+            if not self._state.adding and pk is not None:
+                existentes = existentes.exclude(pk=pk)
+            if existentes.exists():
+                clave = unique_check[0] if len(unique_check) == 1 else NON_FIELD_ERRORS
+                errors.setdefault(clave, []).append(self.unique_error_message(model_class, unique_check))
+        return errors
+
 
 class Usuario(AbstractUser):
     """Usuario base con roles específicos"""
@@ -39,20 +364,47 @@ class Programa(models.Model):
         return self.nombre
 
 
-class PeriodoAcademico(models.Model):
+class PeriodoAcademico(Archivable):
     """Periodo académico (semestre)"""
     nombre = models.CharField(max_length=50)  # Ej: "2025-1"
     fecha_inicio = models.DateField()
     fecha_fin = models.DateField()
     activo = models.BooleanField(default=True)
+    cerrado = models.BooleanField(default=False)  # notas congeladas en HistorialAcademico
+    fecha_cierre = models.DateTimeField(null=True, blank=True)
     
     class Meta:
         verbose_name = 'Periodo Académico'
         verbose_name_plural = 'Periodos Académicos'
         ordering = ['-fecha_inicio']
+        indexes = [
+            models.Index(fields=['-fecha_inicio'], condition=Q(archived=False), name='periodo_activo_idx'),
+        ]
     
     def __str__(self):
         return self.nombre
+    
+    def cerrar(self, lote=1000):
+        """
+        Congela promedio, créditos y estado de cada inscripción del periodo en HistorialAcademico
+        y marca el periodo como cerrado. Devuelve el número de registros creados.
+        """
+        with transaction.atomic():
+            periodo = PeriodoAcademico.con_archivados.select_for_update().get(pk=self.pk)
+            if periodo.cerrado:
+                raise ValueError(f'El periodo {periodo.nombre} ya está cerrado')
+            
+            inscripciones = (InscripcionCurso.con_archivados.filter(curso__periodo=periodo)
+                             .select_related('curso__materia', 'curso__periodo').con_pesos().order_by('id'))
+            registros = [HistorialAcademico.desde_inscripcion(insc) for insc in inscripciones]
+            HistorialAcademico.objects.bulk_create(registros, batch_size=lote)
+            RegistroAcumulado.objects.acumular(registros, lote=lote)
+            
+            periodo.cerrado = True
+            periodo.fecha_cierre = timezone.now()
+            periodo.save(update_fields=['cerrado', 'fecha_cierre'])
+        self.cerrado, self.fecha_cierre = periodo.cerrado, periodo.fecha_cierre
+        return len(registros)
 
 
 class Estudiante(models.Model):
@@ -80,8 +432,8 @@ class Estudiante(models.Model):
     
     def obtener_promedio_periodo(self, periodo):
         """Calcula el promedio del estudiante en un periodo específico"""
-        inscripciones = self.inscripciones.filter(curso__periodo=periodo)
-        promedios = [insc.calcular_promedio() for insc in inscripciones if insc.calcular_promedio() is not None]
+        inscripciones = self.inscripciones.filter(curso__periodo=periodo).con_pesos()
+        promedios = [p for p in (insc.calcular_promedio() for insc in inscripciones) if p is not None]
         return sum(promedios) / len(promedios) if promedios else 0.0
 
 
@@ -130,7 +482,7 @@ class Materia(models.Model):
         return f"{self.codigo} - {self.nombre}"
 
 
-class Curso(models.Model):
+class Curso(Archivable):
     """Curso específico (una materia en un periodo con un profesor)"""
     materia = models.ForeignKey(Materia, on_delete=models.PROTECT)
     periodo = models.ForeignKey(PeriodoAcademico, on_delete=models.PROTECT)
@@ -139,17 +491,45 @@ class Curso(models.Model):
     horario = models.TextField(blank=True)
     aula = models.CharField(max_length=50, blank=True)
     cupo_maximo = models.IntegerField(default=30)
+    inscritos = models.PositiveIntegerField(default=0)  # inscripciones activas (contador)
+    
+    objects = ActivosManager.from_queryset(CursoQuerySet)()
+    con_archivados = ArchivadoManager.from_queryset(CursoQuerySet)()
     
     class Meta:
         verbose_name = 'Curso'
         verbose_name_plural = 'Cursos'
         unique_together = ['materia', 'periodo', 'grupo']
+        indexes = [
+            models.Index(fields=['periodo'], condition=Q(archived=False), name='curso_periodo_activo_idx'),
+            models.Index(fields=['periodo', 'profesor'], name='curso_periodo_profesor_idx'),
+            models.Index(fields=['periodo', 'materia'], name='curso_periodo_materia_idx'),
+        ]
     
     def __str__(self):
         return f"{self.materia.codigo} - Grupo {self.grupo} - {self.periodo.nombre}"
     
     def estudiantes_inscritos(self):
-        return self.inscripciones.count()
+        """Inscripciones activas, del contador `inscritos` (sin consulta)"""
+        return self.inscritos
+    
+    def clean(self):
+        """El aula no puede estar ocupada por otro curso del periodo (si el horario se entiende)"""
+        from .horarios import choque_de_aula
+        if not self.periodo_id:
+            return
+        try:
+            otro = choque_de_aula(self)
+        except ValueError as error:
+            # Igual que sincronizar_franjas: el curso se guarda sin franjas y no entra en los choques
+            logger.warning('Horario del curso %s sin franjas: %s', self.pk or 'nuevo', error)
+            return
+        if otro:
+            raise ValidationError({'aula': f'El aula está ocupada a esa hora por {Curso.con_archivados.get(pk=otro)}'})
+    
+    def pesos_evaluacion(self):
+        """{tipo_evaluacion_id: porcentaje}; usa la configuración precargada si existe"""
+        return {config.tipo_evaluacion_id: config.porcentaje for config in self.configuracion_evaluaciones.all()}
 
 
 class TipoEvaluacion(models.Model):
@@ -172,6 +552,8 @@ class ConfiguracionEvaluacion(models.Model):
     porcentaje = models.DecimalField(max_digits=5, decimal_places=2, 
                                      validators=[MinValueValidator(0), MaxValueValidator(100)])
     
+    objects = VersionadoQuerySet.as_manager()
+    
     class Meta:
         verbose_name = 'Configuración de Evaluación'
         verbose_name_plural = 'Configuraciones de Evaluación'
@@ -181,48 +563,52 @@ class ConfiguracionEvaluacion(models.Model):
         return f"{self.curso} - {self.tipo_evaluacion.nombre}: {self.porcentaje}%"
 
 
-class InscripcionCurso(models.Model):
+class InscripcionCurso(Archivable):
     """Inscripción de un estudiante en un curso"""
     estudiante = models.ForeignKey(Estudiante, on_delete=models.CASCADE, related_name='inscripciones')
     curso = models.ForeignKey(Curso, on_delete=models.CASCADE, related_name='inscripciones')
     fecha_inscripcion = models.DateTimeField(auto_now_add=True)
+    # Copia de calcular_promedio(); se recalcula al escribir notas o pesos del curso
+    promedio_almacenado = models.DecimalField(max_digits=3, decimal_places=2, null=True, blank=True)
+    
+    objects = ActivosManager.from_queryset(InscripcionQuerySet)()
+    con_archivados = ArchivadoManager.from_queryset(InscripcionQuerySet)()
     
     class Meta:
         verbose_name = 'Inscripción a Curso'
         verbose_name_plural = 'Inscripciones a Cursos'
         unique_together = ['estudiante', 'curso']
+        indexes = [
+            models.Index(fields=['estudiante', 'curso'], condition=Q(archived=False), name='insc_est_curso_activo_idx'),
+            models.Index(fields=['curso', 'estudiante'], name='insc_curso_est_idx'),
+        ]
     
     def __str__(self):
         return f"{self.estudiante} - {self.curso}"
     
+    @PROMEDIO_SEGUNDOS.cronometrado
     def calcular_promedio(self):
         """Calcula el promedio ponderado del estudiante en este curso"""
-        calificaciones = self.calificaciones.all()
-        if not calificaciones:
+        notas = {cal.tipo_evaluacion_id: cal.nota for cal in self.calificaciones.all()}
+        if not notas:
             return None
-        
-        total_ponderado = 0
-        total_porcentaje = 0
-        
-        for calificacion in calificaciones:
-            config = ConfiguracionEvaluacion.objects.filter(
-                curso=self.curso,
-                tipo_evaluacion=calificacion.tipo_evaluacion
-            ).first()
-            
-            if config:
-                peso = float(config.porcentaje) / 100
-                total_ponderado += float(calificacion.nota) * peso
-                total_porcentaje += peso
-        
-        return round(total_ponderado, 2) if total_porcentaje > 0 else 0.0
+        return promedio_ponderado(notas, self.curso.pesos_evaluacion())
     
     def estado_aprobacion(self):
         """Determina si el estudiante aprobó o reprobó"""
-        promedio = self.calcular_promedio()
-        if promedio is None:
-            return "Pendiente"
-        return "Aprobado" if promedio >= 3.0 else "Reprobado"
+        return estado_segun_promedio(self.calcular_promedio())
+    
+    def clean(self):
+        """El estudiante no puede tener otro curso del periodo a la misma hora"""
+        from .horarios import choque_de_estudiante
+        if not (self.estudiante_id and self.curso_id) or self.archived:
+            return
+        try:
+            otro = choque_de_estudiante(self.estudiante_id, self.curso)
+        except ValueError:
+            return  # horario sin formato: no se puede comprobar
+        if otro:
+            raise ValidationError(f'El horario se cruza con {Curso.con_archivados.get(pk=otro)}')
 
 
 class Calificacion(models.Model):
@@ -236,6 +622,8 @@ class Calificacion(models.Model):
     fecha_modificacion = models.DateTimeField(auto_now=True)
     registrada_por = models.ForeignKey(Usuario, on_delete=models.PROTECT)
     
+    objects = VersionadoQuerySet.as_manager()
+    
     class Meta:
         verbose_name = 'Calificación'
         verbose_name_plural = 'Calificaciones'
@@ -245,7 +633,7 @@ class Calificacion(models.Model):
         return f"{self.inscripcion.estudiante} - {self.tipo_evaluacion.nombre}: {self.nota}"
 
 
-class Notificacion(models.Model):
+class Notificacion(Archivable):
     """Notificaciones para usuarios"""
     TIPOS = [
         ('nueva_nota', 'Nueva Nota'),
@@ -265,9 +653,19 @@ class Notificacion(models.Model):
         verbose_name = 'Notificación'
         verbose_name_plural = 'Notificaciones'
         ordering = ['-fecha_creacion']
+        indexes = [
+            models.Index(fields=['usuario', '-fecha_creacion'], condition=Q(archived=False), name='notif_usuario_activa_idx'),
+            models.Index(fields=['usuario', 'leida', 'fecha_creacion'], name='notif_usuario_leida_fecha_idx'),
+        ]
     
     def __str__(self):
         return f"{self.usuario.username} - {self.titulo}"
+    
+    def save(self, *args, **kwargs):
+        creada = self._state.adding
+        super().save(*args, **kwargs)
+        if creada:
+            NOTIFICACIONES_CREADAS.inc(tipo=self.tipo)
 
 
 class LogActividad(models.Model):
@@ -291,6 +689,515 @@ class LogActividad(models.Model):
         verbose_name = 'Log de Actividad'
         verbose_name_plural = 'Logs de Actividad'
         ordering = ['-fecha']
+        indexes = [
+            models.Index(fields=['fecha'], name='log_fecha_idx'),
+            models.Index(fields=['usuario', 'fecha'], name='log_usuario_fecha_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.usuario} - {self.accion} - {self.modelo} - {self.fecha}"
+
+
+class LogActividadArchivo(models.Model):
+    """Registros de actividad rotados fuera de la tabla principal (una partición por mes)"""
+    usuario = models.ForeignKey(Usuario, on_delete=models.SET_NULL, null=True, related_name='+')
+    accion = models.CharField(max_length=20, choices=LogActividad.ACCIONES)
+    modelo = models.CharField(max_length=50)
+    objeto_id = models.IntegerField()
+    descripcion = models.TextField()
+    fecha = models.DateTimeField()
+    ip_address = models.GenericIPAddressField(null=True, blank=True)
+    particion = models.CharField(max_length=7)  # Ej: "2025-03"
+    
+    class Meta:
+        verbose_name = 'Log de Actividad Archivado'
+        verbose_name_plural = 'Logs de Actividad Archivados'
+        ordering = ['-fecha']
+        indexes = [
+            models.Index(fields=['particion'], name='logarch_particion_idx'),
+            models.Index(fields=['fecha'], name='logarch_fecha_idx'),
+            models.Index(fields=['usuario', 'fecha'], name='logarch_usuario_fecha_idx'),
+        ]
     
     def __str__(self):
-        return f"{self.usuario} - {self.accion} - {self.modelo} - {self.fecha}"
\ No newline at end of file
+        return f"[{self.particion}] {self.usuario} - {self.accion} - {self.modelo} - {self.fecha}"
+
+
+class VersionDatos(models.Model):
+    """Versión de los datos de un curso, estudiante o periodo; aumenta con cada escritura relacionada"""
+    AMBITOS = [
+        ('curso', 'Curso'),
+        ('estudiante', 'Estudiante'),
+        ('periodo', 'Periodo Académico'),
+    ]
+    
+    ambito = models.CharField(max_length=20, choices=AMBITOS)
+    objeto_id = models.PositiveBigIntegerField()
+    version = models.PositiveBigIntegerField(default=0)
+    fecha_modificacion = models.DateTimeField()
+    
+    class Meta:
+        verbose_name = 'Versión de Datos'
+        verbose_name_plural = 'Versiones de Datos'
+        constraints = [
+            models.UniqueConstraint(fields=['ambito', 'objeto_id'], name='version_ambito_objeto_uniq'),
+        ]
+    
+    def __str__(self):
+        return f"{self.ambito} {self.objeto_id} v{self.version}"
+
+
+class HistorialQuerySet(models.QuerySet):
+    """El historial no admite modificaciones"""
+    def update(self, **kwargs):
+        raise TypeError('HistorialAcademico no admite modificaciones')
+
+    def de_estudiante(self, estudiante, periodo=None):
+        """Registros congelados de los periodos cerrados (más los abiertos calculados al vuelo)"""
+        registros = list(self.filter(estudiante=estudiante, **({'periodo': periodo} if periodo else {}))
+                         .select_related('periodo').order_by('-periodo__fecha_inicio', 'materia_codigo'))
+        if periodo is not None and periodo.cerrado:
+            return registros
+        abiertas = estudiante.inscripciones.filter(curso__periodo__cerrado=False)
+        if periodo is not None:
+            abiertas = abiertas.filter(curso__periodo=periodo)
+        registros += [
+            HistorialAcademico.desde_inscripcion(insc)
+            for insc in abiertas.select_related('curso__materia', 'curso__periodo').con_pesos()
+            .order_by('-curso__periodo__fecha_inicio', 'curso__materia__codigo')
+        ]
+        return sorted(registros, key=lambda r: r.periodo.fecha_inicio, reverse=True)
+
+
+class HistorialAcademico(models.Model):
+    """Nota final congelada de una inscripción al cerrar su periodo; las filas no se modifican"""
+    estudiante = models.ForeignKey(Estudiante, on_delete=models.PROTECT, related_name='historial')
+    periodo = models.ForeignKey(PeriodoAcademico, on_delete=models.PROTECT, related_name='historial')
+    # Las tablas vivas pueden archivarse o depurarse después del cierre
+    inscripcion = models.ForeignKey(InscripcionCurso, on_delete=models.SET_NULL, null=True, blank=True,
+                                    related_name='+')
+    materia_codigo = models.CharField(max_length=20)
+    materia_nombre = models.CharField(max_length=200)
+    grupo = models.CharField(max_length=10)
+    creditos = models.IntegerField()
+    promedio = models.DecimalField(max_digits=3, decimal_places=2, null=True, blank=True)
+    estado = models.CharField(max_length=20)
+    fecha_cierre = models.DateTimeField(auto_now_add=True)
+    
+    objects = HistorialQuerySet.as_manager()
+    
+    class Meta:
+        verbose_name = 'Historial Académico'
+        verbose_name_plural = 'Historial Académico'
+        ordering = ['-periodo__fecha_inicio', 'materia_codigo']
+        constraints = [
+            models.UniqueConstraint(fields=['estudiante', 'periodo', 'materia_codigo', 'grupo'],
+                                    name='historial_est_periodo_uniq'),
+        ]
+    
+    def __str__(self):
+        return f"{self.estudiante_id} - {self.periodo} - {self.materia_codigo}: {self.promedio}"
+    
+    @classmethod
+    def desde_inscripcion(cls, inscripcion):
+        """Registro (sin guardar) con el estado actual de la inscripción"""
+        promedio = inscripcion.calcular_promedio()
+        materia = inscripcion.curso.materia
+        return cls(
+            estudiante_id=inscripcion.estudiante_id, periodo=inscripcion.curso.periodo, inscripcion=inscripcion,
+            materia_codigo=materia.codigo, materia_nombre=materia.nombre, grupo=inscripcion.curso.grupo,
+            creditos=materia.creditos, promedio=decimal_promedio(promedio),
+            estado=estado_segun_promedio(promedio),
+        )
+    
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise TypeError('HistorialAcademico no admite modificaciones')
+        super().save(*args, **kwargs)
+
+
+class AcumuladoQuerySet(models.QuerySet):
+    def acumular(self, registros, lote=1000):
+        """Suma al acumulado de cada estudiante los registros de historial de un periodo recién cerrado"""
+        deltas = {}
+        for registro in registros:
+            delta = deltas.setdefault(registro.estudiante_id, {
+                'suma_ponderada': Decimal(0), 'creditos_cursados': 0, 'creditos_aprobados': 0, 'cursos_reprobados': 0,
+            })
+            if registro.promedio is None:
+                continue  # sin notas: no cuenta para el promedio
+            delta['suma_ponderada'] += registro.promedio * registro.creditos
+            delta['creditos_cursados'] += registro.creditos
+            if registro.estado == 'Aprobado':
+                delta['creditos_aprobados'] += registro.creditos
+            else:
+                delta['cursos_reprobados'] += 1
+        
+        programas = dict(Estudiante.objects.filter(pk__in=deltas).values_list('id', 'programa_id'))
+        existentes = self.select_for_update().in_bulk(deltas, field_name='estudiante_id')
+        nuevos = []
+        for estudiante_id, delta in deltas.items():
+            acumulado = existentes.get(estudiante_id)
+            if acumulado is None:
+                acumulado = RegistroAcumulado(estudiante_id=estudiante_id)
+                nuevos.append(acumulado)
+            acumulado.programa_id = programas[estudiante_id]
+            for campo, valor in delta.items():
+                setattr(acumulado, campo, getattr(acumulado, campo) + valor)
+            acumulado.actualizar_promedio()
+        
+        self.bulk_create(nuevos, batch_size=lote)
+        self.bulk_update(list(existentes.values()), CAMPOS_ACUMULADO, batch_size=lote)
+        return len(deltas)
+    
+    def ranking(self, programa):
+        """Puesto de cada estudiante del programa por promedio acumulado (usa acumulado_ranking_idx)"""
+        orden = [F('promedio_acumulado').desc(nulls_last=True), F('creditos_aprobados').desc()]
+        return (self.filter(programa=programa).select_related('estudiante__usuario')
+                .annotate(puesto=Window(Rank(), order_by=orden)).order_by(*orden, 'estudiante_id'))
+
+
+CAMPOS_ACUMULADO = ['programa', 'suma_ponderada', 'creditos_cursados', 'creditos_aprobados', 'cursos_reprobados',
+                    'promedio_acumulado', 'fecha_actualizacion']
+
+
+class RegistroAcumulado(models.Model):
+    """Promedio acumulado ponderado por créditos y totales de un estudiante sobre sus periodos cerrados"""
+    estudiante = models.OneToOneField(Estudiante, on_delete=models.CASCADE, related_name='acumulado')
+    programa = models.ForeignKey(Programa, on_delete=models.PROTECT, related_name='+')
+    suma_ponderada = models.DecimalField(max_digits=10, decimal_places=2, default=0)  # Σ promedio × créditos
+    creditos_cursados = models.PositiveIntegerField(default=0)
+    creditos_aprobados = models.PositiveIntegerField(default=0)
+    cursos_reprobados = models.PositiveIntegerField(default=0)
+    promedio_acumulado = models.DecimalField(max_digits=3, decimal_places=2, null=True, blank=True)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+    
+    objects = AcumuladoQuerySet.as_manager()
+    
+    class Meta:
+        verbose_name = 'Registro Acumulado'
+        verbose_name_plural = 'Registros Acumulados'
+        indexes = [
+            models.Index(fields=['programa', '-promedio_acumulado', '-creditos_aprobados'],
+                         name='acumulado_ranking_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.estudiante_id}: {self.promedio_acumulado} ({self.creditos_aprobados} créditos)"
+    
+    def calcular_puesto(self):
+        """Puesto en el ranking del programa: un conteo sobre acumulado_ranking_idx"""
+        if self.promedio_acumulado is None:
+            return None
+        # Mismo desempate que AcumuladoQuerySet.ranking: a igual promedio, más créditos aprobados va antes
+        return RegistroAcumulado.objects.filter(
+            Q(promedio_acumulado__gt=self.promedio_acumulado)
+            | Q(promedio_acumulado=self.promedio_acumulado, creditos_aprobados__gt=self.creditos_aprobados),
+            programa_id=self.programa_id,
+        ).count() + 1
+    
+    def actualizar_promedio(self):
+        self.fecha_actualizacion = timezone.now()
+        self.promedio_acumulado = (
+            (self.suma_ponderada / self.creditos_cursados).quantize(Decimal('0.01')) if self.creditos_cursados else None
+        )
+
+
+class FranjaHorario(models.Model):
+    """Franja semanal de un curso, obtenida de Curso.horario (ver horarios.py)"""
+    DIAS = [(0, 'Lunes'), (1, 'Martes'), (2, 'Miércoles'), (3, 'Jueves'), (4, 'Viernes'), (5, 'Sábado'),
+            (6, 'Domingo')]
+    
+    curso = models.ForeignKey(Curso, on_delete=models.CASCADE, related_name='franjas')
+    periodo = models.ForeignKey(PeriodoAcademico, on_delete=models.CASCADE, related_name='+')  # copia de curso.periodo
+    aula = models.CharField(max_length=50, blank=True)  # curso.aula normalizada (minúsculas, sin tildes)
+    dia = models.PositiveSmallIntegerField(choices=DIAS)
+    hora_inicio = models.TimeField()
+    hora_fin = models.TimeField()
+    
+    class Meta:
+        verbose_name = 'Franja de Horario'
+        verbose_name_plural = 'Franjas de Horario'
+        ordering = ['dia', 'hora_inicio']
+        constraints = [
+            models.CheckConstraint(check=Q(hora_fin__gt=F('hora_inicio')), name='franja_fin_posterior'),
+        ]
+        indexes = [
+            models.Index(fields=['periodo', 'aula', 'dia', 'hora_inicio'], name='franja_aula_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.curso_id}: {self.get_dia_display()} {self.hora_inicio:%H:%M}-{self.hora_fin:%H:%M} {self.aula}"
+
+
+DIMENSIONES_CUBO = {
+    'programa': ('programa_id', 'programa__nombre'),
+    'semestre': ('semestre',),
+    'materia': ('materia_id', 'materia__codigo', 'materia__nombre'),
+    'periodo': ('periodo_id', 'periodo__nombre'),
+}
+
+MEDIDAS_CUBO = ['inscripciones', 'con_promedio', 'suma_promedios', 'aprobados', 'reprobados', 'creditos_inscritos',
+                'creditos_aprobados']
+
+
+class CuboQuerySet(models.QuerySet):
+    def refrescar(self, celdas=None, periodos=None):
+        """
+        Recalcula desde InscripcionCurso.promedio_almacenado las `celdas` dadas ((periodo_id, materia_id,
+        programa_id, semestre)), las de `periodos` o, sin argumentos, todo el cubo. Devuelve cuántas se escribieron.
+        """
+        inscripciones = InscripcionCurso.objects.all()
+        actuales = self.all()
+        if celdas is not None:
+            grupos = {}
+            for periodo_id, materia_id, programa_id, semestre in celdas:
+                grupos.setdefault((periodo_id, programa_id, semestre), set()).add(materia_id)
+            if not grupos:
+                return 0
+            # Un término por (periodo, programa, semestre): el OR no crece con el número de materias
+            alcance, de_inscripciones = Q(), Q()
+            for (periodo_id, programa_id, semestre), materias in grupos.items():
+                alcance |= Q(periodo_id=periodo_id, programa_id=programa_id, semestre=semestre,
+                             materia_id__in=materias)
+                de_inscripciones |= Q(curso__periodo_id=periodo_id, estudiante__programa_id=programa_id,
+                                      estudiante__semestre=semestre, curso__materia_id__in=materias)
+            actuales = actuales.filter(alcance)
+            inscripciones = inscripciones.filter(de_inscripciones)
+        elif periodos is not None:
+            actuales = actuales.filter(periodo__in=periodos)
+            inscripciones = inscripciones.filter(curso__periodo__in=periodos)
+        
+        aprobado = Q(promedio_almacenado__gte=3)
+        filas = inscripciones.order_by().values(
+            programa_id=F('estudiante__programa_id'), semestre=F('estudiante__semestre'),
+            materia_id=F('curso__materia_id'), periodo_id=F('curso__periodo_id'),
+        ).annotate(
+            total=Count('id'),
+            total_con_promedio=Count('promedio_almacenado'),
+            total_suma=Coalesce(Sum('promedio_almacenado'), Decimal('0')),
+            total_aprobados=Count('id', filter=aprobado),
+            total_reprobados=Count('id', filter=Q(promedio_almacenado__lt=3)),
+            total_creditos=Coalesce(Sum('curso__materia__creditos'), 0),
+            total_creditos_aprobados=Coalesce(Sum('curso__materia__creditos', filter=aprobado), 0),
+        )
+        nuevas = [
+            CuboRendimiento(
+                programa_id=fila['programa_id'], semestre=fila['semestre'], materia_id=fila['materia_id'],
+                periodo_id=fila['periodo_id'], inscripciones=fila['total'], con_promedio=fila['total_con_promedio'],
+                suma_promedios=fila['total_suma'], aprobados=fila['total_aprobados'],
+                reprobados=fila['total_reprobados'], creditos_inscritos=fila['total_creditos'],
+                creditos_aprobados=fila['total_creditos_aprobados'],
+            )
+            for fila in filas
+        ]
+        claves = ['periodo', 'materia', 'programa', 'semestre']
+        with transaction.atomic():
+            # Upsert y luego borrar las celdas que quedaron vacías: dos refrescos simultáneos no chocan
+            self.bulk_create(nuevas, batch_size=1000, update_conflicts=True, unique_fields=claves,
+                             update_fields=MEDIDAS_CUBO + ['fecha_actualizacion'])
+            vigentes = {(c.periodo_id, c.materia_id, c.programa_id, c.semestre) for c in nuevas}
+            existentes = actuales.values_list('pk', 'periodo_id', 'materia_id', 'programa_id', 'semestre')
+            vacias = [pk for pk, *clave in existentes if tuple(clave) not in vigentes]
+            self.filter(pk__in=vacias).delete()
+        return len(nuevas)
+    
+    def resumen(self, *dimensiones):
+        """Agregado del cubo por las dimensiones dadas (ver DIMENSIONES_CUBO), con promedio y tasa de aprobación"""
+        campos = [campo for dimension in dimensiones for campo in DIMENSIONES_CUBO[dimension]]
+        totales = {
+            'total_inscripciones': Coalesce(Sum('inscripciones'), 0),
+            'total_con_promedio': Coalesce(Sum('con_promedio'), 0),
+            'total_suma': Coalesce(Sum('suma_promedios'), Decimal('0')),
+            'total_aprobados': Coalesce(Sum('aprobados'), 0),
+            'total_reprobados': Coalesce(Sum('reprobados'), 0),
+            'total_creditos': Coalesce(Sum('creditos_inscritos'), 0),
+            'total_creditos_aprobados': Coalesce(Sum('creditos_aprobados'), 0),
+        }
+        # Sin dimensiones es el gran total: values() vacío agruparía por celda
+        filas = self.values(*campos).annotate(**totales).order_by(*campos) if campos else [self.aggregate(**totales)]
+        resultado = []
+        for fila in filas:
+            con_promedio = fila['total_con_promedio']
+            resultado.append({
+                **{campo: fila[campo] for campo in campos},
+                'inscripciones': fila['total_inscripciones'],
+                'con_promedio': con_promedio,
+                'aprobados': fila['total_aprobados'],
+                'reprobados': fila['total_reprobados'],
+                'creditos_inscritos': fila['total_creditos'],
+                'creditos_aprobados': fila['total_creditos_aprobados'],
+                'promedio': round(float(fila['total_suma']) / con_promedio, 2) if con_promedio else None,
+                'tasa_aprobacion': round(fila['total_aprobados'] * 100 / con_promedio, 1) if con_promedio else None,
+            })
+        return resultado
+
+
+class CuboRendimiento(models.Model):
+    """
+    Agregado de inscripciones por programa y semestre del estudiante, materia y periodo (el grano más fino);
+    cualquier agrupación más gruesa se suma desde aquí con CuboQuerySet.resumen
+    """
+    programa = models.ForeignKey(Programa, on_delete=models.CASCADE, related_name='+')
+    semestre = models.PositiveSmallIntegerField()
+    materia = models.ForeignKey(Materia, on_delete=models.CASCADE, related_name='+')
+    periodo = models.ForeignKey(PeriodoAcademico, on_delete=models.CASCADE, related_name='+')
+    inscripciones = models.PositiveIntegerField(default=0)
+    con_promedio = models.PositiveIntegerField(default=0)
+    suma_promedios = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    aprobados = models.PositiveIntegerField(default=0)
+    reprobados = models.PositiveIntegerField(default=0)
+    creditos_inscritos = models.PositiveIntegerField(default=0)
+    creditos_aprobados = models.PositiveIntegerField(default=0)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+    
+    objects = CuboQuerySet.as_manager()
+    
+    class Meta:
+        verbose_name = 'Celda del Cubo de Rendimiento'
+        verbose_name_plural = 'Cubo de Rendimiento'
+        constraints = [
+            models.UniqueConstraint(fields=['periodo', 'materia', 'programa', 'semestre'], name='cubo_celda_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['programa', 'periodo'], name='cubo_programa_periodo_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.periodo_id}/{self.materia_id}/{self.programa_id}/S{self.semestre}: {self.inscripciones}"
+
+
+class PuntajeRiesgoQuerySet(models.QuerySet):
+    def en_riesgo(self, periodo, programa_id=None):
+        """
+        Puntajes medio y alto del periodo, de mayor a menor; None si calcular_riesgo todavía no pasó por
+        el periodo (el cálculo es del comando, nunca de una petición)
+        """
+        puntajes = self.filter(periodo=periodo)
+        if not puntajes.exists():
+            return None
+        puntajes = puntajes.exclude(nivel='bajo')
+        if programa_id:
+            puntajes = puntajes.filter(programa_id=programa_id)
+        return list(puntajes.select_related('estudiante__usuario').order_by('-puntaje', 'estudiante_id'))
+
+
+class PuntajeRiesgo(models.Model):
+    """Puntaje de alerta temprana (0-100) de un estudiante en un periodo, calculado por lotes en riesgo.py"""
+    NIVELES = [
+        ('bajo', 'Bajo'),
+        ('medio', 'Medio'),
+        ('alto', 'Alto'),
+    ]
+    
+    estudiante = models.ForeignKey(Estudiante, on_delete=models.CASCADE, related_name='puntajes_riesgo')
+    periodo = models.ForeignKey(PeriodoAcademico, on_delete=models.CASCADE, related_name='+')
+    programa = models.ForeignKey(Programa, on_delete=models.CASCADE, related_name='+')
+    puntaje = models.DecimalField(max_digits=5, decimal_places=2)
+    nivel = models.CharField(max_length=10, choices=NIVELES)
+    promedio_parcial = models.DecimalField(max_digits=3, decimal_places=2, null=True, blank=True)
+    promedio_anterior = models.DecimalField(max_digits=3, decimal_places=2, null=True, blank=True)
+    tendencia = models.DecimalField(max_digits=3, decimal_places=2, null=True, blank=True)  # parcial - anterior
+    evaluaciones_faltantes = models.PositiveIntegerField(default=0)
+    cursos = models.PositiveIntegerField(default=0)
+    cursos_en_riesgo = models.PositiveIntegerField(default=0)
+    fecha_calculo = models.DateTimeField()
+    
+    objects = PuntajeRiesgoQuerySet.as_manager()
+    
+    class Meta:
+        verbose_name = 'Puntaje de Riesgo'
+        verbose_name_plural = 'Puntajes de Riesgo'
+        constraints = [
+            models.UniqueConstraint(fields=['periodo', 'estudiante'], name='riesgo_periodo_est_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['periodo', '-puntaje'], name='riesgo_periodo_puntaje_idx'),
+            models.Index(fields=['periodo', 'programa', '-puntaje'], name='riesgo_programa_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.estudiante_id} - {self.periodo_id}: {self.puntaje} ({self.nivel})"
+
+
+class RankingQuerySet(models.QuerySet):
+    def refrescar(self, estudiantes_por_periodo, lote=1000):
+        """
+        Recalcula el promedio del periodo de esos estudiantes ({periodo_id: {estudiante_id}}) y guarda solo
+        las posiciones que cambiaron. Devuelve cuántas se escribieron.
+        """
+        alcance, inscripciones = Q(), Q()
+        for periodo_id, ids in estudiantes_por_periodo.items():
+            alcance |= Q(periodo_id=periodo_id, estudiante_id__in=ids)
+            inscripciones |= Q(curso__periodo_id=periodo_id, estudiante_id__in=ids)
+        if not alcance:
+            return 0
+        
+        # Promedio ponderado por créditos de las inscripciones con nota, como RegistroAcumulado (en Decimal)
+        sumas = {}
+        for estudiante_id, periodo_id, promedio, creditos in InscripcionCurso.objects.filter(
+            inscripciones, promedio_almacenado__isnull=False
+        ).values_list('estudiante_id', 'curso__periodo_id', 'promedio_almacenado', 'curso__materia__creditos'):
+            suma = sumas.setdefault((periodo_id, estudiante_id), [Decimal(0), 0])
+            suma[0] += promedio * creditos
+            suma[1] += creditos
+        
+        ids = set().union(*estudiantes_por_periodo.values())
+        ubicacion = {pk: (programa_id, semestre) for pk, programa_id, semestre in
+                     Estudiante.objects.filter(pk__in=ids).values_list('id', 'programa_id', 'semestre')}
+        existentes = {(p.periodo_id, p.estudiante_id): p for p in self.filter(alcance)}
+        ahora = timezone.now()
+        cambios = []
+        for periodo_id, estudiantes in estudiantes_por_periodo.items():
+            for estudiante_id in estudiantes:
+                if estudiante_id not in ubicacion:
+                    continue
+                suma, creditos = sumas.get((periodo_id, estudiante_id), (0, 0))
+                promedio = (suma / creditos).quantize(Decimal('0.01')) if creditos else None
+                valores = (*ubicacion[estudiante_id], promedio, creditos)
+                actual = existentes.get((periodo_id, estudiante_id))
+                if actual is None and promedio is None:
+                    continue
+                if actual is not None and (actual.programa_id, actual.semestre, actual.promedio,
+                                           actual.creditos) == valores:
+                    continue
+                # Sin notas la fila queda con promedio NULL en vez de borrarse: ranking.py ve el cambio.
+                # Una fila nueva sin promedio no aportaría nada al ranking
+                cambios.append(PosicionRanking(
+                    periodo_id=periodo_id, estudiante_id=estudiante_id, programa_id=valores[0], semestre=valores[1],
+                    promedio=promedio, creditos=creditos, fecha_actualizacion=ahora,
+                ))
+        self.bulk_create(cambios, batch_size=lote, update_conflicts=True, unique_fields=['periodo', 'estudiante'],
+                         update_fields=['programa', 'semestre', 'promedio', 'creditos', 'fecha_actualizacion'])
+        return len(cambios)
+
+
+class PosicionRanking(models.Model):
+    """
+    Promedio del periodo de un estudiante (ponderado por créditos) para el ranking de su programa y semestre.
+    Se mantiene al cambiar los promedios almacenados; ranking.py lo carga en listas ordenadas.
+    """
+    periodo = models.ForeignKey(PeriodoAcademico, on_delete=models.CASCADE, related_name='+')
+    estudiante = models.ForeignKey(Estudiante, on_delete=models.CASCADE, related_name='posiciones_ranking')
+    programa = models.ForeignKey(Programa, on_delete=models.CASCADE, related_name='+')
+    semestre = models.PositiveSmallIntegerField()
+    promedio = models.DecimalField(max_digits=3, decimal_places=2, null=True, blank=True)
+    creditos = models.PositiveIntegerField(default=0)
+    fecha_actualizacion = models.DateTimeField()
+    
+    objects = RankingQuerySet.as_manager()
+    
+    class Meta:
+        verbose_name = 'Posición en Ranking'
+        verbose_name_plural = 'Posiciones en Ranking'
+        constraints = [
+            models.UniqueConstraint(fields=['periodo', 'estudiante'], name='ranking_periodo_est_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['periodo', 'programa', 'semestre', '-promedio'], name='ranking_grupo_idx'),
+            models.Index(fields=['periodo', 'fecha_actualizacion'], name='ranking_cambios_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.estudiante_id} - {self.periodo_id}: {self.promedio}"
+
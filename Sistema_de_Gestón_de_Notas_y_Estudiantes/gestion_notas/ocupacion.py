@@ -0,0 +1,138 @@
+"""
+Ocupación de aulas por día y bloque horario de un periodo.
+
+Cada aula guarda un entero por día cuyo bit i indica si el bloque i
+(BLOQUE_MINUTOS a partir de HORA_INICIO) está ocupado. Ocupar una franja es
+un OR con su máscara, la utilización es un conteo de bits y buscar k bloques
+libres seguidos es un AND de la máscara libre con sus desplazamientos: nada
+recorre los bloques uno a uno, así que cientos de aulas se resuelven al
+instante. Las franjas salen de FranjaHorario (ver horarios.py).
+"""
+from .horarios import DIAS, normalizar
+from .models import FranjaHorario
+
+HORA_INICIO = 6 * 60
+HORA_FIN = 22 * 60
+BLOQUE_MINUTOS = 30
+BLOQUES = (HORA_FIN - HORA_INICIO) // BLOQUE_MINUTOS
+DIAS_LECTIVOS = 6  # lunes a sábado
+
+
+def minutos(hora):
+    return hora.hour * 60 + hora.minute
+
+
+def parsear_minutos(texto):
+    """'08:30' -> 510; ValueError si no es una hora"""
+    horas, _, mins = texto.partition(':')
+    valor = int(horas) * 60 + int(mins or 0)
+    if not 0 <= valor <= 24 * 60:
+        raise ValueError(f'Hora inválida: {texto}')
+    return valor
+
+
+def mascara(inicio, fin, completos=False):
+    """
+    Bits de los bloques que toca [inicio, fin) en minutos del día, recortado a la jornada;
+    con `completos` solo los bloques que caben enteros en el intervalo.
+    """
+    desde, hasta = inicio - HORA_INICIO, fin - HORA_INICIO
+    if completos:
+        desde, hasta = -(-desde // BLOQUE_MINUTOS), hasta // BLOQUE_MINUTOS
+    else:
+        desde, hasta = desde // BLOQUE_MINUTOS, -(-hasta // BLOQUE_MINUTOS)
+    primero, ultimo = max(0, desde), min(BLOQUES, hasta)
+    if ultimo <= primero:
+        return 0
+    return ((1 << (ultimo - primero)) - 1) << primero
+
+
+def etiqueta_bloque(indice):
+    total = HORA_INICIO + indice * BLOQUE_MINUTOS
+    return f'{total // 60:02d}:{total % 60:02d}'
+
+
+def tramos(bits):
+    """(primer bloque, bloques) de cada tramo de bits seguidos, usando solo los bordes de los tramos"""
+    inicios = bits & ~(bits << 1)
+    finales = bits & ~(bits >> 1)
+    resultado = []
+    while inicios:
+        inicio = (inicios & -inicios).bit_length() - 1
+        fin = (finales & -finales).bit_length() - 1
+        resultado.append((inicio, fin - inicio + 1))
+        inicios &= inicios - 1
+        finales &= finales - 1
+    return resultado
+
+
+class MapaOcupacion:
+    """Máscara de bloques ocupados por aula y día"""
+
+    def __init__(self, aulas=(), dias=DIAS_LECTIVOS):
+        self.dias = dias
+        self.aulas = {aula: [0] * dias for aula in aulas}
+
+    @classmethod
+    def de_periodo(cls, periodo, dias=DIAS_LECTIVOS):
+        """Mapa de un periodo con dos consultas; incluye las aulas usadas en cualquier periodo aunque estén libres"""
+        aulas = FranjaHorario.objects.exclude(aula='').order_by('aula').values_list('aula', flat=True).distinct()
+        mapa = cls(aulas, dias)
+        franjas = FranjaHorario.objects.filter(periodo=periodo, curso__archived=False, dia__lt=dias).exclude(aula='')
+        for aula, dia, inicio, fin in franjas.values_list('aula', 'dia', 'hora_inicio', 'hora_fin'):
+            mapa.ocupar(aula, dia, minutos(inicio), minutos(fin))
+        return mapa
+
+    def ocupar(self, aula, dia, inicio, fin):
+        self.aulas.setdefault(aula, [0] * self.dias)[dia] |= mascara(inicio, fin)
+
+    def bloques_ocupados(self, aula):
+        return sum(bits.bit_count() for bits in self.aulas[aula])
+
+    def utilizacion(self, aula=None):
+        """Fracción de bloques ocupados de un aula, o de todas"""
+        aulas = [aula] if aula is not None else list(self.aulas)
+        total = len(aulas) * self.dias * BLOQUES
+        return sum(self.bloques_ocupados(a) for a in aulas) / total if total else 0.0
+
+    def libres(self, duracion, dia=None, desde=HORA_INICIO, hasta=HORA_FIN, aulas=None):
+        """
+        Ventanas libres de al menos `duracion` minutos entre `desde` y `hasta`:
+        [{'aula', 'dia', 'inicio', 'fin'}] con cada tramo libre maximal.
+        """
+        k = max(1, -(-duracion // BLOQUE_MINUTOS))
+        jornada = mascara(desde, hasta, completos=True)
+        dias = range(self.dias) if dia is None else [dia]
+        resultado = []
+        for aula in (self.aulas if aulas is None else [normalizar(a) for a in aulas if normalizar(a) in self.aulas]):
+            for d in dias:
+                libre = ~self.aulas[aula][d] & jornada
+                # Bits donde empieza un tramo de k bloques libres...
+                inicios = libre
+                for desplazamiento in range(1, k):
+                    inicios &= libre >> desplazamiento
+                # ...y los bloques que cubren esos tramos: sus tramos son las ventanas maximales
+                cubiertos = 0
+                for desplazamiento in range(k):
+                    cubiertos |= inicios << desplazamiento
+                for primero, cantidad in tramos(cubiertos):
+                    resultado.append({'aula': aula, 'dia': DIAS[d], 'inicio': etiqueta_bloque(primero),
+                                      'fin': etiqueta_bloque(primero + cantidad)})
+        return resultado
+
+    def como_dict(self):
+        """Matriz aula x día x bloque como cadenas de '0'/'1' (un carácter por bloque) y utilización"""
+        return {
+            'dias': list(DIAS[:self.dias]),
+            'bloques': [etiqueta_bloque(i) for i in range(BLOQUES)],
+            'bloque_minutos': BLOQUE_MINUTOS,
+            'utilizacion': round(self.utilizacion() * 100, 1),
+            'aulas': [
+                {
+                    'aula': aula,
+                    'utilizacion': round(self.utilizacion(aula) * 100, 1),
+                    'ocupacion': {DIAS[d]: format(bits, f'0{BLOQUES}b')[::-1] for d, bits in enumerate(dias)},
+                }
+                for aula, dias in sorted(self.aulas.items())
+            ],
+        }
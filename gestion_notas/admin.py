@@ -1,6 +1,29 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from .models import *
+from .forms import archive_queryset
+
+
+class ArchivableAdmin(admin.ModelAdmin):
+    """Admin base para modelos archivables: muestra también los archivados"""
+    actions = ['archivar_seleccionados', 'desarchivar_seleccionados']
+
+    def get_queryset(self, request):
+        qs = self.model.con_archivados.get_queryset()
+        ordering = self.get_ordering(request)
+        if ordering:
+            qs = qs.order_by(*ordering)
+        return qs
+
+    @admin.action(description='Archivar seleccionados')
+    def archivar_seleccionados(self, request, queryset):
+        total = archive_queryset(queryset.filter(archived=False), archived=True, by_user=request.user)
+        self.message_user(request, f'{total} registro(s) archivado(s)')
+
+    @admin.action(description='Desarchivar seleccionados')
+    def desarchivar_seleccionados(self, request, queryset):
+        total = archive_queryset(queryset.filter(archived=True), archived=False, by_user=request.user)
+        self.message_user(request, f'{total} registro(s) desarchivado(s)')
 
 # Personalización del admin de Usuario
 @admin.register(Usuario)
@@ -30,11 +53,29 @@ class ProgramaAdmin(admin.ModelAdmin):
 
 
 @admin.register(PeriodoAcademico)
-class PeriodoAcademicoAdmin(admin.ModelAdmin):
-    list_display = ('nombre', 'fecha_inicio', 'fecha_fin', 'activo')
-    list_filter = ('activo',)
+class PeriodoAcademicoAdmin(ArchivableAdmin):
+    list_display = ('nombre', 'fecha_inicio', 'fecha_fin', 'activo', 'cerrado', 'archived')
+    list_filter = ('activo', 'cerrado', 'archived')
     search_fields = ('nombre',)
     date_hierarchy = 'fecha_inicio'
+    readonly_fields = ('cerrado', 'fecha_cierre')
+    actions = ArchivableAdmin.actions + ['cerrar_periodos', 'revisar_choques_horario']
+
+    @admin.action(description='Cerrar periodos seleccionados (congelar historial)')
+    def cerrar_periodos(self, request, queryset):
+        for periodo in queryset.filter(cerrado=False):
+            total = periodo.cerrar()
+            self.message_user(request, f'{periodo.nombre} cerrado: {total} registros de historial')
+
+    @admin.action(description='Revisar choques de horario (aulas y estudiantes)')
+    def revisar_choques_horario(self, request, queryset):
+        from .horarios import choques_periodo
+        for periodo in queryset:
+            choques = choques_periodo(periodo)
+            aulas = sum(1 for choque in choques if choque['tipo'] == 'aula')
+            nivel = messages.WARNING if choques else messages.SUCCESS
+            self.message_user(request, f'{periodo.nombre}: {aulas} choques de aula y {len(choques) - aulas} '
+                                       f'de estudiante (detalle: manage.py choques_horario)', nivel)
 
 
 @admin.register(Estudiante)
@@ -76,11 +117,23 @@ class MateriaAdmin(admin.ModelAdmin):
     search_fields = ('codigo', 'nombre')
 
 
+class FranjaHorarioInline(admin.TabularInline):
+    model = FranjaHorario
+    fields = ('dia', 'hora_inicio', 'hora_fin', 'aula')
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+    
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(Curso)
-class CursoAdmin(admin.ModelAdmin):
-    list_display = ('get_nombre_completo', 'grupo', 'get_profesor', 'periodo', 'get_inscritos')
-    list_filter = ('periodo', 'materia__programa')
+class CursoAdmin(ArchivableAdmin):
+    list_display = ('get_nombre_completo', 'grupo', 'get_profesor', 'periodo', 'get_inscritos', 'archived')
+    list_filter = ('periodo', 'materia__programa', 'archived')
     search_fields = ('materia__nombre', 'materia__codigo', 'profesor__usuario__last_name')
+    inlines = [FranjaHorarioInline]
     
     def get_nombre_completo(self, obj):
         return f"{obj.materia.codigo} - {obj.materia.nombre}"
@@ -91,8 +144,9 @@ class CursoAdmin(admin.ModelAdmin):
     get_profesor.short_description = 'Profesor'
     
     def get_inscritos(self, obj):
-        return obj.estudiantes_inscritos()
+        return obj.inscritos
     get_inscritos.short_description = 'Inscritos'
+    get_inscritos.admin_order_field = 'inscritos'
 
 
 @admin.register(TipoEvaluacion)
@@ -109,9 +163,9 @@ class ConfiguracionEvaluacionAdmin(admin.ModelAdmin):
 
 
 @admin.register(InscripcionCurso)
-class InscripcionCursoAdmin(admin.ModelAdmin):
-    list_display = ('get_estudiante', 'curso', 'fecha_inscripcion', 'get_promedio', 'get_estado')
-    list_filter = ('curso__periodo', 'curso__materia')
+class InscripcionCursoAdmin(ArchivableAdmin):
+    list_display = ('get_estudiante', 'curso', 'fecha_inscripcion', 'get_promedio', 'get_estado', 'archived')
+    list_filter = ('curso__periodo', 'curso__materia', 'archived')
     search_fields = ('estudiante__codigo_estudiantil', 'estudiante__usuario__first_name', 
                     'estudiante__usuario__last_name', 'curso__materia__nombre')
     date_hierarchy = 'fecha_inscripcion'
@@ -155,9 +209,9 @@ class CalificacionAdmin(admin.ModelAdmin):
 
 
 @admin.register(Notificacion)
-class NotificacionAdmin(admin.ModelAdmin):
-    list_display = ('usuario', 'tipo', 'titulo', 'leida', 'fecha_creacion')
-    list_filter = ('tipo', 'leida', 'fecha_creacion')
+class NotificacionAdmin(ArchivableAdmin):
+    list_display = ('usuario', 'tipo', 'titulo', 'leida', 'fecha_creacion', 'archived')
+    list_filter = ('tipo', 'leida', 'fecha_creacion', 'archived')
     search_fields = ('usuario__username', 'titulo', 'mensaje')
     date_hierarchy = 'fecha_creacion'
     readonly_fields = ('fecha_creacion',)
@@ -179,7 +233,106 @@ class LogActividadAdmin(admin.ModelAdmin):
         return False
 
 
+@admin.register(LogActividadArchivo)
+class LogActividadArchivoAdmin(admin.ModelAdmin):
+    list_display = ('usuario', 'accion', 'modelo', 'objeto_id', 'fecha', 'particion')
+    list_filter = ('particion', 'accion', 'modelo')
+    search_fields = ('usuario__username', 'descripcion')
+    
+    # Solo lectura en el admin
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
 # Personalización del sitio de admin
 admin.site.site_header = "Sistema de Gestión de Notas UCC"
 admin.site.site_title = "Admin UCC"
-admin.site.index_title = "Panel de Administración"
\ No newline at end of file
+admin.site.index_title = "Panel de Administración"
+
+
+@admin.register(HistorialAcademico)
+class HistorialAcademicoAdmin(admin.ModelAdmin):
+    """Solo lectura: el historial se escribe al cerrar el periodo"""
+    list_display = ('estudiante', 'periodo', 'materia_codigo', 'materia_nombre', 'creditos', 'promedio', 'estado')
+    list_filter = ('periodo', 'estado')
+    search_fields = ('estudiante__codigo_estudiantil', 'estudiante__usuario__last_name', 'materia_codigo')
+    list_select_related = ('estudiante__usuario', 'periodo')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(RegistroAcumulado)
+class RegistroAcumuladoAdmin(admin.ModelAdmin):
+    """Solo lectura: se actualiza al cerrar periodos (o con recalcular_acumulados)"""
+    list_display = ('estudiante', 'programa', 'promedio_acumulado', 'creditos_aprobados', 'cursos_reprobados',
+                    'fecha_actualizacion')
+    list_filter = ('programa',)
+    search_fields = ('estudiante__codigo_estudiantil', 'estudiante__usuario__last_name')
+    list_select_related = ('estudiante__usuario', 'programa')
+    ordering = ('programa', '-promedio_acumulado')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(CuboRendimiento)
+class CuboRendimientoAdmin(admin.ModelAdmin):
+    """Solo lectura: se refresca al confirmar cada cambio de notas o inscripciones (o con recalcular_cubo)"""
+    list_display = ('periodo', 'programa', 'semestre', 'materia', 'inscripciones', 'con_promedio', 'aprobados',
+                    'reprobados', 'creditos_aprobados', 'fecha_actualizacion')
+    list_filter = ('periodo', 'programa', 'semestre')
+    search_fields = ('materia__codigo', 'materia__nombre')
+    list_select_related = ('periodo', 'programa', 'materia')
+    ordering = ('periodo', 'programa', 'semestre', 'materia')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(PuntajeRiesgo)
+class PuntajeRiesgoAdmin(admin.ModelAdmin):
+    """Solo lectura: lo escribe el cálculo por lotes (calcular_riesgo)"""
+    list_display = ('estudiante', 'periodo', 'programa', 'puntaje', 'nivel', 'promedio_parcial', 'tendencia',
+                    'evaluaciones_faltantes', 'cursos_en_riesgo', 'fecha_calculo')
+    list_filter = ('periodo', 'nivel', 'programa')
+    search_fields = ('estudiante__codigo_estudiantil', 'estudiante__usuario__last_name')
+    list_select_related = ('estudiante__usuario', 'periodo', 'programa')
+    ordering = ('periodo', '-puntaje')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(PosicionRanking)
+class PosicionRankingAdmin(admin.ModelAdmin):
+    """Solo lectura: se mantiene con cada cambio de promedios (o con recalcular_ranking)"""
+    list_display = ('estudiante', 'periodo', 'programa', 'semestre', 'promedio', 'creditos', 'fecha_actualizacion')
+    list_filter = ('periodo', 'programa', 'semestre')
+    search_fields = ('estudiante__codigo_estudiantil', 'estudiante__usuario__last_name')
+    list_select_related = ('estudiante__usuario', 'periodo', 'programa')
+    ordering = ('periodo', 'programa', '-promedio')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,107 @@
+"""
+Analítica de notas por curso con NumPy.
+
+Las notas del curso se cargan en una sola consulta y se colocan en una matriz
+inscripciones x tipos de evaluación (NaN donde falta la nota); promedios,
+histograma, cuartiles, medias por tipo y percentiles salen de operaciones
+sobre esa matriz, sin bucles por estudiante.
+"""
+import numpy as np
+
+from .models import Calificacion, ConfiguracionEvaluacion, InscripcionCurso, estado_segun_promedio
+
+ANCHO_INTERVALO = 0.5
+BORDES = np.arange(0, 5 + ANCHO_INTERVALO, ANCHO_INTERVALO)
+
+
+def matriz_notas(inscripciones, tipos, filas):
+    """Matriz len(inscripciones) x len(tipos) con las notas de `filas` (inscripcion_id, tipo_id, nota); NaN si falta"""
+    matriz = np.full((len(inscripciones), len(tipos)), np.nan)
+    if filas:
+        posicion_fila = {inscripcion_id: i for i, inscripcion_id in enumerate(inscripciones)}
+        posicion_columna = {tipo_id: j for j, tipo_id in enumerate(tipos)}
+        ids, tipo_ids, notas = zip(*filas)
+        matriz[[posicion_fila[i] for i in ids], [posicion_columna[t] for t in tipo_ids]] = np.array(notas, dtype=float)
+    return matriz
+
+
+def promedios(matriz, pesos):
+    """
+    Promedio ponderado por fila con la misma regla que promedio_ponderado: suma de nota x peso de las notas
+    con peso; 0 si ninguna lo tiene y NaN si la fila no tiene notas. `pesos` en porcentaje, NaN sin configurar.
+    """
+    presentes = ~np.isnan(matriz)
+    con_peso = presentes & ~np.isnan(pesos)
+    # Mismo orden de operaciones que promedio_ponderado (nota x (porcentaje / 100)) para redondear igual
+    ponderado = np.where(con_peso, np.nan_to_num(matriz) * (np.nan_to_num(pesos) / 100), 0).sum(axis=1)
+    return np.where(presentes.any(axis=1), ponderado, np.nan)
+
+
+def percentiles(valores):
+    """Porcentaje de valores menores o iguales a cada uno (rango percentil), por búsqueda en el arreglo ordenado"""
+    ordenados = np.sort(valores)
+    return np.searchsorted(ordenados, valores, side='right') / len(valores) * 100 if len(valores) else valores
+
+
+def redondear(valor, decimales=2):
+    return None if valor is None or np.isnan(valor) else round(float(valor), decimales)
+
+
+def analitica_curso(curso_id):
+    """Distribución de promedios, cuartiles, desviación, medias por tipo y percentil de cada estudiante"""
+    inscripciones = list(InscripcionCurso.objects.filter(curso_id=curso_id).order_by(
+        'estudiante__usuario__last_name', 'estudiante__usuario__first_name', 'id'
+    ).values_list('id', 'estudiante__codigo_estudiantil', 'estudiante__usuario__first_name',
+                  'estudiante__usuario__last_name'))
+    configuracion = list(ConfiguracionEvaluacion.objects.filter(curso_id=curso_id).values_list(
+        'tipo_evaluacion_id', 'tipo_evaluacion__nombre', 'porcentaje'
+    ))
+    filas = list(Calificacion.objects.filter(inscripcion__curso_id=curso_id, inscripcion__archived=False)
+                 .values_list('inscripcion_id', 'tipo_evaluacion_id', 'tipo_evaluacion__nombre', 'nota'))
+
+    nombres = {tipo_id: nombre for tipo_id, nombre, _ in configuracion}
+    nombres.update((tipo_id, nombre) for _, tipo_id, nombre, _ in filas)
+    tipos = sorted(nombres)
+    porcentajes = {tipo_id: porcentaje for tipo_id, _, porcentaje in configuracion}
+    pesos = np.array([float(porcentajes[t]) if t in porcentajes else np.nan for t in tipos])
+
+    matriz = matriz_notas([fila[0] for fila in inscripciones], tipos,
+                          [(inscripcion_id, tipo_id, nota) for inscripcion_id, tipo_id, _, nota in filas])
+    # round() de Python y no np.round: np.round escala por 100 y no redondea 3.175 igual que promedio_ponderado
+    promedio = np.array([round(p, 2) for p in promedios(matriz, pesos).tolist()])
+    con_promedio = ~np.isnan(promedio)
+    valores = promedio[con_promedio]
+
+    rango = np.full(len(promedio), np.nan)
+    rango[con_promedio] = percentiles(valores)
+    conteo, _ = np.histogram(valores, bins=BORDES)
+    cuartiles = np.percentile(valores, [25, 50, 75]) if len(valores) else [np.nan] * 3
+    calificadas = (~np.isnan(matriz)).sum(axis=0)
+    medias = np.divide(np.nansum(matriz, axis=0), calificadas, out=np.full(len(tipos), np.nan),
+                       where=calificadas > 0)
+
+    return {
+        'curso': curso_id,
+        'inscritos': len(inscripciones),
+        'con_promedio': int(con_promedio.sum()),
+        'aprobados': int((valores >= 3.0).sum()),
+        'promedio': redondear(valores.mean()) if len(valores) else None,
+        'desviacion': redondear(valores.std()) if len(valores) else None,
+        'minimo': redondear(valores.min()) if len(valores) else None,
+        'maximo': redondear(valores.max()) if len(valores) else None,
+        'cuartiles': dict(zip(('q1', 'mediana', 'q3'), map(redondear, cuartiles))),
+        'histograma': [
+            {'desde': float(desde), 'hasta': float(hasta), 'estudiantes': int(n)}
+            for desde, hasta, n in zip(BORDES[:-1], BORDES[1:], conteo)
+        ],
+        'tipos': [
+            {'id': tipo_id, 'nombre': nombres[tipo_id], 'porcentaje': redondear(peso), 'media': redondear(media),
+             'calificadas': int(n)}
+            for tipo_id, peso, media, n in zip(tipos, pesos, medias, calificadas)
+        ],
+        'estudiantes': [
+            {'inscripcion': inscripcion_id, 'codigo': codigo, 'estudiante': ' '.join(filter(None, [nombre, apellido])),
+             'promedio': redondear(p), 'percentil': redondear(r, 1), 'estado': estado_segun_promedio(redondear(p))}
+            for (inscripcion_id, codigo, nombre, apellido), p, r in zip(inscripciones, promedio, rango)
+        ],
+    }
@@ -3,4 +3,7 @@ from django.apps import AppConfig
 
 class GestionNotasConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'gestion_notas'
\ No newline at end of file
+    name = 'gestion_notas'
+
+    def ready(self):
+        from . import signals  # noqa: F401
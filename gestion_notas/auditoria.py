@@ -0,0 +1,226 @@
+"""
+Rotación y consulta del registro de actividad.
+
+La tabla `LogActividad` solo guarda los meses recientes. Los meses antiguos se
+mueven en lote a `LogActividadArchivo` (una partición por mes) o a archivos
+NDJSON comprimidos, y `consultar_logs` recorre las tres fuentes como si
+fueran una sola.
+
+Cada lote NDJSON se escribe en un archivo pendiente que solo se publica (se
+renombra a su nombre definitivo, uno por rango de ids) cuando la transacción
+que borra las filas confirma. Un lote revertido o interrumpido no deja filas
+duplicadas: la siguiente rotación publica o descarta los pendientes según las
+filas sigan o no en la tabla.
+"""
+import gzip
+import heapq
+import json
+import os
+import re
+from datetime import datetime, timezone as dt_timezone
+from functools import partial
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import LogActividad, LogActividadArchivo
+
+CAMPOS_LOG = ['id', 'usuario_id', 'accion', 'modelo', 'objeto_id', 'descripcion', 'fecha', 'ip_address']
+
+
+def directorio_archivos():
+    """Directorio donde se guardan las particiones NDJSON"""
+    directorio = getattr(settings, 'LOGS_ACTIVIDAD_DIR', None)
+    if directorio is None:
+        directorio = Path(settings.BASE_DIR) / 'logs' / 'actividad'
+    return Path(directorio)
+
+
+def inicio_mes(fecha, meses_atras=0):
+    """Primer instante del mes de `fecha`, desplazado `meses_atras` meses"""
+    total = fecha.year * 12 + (fecha.month - 1) - meses_atras
+    return fecha.replace(year=total // 12, month=total % 12 + 1, day=1,
+                         hour=0, minute=0, second=0, microsecond=0)
+
+
+def nombre_particion(fecha):
+    return f"{fecha.year:04d}-{fecha.month:02d}"
+
+
+PREFIJO_PENDIENTE = '.pendiente_'
+ARCHIVO_LOTE = re.compile(r'^actividad_(?P<particion>\d{4}-\d{2})(?:_(?P<primero>\d+)-(?P<ultimo>\d+))?\.ndjson\.gz$')
+
+
+def ruta_lote(particion, primero, ultimo, directorio=None):
+    """Archivo definitivo de un lote: el rango de ids en el nombre lo hace único"""
+    nombre = f"actividad_{particion}_{primero:010d}-{ultimo:010d}.ndjson.gz"
+    return Path(directorio or directorio_archivos()) / nombre
+
+
+def publicar(pendiente):
+    os.replace(pendiente, pendiente.with_name(pendiente.name[len(PREFIJO_PENDIENTE):]))
+
+
+def recuperar_pendientes(directorio=None):
+    """Publica los lotes cuyas filas ya se borraron y descarta los de transacciones revertidas"""
+    base = Path(directorio or directorio_archivos())
+    if not base.exists():
+        return
+    for pendiente in base.glob(f'{PREFIJO_PENDIENTE}actividad_*.ndjson.gz'):
+        coincidencia = ARCHIVO_LOTE.match(pendiente.name[len(PREFIJO_PENDIENTE):])
+        if coincidencia is None or coincidencia['primero'] is None:
+            continue
+        # Las particiones son meses UTC, como timezone.now() en rotar_logs
+        desde = datetime.strptime(coincidencia['particion'], '%Y-%m').replace(tzinfo=dt_timezone.utc)
+        # El lote eran las filas del mes con ids en el rango: si alguna sigue en la tabla, no se confirmó
+        if LogActividad.objects.filter(id__gte=int(coincidencia['primero']), id__lte=int(coincidencia['ultimo']),
+                                       fecha__gte=desde, fecha__lt=inicio_mes(desde, -1)).exists():
+            pendiente.unlink()
+        else:
+            publicar(pendiente)
+
+
+def rotar_logs(meses=6, destino='tabla', directorio=None, lote=5000):
+    """
+    Mueve los registros con más de `meses` meses a la tabla de archivo o a
+    archivos NDJSON (destino='ndjson'). Devuelve {particion: registros movidos}.
+    """
+    if destino not in ('tabla', 'ndjson'):
+        raise ValueError(f"Destino de rotación desconocido: {destino}")
+
+    limite = inicio_mes(timezone.now(), meses)
+    movidos = {}
+    if destino == 'ndjson':
+        recuperar_pendientes(directorio)
+
+    while True:
+        primero = LogActividad.objects.filter(fecha__lt=limite).order_by('fecha').values_list('fecha', flat=True).first()
+        if primero is None:
+            break
+
+        desde = inicio_mes(primero)
+        hasta = min(inicio_mes(desde, -1), limite)
+        particion = nombre_particion(desde)
+        movidos[particion] = movidos.get(particion, 0) + mover_particion(
+            desde, hasta, particion, destino, directorio, lote
+        )
+
+    return movidos
+
+
+def mover_particion(desde, hasta, particion, destino, directorio, lote):
+    """Mueve un mes de registros en lotes de `lote` filas (insertar + borrar en una transacción)"""
+    total = 0
+    pendientes = LogActividad.objects.filter(fecha__gte=desde, fecha__lt=hasta).order_by('id')
+
+    while True:
+        filas = list(pendientes.values(*CAMPOS_LOG)[:lote])
+        if not filas:
+            break
+
+        with transaction.atomic():
+            if destino == 'tabla':
+                LogActividadArchivo.objects.bulk_create([
+                    LogActividadArchivo(particion=particion, **{k: v for k, v in fila.items() if k != 'id'})
+                    for fila in filas
+                ], batch_size=lote)
+            else:
+                ruta = ruta_lote(particion, filas[0]['id'], filas[-1]['id'], directorio)
+                pendiente = ruta.with_name(PREFIJO_PENDIENTE + ruta.name)
+                escribir_ndjson(pendiente, filas)
+                transaction.on_commit(partial(publicar, pendiente))
+
+            LogActividad.objects.filter(id__in=[fila['id'] for fila in filas]).delete()
+
+        total += len(filas)
+
+    return total
+
+
+def escribir_ndjson(ruta, filas):
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    with gzip.open(ruta, 'wt', encoding='utf-8') as archivo:
+        for fila in filas:
+            archivo.write(json.dumps({**fila, 'fecha': fila['fecha'].isoformat()}, ensure_ascii=False))
+            archivo.write('\n')
+
+
+def leer_ndjson(ruta):
+    with gzip.open(ruta, 'rt', encoding='utf-8') as archivo:
+        for linea in archivo:
+            if linea.strip():
+                fila = json.loads(linea)
+                fila['fecha'] = datetime.fromisoformat(fila['fecha'])
+                yield fila
+
+
+def consultar_logs(desde=None, hasta=None, usuario=None, accion=None, modelo=None,
+                   limite=None, incluir_archivos=True, directorio=None):
+    """
+    Registros de actividad entre `desde` y `hasta` (ambos opcionales), de la
+    tabla principal, la tabla de archivo y los NDJSON, del más reciente al más
+    antiguo. Cada registro es un diccionario con `origen` indicando su fuente.
+    """
+    filtros = {}
+    if desde is not None:
+        filtros['fecha__gte'] = desde
+    if hasta is not None:
+        filtros['fecha__lt'] = hasta
+    if usuario is not None:
+        filtros['usuario'] = usuario
+    if accion is not None:
+        filtros['accion'] = accion
+    if modelo is not None:
+        filtros['modelo'] = modelo
+
+    fuentes = [
+        etiquetar(LogActividad.objects.filter(**filtros).order_by('-fecha').values(*CAMPOS_LOG).iterator(), 'vivo'),
+        etiquetar(LogActividadArchivo.objects.filter(**filtros).order_by('-fecha').values(*CAMPOS_LOG).iterator(), 'archivo'),
+    ]
+    if incluir_archivos:
+        fuentes.append(etiquetar(filas_ndjson(desde, hasta, usuario, accion, modelo, directorio), 'ndjson'))
+
+    resultados = heapq.merge(*fuentes, key=lambda fila: fila['fecha'], reverse=True)
+    for n, fila in enumerate(resultados):
+        if limite is not None and n >= limite:
+            break
+        yield fila
+
+
+def etiquetar(filas, origen):
+    for fila in filas:
+        fila['origen'] = origen
+        yield fila
+
+
+def filas_ndjson(desde, hasta, usuario, accion, modelo, directorio):
+    """Filas de las particiones NDJSON que se solapan con el rango, ordenadas por fecha descendente"""
+    base = Path(directorio or directorio_archivos())
+    if not base.exists():
+        return
+
+    usuario_id = getattr(usuario, 'pk', usuario)
+    particiones = {}
+    for ruta in base.glob('actividad_*.ndjson.gz'):
+        coincidencia = ARCHIVO_LOTE.match(ruta.name)
+        if coincidencia is not None:
+            particiones.setdefault(coincidencia['particion'], []).append(ruta)
+
+    for particion in sorted(particiones, reverse=True):
+        if desde is not None and particion < nombre_particion(desde):
+            continue
+        if hasta is not None and particion > nombre_particion(hasta):
+            continue
+
+        filas = [
+            fila for ruta in particiones[particion] for fila in leer_ndjson(ruta)
+            if (desde is None or fila['fecha'] >= desde)
+            and (hasta is None or fila['fecha'] < hasta)
+            and (usuario_id is None or fila['usuario_id'] == usuario_id)
+            and (accion is None or fila['accion'] == accion)
+            and (modelo is None or fila['modelo'] == modelo)
+        ]
+        filas.sort(key=lambda fila: fila['fecha'], reverse=True)
+        yield from filas
@@ -0,0 +1,559 @@
+"""
+Generación de documentos PDF (ReportLab), Excel (openpyxl) y CSV.
+
+Este módulo se importa solo dentro de las vistas que descargan archivos, para
+que el resto de procesos (login, dashboards, comandos, pruebas) no pague el
+tiempo de importación ni la memoria de ambas librerías. Cada función recibe
+los datos ya consultados y devuelve un BytesIO listo para la respuesta. Los
+reportes por curso aceptan `promedios` ({inscripcion_id: promedio}) ya
+calculados; sin ellos calculan el de cada inscripción.
+"""
+import csv
+import io
+import re
+from datetime import datetime
+
+import openpyxl
+from openpyxl.styles import Font, Alignment, PatternFill
+from openpyxl.utils import get_column_letter
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter, A4
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.units import inch
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+
+from .models import estado_segun_promedio
+
+ENCABEZADOS_RENDIMIENTO = ['Curso', 'Grupo', 'Profesor', 'Inscritos', 'Promedio', 'Aprobados', 'Reprobados']
+ENCABEZADOS_RIESGO = ['Código', 'Estudiante', 'Puntaje', 'Nivel', 'Cursos', 'Cursos en riesgo',
+                      'Evaluaciones faltantes', 'Promedio parcial', 'Promedio anterior', 'Tendencia']
+ENCABEZADOS_NOTAS = ['Grupo', 'Profesor', 'Código', 'Estudiante', 'Promedio', 'Estado']
+
+
+def promedio_de(inscripcion, promedios=None):
+    return promedios[inscripcion.id] if promedios is not None else inscripcion.calcular_promedio()
+
+
+def tabla_csv(encabezados, filas):
+    """Tabla en CSV; UTF-8 con BOM para que Excel abra bien las tildes"""
+    texto = io.StringIO()
+    escritor = csv.writer(texto)
+    escritor.writerow(encabezados)
+    escritor.writerows(filas)
+    return io.BytesIO(texto.getvalue().encode('utf-8-sig'))
+
+
+def tabla_excel(titulo, encabezados, filas):
+    """Tabla en una hoja de Excel con el encabezado de los reportes"""
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = re.sub(r'[\\/?*\[\]:]', '-', titulo)[:31]  # caracteres que Excel no admite en hojas
+    ws.append(encabezados)
+    for cell in ws[1]:
+        cell.font = Font(bold=True, color="FFFFFF", size=12)
+        cell.fill = PatternFill(start_color="0D47A1", end_color="0D47A1", fill_type="solid")
+        cell.alignment = Alignment(horizontal="center", vertical="center")
+    for fila in filas:
+        ws.append(fila)
+    for col, header in enumerate(encabezados, 1):
+        ws.column_dimensions[get_column_letter(col)].width = max(12, len(header) + 4)
+    
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    buffer.seek(0)
+    return buffer
+
+
+def filas_rendimiento(cursos, promedios=None):
+    """Filas de ENCABEZADOS_RENDIMIENTO por curso"""
+    for curso in cursos:
+        inscripciones = curso.inscripciones.all()
+        notas = [p for p in (promedio_de(insc, promedios) for insc in inscripciones) if p is not None]
+        aprobados = sum(1 for p in notas if p >= 3.0)
+        yield [
+            f"{curso.materia.codigo} - {curso.materia.nombre}",
+            curso.grupo,
+            curso.profesor.usuario.get_full_name(),
+            len(inscripciones),
+            round(sum(notas) / len(notas), 2) if notas else 0.0,
+            aprobados,
+            len(notas) - aprobados,
+        ]
+
+
+def filas_riesgo(estudiantes_riesgo):
+    """Filas de ENCABEZADOS_RIESGO por PuntajeRiesgo"""
+    for item in estudiantes_riesgo:
+        yield [
+            item.estudiante.codigo_estudiantil,
+            item.estudiante.usuario.get_full_name(),
+            float(item.puntaje),
+            item.get_nivel_display(),
+            item.cursos,
+            item.cursos_en_riesgo,
+            item.evaluaciones_faltantes,
+            *(None if valor is None else float(valor)
+              for valor in (item.promedio_parcial, item.promedio_anterior, item.tendencia)),
+        ]
+
+
+def filas_notas_materia(cursos, promedios=None):
+    """Filas de ENCABEZADOS_NOTAS por inscripción de cada grupo"""
+    for curso in cursos:
+        profesor = curso.profesor.usuario.get_full_name()
+        for insc in curso.inscripciones.all():
+            promedio = promedio_de(insc, promedios)
+            yield [
+                curso.grupo,
+                profesor,
+                insc.estudiante.codigo_estudiantil,
+                insc.estudiante.usuario.get_full_name(),
+                round(promedio, 2) if promedio is not None else None,
+                estado_segun_promedio(promedio),
+            ]
+
+
+def boletin_pdf(estudiante, periodo, registros):
+    """Boletín de notas del periodo en PDF a partir de registros de HistorialAcademico"""
+    # Crear PDF
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter)
+    elements = []
+    styles = getSampleStyleSheet()
+    
+    # Encabezado
+    titulo = Paragraph("<b>BOLETÍN DE NOTAS ACADÉMICAS</b>", styles['Title'])
+    elements.append(titulo)
+    elements.append(Spacer(1, 0.3*inch))
+    
+    # Información del estudiante
+    info_estudiante = Paragraph(f"""
+        <b>Estudiante:</b> {estudiante.usuario.get_full_name()}<br/>
+        <b>Código:</b> {estudiante.codigo_estudiantil}<br/>
+        <b>Programa:</b> {estudiante.programa.nombre}<br/>
+        <b>Semestre:</b> {estudiante.semestre}<br/>
+        <b>Periodo:</b> {periodo.nombre}<br/>
+        <b>Fecha de emisión:</b> {datetime.now().strftime('%d/%m/%Y')}
+    """, styles['Normal'])
+    elements.append(info_estudiante)
+    elements.append(Spacer(1, 0.3*inch))
+    
+    # Tabla de notas
+    data = [['Código', 'Materia', 'Créditos', 'Promedio', 'Estado']]
+    
+    total_creditos = 0
+    promedios_list = []
+    
+    for registro in registros:
+        promedio = float(registro.promedio or 0)
+        creditos = registro.creditos
+    
+        data.append([
+            registro.materia_codigo,
+            registro.materia_nombre,
+            str(creditos),
+            f"{promedio:.2f}",
+            registro.estado
+        ])
+    
+        total_creditos += creditos
+        if promedio > 0:
+            promedios_list.append(promedio)
+    
+    # Calcular promedio general
+    promedio_general = sum(promedios_list) / len(promedios_list) if promedios_list else 0.0
+    
+    table = Table(data, colWidths=[1*inch, 3*inch, 1*inch, 1*inch, 1.2*inch])
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#0D47A1')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 11),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 1), (-1, -1), 9),
+    ]))
+    elements.append(table)
+    
+    # Resumen
+    elements.append(Spacer(1, 0.3*inch))
+    resumen = Paragraph(f"""
+        <b>RESUMEN ACADÉMICO</b><br/>
+        Total de Créditos: {total_creditos}<br/>
+        Promedio General del Periodo: <b>{promedio_general:.2f}</b><br/>
+        Estado: <b>{'APROBADO' if promedio_general >= 3.0 else 'REPROBADO'}</b>
+    """, styles['Normal'])
+    elements.append(resumen)
+    
+    # Pie de página
+    elements.append(Spacer(1, 0.5*inch))
+    pie = Paragraph("""
+        <i>Este es un documento oficial emitido por el Sistema de Gestión Académica<br/>
+        Universidad Cooperativa de Colombia - Campus Pasto</i>
+    """, styles['Normal'])
+    elements.append(pie)
+    
+    doc.build(elements)
+    buffer.seek(0)
+    return buffer
+
+
+def reporte_rendimiento_pdf(cursos, periodo, generado_por, promedios=None):
+    """Reporte de rendimiento académico general en PDF"""
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4)
+    elements = []
+    styles = getSampleStyleSheet()
+    
+    # Título
+    titulo = Paragraph("<b>REPORTE DE RENDIMIENTO ACADÉMICO GENERAL</b>", styles['Title'])
+    elements.append(titulo)
+    elements.append(Spacer(1, 0.2*inch))
+    
+    # Información del reporte
+    info = Paragraph(f"""
+        <b>Periodo:</b> {periodo.nombre}<br/>
+        <b>Fecha de generación:</b> {datetime.now().strftime('%d/%m/%Y %H:%M')}<br/>
+        <b>Generado por:</b> {generado_por}
+    """, styles['Normal'])
+    elements.append(info)
+    elements.append(Spacer(1, 0.3*inch))
+    
+    # Tabla de datos
+    data = [['Curso', 'Grupo', 'Profesor', 'Inscritos', 'Promedio', 'Aprobados']]
+    
+    total_estudiantes = 0
+    total_aprobados = 0
+    promedios_generales = []
+    
+    for curso in cursos:
+        inscripciones = curso.inscripciones.all()
+        total_inscritos = len(inscripciones)
+        total_estudiantes += total_inscritos
+    
+        notas = [p for p in (promedio_de(insc, promedios) for insc in inscripciones) if p is not None]
+        promedio_curso = sum(notas) / len(notas) if notas else 0.0
+    
+        aprobados = sum(1 for p in notas if p >= 3.0)
+        total_aprobados += aprobados
+    
+        if promedio_curso > 0:
+            promedios_generales.append(promedio_curso)
+    
+        data.append([
+            f"{curso.materia.codigo}",
+            curso.grupo,
+            curso.profesor.usuario.last_name,
+            str(total_inscritos),
+            f"{promedio_curso:.2f}",
+            f"{aprobados}/{total_inscritos}"
+        ])
+    
+    table = Table(data, colWidths=[1.5*inch, 0.7*inch, 1.3*inch, 0.8*inch, 0.8*inch, 0.9*inch])
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#0D47A1')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('FONTSIZE', (0, 1), (-1, -1), 8),
+    ]))
+    elements.append(table)
+    
+    # Resumen estadístico
+    promedio_institucional = sum(promedios_generales) / len(promedios_generales) if promedios_generales else 0.0
+    tasa_aprobacion = (total_aprobados / total_estudiantes * 100) if total_estudiantes > 0 else 0.0
+    
+    elements.append(Spacer(1, 0.3*inch))
+    resumen = Paragraph(f"""
+        <b>RESUMEN ESTADÍSTICO</b><br/>
+        Total de Estudiantes: {total_estudiantes}<br/>
+        Total de Aprobados: {total_aprobados}<br/>
+        Tasa de Aprobación: {tasa_aprobacion:.1f}%<br/>
+        Promedio Institucional: <b>{promedio_institucional:.2f}</b>
+    """, styles['Normal'])
+    elements.append(resumen)
+    
+    doc.build(elements)
+    buffer.seek(0)
+    return buffer
+
+
+def reporte_rendimiento_excel(cursos, promedios=None):
+    """Reporte de rendimiento académico general en Excel"""
+    # Crear archivo Excel
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Rendimiento Académico"
+    
+    # Estilos
+    header_font = Font(bold=True, color="FFFFFF", size=12)
+    header_fill = PatternFill(start_color="0D47A1", end_color="0D47A1", fill_type="solid")
+    center_aligned = Alignment(horizontal="center", vertical="center")
+    
+    # Encabezados
+    for col, header in enumerate(ENCABEZADOS_RENDIMIENTO, 1):
+        cell = ws.cell(row=1, column=col)
+        cell.value = header
+        cell.font = header_font
+        cell.fill = header_fill
+        cell.alignment = center_aligned
+    
+    # Datos
+    for row, fila in enumerate(filas_rendimiento(cursos, promedios), 2):
+        for col, valor in enumerate(fila, 1):
+            ws.cell(row=row, column=col).value = valor
+            ws.cell(row=row, column=col).alignment = center_aligned
+    
+    # Ajustar ancho de columnas
+    ws.column_dimensions['A'].width = 40
+    ws.column_dimensions['B'].width = 10
+    ws.column_dimensions['C'].width = 25
+    ws.column_dimensions['D'].width = 12
+    ws.column_dimensions['E'].width = 12
+    ws.column_dimensions['F'].width = 12
+    ws.column_dimensions['G'].width = 12
+    
+    # Guardar en buffer
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    buffer.seek(0)
+    return buffer
+
+
+def reporte_rendimiento_csv(cursos, promedios=None):
+    """Reporte de rendimiento académico general en CSV"""
+    return tabla_csv(ENCABEZADOS_RENDIMIENTO, filas_rendimiento(cursos, promedios))
+
+
+def reporte_riesgo_pdf(periodo, estudiantes_riesgo):
+    """Listado de estudiantes en riesgo académico (PuntajeRiesgo, de mayor a menor puntaje) en PDF"""
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4)
+    elements = []
+    styles = getSampleStyleSheet()
+    
+    titulo = Paragraph("<b>REPORTE DE ESTUDIANTES EN RIESGO ACADÉMICO</b>", styles['Title'])
+    elements.append(titulo)
+    elements.append(Spacer(1, 0.2*inch))
+    
+    info = Paragraph(f"""
+        <b>Periodo:</b> {periodo.nombre}<br/>
+        <b>Fecha:</b> {datetime.now().strftime('%d/%m/%Y')}<br/>
+        <b>Total en riesgo:</b> {len(estudiantes_riesgo)} estudiantes
+    """, styles['Normal'])
+    elements.append(info)
+    elements.append(Spacer(1, 0.3*inch))
+    
+    data = [['Código', 'Estudiante', 'Puntaje', 'Nivel', 'Cursos en riesgo', 'Promedio', 'Tendencia']]
+    
+    for item in estudiantes_riesgo:
+        data.append([
+            item.estudiante.codigo_estudiantil,
+            item.estudiante.usuario.get_full_name(),
+            f"{item.puntaje:.1f}",
+            item.get_nivel_display(),
+            f"{item.cursos_en_riesgo}/{item.cursos}",
+            f"{item.promedio_parcial:.2f}" if item.promedio_parcial is not None else "N/A",
+            f"{item.tendencia:+.2f}" if item.tendencia is not None else "N/A",
+        ])
+    
+    table = Table(data, colWidths=[1*inch, 1.9*inch, 0.7*inch, 0.7*inch, 0.9*inch, 0.8*inch, 0.8*inch])
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#C62828')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+    ]))
+    elements.append(table)
+    
+    doc.build(elements)
+    buffer.seek(0)
+    return buffer
+
+
+def reporte_riesgo_excel(periodo, estudiantes_riesgo):
+    """Listado de estudiantes en riesgo académico en Excel"""
+    return tabla_excel(f"Riesgo {periodo.nombre}", ENCABEZADOS_RIESGO, filas_riesgo(estudiantes_riesgo))
+
+
+def reporte_riesgo_csv(periodo, estudiantes_riesgo):
+    """Listado de estudiantes en riesgo académico en CSV"""
+    return tabla_csv(ENCABEZADOS_RIESGO, filas_riesgo(estudiantes_riesgo))
+
+
+def reporte_notas_materia_pdf(materia, cursos, promedios=None):
+    """Notas de cada grupo de una materia en PDF"""
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4)
+    elements = []
+    styles = getSampleStyleSheet()
+    
+    titulo = Paragraph(f"<b>REPORTE DE NOTAS - {materia.nombre}</b>", styles['Title'])
+    elements.append(titulo)
+    elements.append(Spacer(1, 0.2*inch))
+    
+    for curso in cursos:
+        elements.append(Paragraph(f"<b>Grupo: {curso.grupo} - Profesor: {curso.profesor.usuario.get_full_name()}</b>", styles['Heading2']))
+        elements.append(Spacer(1, 0.1*inch))
+    
+        inscripciones = curso.inscripciones.all()
+        data = [['Código', 'Estudiante', 'Promedio', 'Estado']]
+    
+        for insc in inscripciones:
+            promedio = promedio_de(insc, promedios)
+            data.append([
+                insc.estudiante.codigo_estudiantil,
+                insc.estudiante.usuario.get_full_name(),
+                f"{promedio:.2f}" if promedio else "N/A",
+                estado_segun_promedio(promedio)
+            ])
+    
+        table = Table(data)
+        table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ]))
+        elements.append(table)
+        elements.append(Spacer(1, 0.3*inch))
+    
+    doc.build(elements)
+    buffer.seek(0)
+    return buffer
+
+
+def reporte_notas_materia_excel(materia, cursos, promedios=None):
+    """Notas de cada grupo de una materia en Excel"""
+    return tabla_excel(materia.codigo, ENCABEZADOS_NOTAS, filas_notas_materia(cursos, promedios))
+
+
+def reporte_notas_materia_csv(materia, cursos, promedios=None):
+    """Notas de cada grupo de una materia en CSV"""
+    return tabla_csv(ENCABEZADOS_NOTAS, filas_notas_materia(cursos, promedios))
+
+
+def historial_excel(estudiante, registros, acumulado=None):
+    """Historial académico completo en Excel a partir de registros de HistorialAcademico"""
+    # Crear Excel
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Historial de Notas"
+    
+    # Información del estudiante
+    ws['A1'] = "HISTORIAL ACADÉMICO"
+    ws['A2'] = f"Estudiante: {estudiante.usuario.get_full_name()}"
+    ws['A3'] = f"Código: {estudiante.codigo_estudiantil}"
+    ws['A4'] = f"Programa: {estudiante.programa.nombre}"
+    
+    # Encabezados
+    headers = ['Periodo', 'Código', 'Materia', 'Créditos', 'Promedio', 'Estado']
+    for col, header in enumerate(headers, 1):
+        ws.cell(row=6, column=col).value = header
+        ws.cell(row=6, column=col).font = Font(bold=True)
+    
+    # Datos
+    row = 7
+    for registro in registros:
+        promedio = registro.promedio
+        ws.cell(row=row, column=1).value = registro.periodo.nombre
+        ws.cell(row=row, column=2).value = registro.materia_codigo
+        ws.cell(row=row, column=3).value = registro.materia_nombre
+        ws.cell(row=row, column=4).value = registro.creditos
+        ws.cell(row=row, column=5).value = round(float(promedio), 2) if promedio else "N/A"
+        ws.cell(row=row, column=6).value = registro.estado
+        row += 1
+    
+    # Acumulado de los periodos cerrados
+    if acumulado is not None:
+        row += 1
+        resumen = [
+            ('Promedio acumulado', float(acumulado.promedio_acumulado) if acumulado.promedio_acumulado else "N/A"),
+            ('Créditos aprobados', acumulado.creditos_aprobados),
+            ('Materias reprobadas', acumulado.cursos_reprobados),
+        ]
+        for etiqueta, valor in resumen:
+            ws.cell(row=row, column=3).value = etiqueta
+            ws.cell(row=row, column=3).font = Font(bold=True)
+            ws.cell(row=row, column=5).value = valor
+            row += 1
+    
+    # Ajustar anchos
+    ws.column_dimensions['A'].width = 12
+    ws.column_dimensions['B'].width = 12
+    ws.column_dimensions['C'].width = 35
+    ws.column_dimensions['D'].width = 10
+    ws.column_dimensions['E'].width = 12
+    ws.column_dimensions['F'].width = 12
+    
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    buffer.seek(0)
+    return buffer
+
+
+def ocupacion_aulas_excel(periodo, matriz):
+    """Utilización por aula y cuadrícula aula x día x bloque (de MapaOcupacion.como_dict)"""
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Utilización"
+    
+    header_font = Font(bold=True, color="FFFFFF")
+    header_fill = PatternFill(start_color="0D47A1", end_color="0D47A1", fill_type="solid")
+    ocupado_fill = PatternFill(start_color="EF9A9A", end_color="EF9A9A", fill_type="solid")
+    center_aligned = Alignment(horizontal="center", vertical="center")
+    
+    ws.cell(row=1, column=1).value = f"Ocupación de aulas - {periodo.nombre}"
+    ws.cell(row=1, column=1).font = Font(bold=True, size=14)
+    ws.cell(row=2, column=1).value = f"Utilización total: {matriz['utilizacion']}%"
+    
+    headers = ['Aula', 'Utilización (%)', *[dia.capitalize() + ' (%)' for dia in matriz['dias']]]
+    for col, header in enumerate(headers, 1):
+        cell = ws.cell(row=4, column=col)
+        cell.value = header
+        cell.font = header_font
+        cell.fill = header_fill
+        cell.alignment = center_aligned
+    
+    bloques = len(matriz['bloques'])
+    for row, aula in enumerate(matriz['aulas'], 5):
+        ws.cell(row=row, column=1).value = aula['aula']
+        ws.cell(row=row, column=2).value = aula['utilizacion']
+        for col, dia in enumerate(matriz['dias'], 3):
+            ws.cell(row=row, column=col).value = round(aula['ocupacion'][dia].count('1') * 100 / bloques, 1)
+    ws.column_dimensions['A'].width = 20
+    ws.column_dimensions['B'].width = 16
+    
+    # Cuadrícula: una fila por aula y día, una columna por bloque
+    grilla = wb.create_sheet("Cuadrícula")
+    for col, header in enumerate(['Aula', 'Día', *matriz['bloques']], 1):
+        cell = grilla.cell(row=1, column=col)
+        cell.value = header
+        cell.font = header_font
+        cell.fill = header_fill
+        cell.alignment = center_aligned
+    row = 2
+    for aula in matriz['aulas']:
+        for dia in matriz['dias']:
+            grilla.cell(row=row, column=1).value = aula['aula']
+            grilla.cell(row=row, column=2).value = dia
+            for col, ocupado in enumerate(aula['ocupacion'][dia], 3):
+                if ocupado == '1':
+                    grilla.cell(row=row, column=col).fill = ocupado_fill
+            row += 1
+    grilla.column_dimensions['A'].width = 20
+    grilla.freeze_panes = 'C2'
+    
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    buffer.seek(0)
+    return buffer
@@ -55,6 +55,14 @@ class BulkArchiveForm(forms.Form):
             # keep legacy 'ids' for API compatibility
             self.fields["ids"].widget = forms.HiddenInput()
 
+    def selected_ids(self):
+        """Return the selected ids, from ids_qs when available or from the comma-separated ids."""
+        selected = self.cleaned_data.get("ids_qs")
+        if selected:
+            return [obj.pk for obj in selected]
+        raw = self.cleaned_data.get("ids") or ""
+        return [part.strip() for part in raw.split(",") if part.strip()]
+
 
 def archive_queryset(queryset, archived=True, by_user=None, reason=None, timestamp=None):
     """
@@ -77,23 +85,25 @@ def archive_queryset(queryset, archived=True, by_user=None, reason=None, timesta
         if update_kwargs:
             return queryset.update(**update_kwargs)
 
-    # fallback: iterate and set attributes
-    updated = 0
+    # fallback: plain iterables of model instances, saved with one bulk_update per model
+    groups = {}
     for obj in queryset:
-        changed = False
+        fields = []
         if hasattr(obj, "archived"):
             obj.archived = archived
-            changed = True
+            fields.append("archived")
         if hasattr(obj, "archived_at"):
             obj.archived_at = timestamp if archived else None
-            changed = True
-        if changed:
-            try:
-                obj.save()
-                updated += 1
-            except Exception:
-                # skip failing saves
-                pass
+            fields.append("archived_at")
+        if fields and getattr(obj, "pk", None) is not None:
+            groups.setdefault((type(obj), tuple(fields)), []).append(obj)
+
+    updated = 0
+    for (model_cls, fields), objs in groups.items():
+        manager = getattr(model_cls, "_base_manager", None)
+        if manager is None:
+            continue
+        updated += manager.bulk_update(objs, list(fields)) or 0
     return updated
 
 
@@ -0,0 +1,256 @@
+"""
+Horarios de curso como franjas (día, inicio, fin, aula).
+
+`Curso.horario` es texto libre ("Lun-Mie 10:00-12:00", "Mar 08:00-10:00;
+Jue 14:00-16:00"). `parsear_horario` lo convierte en franjas y
+`sincronizar_franjas` las guarda en FranjaHorario, que es lo que se consulta
+para detectar choques de aula y de estudiante.
+
+`choque_de_aula` y `choque_de_estudiante` comprueban un solo curso con una
+consulta de rango (mismo día, empieza antes del fin y termina después del
+inicio); la de aula usa el índice (periodo, aula, dia, hora_inicio).
+
+`IndiceIntervalos` es para comprobar muchos intervalos de una vez, como en la
+inscripción por lotes: guarda por clave (aula o estudiante) los intervalos en
+minutos de la semana ordenados por inicio, con el máximo acumulado de los
+finales. Construirlo cuesta O(n log n) y cada consulta es después una búsqueda
+binaria, O(log n), aunque contenga intervalos solapados entre sí.
+"""
+import re
+import unicodedata
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from datetime import time
+from itertools import accumulate
+
+from django.db import transaction
+from django.db.models import Q
+
+from .models import FranjaHorario, InscripcionCurso
+
+DIAS = ('lun', 'mar', 'mie', 'jue', 'vie', 'sab', 'dom')
+
+MINUTOS_DIA = 24 * 60
+
+SEGMENTO = re.compile(
+    r'^(?P<dias>[a-z]+(?:\s*[-/,y]\s*[a-z]+)*)\s+(?P<inicio>\d{1,2}(?::\d{2})?)\s*-\s*(?P<fin>\d{1,2}(?::\d{2})?)$'
+)
+
+Franja = namedtuple('Franja', 'dia inicio fin')
+
+
+def normalizar(texto):
+    sin_tildes = unicodedata.normalize('NFKD', texto).encode('ascii', 'ignore').decode()
+    return re.sub(r'\s+', ' ', sin_tildes.lower()).strip()
+
+
+def parsear_hora(texto):
+    horas, _, minutos = texto.partition(':')
+    return time(int(horas), int(minutos or 0))
+
+
+def parsear_horario(texto):
+    """Franjas de un horario en texto; ValueError si no se entiende. 'Lun-Mie' son dos días, no un rango"""
+    franjas = []
+    for segmento in filter(None, (s.strip() for s in re.split(r'[;\n]', normalizar(texto or '')))):
+        coincidencia = SEGMENTO.match(segmento)
+        if coincidencia is None:
+            raise ValueError(f'Horario no reconocido: "{segmento}" (formato: "Lun-Mie 10:00-12:00")')
+        try:
+            inicio, fin = parsear_hora(coincidencia['inicio']), parsear_hora(coincidencia['fin'])
+        except ValueError:
+            raise ValueError(f'Hora inválida en "{segmento}"')
+        if fin <= inicio:
+            raise ValueError(f'La hora final debe ser posterior a la inicial en "{segmento}"')
+        for nombre in re.split(r'\s*[-/,y]\s*', coincidencia['dias']):
+            if nombre[:3] not in DIAS:
+                raise ValueError(f'Día no reconocido: "{nombre}"')
+            franjas.append(Franja(DIAS.index(nombre[:3]), inicio, fin))
+    return sorted(set(franjas))
+
+
+def minutos_semana(dia, hora):
+    return dia * MINUTOS_DIA + hora.hour * 60 + hora.minute
+
+
+def intervalo(franja):
+    return minutos_semana(franja.dia, franja.inicio), minutos_semana(franja.dia, franja.fin)
+
+
+def franjas_de_curso(curso):
+    """FranjaHorario sin guardar de un curso; ValueError si su horario no se entiende"""
+    return [
+        FranjaHorario(curso_id=curso.pk, periodo_id=curso.periodo_id, aula=normalizar(curso.aula),
+                      dia=franja.dia, hora_inicio=franja.inicio, hora_fin=franja.fin)
+        for franja in parsear_horario(curso.horario)
+    ]
+
+
+def sincronizar_franjas(cursos, lote=1000):
+    """Reemplaza las franjas de un queryset de cursos; devuelve (franjas creadas, {curso_id: error})"""
+    nuevas, errores = [], {}
+    cursos = list(cursos.only('id', 'periodo_id', 'horario', 'aula'))
+    for curso in cursos:
+        try:
+            nuevas += franjas_de_curso(curso)
+        except ValueError as error:
+            errores[curso.pk] = str(error)
+    with transaction.atomic():
+        FranjaHorario.objects.filter(curso_id__in=[curso.pk for curso in cursos]).delete()
+        FranjaHorario.objects.bulk_create(nuevas, batch_size=lote)
+    return len(nuevas), errores
+
+
+class IndiceIntervalos:
+    """Intervalos [inicio, fin) por clave, con consulta de choque en O(log n)"""
+
+    def __init__(self):
+        self.intervalos = {}
+        self.inicios = {}
+        self.max_fines = {}
+
+    def agregar(self, clave, inicio, fin, etiqueta=None):
+        self.intervalos.setdefault(clave, []).append((inicio, fin, etiqueta))
+        # Se reordena en la siguiente consulta: cargar n intervalos cuesta O(n log n), no O(n²)
+        self.inicios.pop(clave, None)
+
+    def ordenar(self, clave):
+        intervalos = self.intervalos[clave]
+        intervalos.sort(key=lambda i: (i[0], i[1]))
+        self.inicios[clave] = [i for i, _, _ in intervalos]
+        # Máximo acumulado de los finales en orden de inicio (no decreciente)
+        self.max_fines[clave] = list(accumulate((f for _, f, _ in intervalos), max))
+
+    def choque(self, clave, inicio, fin):
+        """Algún intervalo de `clave` que se solape con [inicio, fin), o None"""
+        if not self.intervalos.get(clave):
+            return None
+        if clave not in self.inicios:
+            self.ordenar(clave)
+        # Candidatos: los que empiezan antes de `fin`. El primero cuyo máximo acumulado supera
+        # `inicio` es justo uno que termina después de `inicio`: si es candidato, hay choque
+        candidatos = bisect_left(self.inicios[clave], fin)
+        primero = bisect_right(self.max_fines[clave], inicio)
+        return self.intervalos[clave][primero] if primero < candidatos else None
+
+    def choque_franjas(self, clave, franjas):
+        for franja in franjas:
+            encontrado = self.choque(clave, *intervalo(franja))
+            if encontrado is not None:
+                return encontrado
+        return None
+
+    def agregar_franjas(self, clave, franjas, etiqueta=None):
+        for franja in franjas:
+            self.agregar(clave, *intervalo(franja), etiqueta)
+
+
+def franjas_por_curso(filtro):
+    """{curso_id: [Franja]} y {curso_id: aula} de las franjas que cumplen `filtro`"""
+    franjas, aulas = {}, {}
+    filas = FranjaHorario.objects.filter(curso__archived=False, **filtro).values_list(
+        'curso_id', 'aula', 'dia', 'hora_inicio', 'hora_fin'
+    )
+    for curso_id, aula, dia, inicio, fin in filas:
+        franjas.setdefault(curso_id, []).append(Franja(dia, inicio, fin))
+        aulas[curso_id] = aula
+    return franjas, aulas
+
+
+def indice_estudiantes(estudiantes, periodos):
+    """Índice por estudiante con las franjas de sus inscripciones activas en esos periodos"""
+    filas = InscripcionCurso.objects.filter(estudiante_id__in=estudiantes, curso__periodo_id__in=periodos)
+    franjas, _ = franjas_por_curso({'curso_id__in': filas.values('curso_id')})
+    indice = IndiceIntervalos()
+    for estudiante_id, curso_id in filas.values_list('estudiante_id', 'curso_id'):
+        indice.agregar_franjas(estudiante_id, franjas.get(curso_id, ()), curso_id)
+    return indice
+
+
+def solapadas(franjas):
+    """Filtro de las FranjaHorario que se solapan con alguna de `franjas` (no vacía)"""
+    condicion = Q()
+    for franja in franjas:
+        condicion |= Q(dia=franja.dia, hora_inicio__lt=franja.fin, hora_fin__gt=franja.inicio)
+    return condicion
+
+
+def primer_curso(filas):
+    return filas.order_by('dia', 'hora_inicio', 'curso_id').values_list('curso_id', flat=True).first()
+
+
+def choque_de_aula(curso):
+    """Curso del mismo periodo que ocupa el aula de `curso` a la vez, o None"""
+    aula = normalizar(curso.aula)
+    if not aula:
+        return None
+    franjas = parsear_horario(curso.horario)
+    if not franjas:
+        return None
+    filas = FranjaHorario.objects.filter(solapadas(franjas), periodo_id=curso.periodo_id, aula=aula,
+                                         curso__archived=False)
+    if curso.pk is not None:
+        filas = filas.exclude(curso_id=curso.pk)
+    return primer_curso(filas)
+
+
+def choque_de_estudiante(estudiante_id, curso):
+    """Curso en el que `estudiante_id` ya está inscrito y que se cruza con `curso`, o None"""
+    franjas = parsear_horario(curso.horario)
+    if not franjas:
+        return None
+    otros = InscripcionCurso.objects.filter(estudiante_id=estudiante_id, curso__periodo_id=curso.periodo_id)
+    return primer_curso(FranjaHorario.objects.filter(
+        solapadas(franjas), curso_id__in=otros.exclude(curso_id=curso.pk).values('curso_id'), curso__archived=False
+    ))
+
+
+def solapes(intervalos):
+    """Pares de etiquetas solapadas en una lista de (inicio, fin, etiqueta), barriendo una vez por inicio"""
+    activos = []
+    for inicio, fin, etiqueta in sorted(intervalos, key=lambda i: (i[0], i[1])):
+        activos = [a for a in activos if a[1] > inicio]
+        for otro_inicio, otro_fin, otra in activos:
+            if otra != etiqueta:
+                yield otra, etiqueta, inicio, min(fin, otro_fin)
+        activos.append((inicio, fin, etiqueta))
+
+
+def hora_de(minutos):
+    minutos %= MINUTOS_DIA
+    return f'{minutos // 60:02d}:{minutos % 60:02d}'
+
+
+def choques_periodo(periodo):
+    """
+    Choques de aula y de estudiante de todo un periodo con dos consultas.
+    Devuelve dicts {'tipo', 'clave', 'curso_a', 'curso_b', 'dia', 'inicio', 'fin'}.
+    """
+    franjas, aulas = franjas_por_curso({'periodo': periodo})
+    por_clave = {}
+    for curso_id, lista in franjas.items():
+        if aulas[curso_id]:
+            por_clave.setdefault(('aula', aulas[curso_id]), []).extend(
+                (*intervalo(franja), curso_id) for franja in lista
+            )
+    inscripciones = InscripcionCurso.objects.filter(curso__periodo=periodo).values_list('estudiante_id', 'curso_id')
+    for estudiante_id, curso_id in inscripciones.order_by():
+        if curso_id not in franjas:
+            continue
+        por_clave.setdefault(('estudiante', estudiante_id), []).extend(
+            (*intervalo(franja), curso_id) for franja in franjas[curso_id]
+        )
+
+    choques = []
+    for (tipo, clave), intervalos in sorted(por_clave.items(), key=lambda c: (c[0][0], str(c[0][1]))):
+        vistos = set()
+        for curso_a, curso_b, inicio, fin in solapes(intervalos):
+            par = (min(curso_a, curso_b), max(curso_a, curso_b), inicio // MINUTOS_DIA)
+            if par in vistos:
+                continue
+            vistos.add(par)
+            choques.append({
+                'tipo': tipo, 'clave': clave, 'curso_a': par[0], 'curso_b': par[1],
+                'dia': DIAS[par[2]], 'inicio': hora_de(inicio), 'fin': hora_de(fin),
+            })
+    return choques
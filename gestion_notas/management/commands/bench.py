@@ -0,0 +1,187 @@
+import json
+import math
+import platform
+import time
+import tracemalloc
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from gestion_notas.models import *
+
+
+def percentil(valores, p):
+    """Percentil por rango más cercano"""
+    ordenados = sorted(valores)
+    indice = max(0, math.ceil(p / 100 * len(ordenados)) - 1)
+    return ordenados[indice]
+
+
+class Command(BaseCommand):
+    help = ('Mide latencia p50/p95, número de consultas SQL y memoria pico de las vistas más usadas, '
+            'y compara el resultado contra una línea base')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--generar', action='store_true',
+                            help='Generar antes el conjunto de datos con poblar_datos (solo con DEBUG=True)')
+        parser.add_argument('--estudiantes', type=int, default=2000)
+        parser.add_argument('--profesores', type=int, default=60)
+        parser.add_argument('--periodos', type=int, default=3)
+        parser.add_argument('--seed', type=int, default=2025)
+        parser.add_argument('--repeticiones', type=int, default=20)
+        parser.add_argument('--solo', default='', help='Escenarios a medir, separados por coma')
+        parser.add_argument('--salida', default='', help='Archivo JSON de resultados (por defecto stdout)')
+        parser.add_argument('--baseline', default='', help='Archivo JSON de línea base para comparar')
+        parser.add_argument('--guardar-baseline', action='store_true',
+                            help='Escribir los resultados como nueva línea base en --baseline')
+        parser.add_argument('--tolerancia', type=float, default=0.25,
+                            help='Aumento relativo permitido en latencia y memoria (0.25 = 25%%)')
+
+    def handle(self, *args, **options):
+        if options['generar']:
+            if not settings.DEBUG:
+                # poblar_datos escribe en la base configurada: nunca contra producción por accidente
+                raise CommandError('--generar solo se permite con DEBUG=True (base de desarrollo o de pruebas)')
+            call_command('poblar_datos', estudiantes=options['estudiantes'], profesores=options['profesores'],
+                         periodos=options['periodos'], seed=options['seed'], stdout=self.stderr)
+            call_command('calcular_riesgo', stdout=self.stderr)
+
+        escenarios = self.escenarios()
+        if options['solo']:
+            elegidos = {nombre.strip() for nombre in options['solo'].split(',')}
+            escenarios = [e for e in escenarios if e[0] in elegidos]
+
+        resultados = {}
+        for nombre, usuario, metodo, url, datos in escenarios:
+            self.stderr.write(f'Midiendo {nombre}...')
+            resultados[nombre] = self.medir(usuario, metodo, url, datos, options['repeticiones'])
+
+        informe = {
+            'meta': {
+                'fecha': timezone.now().isoformat(),
+                'python': platform.python_version(),
+                'base_de_datos': connection.vendor,
+                'repeticiones': options['repeticiones'],
+                'estudiantes': Estudiante.objects.count(),
+                'cursos': Curso.objects.count(),
+                'inscripciones': InscripcionCurso.objects.count(),
+                'calificaciones': Calificacion.objects.count(),
+            },
+            'resultados': resultados,
+        }
+
+        salida = json.dumps(informe, indent=2, ensure_ascii=False)
+        if options['salida']:
+            Path(options['salida']).write_text(salida, encoding='utf-8')
+        else:
+            self.stdout.write(salida)
+
+        if options['baseline']:
+            ruta = Path(options['baseline'])
+            if options['guardar_baseline']:
+                ruta.write_text(salida, encoding='utf-8')
+                self.stderr.write(self.style.SUCCESS(f'Línea base guardada en {ruta}'))
+            else:
+                self.comparar(resultados, json.loads(ruta.read_text(encoding='utf-8'))['resultados'],
+                              options['tolerancia'])
+
+    def escenarios(self):
+        """(nombre, usuario, método, url, datos POST) de cada vista a medir"""
+        periodo = PeriodoAcademico.objects.filter(activo=True).first()
+        if periodo is None:
+            raise CommandError('No hay periodo activo; ejecute con --generar o poblar_datos')
+
+        estudiante = (Estudiante.objects.filter(inscripciones__curso__periodo=periodo)
+                      .annotate(n=Count('inscripciones')).order_by('-n').first())
+        profesor = (Profesor.objects.filter(cursos__periodo=periodo)
+                    .annotate(n=Count('cursos')).order_by('-n').first())
+        administrador = Administrador.objects.select_related('usuario').first()
+        if not (estudiante and profesor and administrador):
+            raise CommandError('Faltan estudiantes, profesores o administradores en el periodo activo')
+
+        curso = (profesor.cursos.filter(periodo=periodo)
+                 .annotate(n=Count('inscripciones')).order_by('-n').first())
+        materia_id = curso.materia_id
+        reporte = reverse('generar_reporte')
+
+        escenarios = [
+            ('dashboard_estudiante', estudiante.usuario, 'get', reverse('dashboard'), None),
+            ('dashboard_profesor', profesor.usuario, 'get', reverse('dashboard'), None),
+            ('dashboard_administrador', administrador.usuario, 'get', reverse('dashboard'), None),
+            ('mis_notas', estudiante.usuario, 'get', reverse('mis_notas'), None),
+            ('estudiantes_curso', profesor.usuario, 'get', reverse('estudiantes_curso', args=[curso.id]), None),
+            ('estadisticas_dashboard', administrador.usuario, 'get', reverse('estadisticas_dashboard'), None),
+            ('busqueda_global_profesor', profesor.usuario, 'get', reverse('busqueda_global') + '?q=ez', None),
+            ('busqueda_global_administrador', administrador.usuario, 'get', reverse('busqueda_global') + '?q=Ing', None),
+        ]
+        for tipo_reporte, formato in [('rendimiento_general', 'pdf'), ('rendimiento_general', 'excel'),
+                                      ('estudiantes_riesgo', 'pdf'), ('notas_por_materia', 'pdf')]:
+            escenarios.append((
+                f'reporte_{tipo_reporte}_{formato}', administrador.usuario, 'post', reporte,
+                {'tipo_reporte': tipo_reporte, 'formato': formato, 'periodo': periodo.id, 'materia': materia_id},
+            ))
+        return escenarios
+
+    def servidor(self):
+        """Host aceptado por ALLOWED_HOSTS para las peticiones del Client (con DEBUG y lista vacía, localhost)"""
+        for host in settings.ALLOWED_HOSTS:
+            if host != '*' and not host.startswith('.'):
+                return host
+        return 'localhost'
+
+    def medir(self, usuario, metodo, url, datos, repeticiones):
+        client = Client(raise_request_exception=False, SERVER_NAME=self.servidor())
+        client.force_login(usuario)
+        peticion = getattr(client, metodo)
+
+        def ejecutar():
+            return peticion(url, datos) if datos is not None else peticion(url)
+
+        respuesta = ejecutar()  # calentamiento
+
+        tiempos = []
+        with CaptureQueriesContext(connection) as consultas:
+            for _ in range(repeticiones):
+                inicio = time.perf_counter()
+                respuesta = ejecutar()
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+
+        # La memoria se mide en una ejecución aparte: tracemalloc distorsiona los tiempos
+        tracemalloc.start()
+        ejecutar()
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        return {
+            'estado': respuesta.status_code,
+            'p50_ms': round(percentil(tiempos, 50), 3),
+            'p95_ms': round(percentil(tiempos, 95), 3),
+            'consultas': len(consultas) // repeticiones,
+            'memoria_pico_kb': round(pico / 1024, 1),
+        }
+
+    def comparar(self, resultados, base, tolerancia):
+        regresiones = []
+        for nombre, actual in resultados.items():
+            anterior = base.get(nombre)
+            if anterior is None:
+                continue
+            if actual['estado'] != anterior['estado']:
+                regresiones.append(f"{nombre}: estado {anterior['estado']} -> {actual['estado']}")
+            if actual['consultas'] > anterior['consultas']:
+                regresiones.append(f"{nombre}: consultas {anterior['consultas']} -> {actual['consultas']}")
+            for campo in ('p95_ms', 'memoria_pico_kb'):
+                if actual[campo] > anterior[campo] * (1 + tolerancia):
+                    regresiones.append(f"{nombre}: {campo} {anterior[campo]} -> {actual[campo]}")
+
+        if regresiones:
+            raise CommandError('Regresiones de rendimiento:\n  ' + '\n  '.join(regresiones))
+        self.stderr.write(self.style.SUCCESS('Sin regresiones respecto a la línea base'))
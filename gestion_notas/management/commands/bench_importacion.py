@@ -0,0 +1,123 @@
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+# Proceso hijo: arranca Django y resuelve las rutas indicadas, como haría un worker recién creado
+SCRIPT_ARRANQUE = '''
+import json, resource, sys, time
+inicio = time.perf_counter()
+import django
+django.setup()
+from django.urls import resolve
+for ruta in sys.argv[1:]:
+    resolve(ruta)
+arranque_ms = (time.perf_counter() - inicio) * 1000
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+if sys.platform == 'darwin':
+    rss_kb //= 1024
+print(json.dumps({'arranque_ms': arranque_ms, 'rss_kb': rss_kb, 'modulos': sorted(sys.modules)}))
+'''
+
+LINEA_IMPORTTIME = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)')
+
+
+def medir_arranque(rutas):
+    """Ejecuta un intérprete nuevo con -X importtime; devuelve el resumen del hijo y sus importaciones"""
+    proceso = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', SCRIPT_ARRANQUE, *rutas],
+        capture_output=True, text=True, env=os.environ.copy(),
+    )
+    if proceso.returncode != 0:
+        raise CommandError(f'El proceso de arranque falló:\n{proceso.stderr[-2000:]}')
+
+    importaciones = []
+    for linea in proceso.stderr.splitlines():
+        coincidencia = LINEA_IMPORTTIME.match(linea)
+        if coincidencia:
+            propio, acumulado, sangria, modulo = coincidencia.groups()
+            importaciones.append({
+                'modulo': modulo,
+                'propio_us': int(propio),
+                'acumulado_us': int(acumulado),
+                'nivel': len(sangria) // 2,
+            })
+    resumen = json.loads(proceso.stdout.strip().splitlines()[-1])
+    return resumen, importaciones
+
+
+class Command(BaseCommand):
+    help = ('Mide el tiempo de importación (python -X importtime), el arranque y la memoria RSS de un worker '
+            'que atiende las rutas de login y dashboard, y falla si se importan librerías prohibidas')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rutas', default='/,/dashboard/',
+                            help='Rutas a resolver en el arranque, separadas por coma')
+        parser.add_argument('--repeticiones', type=int, default=5)
+        parser.add_argument('--top', type=int, default=15, help='Paquetes más costosos a mostrar')
+        parser.add_argument('--prohibidos', default='reportlab,openpyxl,numpy',
+                            help='Paquetes que no deben cargarse en el arranque')
+        parser.add_argument('--baseline', default='', help='Archivo JSON de línea base para comparar')
+        parser.add_argument('--guardar-baseline', action='store_true',
+                            help='Escribir los resultados como nueva línea base en --baseline')
+        parser.add_argument('--tolerancia', type=float, default=0.2,
+                            help='Aumento relativo permitido en importación, arranque y RSS (0.2 = 20%%)')
+
+    def handle(self, *args, **options):
+        rutas = [ruta.strip() for ruta in options['rutas'].split(',') if ruta.strip()]
+        mediciones = [medir_arranque(rutas) for _ in range(max(1, options['repeticiones']))]
+
+        # Solo cuentan los módulos de primer nivel: su acumulado incluye a sus dependencias
+        totales = [sum(i['acumulado_us'] for i in importaciones if i['nivel'] == 0)
+                   for _, importaciones in mediciones]
+        resumen, importaciones = mediciones[-1]
+
+        paquetes = {}
+        for importacion in importaciones:
+            raiz = importacion['modulo'].split('.')[0]
+            paquetes[raiz] = paquetes.get(raiz, 0) + importacion['propio_us']
+        costosos = sorted(paquetes.items(), key=lambda p: p[1], reverse=True)[:options['top']]
+
+        prohibidos = [p.strip() for p in options['prohibidos'].split(',') if p.strip()]
+        cargados = sorted({m.split('.')[0] for m in resumen['modulos']} & set(prohibidos))
+
+        resultados = {
+            'importacion_ms': round(statistics.median(totales) / 1000, 1),
+            'arranque_ms': round(statistics.median(r['arranque_ms'] for r, _ in mediciones), 1),
+            'rss_kb': int(statistics.median(r['rss_kb'] for r, _ in mediciones)),
+            'modulos': len(resumen['modulos']),
+            'prohibidos_cargados': cargados,
+        }
+
+        self.stdout.write(f"Rutas: {', '.join(rutas)}")
+        for clave, valor in resultados.items():
+            self.stdout.write(f'  {clave}: {valor}')
+        self.stdout.write('Paquetes más costosos (ms propios):')
+        for paquete, microsegundos in costosos:
+            self.stdout.write(f'  {paquete:<30} {microsegundos / 1000:>8.1f}')
+
+        if options['baseline']:
+            ruta = Path(options['baseline'])
+            if options['guardar_baseline']:
+                ruta.write_text(json.dumps(resultados, indent=2), encoding='utf-8')
+                self.stdout.write(self.style.SUCCESS(f'Línea base guardada en {ruta}'))
+            else:
+                self.comparar(resultados, json.loads(ruta.read_text(encoding='utf-8')), options['tolerancia'])
+
+        if cargados:
+            raise CommandError(f"El arranque importa librerías prohibidas: {', '.join(cargados)}")
+
+    def comparar(self, resultados, base, tolerancia):
+        regresiones = [
+            f'{campo}: {base[campo]} -> {resultados[campo]}'
+            for campo in ('importacion_ms', 'arranque_ms', 'rss_kb')
+            if campo in base and resultados[campo] > base[campo] * (1 + tolerancia)
+        ]
+        if regresiones:
+            raise CommandError('Regresiones de arranque:\n  ' + '\n  '.join(regresiones))
+        self.stdout.write(self.style.SUCCESS('Sin regresiones respecto a la línea base'))
@@ -0,0 +1,61 @@
+import statistics
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from gestion_notas.models import Notificacion, Usuario
+
+
+class Command(BaseCommand):
+    help = ('Mide las consultas de notificaciones del dashboard con historiales de distinto tamaño '
+            '(los datos se crean dentro de una transacción que se revierte)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tamanos', default='1000,10000,100000',
+                            help='Tamaños de historial (notificaciones leídas) separados por coma')
+        parser.add_argument('--no-leidas', type=int, default=20,
+                            help='Notificaciones no leídas del usuario de prueba')
+        parser.add_argument('--repeticiones', type=int, default=50)
+
+    def handle(self, *args, **options):
+        tamanos = [int(t) for t in options['tamanos'].split(',') if t.strip()]
+
+        with transaction.atomic():
+            sufijo = uuid.uuid4().hex[:10]
+            usuario = Usuario.objects.create(username=f'bench_{sufijo}', documento=f'B{sufijo}')
+            Notificacion.objects.bulk_create([
+                self.notificacion(usuario, leida=False) for _ in range(options['no_leidas'])
+            ])
+
+            self.stdout.write(f"{'historial':>10} {'ultimas 5 (ms)':>16} {'conteo (ms)':>13}")
+            historial = 0
+            for tamano in sorted(tamanos):
+                nuevas = tamano - historial
+                for inicio in range(0, nuevas, 5000):
+                    Notificacion.objects.bulk_create([
+                        self.notificacion(usuario, leida=True) for _ in range(min(5000, nuevas - inicio))
+                    ])
+                historial = tamano
+
+                ultimas = self.medir(lambda: list(
+                    usuario.notificaciones.filter(leida=False).order_by('-fecha_creacion')[:5]
+                ), options['repeticiones'])
+                conteo = self.medir(lambda: usuario.notificaciones.filter(leida=False).count(),
+                                    options['repeticiones'])
+                self.stdout.write(f'{tamano:>10} {ultimas:>16.3f} {conteo:>13.3f}')
+
+            transaction.set_rollback(True)
+
+    def notificacion(self, usuario, leida):
+        return Notificacion(usuario=usuario, tipo='general', titulo='Benchmark', mensaje='', leida=leida)
+
+    def medir(self, funcion, repeticiones):
+        """Mediana en milisegundos"""
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            funcion()
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        return statistics.median(tiempos)
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from gestion_notas.models import PeriodoAcademico
+from gestion_notas.riesgo import calcular_riesgo
+
+
+class Command(BaseCommand):
+    help = ('Calcula el puntaje de riesgo académico de los estudiantes activos '
+            '(pensado para ejecutarse cada noche; por defecto, los periodos activos)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--periodo', type=int, action='append', default=[],
+                            help='Calcular estos periodos en lugar de los activos (se puede repetir)')
+        parser.add_argument('--lote', type=int, default=1000, help='Filas por bulk_create')
+
+    def handle(self, *args, **options):
+        if options['lote'] < 1:
+            raise CommandError('--lote debe ser >= 1')
+
+        if options['periodo']:
+            periodos = PeriodoAcademico.con_archivados.filter(id__in=options['periodo'])
+        else:
+            periodos = PeriodoAcademico.objects.filter(activo=True)
+        total = 0
+        for periodo in periodos.order_by('fecha_inicio'):
+            calculados = calcular_riesgo(periodo, lote=options['lote'])
+            self.stdout.write(f'  {periodo.nombre}: {calculados} estudiantes')
+            total += calculados
+        self.stdout.write(self.style.SUCCESS(f'{total} puntajes de riesgo calculados'))
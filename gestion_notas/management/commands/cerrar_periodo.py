@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from gestion_notas.models import PeriodoAcademico
+
+
+class Command(BaseCommand):
+    help = ('Cierra un periodo académico: congela promedio, créditos y estado de cada inscripción '
+            'en HistorialAcademico y marca el periodo como cerrado')
+
+    def add_arguments(self, parser):
+        parser.add_argument('periodo', help='Nombre (Ej: 2025-1) o id del periodo')
+        parser.add_argument('--lote', type=int, default=1000, help='Filas por INSERT')
+
+    def handle(self, *args, **options):
+        periodos = PeriodoAcademico.con_archivados.all()
+        periodo = periodos.filter(nombre=options['periodo']).first()
+        if periodo is None and options['periodo'].isdigit():
+            periodo = periodos.filter(id=int(options['periodo'])).first()
+        if periodo is None:
+            raise CommandError(f"No existe el periodo {options['periodo']}")
+        if periodo.activo:
+            self.stdout.write(self.style.WARNING(f'El periodo {periodo.nombre} sigue marcado como activo'))
+
+        try:
+            total = periodo.cerrar(lote=options['lote'])
+        except ValueError as error:
+            raise CommandError(str(error))
+
+        self.stdout.write(self.style.SUCCESS(f'Periodo {periodo.nombre} cerrado: {total} registros de historial'))
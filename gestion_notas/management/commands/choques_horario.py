@@ -0,0 +1,34 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from gestion_notas.horarios import choques_periodo
+from gestion_notas.models import PeriodoAcademico
+
+
+class Command(BaseCommand):
+    help = 'Lista los choques de aula y de estudiante de un periodo en una sola pasada sobre sus franjas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('periodo', help='Nombre (Ej: 2025-1) o id del periodo')
+        parser.add_argument('--json', action='store_true', help='Salida en JSON')
+
+    def handle(self, *args, **options):
+        periodos = PeriodoAcademico.con_archivados.all()
+        periodo = periodos.filter(nombre=options['periodo']).first()
+        if periodo is None and options['periodo'].isdigit():
+            periodo = periodos.filter(id=int(options['periodo'])).first()
+        if periodo is None:
+            raise CommandError(f"No existe el periodo {options['periodo']}")
+
+        choques = choques_periodo(periodo)
+        if options['json']:
+            self.stdout.write(json.dumps(choques, ensure_ascii=False, indent=2))
+            return
+        for choque in choques:
+            self.stdout.write(f"  {choque['tipo']} {choque['clave']}: cursos {choque['curso_a']} y {choque['curso_b']} "
+                              f"el {choque['dia']} de {choque['inicio']} a {choque['fin']}")
+        aulas = sum(1 for choque in choques if choque['tipo'] == 'aula')
+        self.stdout.write(self.style.SUCCESS(
+            f'{periodo.nombre}: {aulas} choques de aula y {len(choques) - aulas} de estudiante'
+        ))
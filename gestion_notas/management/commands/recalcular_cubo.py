@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from gestion_notas.models import CuboRendimiento, PeriodoAcademico
+
+
+class Command(BaseCommand):
+    help = ('Reconstruye el cubo de rendimiento a partir de las inscripciones '
+            '(normalmente se refresca solo con cada cambio de notas o inscripciones)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--periodo', type=int, action='append', default=[],
+                            help='Recalcular solo estos periodos (se puede repetir)')
+
+    def handle(self, *args, **options):
+        periodos = PeriodoAcademico.con_archivados.order_by('id')
+        if options['periodo']:
+            periodos = periodos.filter(id__in=options['periodo'])
+        # Un periodo por transacción: las celdas de cada periodo no dependen de las de otros
+        total = 0
+        for periodo in periodos:
+            celdas = CuboRendimiento.objects.refrescar(periodos=[periodo])
+            self.stdout.write(f'  {periodo.nombre}: {celdas} celdas')
+            total += celdas
+        self.stdout.write(self.style.SUCCESS(f'{total} celdas del cubo recalculadas'))
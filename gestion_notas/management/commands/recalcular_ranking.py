@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from gestion_notas.models import InscripcionCurso, PeriodoAcademico, PosicionRanking
+
+
+class Command(BaseCommand):
+    help = ('Recalcula las posiciones del ranking a partir de los promedios almacenados '
+            '(normalmente se mantienen solas con cada cambio de notas o inscripciones)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--periodo', type=int, action='append', default=[],
+                            help='Recalcular solo estos periodos (se puede repetir)')
+        parser.add_argument('--lote', type=int, default=1000, help='Estudiantes por lote')
+
+    def handle(self, *args, **options):
+        if options['lote'] < 1:
+            raise CommandError('--lote debe ser >= 1')
+
+        periodos = PeriodoAcademico.con_archivados.order_by('id')
+        if options['periodo']:
+            periodos = periodos.filter(id__in=options['periodo'])
+        total = 0
+        for periodo in periodos:
+            estudiantes = set(InscripcionCurso.objects.filter(curso__periodo=periodo)
+                              .values_list('estudiante_id', flat=True))
+            estudiantes.update(PosicionRanking.objects.filter(periodo=periodo).values_list('estudiante_id', flat=True))
+            estudiantes = sorted(estudiantes)
+            cambios = 0
+            for inicio in range(0, len(estudiantes), options['lote']):
+                cambios += PosicionRanking.objects.refrescar(
+                    {periodo.id: estudiantes[inicio:inicio + options['lote']]}, lote=options['lote']
+                )
+            self.stdout.write(f'  {periodo.nombre}: {cambios} posiciones corregidas de {len(estudiantes)}')
+            total += cambios
+        self.stdout.write(self.style.SUCCESS(f'{total} posiciones del ranking corregidas'))
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from gestion_notas.horarios import sincronizar_franjas
+from gestion_notas.models import Curso
+
+
+class Command(BaseCommand):
+    help = ('Regenera FranjaHorario a partir del texto de Curso.horario y lista los cursos cuyo horario '
+            'no se entiende')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--periodo', type=int, action='append', default=[],
+                            help='Limitar a los cursos de estos periodos (se puede repetir)')
+        parser.add_argument('--lote', type=int, default=500, help='Cursos por transacción')
+
+    def handle(self, *args, **options):
+        if options['lote'] < 1:
+            raise CommandError('--lote debe ser >= 1')
+
+        cursos = Curso.con_archivados.order_by('id')
+        if options['periodo']:
+            cursos = cursos.filter(periodo_id__in=options['periodo'])
+        ids = list(cursos.values_list('id', flat=True))
+
+        total, errores = 0, {}
+        for inicio in range(0, len(ids), options['lote']):
+            lote = Curso.con_archivados.filter(id__in=ids[inicio:inicio + options['lote']])
+            creadas, fallidos = sincronizar_franjas(lote)
+            total += creadas
+            errores.update(fallidos)
+
+        for curso_id, error in sorted(errores.items()):
+            self.stdout.write(self.style.WARNING(f'  curso {curso_id}: {error}'))
+        self.stdout.write(self.style.SUCCESS(
+            f'{total} franjas en {len(ids)} cursos; {len(errores)} horarios sin formato'
+        ))
@@ -0,0 +1,319 @@
+"""
+Métricas de la aplicación en formato de texto de Prometheus.
+
+Cada proceso mantiene sus contadores e histogramas en memoria. Si hay un
+directorio compartido (`settings.METRICAS_DIRECTORIO` o la variable de entorno
+PROMETHEUS_MULTIPROC_DIR), cada proceso vuelca periódicamente sus valores a
+su propio archivo JSON y `exponer()` suma los archivos de todos los workers,
+así que cualquier worker de gunicorn que atienda `/metrics` devuelve el total.
+Los archivos de workers terminados se conservan EXPIRACION_ARCHIVOS segundos
+(para que los contadores no retrocedan al reiniciar un worker) y luego se
+borran al agregar. Un volcado que falla se registra y no interrumpe la
+petición que lo disparó.
+"""
+import atexit
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from functools import wraps
+from pathlib import Path
+
+from django.conf import settings
+
+BUCKETS_SEGUNDOS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+INTERVALO_VOLCADO = 1.0
+EXPIRACION_ARCHIVOS = 3600
+
+logger = logging.getLogger('gestion_notas.metricas')
+
+
+def directorio_metricas():
+    """Directorio compartido entre procesos, o None para un registro solo local"""
+    directorio = getattr(settings, 'METRICAS_DIRECTORIO', None) or os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    return Path(directorio) if directorio else None
+
+
+def escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def formatear_etiquetas(nombres, valores, extra=()):
+    pares = [*zip(nombres, valores), *extra]
+    if not pares:
+        return ''
+    return '{' + ','.join(f'{nombre}="{escapar(valor)}"' for nombre, valor in pares) + '}'
+
+
+def proceso_vivo(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True  # existe, pero es de otro usuario
+    return True
+
+
+def archivo_expirado(ruta, ahora):
+    """Archivo de un worker terminado que no se actualiza desde hace más de EXPIRACION_ARCHIVOS"""
+    try:
+        pid = int(ruta.name.split('_')[1])
+        antiguedad = ahora - ruta.stat().st_mtime
+    except (IndexError, ValueError, OSError):
+        return False
+    expiracion = getattr(settings, 'METRICAS_EXPIRACION', EXPIRACION_ARCHIVOS)
+    return antiguedad > expiracion and not proceso_vivo(pid)
+
+
+def formatear_numero(valor):
+    if valor == float('inf'):
+        return '+Inf'
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class Metrica:
+    tipo = None
+
+    def __init__(self, nombre, ayuda, etiquetas=(), registro=None):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self.registro = registro or REGISTRO
+        self.valores = {}
+        self.registro.agregar(self)
+
+    def clave(self, etiquetas):
+        if not etiquetas and not self.etiquetas:
+            return '[]'
+        if set(etiquetas) != set(self.etiquetas):
+            raise ValueError(f"{self.nombre} espera las etiquetas {self.etiquetas}, recibió {tuple(etiquetas)}")
+        return json.dumps([str(etiquetas[nombre]) for nombre in self.etiquetas])
+
+    def reiniciar(self):
+        self.valores = {}
+
+
+class Contador(Metrica):
+    """Valor que solo aumenta"""
+    tipo = 'counter'
+
+    def inc(self, cantidad=1, **etiquetas):
+        if cantidad < 0:
+            raise ValueError('Un contador no puede disminuir')
+        clave = self.clave(etiquetas)
+        with self.registro.bloqueo:
+            self.valores[clave] = self.valores.get(clave, 0) + cantidad
+        self.registro.tal_vez_volcar()
+
+    def muestras(self, valores):
+        nombre = f'{self.nombre}_total'
+        for clave, valor in sorted(valores.items()):
+            yield nombre + formatear_etiquetas(self.etiquetas, json.loads(clave)), valor
+
+    @staticmethod
+    def combinar(actual, otro):
+        return (actual or 0) + otro
+
+
+class Histograma(Metrica):
+    """Distribución de observaciones en buckets acumulados, con suma y conteo"""
+    tipo = 'histogram'
+
+    def __init__(self, nombre, ayuda, etiquetas=(), buckets=BUCKETS_SEGUNDOS, registro=None):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(nombre, ayuda, etiquetas, registro)
+
+    def observe(self, valor, **etiquetas):
+        clave = self.clave(etiquetas)
+        with self.registro.bloqueo:
+            # [conteo por bucket..., suma, conteo total]
+            datos = self.valores.setdefault(clave, [0] * len(self.buckets) + [0.0, 0])
+            for i, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    datos[i] += 1
+                    break
+            datos[-2] += valor
+            datos[-1] += 1
+        self.registro.tal_vez_volcar()
+
+    @contextmanager
+    def cronometrar(self, **etiquetas):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - inicio, **etiquetas)
+
+    def cronometrado(self, funcion):
+        """Decorador: observa la duración de cada llamada"""
+        @wraps(funcion)
+        def envoltorio(*args, **kwargs):
+            with self.cronometrar():
+                return funcion(*args, **kwargs)
+        return envoltorio
+
+    def muestras(self, valores):
+        for clave, datos in sorted(valores.items()):
+            etiquetas = json.loads(clave)
+            acumulado = 0
+            for limite, cantidad in zip(self.buckets, datos):
+                acumulado += cantidad
+                le = (('le', formatear_numero(float(limite))),)
+                yield f'{self.nombre}_bucket' + formatear_etiquetas(self.etiquetas, etiquetas, le), acumulado
+            le = (('le', '+Inf'),)
+            yield f'{self.nombre}_bucket' + formatear_etiquetas(self.etiquetas, etiquetas, le), datos[-1]
+            yield f'{self.nombre}_sum' + formatear_etiquetas(self.etiquetas, etiquetas), datos[-2]
+            yield f'{self.nombre}_count' + formatear_etiquetas(self.etiquetas, etiquetas), datos[-1]
+
+    @staticmethod
+    def combinar(actual, otro):
+        if actual is None:
+            return list(otro)
+        return [a + b for a, b in zip(actual, otro)]
+
+
+class Registro:
+    """Métricas de este proceso y su volcado al directorio compartido"""
+
+    def __init__(self):
+        self.metricas = {}
+        self.bloqueo = threading.RLock()
+        self.pid = None
+        self.archivo = None
+        self.ultimo_volcado = 0.0
+
+    def agregar(self, metrica):
+        if metrica.nombre in self.metricas:
+            raise ValueError(f"Métrica duplicada: {metrica.nombre}")
+        self.metricas[metrica.nombre] = metrica
+
+    def comprobar_proceso(self):
+        """Tras un fork el hijo empieza de cero y con archivo propio"""
+        if self.pid != os.getpid():
+            with self.bloqueo:
+                if self.pid is not None:
+                    for metrica in self.metricas.values():
+                        metrica.reiniciar()
+                self.pid = os.getpid()
+                self.archivo = f'metricas_{self.pid}_{uuid.uuid4().hex[:8]}.json'
+                self.ultimo_volcado = 0.0
+
+    def instantanea(self):
+        with self.bloqueo:
+            return {
+                nombre: {clave: list(valor) if isinstance(valor, list) else valor
+                         for clave, valor in metrica.valores.items()}
+                for nombre, metrica in self.metricas.items()
+            }
+
+    def tal_vez_volcar(self):
+        self.comprobar_proceso()
+        if time.monotonic() - self.ultimo_volcado >= getattr(settings, 'METRICAS_INTERVALO_VOLCADO',
+                                                              INTERVALO_VOLCADO):
+            self.volcar()
+
+    def volcar(self):
+        """Escribe la instantánea en el archivo del proceso; nunca lanza excepciones"""
+        directorio = directorio_metricas()
+        if directorio is None:
+            return
+        self.comprobar_proceso()
+        with self.bloqueo:
+            self.ultimo_volcado = time.monotonic()
+            contenido = json.dumps(self.instantanea())
+        temporal = None
+        try:
+            directorio.mkdir(parents=True, exist_ok=True)
+            # Temporal único por llamada: dos hilos volcando a la vez no se pisan el archivo
+            descriptor, temporal = tempfile.mkstemp(dir=directorio, prefix='.volcado_', suffix='.tmp')
+            with os.fdopen(descriptor, 'w', encoding='utf-8') as archivo:
+                archivo.write(contenido)
+            os.replace(temporal, directorio / self.archivo)
+        except OSError:
+            logger.warning('No se pudieron volcar las métricas en %s', directorio, exc_info=True)
+            if temporal is not None:
+                try:
+                    os.unlink(temporal)
+                except OSError:
+                    pass
+
+    def combinados(self):
+        """Valores de este proceso sumados a los de los archivos de los demás procesos"""
+        self.comprobar_proceso()
+        total = {nombre: {} for nombre in self.metricas}
+        fuentes = [self.instantanea()]
+
+        directorio = directorio_metricas()
+        if directorio is not None and directorio.is_dir():
+            ahora = time.time()
+            for ruta in directorio.glob('metricas_*.json'):
+                if ruta.name == self.archivo:
+                    continue
+                if archivo_expirado(ruta, ahora):
+                    try:
+                        ruta.unlink(missing_ok=True)
+                    except OSError:
+                        pass
+                    continue
+                try:
+                    fuentes.append(json.loads(ruta.read_text(encoding='utf-8')))
+                except (OSError, ValueError):
+                    continue
+
+        for fuente in fuentes:
+            for nombre, valores in fuente.items():
+                metrica = self.metricas.get(nombre)
+                if metrica is None:
+                    continue
+                for clave, valor in valores.items():
+                    total[nombre][clave] = metrica.combinar(total[nombre].get(clave), valor)
+        return total
+
+    def exponer(self):
+        """Texto en el formato de exposición de Prometheus (version 0.0.4)"""
+        combinados = self.combinados()
+        lineas = []
+        for nombre, metrica in sorted(self.metricas.items()):
+            lineas.append(f'# HELP {nombre} {metrica.ayuda}')
+            lineas.append(f'# TYPE {nombre} {metrica.tipo}')
+            for muestra, valor in metrica.muestras(combinados[nombre]):
+                lineas.append(f'{muestra} {formatear_numero(valor)}')
+        return '\n'.join(lineas) + '\n'
+
+
+REGISTRO = Registro()
+atexit.register(REGISTRO.volcar)
+
+
+# ==================== MÉTRICAS DE LA APLICACIÓN ====================
+
+PROMEDIO_SEGUNDOS = Histograma(
+    'gestion_notas_calcular_promedio_segundos', 'Duración de InscripcionCurso.calcular_promedio',
+    buckets=(0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05),
+)
+REPORTE_SEGUNDOS = Histograma(
+    'gestion_notas_reporte_segundos', 'Tiempo de generación de reportes', etiquetas=('tipo_reporte', 'formato'),
+)
+BOLETIN_SEGUNDOS = Histograma('gestion_notas_boletin_segundos', 'Tiempo de generación del boletín en PDF')
+CALIFICACIONES_GUARDADAS = Contador(
+    'gestion_notas_calificaciones_guardadas', 'Calificaciones registradas o modificadas', etiquetas=('accion',),
+)
+NOTIFICACIONES_CREADAS = Contador(
+    'gestion_notas_notificaciones_creadas', 'Notificaciones insertadas', etiquetas=('tipo',),
+)
+BUSQUEDA_SEGUNDOS = Histograma('gestion_notas_busqueda_segundos', 'Latencia de la búsqueda global',
+                               etiquetas=('rol',))
+CACHE_CONSULTAS = Contador(
+    'gestion_notas_cache_consultas', 'Consultas a la caché por resultado (acierto/fallo)',
+    etiquetas=('cache', 'resultado'),
+)
+
+
+def registrar_cache(cache, acierto):
+    CACHE_CONSULTAS.inc(cache=cache, resultado='acierto' if acierto else 'fallo')
@@ -0,0 +1,163 @@
+"""
+Perfilado de SQL por petición.
+
+`PerfilSQLMiddleware` registra en cada petición muestreada el número de
+consultas, el tiempo total en base de datos, las sentencias más lentas y las
+huellas de consultas repetidas (síntoma de un N+1). El resumen se publica en
+la cabecera `Server-Timing` y, si la petición supera los umbrales, como una
+línea JSON en `logs/perfil_sql.log` (junto a `logs/django_errors.log`).
+
+Se activa añadiendo 'gestion_notas.middleware.PerfilSQLMiddleware' a
+MIDDLEWARE y se configura con el diccionario `PERFIL_SQL` de settings, cuyas
+claves y valores por defecto están en CONFIGURACION_PERFIL.
+"""
+import json
+import logging
+import random
+import re
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils import timezone
+
+logger = logging.getLogger('gestion_notas.perfil_sql')
+
+# Valores pensados para dejarlo activo en producción: pocas peticiones muestreadas y solo se
+# registran las lentas o con consultas repetidas
+CONFIGURACION_PERFIL = {
+    'ACTIVO': True,
+    'MUESTREO': 0.02,                # fracción de peticiones perfiladas (0.0 - 1.0)
+    'UMBRAL_PETICION_MS': 500,       # registrar peticiones que tarden al menos esto...
+    'UMBRAL_CONSULTAS': 0,           # ...o que hagan al menos estas consultas (0 = sin umbral)
+    'UMBRAL_CONSULTA_LENTA_MS': 50,  # consultas más rápidas no aparecen entre las lentas
+    'MAX_LENTAS': 5,
+    'MIN_REPETICIONES': 5,           # ejecuciones de una misma huella para considerarla duplicada
+    'CABECERA': None,                # añadir Server-Timing a la respuesta; None = solo con DEBUG
+    'ARCHIVO': None,                 # por defecto BASE_DIR/logs/perfil_sql.log
+}
+
+LONGITUD_MAXIMA_SQL = 1000
+
+
+def huella_sql(sql):
+    """SQL normalizado: sin literales y con las listas IN colapsadas"""
+    sql = re.sub(r"'(?:[^']|'')*'", '?', sql)
+    sql = re.sub(r'\b\d+(?:\.\d+)?\b', '?', sql)
+    sql = re.sub(r'\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)', '(...)', sql)
+    return re.sub(r'\s+', ' ', sql).strip()
+
+
+def configurar_logger(archivo=None):
+    """Envía el log a su propio archivo salvo que LOGGING ya le haya asignado handlers"""
+    if logger.handlers:
+        return
+    archivo = Path(archivo or Path(settings.BASE_DIR) / 'logs' / 'perfil_sql.log')
+    archivo.parent.mkdir(parents=True, exist_ok=True)
+    handler = logging.FileHandler(archivo, encoding='utf-8')
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+class RegistroConsultas:
+    """Envoltorio de `execute` que cronometra cada sentencia"""
+
+    def __init__(self):
+        self.consultas = []
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.consultas.append({
+                'sql': sql,
+                'ms': (time.perf_counter() - inicio) * 1000,
+                'alias': context['connection'].alias,
+            })
+
+    @property
+    def tiempo_total(self):
+        return sum(c['ms'] for c in self.consultas)
+
+    def lentas(self, maximo, umbral_ms):
+        ordenadas = sorted(self.consultas, key=lambda c: c['ms'], reverse=True)
+        return [
+            {'sql': c['sql'][:LONGITUD_MAXIMA_SQL], 'ms': round(c['ms'], 3), 'alias': c['alias']}
+            for c in ordenadas[:maximo] if c['ms'] >= umbral_ms
+        ]
+
+    def duplicadas(self, minimo):
+        grupos = defaultdict(list)
+        for consulta in self.consultas:
+            grupos[huella_sql(consulta['sql'])].append(consulta['ms'])
+        repetidas = [
+            {'huella': huella[:LONGITUD_MAXIMA_SQL], 'veces': len(tiempos), 'ms': round(sum(tiempos), 3)}
+            for huella, tiempos in grupos.items() if len(tiempos) >= minimo
+        ]
+        return sorted(repetidas, key=lambda d: d['veces'], reverse=True)
+
+
+class PerfilSQLMiddleware:
+    """Mide consultas y tiempos de cada petición muestreada"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.config = {**CONFIGURACION_PERFIL, **getattr(settings, 'PERFIL_SQL', {})}
+        if not self.config['ACTIVO'] or self.config['MUESTREO'] <= 0:
+            raise MiddlewareNotUsed
+        if self.config['CABECERA'] is None:
+            # Server-Timing expone tiempos internos: por defecto solo en desarrollo
+            self.config['CABECERA'] = settings.DEBUG
+        configurar_logger(self.config['ARCHIVO'])
+
+    def __call__(self, request):
+        if random.random() >= self.config['MUESTREO']:
+            return self.get_response(request)
+
+        registro = RegistroConsultas()
+        inicio = time.perf_counter()
+        with ExitStack() as pila:
+            for alias in connections:
+                pila.enter_context(connections[alias].execute_wrapper(registro))
+            response = self.get_response(request)
+        total_ms = (time.perf_counter() - inicio) * 1000
+        db_ms = registro.tiempo_total
+
+        if self.config['CABECERA']:
+            response['Server-Timing'] = ', '.join([
+                f'db;dur={db_ms:.2f};desc="{len(registro.consultas)} consultas"',
+                f'app;dur={max(total_ms - db_ms, 0):.2f}',
+                f'total;dur={total_ms:.2f}',
+            ])
+
+        duplicadas = registro.duplicadas(self.config['MIN_REPETICIONES'])
+        umbral_consultas = self.config['UMBRAL_CONSULTAS']
+        if (total_ms >= self.config['UMBRAL_PETICION_MS'] or duplicadas
+                or (umbral_consultas and len(registro.consultas) >= umbral_consultas)):
+            self.registrar(request, response, registro, total_ms, db_ms, duplicadas)
+
+        return response
+
+    def registrar(self, request, response, registro, total_ms, db_ms, duplicadas):
+        coincidencia = getattr(request, 'resolver_match', None)
+        usuario = getattr(request, 'user', None)
+        logger.info(json.dumps({
+            'fecha': timezone.now().isoformat(),
+            'metodo': request.method,
+            'ruta': request.path,
+            'vista': coincidencia.view_name if coincidencia else None,
+            'estado': response.status_code,
+            'usuario_id': usuario.pk if usuario is not None and usuario.is_authenticated else None,
+            'duracion_ms': round(total_ms, 3),
+            'tiempo_db_ms': round(db_ms, 3),
+            'consultas': len(registro.consultas),
+            'lentas': registro.lentas(self.config['MAX_LENTAS'], self.config['UMBRAL_CONSULTA_LENTA_MS']),
+            'duplicadas': duplicadas,
+        }, ensure_ascii=False))
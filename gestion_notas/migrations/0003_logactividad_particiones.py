@@ -0,0 +1,46 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_notas', '0002_archivado'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='logactividad',
+            index=models.Index(fields=['fecha'], name='log_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='logactividad',
+            index=models.Index(fields=['usuario', 'fecha'], name='log_usuario_fecha_idx'),
+        ),
+        migrations.CreateModel(
+            name='LogActividadArchivo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('accion', models.CharField(choices=[('crear', 'Crear'), ('editar', 'Editar'), ('eliminar', 'Eliminar'), ('consultar', 'Consultar')], max_length=20)),
+                ('modelo', models.CharField(max_length=50)),
+                ('objeto_id', models.IntegerField()),
+                ('descripcion', models.TextField()),
+                ('fecha', models.DateTimeField()),
+                ('ip_address', models.GenericIPAddressField(blank=True, null=True)),
+                ('particion', models.CharField(max_length=7)),
+                ('usuario', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Log de Actividad Archivado',
+                'verbose_name_plural': 'Logs de Actividad Archivados',
+                'ordering': ['-fecha'],
+                'indexes': [
+                    models.Index(fields=['particion'], name='logarch_particion_idx'),
+                    models.Index(fields=['fecha'], name='logarch_fecha_idx'),
+                    models.Index(fields=['usuario', 'fecha'], name='logarch_usuario_fecha_idx'),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_notas', '0005_indices_consultas_frecuentes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersionDatos',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ambito', models.CharField(choices=[('curso', 'Curso'), ('estudiante', 'Estudiante'), ('periodo', 'Periodo Académico')], max_length=20)),
+                ('objeto_id', models.PositiveBigIntegerField()),
+                ('version', models.PositiveBigIntegerField(default=0)),
+                ('fecha_modificacion', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Versión de Datos',
+                'verbose_name_plural': 'Versiones de Datos',
+                'constraints': [models.UniqueConstraint(fields=('ambito', 'objeto_id'), name='version_ambito_objeto_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_notas', '0006_versiondatos'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='periodoacademico',
+            name='cerrado',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='periodoacademico',
+            name='fecha_cierre',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='HistorialAcademico',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('materia_codigo', models.CharField(max_length=20)),
+                ('materia_nombre', models.CharField(max_length=200)),
+                ('grupo', models.CharField(max_length=10)),
+                ('creditos', models.IntegerField()),
+                ('promedio', models.DecimalField(blank=True, decimal_places=2, max_digits=3, null=True)),
+                ('estado', models.CharField(max_length=20)),
+                ('fecha_cierre', models.DateTimeField(auto_now_add=True)),
+                ('estudiante', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='historial', to='gestion_notas.estudiante')),
+                ('inscripcion', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='gestion_notas.inscripcioncurso')),
+                ('periodo', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='historial', to='gestion_notas.periodoacademico')),
+            ],
+            options={
+                'verbose_name': 'Historial Académico',
+                'verbose_name_plural': 'Historial Académico',
+                'ordering': ['-periodo__fecha_inicio', 'materia_codigo'],
+                'constraints': [models.UniqueConstraint(fields=('estudiante', 'periodo', 'materia_codigo', 'grupo'), name='historial_est_periodo_uniq')],
+            },
+        ),
+    ]
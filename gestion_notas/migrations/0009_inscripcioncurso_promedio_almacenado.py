@@ -0,0 +1,17 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_notas', '0008_registroacumulado'),
+    ]
+
+    operations = [
+        # Carga inicial: python manage.py recalcular_promedios
+        migrations.AddField(
+            model_name='inscripcioncurso',
+            name='promedio_almacenado',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=3, null=True),
+        ),
+    ]
@@ -0,0 +1,27 @@
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def contar_inscritos(apps, schema_editor):
+    Curso = apps.get_model('gestion_notas', 'Curso')
+    InscripcionCurso = apps.get_model('gestion_notas', 'InscripcionCurso')
+    conteo = (InscripcionCurso.objects.filter(curso=OuterRef('pk'), archived=False).order_by()
+              .values('curso').annotate(total=Count('*')).values('total'))
+    Curso.objects.update(inscritos=Coalesce(Subquery(conteo), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_notas', '0009_inscripcioncurso_promedio_almacenado'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='curso',
+            name='inscritos',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(contar_inscritos, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,50 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def crear_franjas(apps, schema_editor):
+    from gestion_notas.horarios import normalizar, parsear_horario
+    Curso = apps.get_model('gestion_notas', 'Curso')
+    FranjaHorario = apps.get_model('gestion_notas', 'FranjaHorario')
+    franjas = []
+    for curso in Curso.objects.exclude(horario='').only('id', 'periodo_id', 'horario', 'aula').iterator():
+        try:
+            lista = parsear_horario(curso.horario)
+        except ValueError:
+            continue  # horarios sin formato: se pueden revisar con sincronizar_franjas
+        franjas += [
+            FranjaHorario(curso_id=curso.id, periodo_id=curso.periodo_id, aula=normalizar(curso.aula),
+                          dia=franja.dia, hora_inicio=franja.inicio, hora_fin=franja.fin)
+            for franja in lista
+        ]
+    FranjaHorario.objects.bulk_create(franjas, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_notas', '0010_curso_inscritos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FranjaHorario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('aula', models.CharField(blank=True, max_length=50)),
+                ('dia', models.PositiveSmallIntegerField(choices=[(0, 'Lunes'), (1, 'Martes'), (2, 'Miércoles'), (3, 'Jueves'), (4, 'Viernes'), (5, 'Sábado'), (6, 'Domingo')])),
+                ('hora_inicio', models.TimeField()),
+                ('hora_fin', models.TimeField()),
+                ('curso', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='franjas', to='gestion_notas.curso')),
+                ('periodo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='gestion_notas.periodoacademico')),
+            ],
+            options={
+                'verbose_name': 'Franja de Horario',
+                'verbose_name_plural': 'Franjas de Horario',
+                'ordering': ['dia', 'hora_inicio'],
+                'indexes': [models.Index(fields=['periodo', 'aula', 'dia', 'hora_inicio'], name='franja_aula_idx')],
+                'constraints': [models.CheckConstraint(check=models.Q(('hora_fin__gt', models.F('hora_inicio'))), name='franja_fin_posterior')],
+            },
+        ),
+        migrations.RunPython(crear_franjas, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,69 @@
+import django.db.models.deletion
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Coalesce
+
+
+def llenar_cubo(apps, schema_editor):
+    InscripcionCurso = apps.get_model('gestion_notas', 'InscripcionCurso')
+    CuboRendimiento = apps.get_model('gestion_notas', 'CuboRendimiento')
+    aprobado = Q(promedio_almacenado__gte=3)
+    filas = InscripcionCurso.objects.filter(archived=False).values(
+        programa_id=F('estudiante__programa_id'), semestre=F('estudiante__semestre'),
+        materia_id=F('curso__materia_id'), periodo_id=F('curso__periodo_id'),
+    ).annotate(
+        total=Count('id'),
+        total_con_promedio=Count('promedio_almacenado'),
+        total_suma=Coalesce(Sum('promedio_almacenado'), Decimal('0')),
+        total_aprobados=Count('id', filter=aprobado),
+        total_reprobados=Count('id', filter=Q(promedio_almacenado__lt=3)),
+        total_creditos=Coalesce(Sum('curso__materia__creditos'), 0),
+        total_creditos_aprobados=Coalesce(Sum('curso__materia__creditos', filter=aprobado), 0),
+    ).order_by()
+    CuboRendimiento.objects.bulk_create([
+        CuboRendimiento(
+            programa_id=fila['programa_id'], semestre=fila['semestre'], materia_id=fila['materia_id'],
+            periodo_id=fila['periodo_id'], inscripciones=fila['total'], con_promedio=fila['total_con_promedio'],
+            suma_promedios=fila['total_suma'], aprobados=fila['total_aprobados'],
+            reprobados=fila['total_reprobados'], creditos_inscritos=fila['total_creditos'],
+            creditos_aprobados=fila['total_creditos_aprobados'],
+        )
+        for fila in filas
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_notas', '0011_franjahorario'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CuboRendimiento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('semestre', models.PositiveSmallIntegerField()),
+                ('inscripciones', models.PositiveIntegerField(default=0)),
+                ('con_promedio', models.PositiveIntegerField(default=0)),
+                ('suma_promedios', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('aprobados', models.PositiveIntegerField(default=0)),
+                ('reprobados', models.PositiveIntegerField(default=0)),
+                ('creditos_inscritos', models.PositiveIntegerField(default=0)),
+                ('creditos_aprobados', models.PositiveIntegerField(default=0)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+                ('materia', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='gestion_notas.materia')),
+                ('periodo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='gestion_notas.periodoacademico')),
+                ('programa', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='gestion_notas.programa')),
+            ],
+            options={
+                'verbose_name': 'Celda del Cubo de Rendimiento',
+                'verbose_name_plural': 'Cubo de Rendimiento',
+                'indexes': [models.Index(fields=['programa', 'periodo'], name='cubo_programa_periodo_idx')],
+                'constraints': [models.UniqueConstraint(fields=('periodo', 'materia', 'programa', 'semestre'), name='cubo_celda_uniq')],
+            },
+        ),
+        migrations.RunPython(llenar_cubo, migrations.RunPython.noop),
+    ]
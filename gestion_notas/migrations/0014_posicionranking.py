@@ -0,0 +1,56 @@
+import django.db.models.deletion
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def llenar_ranking(apps, schema_editor):
+    InscripcionCurso = apps.get_model('gestion_notas', 'InscripcionCurso')
+    PosicionRanking = apps.get_model('gestion_notas', 'PosicionRanking')
+    sumas = {}
+    filas = InscripcionCurso.objects.filter(archived=False, promedio_almacenado__isnull=False).values_list(
+        'estudiante_id', 'estudiante__programa_id', 'estudiante__semestre', 'curso__periodo_id',
+        'promedio_almacenado', 'curso__materia__creditos',
+    )
+    for estudiante_id, programa_id, semestre, periodo_id, promedio, creditos in filas.iterator():
+        suma = sumas.setdefault((periodo_id, estudiante_id, programa_id, semestre), [Decimal(0), 0])
+        suma[0] += promedio * creditos
+        suma[1] += creditos
+    ahora = timezone.now()
+    PosicionRanking.objects.bulk_create([
+        PosicionRanking(periodo_id=periodo_id, estudiante_id=estudiante_id, programa_id=programa_id,
+                        semestre=semestre, promedio=(suma / creditos).quantize(Decimal('0.01')), creditos=creditos,
+                        fecha_actualizacion=ahora)
+        for (periodo_id, estudiante_id, programa_id, semestre), (suma, creditos) in sumas.items() if creditos
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion_notas', '0013_puntajeriesgo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PosicionRanking',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('semestre', models.PositiveSmallIntegerField()),
+                ('promedio', models.DecimalField(blank=True, decimal_places=2, max_digits=3, null=True)),
+                ('creditos', models.PositiveIntegerField(default=0)),
+                ('fecha_actualizacion', models.DateTimeField()),
+                ('estudiante', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='posiciones_ranking', to='gestion_notas.estudiante')),
+                ('periodo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='gestion_notas.periodoacademico')),
+                ('programa', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='gestion_notas.programa')),
+            ],
+            options={
+                'verbose_name': 'Posición en Ranking',
+                'verbose_name_plural': 'Posiciones en Ranking',
+                'indexes': [models.Index(fields=['periodo', 'programa', 'semestre', '-promedio'], name='ranking_grupo_idx'), models.Index(fields=['periodo', 'fecha_actualizacion'], name='ranking_cambios_idx')],
+                'constraints': [models.UniqueConstraint(fields=('periodo', 'estudiante'), name='ranking_periodo_est_uniq')],
+            },
+        ),
+        migrations.RunPython(llenar_ranking, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,130 @@
+"""
+Ranking de estudiantes por programa (y por programa y semestre) en cada periodo.
+
+PosicionRanking guarda el promedio del periodo de cada estudiante y se
+actualiza, al confirmar cada transacción, para los estudiantes cuyo promedio
+almacenado cambió (ver refrescar_agregados en models.py). Aquí esas filas se mantienen en memoria en
+listas ordenadas de (-promedio, estudiante_id) por grupo: el puesto es una
+búsqueda binaria, O(log n), y los k mejores son un corte, O(k).
+
+Cada proceso guarda un RankingPeriodo por periodo y lo pone al día antes de
+usarlo: una consulta agregada (filas y última modificación) y, si algo cambió,
+solo las filas modificadas desde la última sincronización. Las filas no se
+borran (un estudiante sin notas queda con promedio NULL), así que las bajas
+también llegan como cambios.
+"""
+import threading
+from bisect import bisect_left, insort
+from datetime import timedelta
+
+from django.db.models import Count, Max
+
+from .models import PosicionRanking
+
+# Cambios que se vuelven a leer en cada sincronización: cubre transacciones que confirmaron
+# tarde con una fecha_actualizacion anterior a la última vista (aplicar un cambio dos veces no importa)
+MARGEN = timedelta(minutes=1)
+
+
+class Clasificacion:
+    """Promedios de un grupo ordenados de mayor a menor"""
+
+    def __init__(self):
+        self.claves = []
+
+    def __len__(self):
+        return len(self.claves)
+
+    def agregar(self, estudiante_id, promedio):
+        insort(self.claves, (-promedio, estudiante_id))
+
+    def quitar(self, estudiante_id, promedio):
+        posicion = bisect_left(self.claves, (-promedio, estudiante_id))
+        if posicion < len(self.claves) and self.claves[posicion] == (-promedio, estudiante_id):
+            del self.claves[posicion]
+
+    def puesto(self, promedio):
+        """Puesto de quien tiene `promedio`: 1 + cuántos lo superan (los empates comparten puesto)"""
+        return bisect_left(self.claves, (-promedio,)) + 1
+
+    def mejores(self, k):
+        """[(puesto, estudiante_id, promedio)] de los k primeros"""
+        resultado = []
+        for i, (negativo, estudiante_id) in enumerate(self.claves[:k]):
+            # Empate con el anterior: mismo puesto
+            puesto = resultado[-1][0] if resultado and resultado[-1][2] == -negativo else i + 1
+            resultado.append((puesto, estudiante_id, -negativo))
+        return resultado
+
+
+class RankingPeriodo:
+    """Clasificaciones de un periodo por (programa, None) y por (programa, semestre)"""
+
+    def __init__(self, periodo_id):
+        self.periodo_id = periodo_id
+        self.grupos = {}
+        self.ubicacion = {}  # estudiante_id -> (programa_id, semestre, promedio)
+        self.ultima = None
+        self.bloqueo = threading.Lock()
+
+    def grupos_de(self, programa_id, semestre):
+        return (programa_id, None), (programa_id, semestre)
+
+    def aplicar(self, estudiante_id, programa_id, semestre, promedio):
+        anterior = self.ubicacion.get(estudiante_id)
+        if anterior == (programa_id, semestre, promedio):
+            return
+        if anterior is not None and anterior[2] is not None:
+            for grupo in self.grupos_de(*anterior[:2]):
+                self.grupos[grupo].quitar(estudiante_id, anterior[2])
+        if promedio is not None:
+            for grupo in self.grupos_de(programa_id, semestre):
+                self.grupos.setdefault(grupo, Clasificacion()).agregar(estudiante_id, promedio)
+        self.ubicacion[estudiante_id] = (programa_id, semestre, promedio)
+
+    def cargar(self, filas):
+        for fila in filas.values_list('estudiante_id', 'programa_id', 'semestre', 'promedio'):
+            self.aplicar(*fila)
+
+    def sincronizar(self):
+        """Pone al día las listas con PosicionRanking: una consulta si nada cambió, dos si hubo cambios"""
+        filas = PosicionRanking.objects.filter(periodo_id=self.periodo_id)
+        estado = filas.aggregate(total=Count('id'), ultima=Max('fecha_actualizacion'))
+        with self.bloqueo:
+            if estado['total'] == len(self.ubicacion) and estado['ultima'] == self.ultima:
+                return self
+            if self.ultima is not None and estado['total'] >= len(self.ubicacion):
+                self.cargar(filas.filter(fecha_actualizacion__gte=self.ultima - MARGEN))
+            if self.ultima is None or estado['total'] != len(self.ubicacion):
+                # Primera carga, o filas borradas (p. ej. en cascada): se reconstruye todo
+                self.grupos, self.ubicacion = {}, {}
+                self.cargar(filas)
+            self.ultima = estado['ultima']
+        return self
+
+    def puesto(self, estudiante_id, por_semestre=False):
+        """(puesto, total del grupo) del estudiante en su programa (o programa y semestre); None sin promedio"""
+        ubicacion = self.ubicacion.get(estudiante_id)
+        if ubicacion is None or ubicacion[2] is None:
+            return None
+        programa_id, semestre, promedio = ubicacion
+        grupo = self.grupos[(programa_id, semestre if por_semestre else None)]
+        return grupo.puesto(promedio), len(grupo)
+
+    def mejores(self, programa_id, k, semestre=None):
+        grupo = self.grupos.get((programa_id, semestre))
+        return grupo.mejores(k) if grupo else []
+
+    def total(self, programa_id, semestre=None):
+        return len(self.grupos.get((programa_id, semestre), ()))
+
+
+RANKINGS = {}
+BLOQUEO = threading.Lock()
+
+
+def ranking_periodo(periodo_id):
+    """RankingPeriodo del proceso para el periodo, ya sincronizado"""
+    with BLOQUEO:
+        ranking = RANKINGS.setdefault(periodo_id, RankingPeriodo(periodo_id))
+    return ranking.sincronizar()
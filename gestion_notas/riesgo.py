@@ -0,0 +1,162 @@
+"""
+Alerta temprana de riesgo académico, calculada por lotes con NumPy.
+
+Para cada estudiante activo inscrito en el periodo se cargan inscripciones,
+pesos, notas e historial con cuatro consultas; las características salen de
+sumas agrupadas (np.bincount) sobre arreglos alineados, sin bucles por
+estudiante:
+
+- promedio parcial: nota ponderada solo sobre las evaluaciones ya calificadas
+  de cada curso, promediada por créditos;
+- evaluaciones faltantes: tipos que el curso ya calificó a alguien y al
+  estudiante no;
+- tendencia: promedio parcial menos el promedio de los periodos anteriores
+  (HistorialAcademico);
+- cursos en riesgo: cursos con promedio parcial por debajo de 3.0.
+
+El puntaje (0-100) es la suma ponderada de esas cuatro señales y se guarda en
+PuntajeRiesgo; el reporte y la vista de alertas solo leen esa tabla.
+"""
+import numpy as np
+from django.db import models, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .models import (Calificacion, ConfiguracionEvaluacion, HistorialAcademico, InscripcionCurso, PuntajeRiesgo,
+                     decimal_promedio)
+
+PESOS_RIESGO = {'promedio': 40, 'cursos': 25, 'faltantes': 20, 'tendencia': 15}
+NOTA_SEGURA = 4.0  # promedio parcial desde el que no suma riesgo
+NOTA_CRITICA = 2.0  # promedio parcial con el que suma todo su peso
+CAIDA_CRITICA = 1.0  # caída frente a periodos anteriores con la que suma todo su peso
+UMBRALES = (('alto', 60), ('medio', 35))  # por debajo: bajo
+
+
+def agrupar(grupos, valores, total):
+    return np.bincount(grupos, weights=valores, minlength=total)
+
+
+def dividir(numerador, denominador):
+    """Cociente elemento a elemento; NaN donde el denominador es 0"""
+    return np.divide(numerador, denominador, out=np.full(len(numerador), np.nan), where=denominador > 0)
+
+
+def nivel_de(puntaje):
+    return next((nivel for nivel, minimo in UMBRALES if puntaje >= minimo), 'bajo')
+
+
+def caracteristicas(periodo):
+    """
+    (estudiantes, programas, características) del periodo: arreglos alineados por estudiante con
+    promedio_parcial, promedio_anterior, tendencia, evaluaciones_faltantes, evaluaciones_debidas,
+    cursos y cursos_en_riesgo
+    """
+    filas = list(InscripcionCurso.objects.filter(
+        curso__periodo=periodo, curso__archived=False, estudiante__estado='activo'
+    ).order_by('estudiante_id', 'id').values_list('id', 'estudiante_id', 'estudiante__programa_id', 'curso_id',
+                                                   'curso__materia__creditos'))
+    if not filas:
+        return [], [], {}
+    inscripciones, estudiantes_insc, programas_insc, cursos_insc, creditos = (np.array(c) for c in zip(*filas))
+    n = len(inscripciones)
+    posicion = {inscripcion_id: i for i, inscripcion_id in enumerate(inscripciones.tolist())}
+
+    pesos = {(curso_id, tipo_id): float(porcentaje) for curso_id, tipo_id, porcentaje in
+             ConfiguracionEvaluacion.objects.filter(curso__periodo=periodo).values_list(
+                 'curso_id', 'tipo_evaluacion_id', 'porcentaje')}
+    notas = [
+        (posicion[inscripcion_id], curso_id, tipo_id, float(nota))
+        for inscripcion_id, curso_id, tipo_id, nota in Calificacion.objects.filter(
+            inscripcion__curso__periodo=periodo
+        ).values_list('inscripcion_id', 'inscripcion__curso_id', 'tipo_evaluacion_id', 'nota')
+        if inscripcion_id in posicion
+    ]
+
+    # Por inscripción: promedio sobre lo calificado y evaluaciones que faltan frente al resto del curso
+    if notas:
+        fila_nota, curso_nota, tipo_nota, valor_nota = (np.array(c) for c in zip(*notas))
+        peso_nota = np.array([pesos.get(clave, 0.0) for clave in zip(curso_nota.tolist(), tipo_nota.tolist())])
+        parcial_insc = dividir(agrupar(fila_nota, valor_nota * peso_nota, n), agrupar(fila_nota, peso_nota, n))
+        calificadas = agrupar(fila_nota, None, n)
+        # Tipos distintos calificados en cada curso: pares (curso, tipo) únicos contados por curso
+        cursos_calificados, _ = np.unique(np.stack([curso_nota, tipo_nota]), axis=1)
+        debidas_por_curso = dict(zip(*(a.tolist() for a in np.unique(cursos_calificados, return_counts=True))))
+        debidas = np.array([debidas_por_curso.get(c, 0) for c in cursos_insc.tolist()], dtype=float)
+    else:
+        parcial_insc, calificadas, debidas = np.full(n, np.nan), np.zeros(n), np.zeros(n)
+    faltantes_insc = np.clip(debidas - calificadas, 0, None)
+
+    # Por estudiante (filas ordenadas por estudiante_id: np.unique conserva ese orden)
+    estudiantes, primera, grupo = np.unique(estudiantes_insc, return_index=True, return_inverse=True)
+    total = len(estudiantes)
+    con_parcial = ~np.isnan(parcial_insc)
+    creditos_con_parcial = np.where(con_parcial, creditos, 0)
+    parcial = dividir(agrupar(grupo, np.nan_to_num(parcial_insc) * creditos_con_parcial, total),
+                      agrupar(grupo, creditos_con_parcial, total))
+
+    # Promedio de los periodos anteriores ponderado por créditos, como RegistroAcumulado
+    anteriores = {
+        estudiante_id: float(suma) / creditos_cursados
+        for estudiante_id, suma, creditos_cursados in HistorialAcademico.objects.filter(
+            estudiante__estado='activo', periodo__fecha_inicio__lt=periodo.fecha_inicio, promedio__isnull=False,
+        ).values('estudiante_id').annotate(
+            suma=Sum(F('promedio') * F('creditos'), output_field=models.DecimalField()),
+            total_creditos=Sum('creditos'),
+        ).order_by().values_list('estudiante_id', 'suma', 'total_creditos')
+        if creditos_cursados
+    }
+    anterior = np.array([anteriores.get(e, np.nan) for e in estudiantes.tolist()])
+
+    return estudiantes.tolist(), programas_insc[primera].tolist(), {
+        'promedio_parcial': parcial,
+        'promedio_anterior': anterior,
+        'tendencia': parcial - anterior,
+        'evaluaciones_faltantes': agrupar(grupo, faltantes_insc, total),
+        'evaluaciones_debidas': agrupar(grupo, debidas, total),
+        'cursos': agrupar(grupo, None, total),
+        'cursos_en_riesgo': agrupar(grupo, (con_parcial & (np.nan_to_num(parcial_insc) < 3.0)).astype(float), total),
+    }
+
+
+def puntajes(datos):
+    """Puntaje 0-100 de cada estudiante a partir de sus características; cada señal aporta entre 0 y su peso"""
+    componentes = {
+        'promedio': np.clip((NOTA_SEGURA - datos['promedio_parcial']) / (NOTA_SEGURA - NOTA_CRITICA), 0, 1),
+        'cursos': datos['cursos_en_riesgo'] / datos['cursos'],
+        'faltantes': dividir(datos['evaluaciones_faltantes'], datos['evaluaciones_debidas']),
+        'tendencia': np.clip(-datos['tendencia'] / CAIDA_CRITICA, 0, 1),
+    }
+    # Una señal sin datos (sin notas, sin periodos anteriores) no suma riesgo
+    return sum(peso * np.nan_to_num(componentes[nombre]) for nombre, peso in PESOS_RIESGO.items())
+
+
+def calcular_riesgo(periodo, lote=1000):
+    """Recalcula y guarda el puntaje de riesgo de los estudiantes activos del periodo; devuelve cuántos"""
+    estudiantes, programas, datos = caracteristicas(periodo)
+    ahora = timezone.now()
+    valores = puntajes(datos) if estudiantes else []
+    registros = [
+        PuntajeRiesgo(
+            estudiante_id=estudiante_id, periodo_id=periodo.pk, programa_id=programa_id,
+            puntaje=decimal_promedio(round(float(puntaje), 2)), nivel=nivel_de(puntaje),
+            promedio_parcial=decimal_promedio(None if np.isnan(p) else round(float(p), 2)),
+            promedio_anterior=decimal_promedio(None if np.isnan(a) else round(float(a), 2)),
+            tendencia=decimal_promedio(None if np.isnan(t) else round(float(t), 2)),
+            evaluaciones_faltantes=int(faltantes), cursos=int(cursos), cursos_en_riesgo=int(en_riesgo),
+            fecha_calculo=ahora,
+        )
+        for estudiante_id, programa_id, puntaje, p, a, t, faltantes, cursos, en_riesgo in zip(
+            estudiantes, programas, valores, *(datos.get(campo, ()) for campo in (
+                'promedio_parcial', 'promedio_anterior', 'tendencia', 'evaluaciones_faltantes', 'cursos',
+                'cursos_en_riesgo',
+            ))
+        )
+    ]
+    campos = ['programa', 'puntaje', 'nivel', 'promedio_parcial', 'promedio_anterior', 'tendencia',
+              'evaluaciones_faltantes', 'cursos', 'cursos_en_riesgo', 'fecha_calculo']
+    with transaction.atomic():
+        PuntajeRiesgo.objects.bulk_create(registros, batch_size=lote, update_conflicts=True,
+                                          unique_fields=['periodo', 'estudiante'], update_fields=campos)
+        # Lo que no se reescribió ahora es de estudiantes que ya no están activos o inscritos
+        PuntajeRiesgo.objects.filter(periodo=periodo, fecha_calculo__lt=ahora).delete()
+    return len(registros)
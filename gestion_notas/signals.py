@@ -0,0 +1,145 @@
+from contextlib import contextmanager
+
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .horarios import sincronizar_franjas
+from .models import (Calificacion, ConfiguracionEvaluacion, Curso, Estudiante, InscripcionCurso, PosicionRanking,
+                     refrescar_agregados)
+from .versiones import afectados_por_instancias, incrementar
+
+
+@receiver([post_save, post_delete], sender=Calificacion)
+@receiver([post_save, post_delete], sender=ConfiguracionEvaluacion)
+@receiver([post_save, post_delete], sender=InscripcionCurso)
+@receiver([post_save, post_delete], sender=Curso)
+def incrementar_versiones(sender, instance, **kwargs):
+    """Invalida las claves de caché que dependen del curso, estudiante o periodo modificado"""
+    incrementar(afectados_por_instancias(sender, [instance]))
+
+
+@receiver([post_save, post_delete], sender=Calificacion)
+@receiver([post_save, post_delete], sender=ConfiguracionEvaluacion)
+@receiver(post_save, sender=InscripcionCurso)
+def recalcular_promedio_almacenado(sender, instance, created=False, **kwargs):
+    """Una nota cambia el promedio de su inscripción; un peso, el de todo el curso"""
+    if sender is Calificacion:
+        inscripciones = InscripcionCurso.con_archivados.filter(pk=instance.inscripcion_id)
+    elif sender is ConfiguracionEvaluacion:
+        inscripciones = InscripcionCurso.con_archivados.filter(curso_id=instance.curso_id)
+    elif not created:
+        # Una inscripción que cambia de curso queda con los pesos del nuevo curso
+        inscripciones = InscripcionCurso.con_archivados.filter(pk=instance.pk)
+    else:
+        return
+    inscripciones.recalcular_promedios()
+
+
+@receiver(pre_save, sender=InscripcionCurso)
+def recordar_estado_inscripcion(sender, instance, raw=False, **kwargs):
+    """Curso, archivado y estudiante previos, para ajustar Curso.inscritos, el cubo y el ranking en post_save"""
+    instance._estado_previo = None
+    if instance.pk is not None and not raw:
+        instance._estado_previo = (InscripcionCurso.con_archivados.filter(pk=instance.pk)
+                                   .values_list('curso_id', 'archived', 'estudiante_id').first())
+
+
+def sumar_inscritos(curso_id, cantidad):
+    Curso._base_manager.filter(pk=curso_id).update(inscritos=F('inscritos') + cantidad)
+
+
+@receiver([post_save, post_delete], sender=InscripcionCurso)
+def actualizar_inscritos(sender, instance, signal, created=False, raw=False, **kwargs):
+    """Mantiene Curso.inscritos, el cubo y el ranking; post_delete también cubre los borrados en cascada"""
+    if raw:
+        return
+    if signal is post_delete:
+        previo, actual = (instance.curso_id, instance.archived, instance.estudiante_id), None
+    else:
+        previo = None if created else getattr(instance, '_estado_previo', None)
+        actual = (instance.curso_id, instance.archived, instance.estudiante_id)
+    if previo == actual:
+        return
+    if previo is not None and not previo[1]:
+        sumar_inscritos(previo[0], -1)
+    if actual is not None and not actual[1]:
+        sumar_inscritos(actual[0], 1)
+    refrescar_agregados((estado[0], estado[2]) for estado in (previo, actual) if estado is not None)
+
+
+@receiver(pre_save, sender=Estudiante)
+def recordar_ubicacion(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Programa y semestre previos: sus celdas del cubo pierden al estudiante en post_save"""
+    instance._ubicacion_previa = None
+    if instance.pk is not None and not raw and (update_fields is None or {'programa', 'semestre'} & set(update_fields)):
+        instance._ubicacion_previa = (Estudiante.objects.filter(pk=instance.pk)
+                                      .values_list('programa_id', 'semestre').first())
+
+
+@receiver(post_save, sender=Estudiante)
+def reubicar_en_cubo(sender, instance, created=False, raw=False, **kwargs):
+    """Un cambio de programa o semestre mueve al estudiante a otras celdas del cubo y otros grupos del ranking"""
+    previa = getattr(instance, '_ubicacion_previa', None)
+    if created or raw or previa is None or previa == (instance.programa_id, instance.semestre):
+        return
+    PosicionRanking.objects.filter(estudiante=instance).exclude(
+        programa_id=instance.programa_id, semestre=instance.semestre
+    ).update(programa_id=instance.programa_id, semestre=instance.semestre, fecha_actualizacion=timezone.now())
+    inscripciones = InscripcionCurso.objects.filter(estudiante=instance)
+    refrescar_agregados(
+        inscripciones.values_list('curso_id', 'estudiante_id'),
+        celdas=[(periodo_id, materia_id, *previa) for periodo_id, materia_id in
+                inscripciones.values_list('curso__periodo_id', 'curso__materia_id')],
+    )
+
+
+@receiver(post_delete, sender=Estudiante)
+def quitar_del_ranking(sender, instance, **kwargs):
+    """
+    Los receptores de la cascada (notas e inscripciones del estudiante) pueden haber reescrito su posición
+    después de que la cascada la borrara
+    """
+    PosicionRanking.objects.filter(estudiante_id=instance.pk).delete()
+
+
+@receiver(post_save, sender=Curso)
+def sincronizar_horario(sender, instance, raw=False, **kwargs):
+    """Regenera las franjas del curso a partir de su horario y aula"""
+    if not raw:
+        sincronizar_franjas(Curso.con_archivados.filter(pk=instance.pk))
+
+
+MODELOS_VERSIONADOS = (Calificacion, ConfiguracionEvaluacion, InscripcionCurso, Curso)
+
+RECEPTORES = [
+    (incrementar_versiones, post_save, MODELOS_VERSIONADOS),
+    (incrementar_versiones, post_delete, MODELOS_VERSIONADOS),
+    (recalcular_promedio_almacenado, post_save, (Calificacion, ConfiguracionEvaluacion, InscripcionCurso)),
+    (recalcular_promedio_almacenado, post_delete, (Calificacion, ConfiguracionEvaluacion)),
+    (recordar_estado_inscripcion, pre_save, (InscripcionCurso,)),
+    (actualizar_inscritos, post_save, (InscripcionCurso,)),
+    (actualizar_inscritos, post_delete, (InscripcionCurso,)),
+    (sincronizar_horario, post_save, (Curso,)),
+    (recordar_ubicacion, pre_save, (Estudiante,)),
+    (reubicar_en_cubo, post_save, (Estudiante,)),
+    (quitar_del_ranking, post_delete, (Estudiante,)),
+]
+
+
+@contextmanager
+def sin_versionado():
+    """
+    Desconecta los receptores para borrados masivos sin señales por fila
+    (p. ej. vaciar la base). Quien lo use debe vaciar después la caché.
+    """
+    for receptor, senal, modelos in RECEPTORES:
+        for modelo in modelos:
+            senal.disconnect(receptor, sender=modelo)
+    try:
+        yield
+    finally:
+        for receptor, senal, modelos in RECEPTORES:
+            for modelo in modelos:
+                senal.connect(receptor, sender=modelo)
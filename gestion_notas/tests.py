@@ -1,3 +1,1749 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import zipfile
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from pathlib import Path
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, transaction
+from django.forms import modelform_factory
+from django.test import Client, RequestFactory, TestCase, modify_settings, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import metricas, urls
+from .analitica import analitica_curso
+from .auditoria import consultar_logs, rotar_logs
+from .management.commands.bench_importacion import medir_arranque
+from .forms import archive_queryset
+from .horarios import Franja, IndiceIntervalos, choque_de_aula, choques_periodo, parsear_horario
+from .middleware import CONFIGURACION_PERFIL, huella_sql
+from .ocupacion import BLOQUES, MapaOcupacion, mascara, tramos
+from .paquete_reportes import DatosPeriodo, generar_paquete
+from .ranking import RANKINGS, Clasificacion, ranking_periodo
+from .riesgo import calcular_riesgo
+from .inscripciones import inscribir
+from .versiones import cacheado, clave_cache, versiones
+from .models import *
+
+
+def crear_datos(num_estudiantes=10, num_cursos=3, prefijo='t'):
+    """Crea un periodo activo con cursos, estudiantes inscritos, notas y notificaciones"""
+    programa = Programa.objects.create(nombre=f'Programa {prefijo}', codigo=f'{prefijo}-PRG')
+    periodo = PeriodoAcademico.objects.create(
+        nombre=f'{prefijo}-2025-1', fecha_inicio=date(2025, 1, 15), fecha_fin=date(2025, 6, 15), activo=True
+    )
+    PeriodoAcademico.objects.create(
+        nombre=f'{prefijo}-2024-2', fecha_inicio=date(2024, 8, 1), fecha_fin=date(2024, 12, 15), activo=False
+    )
+    tipos = [
+        TipoEvaluacion.objects.create(nombre=nombre)
+        for nombre in ('Parcial', 'Taller', 'Proyecto Final')
+    ]
+
+    usuario_admin = Usuario.objects.create_user(
+        username=f'{prefijo}-admin', password='clave123', documento=f'{prefijo}-A0', rol='administrador'
+    )
+    Administrador.objects.create(usuario=usuario_admin, cargo='Director', departamento='Académico')
+
+    usuario_profesor = Usuario.objects.create_user(
+        username=f'{prefijo}-prof', password='clave123', documento=f'{prefijo}-P0', rol='profesor',
+        first_name='Profe', last_name='Sor'
+    )
+    profesor = Profesor.objects.create(usuario=usuario_profesor, especialidad='Software', titulo_academico='MSc')
+
+    datos = {
+        'prefijo': prefijo,
+        'programa': programa,
+        'periodo': periodo,
+        'tipos': tipos,
+        'admin': usuario_admin,
+        'profesor': profesor,
+        'cursos': [],
+        'estudiantes': [],
+    }
+    return ampliar_datos(datos, num_estudiantes=num_estudiantes, num_cursos=num_cursos)
+
+
+def ampliar_datos(datos, num_estudiantes=0, num_cursos=0):
+    """Agrega cursos y estudiantes; cada estudiante queda inscrito y calificado en todos los cursos"""
+    prefijo = datos['prefijo']
+    programa = datos['programa']
+    tipos = datos['tipos']
+    usuario_profesor = datos['profesor'].usuario
+
+    nuevos_cursos = []
+    for i in range(len(datos['cursos']), len(datos['cursos']) + num_cursos):
+        materia = Materia.objects.create(
+            nombre=f'Materia {i}', codigo=f'{prefijo}-M{i}', creditos=3, programa=programa, semestre_sugerido=1
+        )
+        curso = Curso.objects.create(
+            materia=materia, periodo=datos['periodo'], profesor=datos['profesor'], grupo='A',
+            horario='Lun-Mie 10:00-12:00', aula=f'Aula {i}'
+        )
+        for tipo, porcentaje in zip(tipos, (40, 30, 30)):
+            ConfiguracionEvaluacion.objects.create(curso=curso, tipo_evaluacion=tipo, porcentaje=porcentaje)
+        nuevos_cursos.append(curso)
+
+    nuevos_estudiantes = []
+    for i in range(len(datos['estudiantes']), len(datos['estudiantes']) + num_estudiantes):
+        usuario = Usuario.objects.create_user(
+            username=f'{prefijo}-est{i}', password='clave123', documento=f'{prefijo}-E{i}', rol='estudiante',
+            first_name=f'Nombre{i}', last_name=f'Apellido{i}'
+        )
+        estudiante = Estudiante.objects.create(
+            usuario=usuario, programa=programa, semestre=1 + i % 10,
+            codigo_estudiantil=f'{prefijo}-{i:05d}', fecha_ingreso=date(2024, 1, 15)
+        )
+        nuevos_estudiantes.append(estudiante)
+        for j in range(3):
+            Notificacion.objects.create(usuario=usuario, tipo='general', titulo=f'Aviso {j}',
+                                        mensaje='', leida=bool(j % 2))
+
+    datos['cursos'] += nuevos_cursos
+    datos['estudiantes'] += nuevos_estudiantes
+
+    for i, estudiante in enumerate(datos['estudiantes']):
+        cursos = datos['cursos'] if estudiante in nuevos_estudiantes else nuevos_cursos
+        for curso in cursos:
+            inscripcion = InscripcionCurso.objects.create(estudiante=estudiante, curso=curso)
+            for j, tipo in enumerate(tipos):
+                Calificacion.objects.create(
+                    inscripcion=inscripcion, tipo_evaluacion=tipo, nota=2.5 + (i + j) % 3 * 0.75,
+                    registrada_por=usuario_profesor
+                )
+
+    return datos
+
+
+class PlanConsultasTests(TestCase):
+    """Las consultas frecuentes deben resolverse con índices, nunca con un recorrido completo"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.datos = crear_datos(num_estudiantes=30, num_cursos=4)
+
+    def consultas_frecuentes(self):
+        periodo = self.datos['periodo']
+        curso = self.datos['cursos'][0]
+        estudiante = self.datos['estudiantes'][0]
+        return {
+            'inscripciones_del_periodo': estudiante.inscripciones.filter(curso__periodo=periodo),
+            'cursos_del_periodo': Curso.objects.filter(periodo=periodo),
+            'cursos_del_profesor': self.datos['profesor'].cursos.filter(periodo=periodo),
+            'calificaciones_del_curso': Calificacion.objects.filter(inscripcion__curso=curso),
+            'notificaciones_no_leidas': estudiante.usuario.notificaciones.filter(leida=False).order_by('-fecha_creacion')[:5],
+        }
+
+    def recorridos_completos(self, queryset):
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+            plan = queryset.explain()
+            return [linea for linea in plan.splitlines() if 'Seq Scan' in linea]
+
+        plan = queryset.explain()
+        return [
+            linea for linea in plan.splitlines()
+            if re.search(r'\bSCAN\b', linea) and 'CONSTANT ROW' not in linea
+        ]
+
+    def test_consultas_frecuentes_usan_indices(self):
+        if connection.vendor not in ('sqlite', 'postgresql'):
+            self.skipTest(f'EXPLAIN no soportado para {connection.vendor}')
+
+        for nombre, queryset in self.consultas_frecuentes().items():
+            with self.subTest(consulta=nombre):
+                self.assertEqual(self.recorridos_completos(queryset), [],
+                                 f'{nombre} recorre una tabla completa:\n{queryset.explain()}')
+
+
+# Plantillas mínimas que recorren las mismas relaciones que las reales, para que un N+1
+# disparado desde la plantilla también cuente (varias plantillas de las vistas no existen en disco)
+PLANTILLAS_CONSULTAS = {
+    'login.html': '',
+    'notificaciones.html': '{% for n in notificaciones %}{{ n.titulo }}{% endfor %}',
+    'estudiante/dashboard.html': (
+        '{% for n in notificaciones %}{{ n.titulo }}{% endfor %}'
+        '{% for i in inscripciones %}{{ i.curso.materia.nombre }}{{ i.curso.profesor.usuario.get_full_name }}'
+        '{{ i.calcular_promedio }}{{ i.estado_aprobacion }}{% endfor %}'
+    ),
+    'profesor/dashboard.html': (
+        '{% for c in cursos %}{{ c.materia.nombre }}{{ c.periodo.nombre }}{{ c.inscritos }}{% endfor %}'
+    ),
+    'administrador/dashboard.html': (
+        '{% for a in actividades_recientes %}{{ a.usuario.username }}{{ a.descripcion }}{% endfor %}'
+    ),
+    'estudiante/mis_notas.html': (
+        '{% for p in periodos %}{{ p.nombre }}{% endfor %}'
+        '{% for d in inscripciones_data %}{{ d.inscripcion.curso.materia.nombre }}'
+        '{{ d.inscripcion.curso.profesor.usuario.get_full_name }}'
+        '{% for c in d.calificaciones %}{{ c.tipo_evaluacion.nombre }}{{ c.nota }}{% endfor %}{% endfor %}'
+    ),
+    'estudiante/detalle_materia.html': (
+        '{{ inscripcion.curso.materia.nombre }}'
+        '{% for c in calificaciones %}{{ c.tipo_evaluacion.nombre }}{{ c.nota }}{% endfor %}'
+        '{% for c in configuraciones %}{{ c.tipo_evaluacion.nombre }}{{ c.porcentaje }}{% endfor %}'
+    ),
+    'estudiante/actualizar_perfil.html': '',
+    'profesor/mis_cursos.html': (
+        '{% for d in cursos_data %}{{ d.curso.materia.nombre }}{{ d.curso.periodo.nombre }}'
+        '{{ d.total_estudiantes }}{{ d.promedio_curso }}{% endfor %}'
+    ),
+    'profesor/estudiantes_curso.html': (
+        '{{ curso.materia.nombre }}{% for t in tipos_evaluacion %}{{ t.tipo_evaluacion.nombre }}{% endfor %}'
+        '{% for d in estudiantes_data %}{{ d.estudiante.usuario.get_full_name }}{{ d.estudiante.codigo_estudiantil }}'
+        '{% for c in d.calificaciones %}{{ c.tipo_evaluacion.nombre }}{{ c.nota }}{% endfor %}{% endfor %}'
+    ),
+    'profesor/registrar_calificacion.html': (
+        '{{ inscripcion.estudiante.usuario.get_full_name }}{{ inscripcion.curso.materia.nombre }}'
+        '{% for t in tipos_evaluacion %}{{ t.nombre }}{% endfor %}'
+        '{% for c in calificaciones_existentes %}{{ c.tipo_evaluacion.nombre }}{{ c.nota }}{% endfor %}'
+        '{% for c in configuraciones %}{{ c.tipo_evaluacion.nombre }}{{ c.porcentaje }}{% endfor %}'
+    ),
+    'administrador/gestion_cursos.html': (
+        '{% for p in periodos %}{{ p.nombre }}{% endfor %}'
+        '{% for c in cursos %}{{ c.materia.nombre }}{{ c.periodo.nombre }}{{ c.profesor.usuario.get_full_name }}'
+        '{{ c.inscritos }}{% endfor %}'
+    ),
+    'administrador/generar_reporte.html': (
+        '{% for p in periodos %}{{ p.nombre }}{% endfor %}{% for p in programas %}{{ p.nombre }}{% endfor %}'
+        '{% for m in materias %}{{ m.nombre }}{% endfor %}'
+    ),
+}
+
+
+@override_settings(
+    TEMPLATES=[{
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'OPTIONS': {'loaders': [('django.template.loaders.locmem.Loader', PLANTILLAS_CONSULTAS)]},
+    }],
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+)
+class ConsultasPorVistaTests(TestCase):
+    """Las vistas de urls.py deben hacer el mismo número de consultas con pocos o muchos datos"""
+
+    # Consultas adicionales permitidas con el conjunto grande; una vista ausente no puede crecer
+    PRESUPUESTO = {}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.datos = crear_datos(num_estudiantes=2, num_cursos=2, prefijo='q')
+
+    def rutas(self, datos):
+        """(nombre de la ruta, usuario, método, kwargs de la URL, datos POST) por cada escenario"""
+        estudiante = datos['estudiantes'][0]
+        profesor = datos['profesor'].usuario
+        admin = datos['admin']
+        periodo = datos['periodo']
+        inscripcion = estudiante.inscripciones.get(curso=datos['cursos'][0])
+        ultima_calificacion = Calificacion.objects.latest('id')
+        ultimo_curso = datos['cursos'][-1]
+        notificacion = estudiante.usuario.notificaciones.earliest('id')
+
+        reportes = [
+            ('generar_reporte', admin, 'post', {}, {
+                'tipo_reporte': tipo, 'formato': formato, 'periodo': periodo.id,
+                'materia': datos['cursos'][0].materia_id,
+            })
+            for tipo, formato in [('rendimiento_general', 'pdf'), ('rendimiento_general', 'excel'),
+                                  ('estudiantes_riesgo', 'pdf'), ('notas_por_materia', 'pdf')]
+        ]
+        reportes.append(('generar_reporte', admin, 'post', {}, {
+            'tipo_reporte': 'paquete', 'periodo': periodo.id, 'formatos': ['pdf', 'excel', 'csv'],
+        }))
+        return [
+            ('login', None, 'get', {}, None),
+            ('logout', estudiante.usuario, 'get', {}, None),
+            ('dashboard', estudiante.usuario, 'get', {}, None),
+            ('dashboard', profesor, 'get', {}, None),
+            ('dashboard', admin, 'get', {}, None),
+            ('mis_notas', estudiante.usuario, 'get', {}, None),
+            ('detalle_materia', estudiante.usuario, 'get', {'inscripcion_id': inscripcion.id}, None),
+            ('actualizar_perfil', estudiante.usuario, 'get', {}, None),
+            ('descargar_boletin', estudiante.usuario, 'get', {'periodo_id': periodo.id}, None),
+            ('exportar_historial_notas', estudiante.usuario, 'get', {}, None),
+            ('mis_cursos', profesor, 'get', {}, None),
+            ('estudiantes_curso', profesor, 'get', {'curso_id': datos['cursos'][0].id}, None),
+            ('registrar_calificacion', profesor, 'get', {'inscripcion_id': inscripcion.id}, None),
+            ('eliminar_calificacion', profesor, 'post', {'calificacion_id': ultima_calificacion.id}, {}),
+            ('gestion_cursos', admin, 'get', {}, None),
+            ('generar_reporte', admin, 'get', {}, None),
+            *reportes,
+            ('estadisticas_dashboard', admin, 'get', {}, None),
+            ('archivar_registro', admin, 'post', {'modelo': 'curso'},
+             {'object_id': ultimo_curso.id, 'archived': 'on'}),
+            ('archivar_masivo', admin, 'post', {'modelo': 'curso'}, {'ids': str(ultimo_curso.id), 'archived': 'on'}),
+            ('todas_notificaciones', estudiante.usuario, 'get', {}, None),
+            ('marcar_notificacion_leida', estudiante.usuario, 'post', {'notificacion_id': notificacion.id}, {}),
+            ('marcar_todas_leidas', estudiante.usuario, 'post', {}, {}),
+            ('api_calificaciones', profesor, 'get', {'inscripcion_id': inscripcion.id}, None),
+            ('api_calificaciones_lote', profesor, 'get', {}, {'curso': datos['cursos'][0].id}),
+            ('cubo_rendimiento', admin, 'get', {}, {'dimensiones': 'programa,materia', 'periodo': periodo.id}),
+            ('analitica_curso', profesor, 'get', {'curso_id': datos['cursos'][0].id}, None),
+            ('impacto_pesos', profesor, 'post', {'curso_id': datos['cursos'][0].id},
+             json.dumps({'pesos': {tipo.id: 100 / len(datos['tipos']) for tipo in datos['tipos']}})),
+            ('inscripcion_masiva', admin, 'post', {}, json.dumps({'inscripciones': [
+                {'estudiante': estudiante.id, 'curso': curso.id} for curso in datos['cursos'][:2]
+            ]})),
+            ('alertas_riesgo', profesor, 'get', {'periodo_id': periodo.id}, None),
+            ('ranking_programa', admin, 'get', {'periodo_id': periodo.id}, {'programa': datos['programa'].id}),
+            ('puesto_ranking', estudiante.usuario, 'get', {'periodo_id': periodo.id, 'estudiante_id': estudiante.id},
+             None),
+            ('choques_horario', admin, 'get', {'periodo_id': periodo.id}, None),
+            ('ocupacion_aulas', admin, 'get', {'periodo_id': periodo.id}, None),
+            ('aulas_libres', admin, 'get', {'periodo_id': periodo.id}, {'duracion': 90, 'dia': 'lun'}),
+            ('validar_nota', profesor, 'post', {}, {'nota': '4.5'}),
+            ('busqueda_global', profesor, 'get', {}, {'q': 'Apellido'}),
+            ('busqueda_global', admin, 'get', {}, {'q': 'Materia'}),
+            ('metricas', admin, 'get', {}, None),
+        ]
+
+    def medir(self, usuario, metodo, nombre, kwargs, datos_post):
+        client = Client()
+        if usuario is not None:
+            client.force_login(usuario)
+        peticion = getattr(client, metodo)
+        url = reverse(nombre, kwargs=kwargs)
+        # Un str se envía como cuerpo JSON
+        extra = {'content_type': 'application/json'} if isinstance(datos_post, str) else {}
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = peticion(url, datos_post, **extra) if datos_post is not None else peticion(url)
+        return respuesta.status_code, len(consultas)
+
+    def test_todas_las_rutas_estan_cubiertas(self):
+        nombres = {patron.name for patron in urls.urlpatterns}
+        self.assertEqual(nombres - {ruta[0] for ruta in self.rutas(self.datos)}, set())
+
+    def test_consultas_no_crecen_con_los_datos(self):
+        for indice in range(len(self.rutas(self.datos))):
+            nombre, usuario = self.rutas(self.datos)[indice][:2]
+            with self.subTest(ruta=nombre, usuario=usuario and usuario.username), transaction.atomic():
+                cache.clear()
+                datos = {**self.datos, 'cursos': list(self.datos['cursos']),
+                         'estudiantes': list(self.datos['estudiantes'])}
+
+                # El reporte y las alertas de riesgo solo leen PuntajeRiesgo: sin calcularlo serían un redirect
+                calcular_riesgo(datos['periodo'])
+                nombre, usuario, metodo, kwargs, datos_post = self.rutas(datos)[indice]
+                estado, pocas = self.medir(usuario, metodo, nombre, kwargs, datos_post)
+                if (nombre, metodo) == ('generar_reporte', 'post'):
+                    self.assertEqual(estado, 200)
+
+                ampliar_datos(datos, num_estudiantes=6, num_cursos=3)
+                calcular_riesgo(datos['periodo'])
+                nombre, usuario, metodo, kwargs, datos_post = self.rutas(datos)[indice]
+                estado_grande, muchas = self.medir(usuario, metodo, nombre, kwargs, datos_post)
+
+                self.assertEqual(estado_grande, estado)
+                self.assertLessEqual(
+                    muchas, pocas + self.PRESUPUESTO.get(nombre, 0),
+                    f'{nombre}: {pocas} consultas con {len(self.datos["estudiantes"])} estudiantes, '
+                    f'{muchas} con {len(datos["estudiantes"])}'
+                )
+                transaction.set_rollback(True)
+
+
+@modify_settings(MIDDLEWARE={'append': 'gestion_notas.middleware.PerfilSQLMiddleware'})
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class PerfilSQLMiddlewareTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.datos = crear_datos(num_estudiantes=2, num_cursos=2, prefijo='p')
+
+    def setUp(self):
+        estudiante = self.datos['estudiantes'][0]
+        self.client.force_login(estudiante.usuario)
+        self.url = reverse('api_calificaciones', args=[estudiante.inscripciones.first().id])
+
+    def test_huella_agrupa_consultas_que_solo_cambian_en_parametros(self):
+        self.assertEqual(huella_sql('SELECT * FROM t WHERE id IN (%s, %s, %s)'),
+                         huella_sql('SELECT * FROM t WHERE id IN (%s)'))
+        self.assertEqual(huella_sql("SELECT * FROM t WHERE a = 'x' AND b = 12"),
+                         huella_sql("SELECT * FROM t WHERE a = 'y' AND b = 7"))
+
+    @override_settings(PERFIL_SQL={'MUESTREO': 1.0, 'UMBRAL_PETICION_MS': 0, 'UMBRAL_CONSULTA_LENTA_MS': 0,
+                                   'CABECERA': True, 'MIN_REPETICIONES': 1, 'MAX_LENTAS': 2})
+    def test_cabecera_y_registro_estructurado(self):
+        with self.assertLogs('gestion_notas.perfil_sql', 'INFO') as logs:
+            response = self.client.get(self.url)
+
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="\d+ consultas", app;dur=[\d.]+, total;dur=')
+        registro = json.loads(logs.records[0].getMessage())
+        self.assertEqual(registro['vista'], 'api_calificaciones')
+        self.assertEqual(registro['estado'], 200)
+        self.assertGreater(registro['consultas'], 0)
+        self.assertLessEqual(len(registro['lentas']), 2)
+        self.assertEqual(sum(d['veces'] for d in registro['duplicadas']), registro['consultas'])
+
+    @override_settings(PERFIL_SQL={'MUESTREO': 1.0, 'UMBRAL_PETICION_MS': 60000, 'MIN_REPETICIONES': 1000,
+                                   'CABECERA': True})
+    def test_peticiones_bajo_los_umbrales_no_se_registran(self):
+        with self.assertNoLogs('gestion_notas.perfil_sql', 'INFO'):
+            response = self.client.get(self.url)
+        self.assertIn('Server-Timing', response)
+
+    @override_settings(PERFIL_SQL={'MUESTREO': 0})
+    def test_sin_muestreo_el_middleware_se_desactiva(self):
+        response = self.client.get(self.url)
+        self.assertNotIn('Server-Timing', response)
+
+    @override_settings(PERFIL_SQL={'MUESTREO': 1.0}, DEBUG=False)
+    def test_sin_debug_no_envia_cabecera_por_defecto(self):
+        with self.assertNoLogs('gestion_notas.perfil_sql', 'INFO'):
+            response = self.client.get(self.url)
+        self.assertNotIn('Server-Timing', response)
+
+    def test_valores_por_defecto_aptos_para_produccion(self):
+        self.assertLessEqual(CONFIGURACION_PERFIL['MUESTREO'], 0.05)
+        self.assertGreater(CONFIGURACION_PERFIL['UMBRAL_PETICION_MS'], 0)
+        self.assertGreater(CONFIGURACION_PERFIL['UMBRAL_CONSULTA_LENTA_MS'], 0)
+
+
+class MetricasTests(TestCase):
+
+    def setUp(self):
+        self.registro = metricas.Registro()
+        self.contador = metricas.Contador('prueba_eventos', 'Eventos', etiquetas=('tipo',), registro=self.registro)
+        self.histograma = metricas.Histograma('prueba_duracion', 'Duración', buckets=(0.1, 1.0),
+                                              registro=self.registro)
+
+    def test_exposicion_en_formato_prometheus(self):
+        self.contador.inc(tipo='a')
+        self.contador.inc(2, tipo='a')
+        for valor in (0.05, 0.5, 3.0):
+            self.histograma.observe(valor)
+
+        texto = self.registro.exponer()
+        self.assertIn('# TYPE prueba_eventos counter\nprueba_eventos_total{tipo="a"} 3\n', texto)
+        self.assertIn('prueba_duracion_bucket{le="0.1"} 1\n', texto)
+        self.assertIn('prueba_duracion_bucket{le="1.0"} 2\n', texto)
+        self.assertIn('prueba_duracion_bucket{le="+Inf"} 3\n', texto)
+        self.assertIn('prueba_duracion_sum 3.55\n', texto)
+        self.assertIn('prueba_duracion_count 3\n', texto)
+
+    def test_suma_los_archivos_de_otros_procesos(self):
+        with tempfile.TemporaryDirectory() as directorio, self.settings(METRICAS_DIRECTORIO=directorio):
+            self.contador.inc(tipo='a')
+            self.histograma.observe(0.5)
+            self.registro.volcar()
+            # Otro worker con su propio archivo
+            (Path(directorio) / 'metricas_1_otro.json').write_text(json.dumps({
+                'prueba_eventos': {'["a"]': 4, '["b"]': 1},
+                'prueba_duracion': {'[]': [1, 0, 0.02, 1]},
+            }))
+
+            texto = self.registro.exponer()
+
+        self.assertIn('prueba_eventos_total{tipo="a"} 5\n', texto)
+        self.assertIn('prueba_eventos_total{tipo="b"} 1\n', texto)
+        self.assertIn('prueba_duracion_bucket{le="0.1"} 1\n', texto)
+        self.assertIn('prueba_duracion_count 2\n', texto)
+
+    def test_etiquetas_incorrectas(self):
+        with self.assertRaises(ValueError):
+            self.contador.inc(otra='x')
+
+    def test_volcados_concurrentes_y_fallidos_no_lanzan(self):
+        with tempfile.TemporaryDirectory() as directorio, self.settings(METRICAS_DIRECTORIO=directorio):
+            self.contador.inc(tipo='a')
+            hilos = [threading.Thread(target=self.registro.volcar) for _ in range(8)]
+            for hilo in hilos:
+                hilo.start()
+            for hilo in hilos:
+                hilo.join()
+            archivos = sorted(ruta.name for ruta in Path(directorio).iterdir())
+            self.assertEqual(archivos, [self.registro.archivo])
+
+            # Un directorio que no se puede crear (ya existe un archivo con ese nombre)
+            ocupado = Path(directorio) / 'ocupado'
+            ocupado.write_text('')
+            with self.settings(METRICAS_DIRECTORIO=str(ocupado)), self.assertLogs('gestion_notas.metricas'):
+                self.registro.volcar()
+
+    def test_archivos_de_workers_terminados_expiran(self):
+        terminado = subprocess.run([sys.executable, '-c', 'import os; print(os.getpid())'],
+                                   capture_output=True, text=True).stdout.strip()
+        with tempfile.TemporaryDirectory() as directorio, self.settings(METRICAS_DIRECTORIO=directorio):
+            viejo = Path(directorio) / f'metricas_{terminado}_viejo.json'
+            reciente = Path(directorio) / f'metricas_{terminado}_reciente.json'
+            for ruta in (viejo, reciente):
+                ruta.write_text(json.dumps({'prueba_eventos': {'["a"]': 1}}))
+            hace_dos_horas = viejo.stat().st_mtime - 2 * 3600
+            os.utime(viejo, (hace_dos_horas, hace_dos_horas))
+
+            texto = self.registro.exponer()
+            self.assertFalse(viejo.exists())
+            self.assertTrue(reciente.exists())
+        self.assertIn('prueba_eventos_total{tipo="a"} 1\n', texto)
+
+    def test_endpoint_metrics(self):
+        admin = Usuario.objects.create_user(username='metricas', password='x', documento='M0', rol='administrador')
+        self.client.force_login(admin)
+        response = self.client.get(reverse('metricas'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('# TYPE gestion_notas_calcular_promedio_segundos histogram',
+                      response.content.decode())
+
+        with self.settings(METRICAS_TOKEN='secreto'):
+            self.assertEqual(self.client.get(reverse('metricas')).status_code, 401)
+            self.client.logout()
+            response = self.client.get(reverse('metricas'), HTTP_AUTHORIZATION='Bearer secreto')
+            self.assertEqual(response.status_code, 200)
+
+    def test_sin_token_ni_debug_solo_administradores(self):
+        # Producción sin METRICAS_TOKEN: un anónimo o un estudiante no ven las métricas
+        self.assertEqual(self.client.get(reverse('metricas')).status_code, 401)
+        estudiante = Usuario.objects.create_user(username='curioso', password='x', documento='M1')
+        self.client.force_login(estudiante)
+        self.assertEqual(self.client.get(reverse('metricas')).status_code, 401)
+        with self.settings(DEBUG=True):
+            self.assertEqual(self.client.get(reverse('metricas')).status_code, 200)
+
+
+class ArranqueTests(TestCase):
+
+    def test_login_y_dashboard_no_cargan_librerias_de_exportacion(self):
+        resumen, importaciones = medir_arranque(['/', '/dashboard/'])
+        paquetes = {modulo.split('.')[0] for modulo in resumen['modulos']}
+        self.assertTrue(importaciones)
+        self.assertNotIn('reportlab', paquetes)
+        self.assertNotIn('openpyxl', paquetes)
+        self.assertNotIn('numpy', paquetes)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class VersionesDatosTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.datos = crear_datos(num_estudiantes=3, num_cursos=2, prefijo='v')
+
+    def setUp(self):
+        cache.clear()
+        self.curso, self.otro_curso = self.datos['cursos']
+        self.estudiante = self.datos['estudiantes'][0]
+        self.inscripcion = self.estudiante.inscripciones.get(curso=self.curso)
+
+    def version(self, **dependencia):
+        return next(iter(versiones(**dependencia).values()))
+
+    def assertIncrementa(self, escritura, **dependencias):
+        antes = {nombre: self.version(**{nombre: [valor]}) for nombre, valor in dependencias.items()}
+        escritura()
+        for nombre, valor in dependencias.items():
+            self.assertGreater(self.version(**{nombre: [valor]}), antes[nombre], nombre)
+
+    def test_guardar_calificacion(self):
+        calificacion = self.inscripcion.calificaciones.first()
+        calificacion.nota = 4.8
+        self.assertIncrementa(calificacion.save, cursos=self.curso, estudiantes=self.estudiante,
+                              periodos=self.datos['periodo'])
+
+    def test_escrituras_masivas(self):
+        self.assertIncrementa(lambda: Calificacion.objects.filter(inscripcion=self.inscripcion).update(nota=1.0),
+                              cursos=self.curso, estudiantes=self.estudiante)
+
+        tipo = TipoEvaluacion.objects.create(nombre='Quiz')
+        self.assertIncrementa(lambda: Calificacion.objects.bulk_create([
+            Calificacion(inscripcion=self.inscripcion, tipo_evaluacion=tipo, nota=3.0,
+                         registrada_por=self.datos['profesor'].usuario)
+        ]), cursos=self.curso, estudiantes=self.estudiante)
+
+        calificaciones = list(self.inscripcion.calificaciones.all())
+        for calificacion in calificaciones:
+            calificacion.nota = 2.0
+        self.assertIncrementa(lambda: Calificacion.objects.bulk_update(calificaciones, ['nota']),
+                              cursos=self.curso, estudiantes=self.estudiante)
+
+    def test_cambiar_pesos_afecta_a_todos_los_estudiantes_del_curso(self):
+        config = self.curso.configuracion_evaluaciones.first()
+        config.porcentaje = 50
+        otros = self.datos['estudiantes'][1:]
+        antes = versiones(estudiantes=otros)
+        otro_curso = self.version(cursos=[self.otro_curso])
+
+        config.save()
+
+        despues = versiones(estudiantes=otros)
+        self.assertTrue(all(despues[clave] > antes[clave] for clave in antes))
+        self.assertEqual(self.version(cursos=[self.otro_curso]), otro_curso)
+
+    def test_la_clave_cambia_solo_con_los_datos_de_los_que_depende(self):
+        clave = clave_cache('notas', cursos=[self.curso], estudiantes=[self.estudiante])
+        self.assertEqual(clave, clave_cache('notas', cursos=[self.curso.id], estudiantes=[self.estudiante.id]))
+
+        otro_estudiante = self.datos['estudiantes'][1]
+        Calificacion.objects.filter(inscripcion__estudiante=otro_estudiante,
+                                    inscripcion__curso=self.otro_curso).update(nota=5.0)
+        self.assertEqual(clave, clave_cache('notas', cursos=[self.curso], estudiantes=[self.estudiante]))
+
+        Calificacion.objects.filter(inscripcion__estudiante=otro_estudiante,
+                                    inscripcion__curso=self.curso).update(nota=5.0)
+        self.assertNotEqual(clave, clave_cache('notas', cursos=[self.curso], estudiantes=[self.estudiante]))
+
+    def test_cacheado_recalcula_tras_una_escritura(self):
+        llamadas = []
+
+        def calcular():
+            llamadas.append(1)
+            return len(llamadas)
+
+        self.assertEqual(cacheado('prueba', calcular, cursos=[self.curso]), 1)
+        self.assertEqual(cacheado('prueba', calcular, cursos=[self.curso]), 1)
+        self.inscripcion.calificaciones.update(nota=4.0)
+        self.assertEqual(cacheado('prueba', calcular, cursos=[self.curso]), 2)
+
+
+class PeticionesCondicionalesTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.datos = crear_datos(num_estudiantes=2, num_cursos=2, prefijo='c')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.datos['profesor'].usuario)
+        self.inscripcion = self.datos['estudiantes'][0].inscripciones.get(curso=self.datos['cursos'][0])
+        self.url = reverse('api_calificaciones', args=[self.inscripcion.id])
+
+    def test_sin_cambios_devuelve_304_sin_serializar(self):
+        respuesta = self.client.get(self.url)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertIn('ETag', respuesta)
+        self.assertIn('no-cache', respuesta['Cache-Control'])
+
+        with CaptureQueriesContext(connection) as consultas:
+            condicional = self.client.get(self.url, HTTP_IF_NONE_MATCH=respuesta['ETag'])
+        self.assertEqual(condicional.status_code, 304)
+        self.assertEqual(condicional['ETag'], respuesta['ETag'])
+        self.assertFalse(any('gestion_notas_calificacion' in c['sql'] for c in consultas.captured_queries))
+
+    def test_cambiar_una_nota_o_los_pesos_cambia_el_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        self.inscripcion.calificaciones.update(nota=1.5)
+        respuesta = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertNotEqual(respuesta['ETag'], etag)
+
+        etag = respuesta['ETag']
+        self.datos['cursos'][0].configuracion_evaluaciones.update(porcentaje=10)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_las_notas_de_otro_curso_no_invalidan(self):
+        etag = self.client.get(self.url)['ETag']
+        Calificacion.objects.filter(inscripcion__curso=self.datos['cursos'][1],
+                                    inscripcion__estudiante=self.datos['estudiantes'][1]).update(nota=2.0)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_estadisticas(self):
+        self.client.force_login(self.datos['admin'])
+        url = reverse('estadisticas_dashboard')
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_busqueda_etag_del_contenido(self):
+        self.client.force_login(self.datos['admin'])
+        url = reverse('busqueda_global')
+        etag = self.client.get(url, {'q': 'Materia'})['ETag']
+        with CaptureQueriesContext(connection) as consultas:
+            self.assertEqual(self.client.get(url, {'q': 'Materia'}, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        # Sin versiones de los nombres, la búsqueda se ejecuta igual: el 304 solo ahorra la transferencia
+        self.assertTrue(any('gestion_notas_materia' in c['sql'] for c in consultas.captured_queries))
+        Materia.objects.filter(pk=self.datos['cursos'][0].materia_id).update(nombre='Materia renombrada')
+        self.assertEqual(self.client.get(url, {'q': 'Materia'}, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class CalificacionesLoteTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.datos = crear_datos(num_estudiantes=4, num_cursos=2, prefijo='l')
+
+    def setUp(self):
+        self.client.force_login(self.datos['profesor'].usuario)
+        self.curso = self.datos['cursos'][0]
+        self.url = reverse('api_calificaciones_lote')
+
+    def test_matriz_del_curso_coincide_con_la_api_individual(self):
+        respuesta = self.client.get(self.url, {'curso': self.curso.id})
+        self.assertEqual(respuesta.status_code, 200)
+        data = respuesta.json()
+        self.assertEqual(len(data['filas']), 4)
+        self.assertEqual(len(data['tipos']), len(data['pesos'][str(self.curso.id)]))
+
+        for fila in data['filas']:
+            self.assertEqual(len(fila['notas']), len(data['tipos']))
+            individual = self.client.get(reverse('api_calificaciones', args=[fila['inscripcion']])).json()
+            self.assertEqual(fila['promedio'], individual['promedio'])
+            self.assertEqual(fila['estado'], individual['estado'])
+
+    def test_lista_de_inscripciones_de_varios_cursos(self):
+        estudiante = self.datos['estudiantes'][0]
+        ids = list(estudiante.inscripciones.values_list('id', flat=True))
+        data = self.client.get(self.url, {'inscripciones': ','.join(map(str, ids))}).json()
+        self.assertEqual(sorted(fila['inscripcion'] for fila in data['filas']), sorted(ids))
+        self.assertEqual(len(data['pesos']), 2)
+
+    def test_permisos_y_errores(self):
+        self.client.force_login(self.datos['estudiantes'][0].usuario)
+        self.assertEqual(self.client.get(self.url, {'curso': self.curso.id}).status_code, 403)
+        propia = self.datos['estudiantes'][0].inscripciones.first()
+        self.assertEqual(self.client.get(self.url, {'inscripciones': propia.id}).status_code, 200)
+
+        self.assertEqual(self.client.get(self.url).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'inscripciones': 'x'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'inscripciones': '999999'}).status_code, 404)
+
+    def test_curso_ajeno_sin_inscripciones(self):
+        usuario = Usuario.objects.create_user(username='l-otro', password='clave123', documento='l-P1', rol='profesor')
+        otro = Profesor.objects.create(usuario=usuario, especialidad='Redes', titulo_academico='MSc')
+        vacio = Curso.objects.create(materia=self.curso.materia, periodo=self.datos['periodo'], profesor=otro,
+                                     grupo='Z', horario='Vie 06:00-07:00')
+        self.assertEqual(self.client.get(self.url, {'curso': vacio.id}).status_code, 403)
+        self.assertEqual(self.client.get(self.url, {'curso': 999999}).status_code, 404)
+        self.client.force_login(usuario)
+        self.assertEqual(self.client.get(self.url, {'curso': vacio.id}).status_code, 200)
+
+    def test_consultas_fijas(self):
+        with CaptureQueriesContext(connection) as consultas:
+            self.client.get(self.url, {'curso': self.curso.id})
+        ampliar_datos(self.datos, num_estudiantes=5)
+        with CaptureQueriesContext(connection) as mas_datos:
+            self.client.get(self.url, {'curso': self.curso.id})
+        self.assertEqual(len(mas_datos), len(consultas))
+
+
+class PurgaNotificacionesTests(TestCase):
+    def setUp(self):
+        self.usuario = Usuario.objects.create_user(username='lector', password='clave123', documento='N0')
+        viejas = timezone.now() - timedelta(days=200)
+        for i in range(5):
+            Notificacion.objects.create(usuario=self.usuario, tipo='general', titulo=f'Vieja {i}', mensaje='',
+                                        leida=True)
+        Notificacion.objects.create(usuario=self.usuario, tipo='general', titulo='Sin leer', mensaje='')
+        Notificacion.objects.update(fecha_creacion=viejas)
+        Notificacion.objects.create(usuario=self.usuario, tipo='general', titulo='Reciente', mensaje='', leida=True)
+
+    def purgar(self, **opciones):
+        salida = io.StringIO()
+        call_command('purgar_notificaciones', dias=180, stdout=salida, **opciones)
+        return salida.getvalue()
+
+    def test_elimina_solo_leidas_antiguas_en_lotes(self):
+        salida = self.purgar(lote=2)
+        self.assertIn('Retención aplicada: 5 notificaciones eliminadas', salida)
+        # 5 filas en lotes de 2: tres sentencias
+        self.assertEqual(re.findall(r'  (\d+) notificaciones eliminadas', salida), ['2', '4', '5'])
+        self.assertEqual(set(Notificacion.con_archivados.values_list('titulo', flat=True)), {'Sin leer', 'Reciente'})
+
+    def test_archivar_conserva_las_filas(self):
+        salida = self.purgar(lote=3, archivar=True)
+        self.assertIn('Retención aplicada: 5 notificaciones archivadas', salida)
+        self.assertEqual(Notificacion.con_archivados.count(), 7)
+        self.assertEqual(set(Notificacion.objects.values_list('titulo', flat=True)), {'Sin leer', 'Reciente'})
+        self.assertIn('Retención aplicada: 0 notificaciones archivadas', self.purgar(archivar=True))
+
+    def test_simular_no_modifica(self):
+        self.assertIn('5 notificaciones leídas', self.purgar(simular=True))
+        self.assertEqual(Notificacion.con_archivados.count(), 7)
+
+    def test_argumentos_invalidos(self):
+        with self.assertRaises(CommandError):
+            self.purgar(lote=0)
+
+
+class CierrePeriodoTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.datos = crear_datos(num_estudiantes=3, num_cursos=2, prefijo='h')
+
+    def setUp(self):
+        self.periodo = self.datos['periodo']
+        self.estudiante = self.datos['estudiantes'][0]
+
+    def test_cerrar_congela_promedios_y_estado(self):
+        inscripciones = InscripcionCurso.objects.filter(curso__periodo=self.periodo).con_pesos()
+        esperados = {insc.id: insc.calcular_promedio() for insc in inscripciones}
+
+        self.assertEqual(self.periodo.cerrar(), len(esperados))
+        self.periodo.refresh_from_db()
+        self.assertTrue(self.periodo.cerrado)
+        self.assertIsNotNone(self.periodo.fecha_cierre)
+        for registro in HistorialAcademico.objects.filter(periodo=self.periodo):
+            self.assertAlmostEqual(float(registro.promedio), esperados[registro.inscripcion_id])
+            self.assertEqual(registro.estado, estado_segun_promedio(esperados[registro.inscripcion_id]))
+
+        with self.assertRaises(ValueError):
+            self.periodo.cerrar()
+
+    def test_el_historial_no_cambia_con_las_notas_vivas(self):
+        call_command('cerrar_periodo', self.periodo.nombre, stdout=io.StringIO())
+        self.periodo.refresh_from_db()
+        antes = [r.promedio for r in HistorialAcademico.objects.de_estudiante(self.estudiante, self.periodo)]
+
+        Calificacion.objects.filter(inscripcion__estudiante=self.estudiante).update(nota=0.5)
+        with self.assertNumQueries(1):
+            despues = [r.promedio for r in HistorialAcademico.objects.de_estudiante(self.estudiante, self.periodo)]
+        self.assertEqual(antes, despues)
+
+        with self.assertRaises(TypeError):
+            HistorialAcademico.objects.update(promedio=5)
+
+    def test_boletin_por_periodo_lee_el_historial(self):
+        from .views import descargar_boletin_periodo
+        self.periodo.cerrar()
+        peticion = RequestFactory().get('/')
+        peticion.user = self.estudiante.usuario
+        # Periodo e historial congelado: sin leer inscripciones ni notas vivas
+        with self.assertNumQueries(2):
+            respuesta = descargar_boletin_periodo(peticion, self.periodo.id)
+        self.assertEqual(respuesta['Content-Type'], 'application/pdf')
+
+    def test_no_se_califica_en_un_periodo_cerrado(self):
+        self.periodo.cerrar()
+        inscripcion = self.estudiante.inscripciones.first()
+        calificacion = inscripcion.calificaciones.first()
+        self.client.force_login(self.datos['profesor'].usuario)
+
+        self.client.post(reverse('registrar_calificacion', args=[inscripcion.id]),
+                         {'tipo_evaluacion': calificacion.tipo_evaluacion_id, 'nota': '1.0'})
+        calificacion.refresh_from_db()
+        self.assertNotEqual(float(calificacion.nota), 1.0)
+
+        respuesta = self.client.post(reverse('eliminar_calificacion', args=[calificacion.id]))
+        self.assertEqual(respuesta.status_code, 409)
+
+    def test_historial_combina_periodos_cerrados_y_abiertos(self):
+        abiertos = HistorialAcademico.objects.de_estudiante(self.estudiante)
+        self.assertEqual(len(abiertos), self.estudiante.inscripciones.count())
+        self.assertTrue(all(r.pk is None for r in abiertos))
+
+        self.periodo.cerrar()
+        cerrados = HistorialAcademico.objects.de_estudiante(self.estudiante)
+        self.assertTrue(all(r.pk is not None for r in cerrados))
+        self.assertEqual([(r.materia_codigo, r.promedio) for r in cerrados],
+                         [(r.materia_codigo, r.promedio) for r in abiertos])
+
+
+class RegistroAcumuladoTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.datos = crear_datos(num_estudiantes=4, num_cursos=2, prefijo='g')
+        cls.datos['periodo'].cerrar()
+        # Segundo periodo con un curso más para todos los estudiantes
+        cls.datos['periodo'] = PeriodoAcademico.objects.create(
+            nombre='g-2025-2', fecha_inicio=date(2025, 8, 1), fecha_fin=date(2025, 12, 15), activo=False
+        )
+        ampliar_datos(cls.datos, num_cursos=1)
+        cls.datos['periodo'].cerrar()
+
+    def esperado(self, estudiante):
+        registros = HistorialAcademico.objects.filter(estudiante=estudiante, promedio__isnull=False)
+        creditos = sum(r.creditos for r in registros)
+        promedio = sum(r.promedio * r.creditos for r in registros) / creditos
+        return (round(promedio, 2), sum(r.creditos for r in registros if r.estado == 'Aprobado'),
+                sum(1 for r in registros if r.estado == 'Reprobado'))
+
+    def actual(self, estudiante):
+        acumulado = RegistroAcumulado.objects.get(estudiante=estudiante)
+        return acumulado.promedio_acumulado, acumulado.creditos_aprobados, acumulado.cursos_reprobados
+
+    def test_el_cierre_acumula_cada_periodo(self):
+        for estudiante in self.datos['estudiantes']:
+            self.assertEqual(HistorialAcademico.objects.filter(estudiante=estudiante).count(), 3)
+            self.assertEqual(self.actual(estudiante), self.esperado(estudiante))
+
+    def test_recalcular_coincide_con_el_incremental(self):
+        antes = {e.id: self.actual(e) for e in self.datos['estudiantes']}
+        call_command('recalcular_acumulados', lote=2, stdout=io.StringIO())
+        self.assertEqual({e.id: self.actual(e) for e in self.datos['estudiantes']}, antes)
+
+    def test_ranking_del_programa(self):
+        ranking = list(RegistroAcumulado.objects.ranking(self.datos['programa']))
+        self.assertEqual(len(ranking), 4)
+        promedios = [r.promedio_acumulado for r in ranking]
+        self.assertEqual(promedios, sorted(promedios, reverse=True))
+        self.assertEqual(ranking[0].puesto, 1)
+        for registro in ranking:
+            with self.assertNumQueries(1):
+                self.assertEqual(registro.calcular_puesto(), registro.puesto)
+
+        # Empate en promedio: decide creditos_aprobados, igual en el ranking y en calcular_puesto
+        primero, segundo = ranking[:2]
+        for registro, creditos in [(primero, 10), (segundo, 3)]:
+            RegistroAcumulado.objects.filter(pk=registro.pk).update(promedio_acumulado=Decimal('4.00'),
+                                                                    creditos_aprobados=creditos)
+        ranking = list(RegistroAcumulado.objects.ranking(self.datos['programa']))
+        self.assertEqual([(r.pk, r.puesto) for r in ranking[:2]], [(primero.pk, 1), (segundo.pk, 2)])
+        for registro in ranking:
+            self.assertEqual(registro.calcular_puesto(), registro.puesto)
+
+
+class PromedioAlmacenadoTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.datos = crear_datos(num_estudiantes=4, num_cursos=2, prefijo='p')
+
+    def setUp(self):
+        self.curso = self.datos['cursos'][0]
+
+    def assertAlmacenadosCorrectos(self):
+        for inscripcion in InscripcionCurso.con_archivados.con_pesos():
+            calculado = inscripcion.calcular_promedio()
+            self.assertEqual(inscripcion.promedio_almacenado, decimal_promedio(calculado), inscripcion.id)
+
+    def test_se_mantiene_con_notas_y_pesos(self):
+        self.assertAlmacenadosCorrectos()
+
+        calificacion = Calificacion.objects.filter(inscripcion__curso=self.curso).first()
+        calificacion.nota = 0.5
+        calificacion.save()
+        self.assertAlmacenadosCorrectos()
+
+        config = self.curso.configuracion_evaluaciones.first()
+        config.porcentaje = 80
+        config.save()
+        self.assertAlmacenadosCorrectos()
+
+        ConfiguracionEvaluacion.objects.filter(curso=self.curso).update(porcentaje=10)
+        Calificacion.objects.filter(inscripcion__curso=self.datos['cursos'][1]).update(nota=4.5)
+        calificacion.delete()
+        self.assertAlmacenadosCorrectos()
+
+    def test_un_cambio_de_pesos_recalcula_solo_su_curso(self):
+        otro = self.datos['cursos'][1]
+        config = self.curso.configuracion_evaluaciones.first()
+        config.porcentaje = 90
+        otros = list(otro.inscripciones.order_by('id').values_list('promedio_almacenado', flat=True))
+        with CaptureQueriesContext(connection) as consultas:
+            config.save()
+        actualizaciones = [c['sql'] for c in consultas.captured_queries
+                           if c['sql'].startswith('UPDATE "gestion_notas_inscripcioncurso"')]
+        self.assertEqual(len(actualizaciones), 1)
+        self.assertEqual(list(otro.inscripciones.order_by('id').values_list('promedio_almacenado', flat=True)), otros)
+
+    def test_comando_recalcular(self):
+        InscripcionCurso._base_manager.update(promedio_almacenado=None)
+        salida = io.StringIO()
+        call_command('recalcular_promedios', lote=1, stdout=salida)
+        self.assertIn(f'{InscripcionCurso.objects.count()} promedios actualizados', salida.getvalue())
+        self.assertAlmacenadosCorrectos()
+
+    def test_vista_previa_del_impacto_no_guarda(self):
+        tipos = self.datos['tipos']
+        self.client.force_login(self.datos['profesor'].usuario)
+        url = reverse('impacto_pesos', args=[self.curso.id])
+        antes = list(InscripcionCurso.objects.order_by('id').values_list('promedio_almacenado', flat=True))
+
+        # Todo el peso en la evaluación con peor nota de cada estudiante
+        pesos = {tipos[0].id: 100, tipos[1].id: 0, tipos[2].id: 0}
+        respuesta = self.client.post(url, json.dumps({'pesos': pesos}), content_type='application/json')
+        self.assertEqual(respuesta.status_code, 200)
+        data = respuesta.json()
+
+        esperados = InscripcionCurso.objects.filter(curso=self.curso).promedios_calculados(
+            pesos={self.curso.id: pesos})
+        cambian = sum(1 for almacenado, nuevo in esperados.values()
+                      if estado_segun_promedio(float(almacenado)) != estado_segun_promedio(nuevo))
+        self.assertEqual(data['inscripciones'], 4)
+        self.assertEqual(data['cambian_estado'], cambian)
+        self.assertEqual(data['aprueban'] + data['reprueban'], cambian)
+        self.assertEqual(list(InscripcionCurso.objects.order_by('id').values_list('promedio_almacenado', flat=True)),
+                         antes)
+
+        self.assertEqual(self.client.post(url, '{"pesos": {"x": 1}}', content_type='application/json').status_code,
+                         400)
+        self.client.force_login(self.datos['estudiantes'][0].usuario)
+        self.assertEqual(self.client.post(url, json.dumps({'pesos': pesos}),
+                                          content_type='application/json').status_code, 403)
+
+
+class InscripcionMasivaTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.datos = crear_datos(num_estudiantes=3, num_cursos=2, prefijo='i')
+        cls.nuevos = ampliar_datos({**cls.datos, 'prefijo': 'i2', 'cursos': [], 'estudiantes': []},
+                                   num_estudiantes=4)['estudiantes']
+
+    def setUp(self):
+        self.curso = Curso.objects.get(pk=self.datos['cursos'][0].pk)
+
+    def test_respeta_el_cupo_en_el_orden_recibido(self):
+        Curso.objects.filter(pk=self.curso.pk).update(cupo_maximo=self.curso.inscritos + 2)
+        resultados = inscribir([(e.id, self.curso.id) for e in self.nuevos])
+
+        self.assertEqual([r['estado'] for r in resultados], ['inscrito', 'inscrito', 'sin_cupo', 'sin_cupo'])
+        self.curso.refresh_from_db()
+        self.assertEqual(self.curso.inscritos, self.curso.cupo_maximo)
+        self.assertEqual(self.curso.inscritos, self.curso.inscripciones.count())
+
+    def test_resultado_por_par(self):
+        existente = self.datos['estudiantes'][0]
+        nuevo = self.nuevos[0]
+        resultados = inscribir([
+            (existente.id, self.curso.id), (nuevo.id, self.curso.id), (nuevo.id, self.curso.id),
+            (nuevo.id, 999999), (999999, self.curso.id),
+        ])
+        self.assertEqual([r['estado'] for r in resultados],
+                         ['ya_inscrito', 'inscrito', 'duplicado', 'curso_inexistente', 'estudiante_inexistente'])
+        self.curso.refresh_from_db()
+        self.assertEqual(self.curso.inscritos, self.curso.inscripciones.count())
+
+        self.datos['periodo'].cerrar()
+        self.assertEqual(inscribir([(self.nuevos[1].id, self.curso.id)])[0]['estado'], 'periodo_cerrado')
+
+    def test_api_y_comando(self):
+        self.client.force_login(self.datos['admin'])
+        pares = [{'estudiante': e.id, 'curso': self.curso.id} for e in self.nuevos[:2]]
+        respuesta = self.client.post(reverse('inscripcion_masiva'), json.dumps({'inscripciones': pares}),
+                                     content_type='application/json')
+        self.assertEqual(respuesta.json()['resumen'], {'inscrito': 2})
+        self.assertEqual(self.client.post(reverse('inscripcion_masiva'), '[]',
+                                          content_type='application/json').status_code, 400)
+
+        with tempfile.TemporaryDirectory() as directorio:
+            archivo = Path(directorio) / 'pares.csv'
+            archivo.write_text('estudiante,curso\n' + '\n'.join(f'{e.id},{self.curso.id}' for e in self.nuevos),
+                               encoding='utf-8')
+            salida = io.StringIO()
+            call_command('inscribir_lote', str(archivo), lote=3, stdout=salida)
+        self.assertIn('inscrito: 2, ya_inscrito: 2', salida.getvalue())
+
+
+class ContadorInscritosTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.datos = crear_datos(num_estudiantes=4, num_cursos=2, prefijo='ci')
+        cls.extra = ampliar_datos({**cls.datos, 'prefijo': 'ci2', 'cursos': [], 'estudiantes': []},
+                                  num_estudiantes=3)['estudiantes']
+
+    def inscritos(self):
+        return {c.pk: c.inscritos for c in Curso.con_archivados.filter(pk__in=[c.pk for c in self.datos['cursos']])}
+
+    def assertContadorCorrecto(self):
+        self.assertFalse(Curso.con_archivados.desfasados().exists())
+
+    def test_altas_y_bajas_individuales(self):
+        curso, otro = self.datos['cursos']
+        self.assertEqual(self.inscritos(), {curso.pk: 4, otro.pk: 4})
+
+        inscripcion = InscripcionCurso.objects.create(estudiante=self.extra[0], curso=curso)
+        self.assertEqual(self.inscritos()[curso.pk], 5)
+        inscripcion.curso = otro
+        inscripcion.save()
+        self.assertEqual(self.inscritos(), {curso.pk: 4, otro.pk: 5})
+        inscripcion.archived = True
+        inscripcion.save()
+        self.assertEqual(self.inscritos()[otro.pk], 4)
+        inscripcion.delete()
+        self.assertEqual(self.inscritos()[otro.pk], 4)
+        self.assertContadorCorrecto()
+
+    def test_rutas_masivas_y_cascada(self):
+        curso, otro = self.datos['cursos']
+        InscripcionCurso.objects.bulk_create([InscripcionCurso(estudiante=e, curso=curso) for e in self.extra])
+        self.assertEqual(self.inscritos()[curso.pk], 7)
+        InscripcionCurso.objects.bulk_create([InscripcionCurso(estudiante=e, curso=curso) for e in self.extra],
+                                             ignore_conflicts=True)
+        self.assertEqual(self.inscritos()[curso.pk], 7)
+
+        archive_queryset(InscripcionCurso.objects.filter(curso=curso, estudiante__in=self.extra[:2]))
+        self.assertEqual(self.inscritos()[curso.pk], 5)
+
+        # Borrar un estudiante borra en cascada sus inscripciones en ambos cursos
+        self.datos['estudiantes'][0].delete()
+        self.assertEqual(self.inscritos(), {curso.pk: 4, otro.pk: 3})
+        InscripcionCurso.con_archivados.filter(curso=otro).delete()
+        self.assertEqual(self.inscritos()[otro.pk], 0)
+        self.assertContadorCorrecto()
+
+    def test_formulario_rechaza_duplicar_una_inscripcion_archivada(self):
+        inscripcion = InscripcionCurso.objects.filter(curso=self.datos['cursos'][0]).first()
+        archive_queryset(InscripcionCurso.objects.filter(pk=inscripcion.pk))
+        Formulario = modelform_factory(InscripcionCurso, fields=['estudiante', 'curso'])
+        formulario = Formulario({'estudiante': inscripcion.estudiante_id, 'curso': inscripcion.curso_id})
+        # objects no ve la fila archivada, pero la restricción única de la base sí
+        self.assertFalse(formulario.is_valid())
+        self.assertTrue(formulario.has_error('__all__', 'unique_together'))
+        self.assertEqual(InscripcionCurso.con_archivados.filter(pk=inscripcion.pk).count(), 1)
+
+    def test_comando_reconciliar(self):
+        curso = self.datos['cursos'][0]
+        Curso._base_manager.filter(pk=curso.pk).update(inscritos=40)
+
+        salida = io.StringIO()
+        call_command('reconciliar_inscritos', simular=True, stdout=salida)
+        self.assertIn(f'curso {curso.pk}: 40 -> 4', salida.getvalue())
+        self.assertEqual(self.inscritos()[curso.pk], 40)
+
+        call_command('reconciliar_inscritos', lote=1, stdout=io.StringIO())
+        self.assertEqual(self.inscritos()[curso.pk], 4)
+        self.assertContadorCorrecto()
+
+    @override_settings(TEMPLATES=[{
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'OPTIONS': {'loaders': [('django.template.loaders.locmem.Loader', PLANTILLAS_CONSULTAS)]},
+    }])
+    def test_listado_de_cursos_sin_consulta_por_fila(self):
+        self.client.force_login(self.datos['admin'])
+        url = reverse('gestion_cursos')
+        with CaptureQueriesContext(connection) as antes:
+            self.client.get(url)
+        ampliar_datos(self.datos, num_cursos=5)
+        with CaptureQueriesContext(connection) as despues:
+            respuesta = self.client.get(url)
+        self.assertEqual(len(despues), len(antes))
+        self.assertEqual({c.inscritos for c in respuesta.context['cursos']}, {4})
+
+    @override_settings(TEMPLATES=[{
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'OPTIONS': {'loaders': [('django.template.loaders.locmem.Loader', PLANTILLAS_CONSULTAS)]},
+    }])
+    def test_promedio_de_mis_cursos_incluye_los_ceros(self):
+        curso = self.datos['cursos'][0]
+        cero, otro, *resto = InscripcionCurso.objects.filter(curso=curso).order_by('id')
+        InscripcionCurso._base_manager.filter(pk=cero.pk).update(promedio_almacenado=Decimal('0.00'))
+        InscripcionCurso._base_manager.filter(pk=otro.pk).update(promedio_almacenado=Decimal('3.25'))
+        InscripcionCurso._base_manager.filter(pk__in=[i.pk for i in resto]).update(promedio_almacenado=None)
+        self.client.force_login(self.datos['profesor'].usuario)
+        datos = {d['curso'].pk: d for d in self.client.get(reverse('mis_cursos')).context['cursos_data']}
+        # Sin notas no cuenta; un 0.00 sí, como calcular_promedio() en la versión por fila
+        self.assertEqual(datos[curso.pk]['promedio_curso'], round((0 + 3.25) / 2, 2))
+        self.assertEqual(datos[curso.pk]['total_estudiantes'], 4)
+
+
+class HorariosTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.datos = crear_datos(num_estudiantes=2, num_cursos=2, prefijo='h')
+        cls.nuevo = ampliar_datos({**cls.datos, 'prefijo': 'h2', 'cursos': [], 'estudiantes': []},
+                                  num_estudiantes=1)['estudiantes'][0]
+
+    def crear_curso(self, grupo, horario, aula):
+        curso = self.datos['cursos'][0]
+        return Curso.objects.create(materia=curso.materia, periodo=curso.periodo, profesor=curso.profesor,
+                                    grupo=grupo, horario=horario, aula=aula)
+
+    def test_parsear_horario(self):
+        self.assertEqual(parsear_horario('Lun-Mié 10:00-12:00; Vie 7-9'), [
+            Franja(0, time(10), time(12)), Franja(2, time(10), time(12)), Franja(4, time(7), time(9)),
+        ])
+        self.assertEqual(parsear_horario(''), [])
+        for invalido in ('Lunes', 'Xyz 10:00-12:00', 'Lun 12:00-10:00', 'Lun 25:00-26:00'):
+            with self.assertRaises(ValueError):
+                parsear_horario(invalido)
+
+    def test_indice_intervalos(self):
+        indice = IndiceIntervalos()
+        for inicio, fin, etiqueta in [(0, 100, 'a'), (10, 20, 'b'), (200, 300, 'c')]:
+            indice.agregar('x', inicio, fin, etiqueta)
+        # [150, 180) empieza después de 'b' pero dentro de nada; [50, 60) solo choca con 'a' (que abarca a 'b')
+        self.assertIsNone(indice.choque('x', 150, 180))
+        self.assertEqual(indice.choque('x', 50, 60)[2], 'a')
+        self.assertEqual(indice.choque('x', 290, 400)[2], 'c')
+        self.assertIsNone(indice.choque('x', 100, 200))
+        self.assertIsNone(indice.choque('y', 0, 1000))
+
+    def test_franjas_se_sincronizan_y_choque_de_aula(self):
+        curso = self.crear_curso('B', 'Mar-Jue 08:00-10:00', 'Aula 9')
+        self.assertEqual(sorted(curso.franjas.values_list('dia', 'aula')), [(1, 'aula 9'), (3, 'aula 9')])
+        Curso.objects.filter(pk=curso.pk).update(horario='Vie 08:00-10:00')
+        self.assertEqual(list(curso.franjas.values_list('dia', flat=True)), [4])
+
+        otro = Curso(materia=curso.materia, periodo=curso.periodo, profesor=curso.profesor, grupo='C',
+                     horario='vie 09:00-11:00', aula='AULA 9')
+        with self.assertRaises(ValidationError) as error:
+            otro.full_clean()
+        self.assertIn('aula', error.exception.message_dict)
+        otro.horario = 'Vie 10:00-12:00'
+        with self.assertNumQueries(1):
+            self.assertIsNone(choque_de_aula(otro))
+        otro.full_clean()
+        # Un horario sin formato no impide guardar: el curso queda sin franjas y se avisa en el log
+        otro.horario = 'cuando se pueda'
+        with self.assertLogs('gestion_notas.horarios', 'WARNING'):
+            otro.full_clean()
+        otro.save()
+        self.assertFalse(otro.franjas.exists())
+
+    def test_inscripcion_rechaza_choques(self):
+        cruzado, libre = self.datos['cursos'][0], self.crear_curso('B', 'Vie 14:00-16:00', 'Aula 8')
+        nocturno = self.crear_curso('C', 'Vie 15:00-17:00', 'Aula 7')
+        InscripcionCurso.objects.create(estudiante=self.nuevo, curso=self.datos['cursos'][1])
+
+        with self.assertRaises(ValidationError):
+            InscripcionCurso(estudiante=self.nuevo, curso=cruzado).full_clean()
+        resultados = inscribir([(self.nuevo.id, cruzado.id), (self.nuevo.id, libre.id), (self.nuevo.id, nocturno.id)])
+        self.assertEqual([r['estado'] for r in resultados], ['choque_horario', 'inscrito', 'choque_horario'])
+        cruzado.refresh_from_db()
+        self.assertEqual(cruzado.inscritos, cruzado.inscripciones.count())
+
+    def test_reporte_de_choques_del_periodo(self):
+        # Los cursos de crear_datos comparten horario: cada estudiante tiene un choque entre ellos
+        self.crear_curso('B', 'Lun 11:00-13:00', 'Aula 0')
+        choques = choques_periodo(self.datos['periodo'])
+        por_tipo = {tipo: [c for c in choques if c['tipo'] == tipo] for tipo in ('aula', 'estudiante')}
+        self.assertEqual([(c['clave'], c['dia'], c['inicio'], c['fin']) for c in por_tipo['aula']],
+                         [('aula 0', 'lun', '11:00', '12:00')])
+        self.assertEqual(len(por_tipo['estudiante']), 2 * 2)  # 2 estudiantes x 2 días
+
+        self.client.force_login(self.datos['admin'])
+        respuesta = self.client.get(reverse('choques_horario', args=[self.datos['periodo'].id]))
+        self.assertEqual((respuesta.json()['aulas'], respuesta.json()['estudiantes']), (1, 4))
+        salida = io.StringIO()
+        call_command('choques_horario', self.datos['periodo'].nombre, stdout=salida)
+        self.assertIn('1 choques de aula y 4 de estudiante', salida.getvalue())
+
+
+class OcupacionAulasTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        # Cursos de crear_datos: 'Lun-Mie 10:00-12:00' en 'Aula 0' y 'Aula 1'
+        cls.datos = crear_datos(num_estudiantes=1, num_cursos=2, prefijo='oa')
+        curso = cls.datos['cursos'][0]
+        Curso.objects.create(materia=curso.materia, periodo=curso.periodo, profesor=curso.profesor, grupo='B',
+                             horario='Lun 07:15-08:00; Sab 06:00-22:00', aula='Aula 0')
+
+    def test_mascaras_y_utilizacion(self):
+        self.assertEqual(mascara(7 * 60 + 15, 8 * 60), 0b1100)  # 07:00-07:30 y 07:30-08:00
+        self.assertEqual(mascara(7 * 60 + 15, 8 * 60, completos=True), 0b1000)
+        self.assertEqual(tramos(0b1110011), [(0, 2), (4, 3)])
+
+        mapa = MapaOcupacion.de_periodo(self.datos['periodo'])
+        self.assertEqual(mapa.bloques_ocupados('aula 0'), 4 + 4 + 2 + BLOQUES)
+        self.assertAlmostEqual(mapa.utilizacion('aula 1'), 8 / (6 * BLOQUES))
+        matriz = mapa.como_dict()
+        aula0 = next(a for a in matriz['aulas'] if a['aula'] == 'aula 0')
+        self.assertEqual(aula0['ocupacion']['lun'][:14], '00110000111100')
+        self.assertEqual(aula0['ocupacion']['sab'], '1' * BLOQUES)
+
+    def test_busqueda_de_aulas_libres(self):
+        mapa = MapaOcupacion.de_periodo(self.datos['periodo'])
+        # Lunes de 07:00 a 13:00 en el aula 0: libre de 08:00 a 10:00 y de 12:00 a 13:00
+        ventanas = mapa.libres(90, dia=0, desde=7 * 60, hasta=13 * 60, aulas=['Aula 0'])
+        self.assertEqual(ventanas, [{'aula': 'aula 0', 'dia': 'lun', 'inicio': '08:00', 'fin': '10:00'}])
+        self.assertEqual(len(mapa.libres(60, dia=0, desde=7 * 60, hasta=13 * 60, aulas=['Aula 0'])), 2)
+        self.assertEqual(mapa.libres(150, dia=0, desde=7 * 60, hasta=13 * 60, aulas=['Aula 0']), [])
+        self.assertEqual(mapa.libres(30, dia=5, aulas=['AULA 0']), [])
+
+        self.client.force_login(self.datos['admin'])
+        url = reverse('aulas_libres', args=[self.datos['periodo'].id])
+        respuesta = self.client.get(url, {'duracion': 60, 'dia': 'sáb'}).json()
+        self.assertEqual({v['aula'] for v in respuesta['ventanas']}, {'aula 1'})
+        self.assertEqual(self.client.get(url, {'dia': 'xyz'}).status_code, 400)
+
+    def test_exportar_json_y_excel(self):
+        self.client.force_login(self.datos['admin'])
+        url = reverse('ocupacion_aulas', args=[self.datos['periodo'].id])
+        self.assertEqual(len(self.client.get(url).json()['aulas']), 2)
+        respuesta = self.client.get(url, {'formato': 'excel'})
+        self.assertEqual(respuesta['Content-Type'],
+                         'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+        self.assertTrue(respuesta.content.startswith(b'PK'))
+
+
+class AnaliticaCursoTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        # Notas de crear_datos: 2.5 + (i + j) % 3 * 0.75 con pesos 40/30/30
+        cls.datos = crear_datos(num_estudiantes=4, num_cursos=1, prefijo='an')
+        cls.curso = cls.datos['cursos'][0]
+
+    def test_coincide_con_el_calculo_por_inscripcion(self):
+        data = analitica_curso(self.curso.id)
+        esperados = {i.id: i.calcular_promedio() for i in self.curso.inscripciones.all()}
+        self.assertEqual({e['inscripcion']: e['promedio'] for e in data['estudiantes']}, esperados)
+
+        valores = sorted(esperados.values())
+        self.assertEqual(data['con_promedio'], 4)
+        self.assertEqual(sum(b['estudiantes'] for b in data['histograma']), 4)
+        self.assertEqual(len(data['histograma']), 10)
+        self.assertAlmostEqual(data['promedio'], round(sum(valores) / 4, 2))
+        self.assertEqual((data['minimo'], data['maximo']), (valores[0], valores[-1]))
+        self.assertEqual([t['porcentaje'] for t in data['tipos']], [40.0, 30.0, 30.0])
+        # El de mayor promedio está en el percentil 100
+        mejor = max(data['estudiantes'], key=lambda e: e['promedio'])
+        self.assertEqual(mejor['percentil'], 100.0)
+
+    def test_estudiante_sin_notas_y_tipo_sin_peso(self):
+        estudiante = ampliar_datos({**self.datos, 'prefijo': 'an2', 'cursos': [], 'estudiantes': []},
+                                   num_estudiantes=1)['estudiantes'][0]
+        InscripcionCurso.objects.create(estudiante=estudiante, curso=self.curso)
+        data = analitica_curso(self.curso.id)
+        sin_notas = next(e for e in data['estudiantes'] if e['codigo'] == estudiante.codigo_estudiantil)
+        self.assertEqual((sin_notas['promedio'], sin_notas['percentil'], sin_notas['estado']),
+                         (None, None, 'Pendiente'))
+        self.assertEqual((data['inscritos'], data['con_promedio']), (5, 4))
+
+    def test_vista_cacheada_por_version_del_curso(self):
+        self.client.force_login(self.datos['profesor'].usuario)
+        url = reverse('analitica_curso', args=[self.curso.id])
+        antes = self.client.get(url).json()
+        calificacion = Calificacion.objects.filter(inscripcion__curso=self.curso).first()
+        calificacion.nota = 5
+        calificacion.save()
+        despues = self.client.get(url).json()
+        self.assertNotEqual(antes['promedio'], despues['promedio'])
+
+        self.client.force_login(self.datos['estudiantes'][0].usuario)
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+
+class CuboRendimientoTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        # El cubo se refresca al confirmar la transacción
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.datos = crear_datos(num_estudiantes=6, num_cursos=2, prefijo='cb')
+
+    def celdas_directas(self):
+        """Lo que el cubo debería contener, agregado directamente desde las inscripciones"""
+        celdas = {}
+        for inscripcion in InscripcionCurso.objects.select_related('estudiante', 'curso__materia'):
+            clave = (inscripcion.curso.periodo_id, inscripcion.curso.materia_id, inscripcion.estudiante.programa_id,
+                     inscripcion.estudiante.semestre)
+            celda = celdas.setdefault(clave, [0, 0, 0])
+            celda[0] += 1
+            if inscripcion.promedio_almacenado is not None:
+                celda[1] += 1
+                celda[2] += inscripcion.promedio_almacenado >= 3
+        return celdas
+
+    def celdas_cubo(self):
+        return {(c.periodo_id, c.materia_id, c.programa_id, c.semestre): [c.inscripciones, c.con_promedio, c.aprobados]
+                for c in CuboRendimiento.objects.all()}
+
+    def test_se_mantiene_con_notas_e_inscripciones(self):
+        self.assertEqual(self.celdas_cubo(), self.celdas_directas())
+
+        calificaciones = Calificacion.objects.filter(inscripcion__curso=self.datos['cursos'][0])
+        with self.captureOnCommitCallbacks(execute=True) as refrescos:
+            calificaciones.update(nota=0)
+        # Nada se recalcula antes del commit, y una sola vez por transacción
+        self.assertEqual(len(refrescos), 1)
+        self.assertEqual(self.celdas_cubo(), self.celdas_directas())
+
+        inscripcion = InscripcionCurso.objects.filter(curso=self.datos['cursos'][1]).first()
+        inscripcion.archived = True
+        with self.captureOnCommitCallbacks(execute=True):
+            inscripcion.save()
+        self.assertEqual(self.celdas_cubo(), self.celdas_directas())
+
+        estudiante = self.datos['estudiantes'][0]
+        estudiante.semestre = 7
+        with self.captureOnCommitCallbacks(execute=True):
+            estudiante.save()
+        self.assertEqual(self.celdas_cubo(), self.celdas_directas())
+
+    def test_solo_se_recalculan_las_celdas_afectadas(self):
+        estudiante = self.datos['estudiantes'][0]
+        inscripcion = estudiante.inscripciones.first()
+        celda = (inscripcion.curso.periodo_id, inscripcion.curso.materia_id, estudiante.programa_id,
+                 estudiante.semestre)
+        antes = dict(CuboRendimiento.objects.values_list('id', 'fecha_actualizacion'))
+        with self.captureOnCommitCallbacks(execute=True):
+            for calificacion in inscripcion.calificaciones.all():
+                calificacion.nota = 5
+                calificacion.save()
+        cambiadas = {(c.periodo_id, c.materia_id, c.programa_id, c.semestre)
+                     for c in CuboRendimiento.objects.all() if c.fecha_actualizacion != antes.get(c.id)}
+        self.assertEqual(cambiadas, {celda})
+        self.assertEqual(self.celdas_cubo(), self.celdas_directas())
+
+    def test_resumen_agrega_las_celdas(self):
+        materia = self.datos['cursos'][0].materia
+        promedios = [i.promedio_almacenado for i in InscripcionCurso.objects.filter(curso__materia=materia)]
+        fila, = CuboRendimiento.objects.filter(materia=materia).resumen('materia')
+        self.assertEqual((fila['materia_id'], fila['inscripciones']), (materia.id, len(promedios)))
+        self.assertEqual(fila['aprobados'], sum(p >= 3 for p in promedios))
+        self.assertAlmostEqual(fila['promedio'], round(float(sum(promedios)) / len(promedios), 2))
+        self.assertEqual(fila['creditos_inscritos'], materia.creditos * len(promedios))
+
+        total, = CuboRendimiento.objects.resumen()
+        self.assertEqual(total['inscripciones'], InscripcionCurso.objects.count())
+
+    def test_comando_reconstruye_el_cubo(self):
+        esperado = self.celdas_cubo()
+        CuboRendimiento.objects.all().delete()
+        salida = io.StringIO()
+        call_command('recalcular_cubo', stdout=salida)
+        self.assertEqual(self.celdas_cubo(), esperado)
+        self.assertIn(f'{len(esperado)} celdas', salida.getvalue())
+
+    def test_vista_solo_administradores(self):
+        url = reverse('cubo_rendimiento')
+        self.client.force_login(self.datos['admin'])
+        data = self.client.get(url, {'dimensiones': 'programa,periodo'}).json()
+        self.assertEqual([f['inscripciones'] for f in data['filas']], [InscripcionCurso.objects.count()])
+        self.assertEqual(self.client.get(url, {'dimensiones': 'aula'}).status_code, 400)
+
+        self.client.force_login(self.datos['profesor'].usuario)
+        self.assertNotEqual(self.client.get(url).status_code, 200)
+
+
+class PuntajeRiesgoTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        # Promedios de crear_datos: 3.175, 3.25 y 3.325 en cada curso
+        cls.datos = crear_datos(num_estudiantes=3, num_cursos=2, prefijo='rg')
+        cls.periodo = cls.datos['periodo']
+        cls.estudiante = cls.datos['estudiantes'][0]
+        primero, segundo = cls.datos['cursos']
+        Calificacion.objects.filter(inscripcion__estudiante=cls.estudiante, inscripcion__curso=primero).update(nota=1)
+        # En el segundo curso le falta el Taller (30%): promedio parcial (2.5 * 40 + 4.0 * 30) / 70
+        Calificacion.objects.filter(inscripcion__estudiante=cls.estudiante, inscripcion__curso=segundo,
+                                    tipo_evaluacion=cls.datos['tipos'][1]).delete()
+
+    def test_caracteristicas_y_puntaje(self):
+        self.assertEqual(calcular_riesgo(self.periodo), 3)
+        puntaje = PuntajeRiesgo.objects.get(periodo=self.periodo, estudiante=self.estudiante)
+        parcial = (1.0 + (2.5 * 40 + 4.0 * 30) / 70) / 2
+        self.assertEqual(puntaje.promedio_parcial, Decimal(str(round(parcial, 2))))
+        self.assertEqual((puntaje.cursos, puntaje.cursos_en_riesgo, puntaje.evaluaciones_faltantes), (2, 1, 1))
+        self.assertIsNone(puntaje.tendencia)
+        esperado = 40 * (4 - parcial) / 2 + 25 * 1 / 2 + 20 * 1 / 6
+        self.assertAlmostEqual(float(puntaje.puntaje), esperado, places=2)
+        self.assertEqual(puntaje.nivel, 'medio')
+
+        primero = PuntajeRiesgo.objects.filter(periodo=self.periodo).order_by('-puntaje').first()
+        self.assertEqual(primero.estudiante_id, self.estudiante.id)
+
+    def test_tendencia_frente_a_periodos_anteriores(self):
+        anterior = PeriodoAcademico.objects.get(nombre='rg-2024-2')
+        otro = self.datos['estudiantes'][1]
+        HistorialAcademico.objects.create(estudiante=otro, periodo=anterior, materia_codigo='X1', materia_nombre='X',
+                                          grupo='A', creditos=3, promedio=Decimal('4.50'), estado='Aprobado')
+        calcular_riesgo(self.periodo)
+        puntaje = PuntajeRiesgo.objects.get(periodo=self.periodo, estudiante=otro)
+        self.assertEqual((puntaje.promedio_anterior, puntaje.tendencia), (Decimal('4.50'), Decimal('-1.25')))
+        # Promedio 3.25 (15 puntos) más la caída completa (15 puntos)
+        self.assertAlmostEqual(float(puntaje.puntaje), 30, places=2)
+
+    def test_recalculo_quita_estudiantes_inactivos(self):
+        calcular_riesgo(self.periodo)
+        Estudiante.objects.filter(pk=self.estudiante.pk).update(estado='retirado')
+        call_command('calcular_riesgo', periodo=[self.periodo.id], stdout=io.StringIO())
+        self.assertFalse(PuntajeRiesgo.objects.filter(estudiante=self.estudiante).exists())
+        self.assertEqual(PuntajeRiesgo.objects.filter(periodo=self.periodo).count(), 2)
+
+    def test_vista_de_alertas_y_reporte(self):
+        calcular_riesgo(self.periodo)
+        url = reverse('alertas_riesgo', args=[self.periodo.id])
+        self.client.force_login(self.datos['profesor'].usuario)
+        data = self.client.get(url, {'nivel': ['medio', 'alto']}).json()
+        self.assertEqual([e['codigo'] for e in data['estudiantes']], [self.estudiante.codigo_estudiantil])
+        data = self.client.get(url, {'orden': 'promedio', 'limite': 2}).json()
+        self.assertEqual(len(data['estudiantes']), 2)
+        self.assertEqual(self.client.get(url, {'orden': 'nombre'}).status_code, 400)
+
+        self.client.force_login(self.estudiante.usuario)
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        self.client.force_login(self.datos['admin'])
+        for formato, tipo in [('pdf', 'application/pdf'), ('csv', 'text/csv; charset=utf-8'),
+                              ('excel', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')]:
+            respuesta = self.client.post(reverse('generar_reporte'), {
+                'tipo_reporte': 'estudiantes_riesgo', 'formato': formato, 'periodo': self.periodo.id,
+            })
+            self.assertEqual(respuesta['Content-Type'], tipo)
+
+    def test_reporte_sin_puntajes_no_los_calcula(self):
+        self.client.force_login(self.datos['admin'])
+        respuesta = self.client.post(reverse('generar_reporte'), {
+            'tipo_reporte': 'estudiantes_riesgo', 'formato': 'pdf', 'periodo': self.periodo.id,
+        })
+        self.assertRedirects(respuesta, reverse('generar_reporte'), fetch_redirect_response=False)
+        self.assertFalse(PuntajeRiesgo.objects.filter(periodo=self.periodo).exists())
+
+
+class RankingTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.datos = crear_datos(num_estudiantes=4, num_cursos=2, prefijo='rk')
+        cls.periodo = cls.datos['periodo']
+
+    def setUp(self):
+        RANKINGS.clear()
+
+    def orden_esperado(self):
+        filas = PosicionRanking.objects.filter(periodo=self.periodo).order_by('-promedio', 'estudiante_id')
+        return [(fila.estudiante_id, fila.promedio) for fila in filas]
+
+    def test_clasificacion_con_empates(self):
+        clasificacion = Clasificacion()
+        for estudiante_id, promedio in [(1, Decimal('3.5')), (2, Decimal('4.2')), (3, Decimal('3.5')), (4, 1)]:
+            clasificacion.agregar(estudiante_id, promedio)
+        self.assertEqual(clasificacion.mejores(3), [(1, 2, Decimal('4.2')), (2, 1, Decimal('3.5')),
+                                                    (2, 3, Decimal('3.5'))])
+        self.assertEqual((clasificacion.puesto(Decimal('3.5')), clasificacion.puesto(1)), (2, 4))
+        clasificacion.quitar(2, Decimal('4.2'))
+        self.assertEqual((len(clasificacion), clasificacion.puesto(Decimal('3.5'))), (3, 1))
+
+    def test_posiciones_promedian_por_creditos(self):
+        estudiante = self.datos['estudiantes'][0]
+        posicion = PosicionRanking.objects.get(periodo=self.periodo, estudiante=estudiante)
+        promedios = [i.promedio_almacenado for i in estudiante.inscripciones.all()]
+        self.assertEqual(posicion.promedio, (sum(promedios) / len(promedios)).quantize(Decimal('0.01')))
+        self.assertEqual((posicion.creditos, posicion.programa_id), (6, self.datos['programa'].id))
+
+    def test_se_actualiza_con_los_cambios_de_notas(self):
+        programa = self.datos['programa'].id
+        ranking = ranking_periodo(self.periodo.id)
+        esperado = self.orden_esperado()
+        self.assertEqual([(e, p) for _, e, p in ranking.mejores(programa, 10)], esperado)
+
+        ultimo = esperado[-1][0]
+        with self.captureOnCommitCallbacks(execute=True):
+            Calificacion.objects.filter(inscripcion__estudiante_id=ultimo).update(nota=5)
+        # Solo se leen las filas que cambiaron
+        with self.assertNumQueries(2):
+            ranking = ranking_periodo(self.periodo.id)
+        self.assertEqual(ranking.puesto(ultimo), (1, 4))
+        self.assertEqual([(e, p) for _, e, p in ranking.mejores(programa, 10)], self.orden_esperado())
+        with self.assertNumQueries(1):
+            ranking_periodo(self.periodo.id)
+
+        # Sin notas sale del ranking
+        with self.captureOnCommitCallbacks(execute=True):
+            Calificacion.objects.filter(inscripcion__estudiante_id=ultimo).delete()
+        ranking = ranking_periodo(self.periodo.id)
+        self.assertIsNone(ranking.puesto(ultimo))
+        self.assertEqual(ranking.total(programa), 3)
+
+    def test_grupo_por_semestre(self):
+        estudiante = self.datos['estudiantes'][0]
+        ranking = ranking_periodo(self.periodo.id)
+        self.assertEqual(ranking.puesto(estudiante.id, por_semestre=True)[1], 1)
+        otro = self.datos['estudiantes'][1]
+        otro.semestre = estudiante.semestre
+        with self.captureOnCommitCallbacks(execute=True):
+            otro.save()
+        ranking = ranking_periodo(self.periodo.id)
+        self.assertEqual(ranking.total(self.datos['programa'].id, estudiante.semestre), 2)
+
+    def test_vistas(self):
+        estudiante = self.datos['estudiantes'][0]
+        self.client.force_login(self.datos['admin'])
+        data = self.client.get(reverse('ranking_programa', args=[self.periodo.id]),
+                               {'programa': self.datos['programa'].id, 'limite': 2}).json()
+        self.assertEqual([f['estudiante'] for f in data['mejores']], [e for e, _ in self.orden_esperado()[:2]])
+        self.assertEqual(data['total'], 4)
+
+        self.client.force_login(estudiante.usuario)
+        data = self.client.get(reverse('puesto_ranking', args=[self.periodo.id, estudiante.id])).json()
+        puesto = [e for e, _ in self.orden_esperado()].index(estudiante.id) + 1
+        self.assertEqual(data['programa'], {'puesto': puesto, 'total': 4})
+        otro = reverse('puesto_ranking', args=[self.periodo.id, self.datos['estudiantes'][1].id])
+        self.assertEqual(self.client.get(otro).status_code, 403)
+
+    def test_comando_reconstruye_las_posiciones(self):
+        esperado = self.orden_esperado()
+        PosicionRanking.objects.all().delete()
+        call_command('recalcular_ranking', periodo=[self.periodo.id], stdout=io.StringIO())
+        self.assertEqual(self.orden_esperado(), esperado)
+
+
+class PaqueteReportesTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.datos = crear_datos(num_estudiantes=3, num_cursos=2, prefijo='pq')
+        cls.periodo = cls.datos['periodo']
+        calcular_riesgo(cls.periodo)
+
+    def paquete(self, **datos_post):
+        self.client.force_login(self.datos['admin'])
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.post(reverse('generar_reporte'), {
+                'tipo_reporte': 'paquete', 'periodo': self.periodo.id, **datos_post,
+            })
+        self.assertEqual(respuesta['Content-Type'], 'application/zip')
+        return zipfile.ZipFile(io.BytesIO(respuesta.content)), len(consultas)
+
+    def test_un_archivo_por_reporte_formato_y_materia(self):
+        archivo, _ = self.paquete(formatos=['pdf', 'excel', 'csv'])
+        nombre = self.periodo.nombre
+        esperados = {
+            f'{base}.{extension}'
+            for extension in ('pdf', 'xlsx', 'csv')
+            for base in (f'reporte_rendimiento_{nombre}', f'estudiantes_riesgo_{nombre}',
+                         *(f'notas_por_materia/notas_{curso.materia.codigo}_{nombre}' for curso in self.datos['cursos']))
+        }
+        self.assertEqual(set(archivo.namelist()), esperados)
+
+        filas = list(csv.reader(io.StringIO(archivo.read(f'reporte_rendimiento_{nombre}.csv').decode('utf-8-sig'))))
+        # Promedios 3.175, 3.25 y 3.325 en cada curso
+        self.assertEqual([fila[3:] for fila in filas[1:]], [['3', '3.25', '3', '0']] * 2)
+
+    def test_riesgo_sin_calcular_no_se_calcula_en_la_peticion(self):
+        PuntajeRiesgo.objects.filter(periodo=self.periodo).delete()
+        archivo, _ = self.paquete(reportes=['estudiantes_riesgo'], formatos=['pdf', 'csv'])
+        self.assertEqual(archivo.namelist(), [f'estudiantes_riesgo_{self.periodo.nombre}.txt'])
+        self.assertFalse(PuntajeRiesgo.objects.filter(periodo=self.periodo).exists())
+
+    def test_solo_los_reportes_pedidos(self):
+        archivo, _ = self.paquete(reportes=['estudiantes_riesgo'], formatos=['csv', 'otro'])
+        self.assertEqual(archivo.namelist(), [f'estudiantes_riesgo_{self.periodo.nombre}.csv'])
+
+    def test_una_sola_carga_para_todos_los_documentos(self):
+        _, uno = self.paquete(reportes=['rendimiento_general'], formatos=['pdf'])
+        _, todos = self.paquete(formatos=['pdf', 'excel', 'csv'])
+        self.assertEqual(todos, uno)
+
+    def test_documentos_sin_consultas_desde_los_hilos(self):
+        datos = DatosPeriodo(self.periodo, Curso.objects.filter(periodo=self.periodo))
+        with self.assertNumQueries(0):
+            archivo = zipfile.ZipFile(generar_paquete(datos, formatos=['pdf', 'excel', 'csv'], hilos=3))
+        self.assertEqual(len(archivo.namelist()), 12)
+        self.assertEqual(len(datos.promedios), 6)
+
+
+class RotacionLogsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = Usuario.objects.create_user(username='log-u', password='clave123', documento='log-1',
+                                                  rol='administrador')
+        cls.otro = Usuario.objects.create_user(username='log-o', password='clave123', documento='log-2',
+                                               rol='administrador')
+        for dia, usuario in [(3, cls.usuario), (5, cls.otro), (7, cls.usuario)]:
+            log = LogActividad.objects.create(usuario=usuario, accion='consultar', modelo='Curso', objeto_id=dia,
+                                              descripcion=f'Dia {dia}')
+            LogActividad.objects.filter(pk=log.pk).update(fecha=datetime(2020, 1, dia, tzinfo=dt_timezone.utc))
+        LogActividad.objects.create(usuario=cls.usuario, accion='crear', modelo='Curso', objeto_id=0,
+                                    descripcion='Reciente')
+
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.directorio = Path(directorio.name)
+
+    def consultar(self, **filtros):
+        return list(consultar_logs(directorio=self.directorio, **filtros))
+
+    def test_rotacion_a_tabla_y_consulta_combinada(self):
+        self.assertEqual(rotar_logs(meses=1, destino='tabla', lote=2), {'2020-01': 3})
+        self.assertEqual(LogActividad.objects.count(), 1)
+        self.assertEqual(set(LogActividadArchivo.objects.values_list('particion', flat=True)), {'2020-01'})
+
+        logs = self.consultar()
+        self.assertEqual([(log['descripcion'], log['origen']) for log in logs],
+                         [('Reciente', 'vivo'), ('Dia 7', 'archivo'), ('Dia 5', 'archivo'), ('Dia 3', 'archivo')])
+        self.assertEqual([log['descripcion'] for log in self.consultar(usuario=self.otro)], ['Dia 5'])
+        hasta = datetime(2020, 1, 6, tzinfo=dt_timezone.utc)
+        self.assertEqual([log['descripcion'] for log in self.consultar(hasta=hasta)], ['Dia 5', 'Dia 3'])
+
+    def test_rotacion_a_ndjson_publica_al_confirmar(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            movidos = rotar_logs(meses=1, destino='ndjson', directorio=self.directorio, lote=2)
+        self.assertEqual(movidos, {'2020-01': 3})
+        self.assertEqual(len(list(self.directorio.glob('actividad_2020-01_*.ndjson.gz'))), 2)
+        self.assertEqual(list(self.directorio.glob('.pendiente_*')), [])
+
+        logs = self.consultar(usuario=self.usuario)
+        self.assertEqual([(log['descripcion'], log['origen']) for log in logs],
+                         [('Reciente', 'vivo'), ('Dia 7', 'ndjson'), ('Dia 3', 'ndjson')])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(rotar_logs(meses=1, destino='ndjson', directorio=self.directorio), {})
+        self.assertEqual(len(self.consultar()), 4)
+
+    def test_lote_revertido_no_duplica_filas(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            rotar_logs(meses=1, destino='ndjson', directorio=self.directorio)
+            raise RuntimeError('fallo antes de confirmar')
+        # El lote quedó pendiente y sus filas siguen en la tabla
+        self.assertEqual(len(list(self.directorio.glob('.pendiente_*'))), 1)
+        self.assertEqual(LogActividad.objects.count(), 4)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            rotar_logs(meses=1, destino='ndjson', directorio=self.directorio)
+        self.assertEqual(list(self.directorio.glob('.pendiente_*')), [])
+        ids = [log['id'] for log in self.consultar()]
+        self.assertEqual(len(ids), 4)
+        self.assertEqual(len(set(ids)), 4)
+
+
+class PoblarDatosTests(TestCase):
+    MODELOS = (Usuario, Programa, PeriodoAcademico, TipoEvaluacion, Administrador, Profesor, Estudiante, Materia,
+               Curso, ConfiguracionEvaluacion, FranjaHorario, InscripcionCurso, Calificacion, Notificacion,
+               HistorialAcademico, RegistroAcumulado)
+
+    def poblar(self):
+        call_command('poblar_datos', estudiantes=6, profesores=2, periodos=2, lote=7, stdout=io.StringIO())
+        return {modelo.__name__: getattr(modelo, 'con_archivados', modelo.objects).count() for modelo in self.MODELOS}
+
+    def test_reejecutar_no_duplica_filas(self):
+        primera = self.poblar()
+        self.assertGreater(primera['Calificacion'], 0)
+        self.assertEqual(self.poblar(), primera)
+
+
+@override_settings(
+    TEMPLATES=[{
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'OPTIONS': {'loaders': [('django.template.loaders.locmem.Loader', PLANTILLAS_CONSULTAS)]},
+    }],
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+)
+class BenchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        crear_datos(num_estudiantes=2, num_cursos=2, prefijo='bn')
+
+    def bench(self, **opciones):
+        with tempfile.TemporaryDirectory() as directorio:
+            salida = Path(directorio) / 'resultados.json'
+            call_command('bench', repeticiones=2, solo='mis_notas,dashboard_profesor', salida=str(salida),
+                         stderr=io.StringIO(), **opciones)
+            return json.loads(salida.read_text(encoding='utf-8'))
+
+    def test_mide_los_escenarios_pedidos(self):
+        resultados = self.bench()['resultados']
+        self.assertEqual(set(resultados), {'mis_notas', 'dashboard_profesor'})
+        for medida in resultados.values():
+            self.assertEqual(medida['estado'], 200)
+            self.assertLessEqual(medida['p50_ms'], medida['p95_ms'])
+
+    def test_compara_con_la_linea_base(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            base = Path(directorio) / 'base.json'
+            self.bench(baseline=str(base), guardar_baseline=True)
+            informe = json.loads(base.read_text(encoding='utf-8'))
+            informe['resultados']['mis_notas']['consultas'] = -1
+            base.write_text(json.dumps(informe), encoding='utf-8')
+            # Tolerancia amplia: solo cuenta la regresión de consultas, no el ruido de los tiempos
+            with self.assertRaisesMessage(CommandError, 'Regresiones de rendimiento:\n  mis_notas: consultas -1 ->'):
+                self.bench(baseline=str(base), tolerancia=1000)
+
+    def test_generar_exige_debug(self):
+        with self.assertRaisesMessage(CommandError, 'DEBUG=True'):
+            self.bench(generar=True)
+        self.assertEqual(Estudiante.objects.count(), 2)
@@ -28,6 +28,8 @@ urlpatterns = [
     path('administrador/cursos/', views.gestion_cursos, name='gestion_cursos'),
     path('administrador/reportes/', views.generar_reporte, name='generar_reporte'),
     path('administrador/estadisticas/', views.estadisticas_dashboard, name='estadisticas_dashboard'),
+    path('administrador/archivo/<str:modelo>/', views.archivar_registro, name='archivar_registro'),
+    path('administrador/archivo/<str:modelo>/masivo/', views.archivar_masivo, name='archivar_masivo'),
     
     # Notificaciones
     path('notificaciones/', views.todas_notificaciones, name='todas_notificaciones'),
@@ -36,8 +38,22 @@ urlpatterns = [
     
     # API/AJAX endpoints (para modales y vistas emergentes)
     path('api/calificaciones/<int:inscripcion_id>/', views.obtener_calificaciones_estudiante, name='api_calificaciones'),
+    path('api/calificaciones/lote/', views.calificaciones_lote, name='api_calificaciones_lote'),
+    path('api/analitica/cubo/', views.cubo_rendimiento, name='cubo_rendimiento'),
+    path('api/cursos/<int:curso_id>/analitica/', views.analitica_curso, name='analitica_curso'),
+    path('api/cursos/<int:curso_id>/impacto-pesos/', views.impacto_pesos, name='impacto_pesos'),
+    path('api/inscripciones/lote/', views.inscripcion_masiva, name='inscripcion_masiva'),
+    path('api/periodos/<int:periodo_id>/ranking/', views.ranking_programa, name='ranking_programa'),
+    path('api/periodos/<int:periodo_id>/ranking/<int:estudiante_id>/', views.puesto_ranking, name='puesto_ranking'),
+    path('api/periodos/<int:periodo_id>/riesgo/', views.alertas_riesgo, name='alertas_riesgo'),
+    path('api/periodos/<int:periodo_id>/choques-horario/', views.choques_horario, name='choques_horario'),
+    path('api/periodos/<int:periodo_id>/ocupacion-aulas/', views.ocupacion_aulas, name='ocupacion_aulas'),
+    path('api/periodos/<int:periodo_id>/aulas-libres/', views.aulas_libres, name='aulas_libres'),
     path('api/validar-nota/', views.validar_nota, name='validar_nota'),
     path('api/buscar/', views.busqueda_global, name='busqueda_global'),
+    
+    # Métricas (Prometheus)
+    path('metrics', views.exponer_metricas, name='metricas'),
 ]
 
 # En gestion_notas/urls.py
@@ -0,0 +1,194 @@
+"""
+Versiones de datos por curso, estudiante y periodo.
+
+Cada escritura de Calificacion, InscripcionCurso, ConfiguracionEvaluacion o
+Curso incrementa la versión de los cursos, estudiantes y periodos afectados:
+desde signals.py para save/delete y desde VersionadoQuerySet para update,
+bulk_create y bulk_update. Las claves de `clave_cache` incluyen esas
+versiones, así que cambian solas cuando cambian los datos: no hay que borrar
+entradas de la caché ni adivinar un TTL.
+
+Las filas de VersionDatos no se borran nunca; un objeto sin fila tiene versión 0.
+"""
+import hashlib
+
+from django.core.cache import cache
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.db import models, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .metricas import registrar_cache
+from .models import Calificacion, ConfiguracionEvaluacion, Curso, InscripcionCurso, VersionDatos
+
+AMBITOS = ('curso', 'estudiante', 'periodo')
+
+LOTE = 500
+
+FALTANTE = object()
+
+
+def vacio():
+    return {ambito: set() for ambito in AMBITOS}
+
+
+def identificador(valor):
+    """pk de una instancia o un id; None para expresiones (F(), Subquery...)"""
+    if isinstance(valor, models.Model):
+        return valor.pk
+    return valor if isinstance(valor, (int, str)) else None
+
+
+def afectados_por_inscripciones(ids):
+    afectados = vacio()
+    filas = InscripcionCurso.con_archivados.filter(pk__in=ids).values_list('curso_id', 'estudiante_id',
+                                                                           'curso__periodo_id')
+    for curso_id, estudiante_id, periodo_id in filas:
+        afectados['curso'].add(curso_id)
+        afectados['estudiante'].add(estudiante_id)
+        afectados['periodo'].add(periodo_id)
+    return afectados
+
+
+def afectados_por_cursos(ids):
+    """Un cambio en el curso afecta a su periodo y a todos sus estudiantes"""
+    afectados = vacio()
+    for curso_id, periodo_id in Curso.con_archivados.filter(pk__in=ids).values_list('id', 'periodo_id'):
+        afectados['curso'].add(curso_id)
+        afectados['periodo'].add(periodo_id)
+    afectados['estudiante'].update(
+        InscripcionCurso.con_archivados.filter(curso_id__in=ids).values_list('estudiante_id', flat=True)
+    )
+    return afectados
+
+
+def afectados_por_instancias(model, objs):
+    """Cursos, estudiantes y periodos a los que afecta escribir `objs`"""
+    if model is Calificacion:
+        return afectados_por_inscripciones({obj.inscripcion_id for obj in objs})
+    if model is ConfiguracionEvaluacion:
+        return afectados_por_cursos({obj.curso_id for obj in objs})
+    afectados = vacio()
+    if model is InscripcionCurso:
+        afectados['curso'] = {obj.curso_id for obj in objs}
+        afectados['estudiante'] = {obj.estudiante_id for obj in objs}
+        afectados['periodo'] = set(
+            Curso.con_archivados.filter(pk__in=afectados['curso']).values_list('periodo_id', flat=True)
+        )
+    elif model is Curso:
+        # Se leen los atributos de la instancia: en post_delete la fila ya no existe
+        afectados['curso'] = {obj.pk for obj in objs}
+        afectados['periodo'] = {obj.periodo_id for obj in objs}
+        afectados['estudiante'] = set(
+            InscripcionCurso.con_archivados.filter(curso_id__in=afectados['curso'])
+            .values_list('estudiante_id', flat=True)
+        )
+    return afectados
+
+
+def afectados_por_queryset(queryset, cambios):
+    """Afectados por `queryset.update(**cambios)`, incluidos los destinos si se cambia una FK"""
+    model = queryset.model
+    queryset = queryset.order_by()
+    if model is Calificacion:
+        ids = set(queryset.values_list('inscripcion_id', flat=True))
+        ids.add(identificador(cambios.get('inscripcion', cambios.get('inscripcion_id'))))
+        return afectados_por_inscripciones(ids - {None})
+    if model is ConfiguracionEvaluacion:
+        ids = set(queryset.values_list('curso_id', flat=True))
+        ids.add(identificador(cambios.get('curso', cambios.get('curso_id'))))
+        return afectados_por_cursos(ids - {None})
+    if model is InscripcionCurso:
+        afectados = afectados_por_inscripciones(queryset.values_list('pk', flat=True))
+        nuevos = vacio()
+        nuevos['curso'].add(identificador(cambios.get('curso', cambios.get('curso_id'))))
+        nuevos['estudiante'].add(identificador(cambios.get('estudiante', cambios.get('estudiante_id'))))
+        if nuevos['curso'] - {None}:
+            nuevos['periodo'] = set(
+                Curso.con_archivados.filter(pk__in=nuevos['curso'] - {None}).values_list('periodo_id', flat=True)
+            )
+        for ambito in AMBITOS:
+            afectados[ambito] |= nuevos[ambito] - {None}
+        return afectados
+    if model is Curso:
+        afectados = afectados_por_cursos(queryset.values_list('pk', flat=True))
+        periodo = identificador(cambios.get('periodo', cambios.get('periodo_id')))
+        if periodo is not None:
+            afectados['periodo'].add(periodo)
+        return afectados
+    return vacio()
+
+
+def incrementar(afectados):
+    """Suma 1 a la versión de cada objeto afectado ({ambito: ids})"""
+    ahora = timezone.now()
+    with transaction.atomic():
+        for ambito in AMBITOS:
+            # Orden fijo de bloqueo entre transacciones concurrentes
+            ids = sorted(i for i in afectados.get(ambito, ()) if i is not None)
+            for inicio in range(0, len(ids), LOTE):
+                lote = ids[inicio:inicio + LOTE]
+                VersionDatos.objects.bulk_create(
+                    [VersionDatos(ambito=ambito, objeto_id=i, fecha_modificacion=ahora) for i in lote],
+                    ignore_conflicts=True,
+                )
+                VersionDatos.objects.filter(ambito=ambito, objeto_id__in=lote).update(
+                    version=F('version') + 1, fecha_modificacion=ahora
+                )
+
+
+def dependencias(cursos=(), estudiantes=(), periodos=()):
+    pedidos = {'curso': cursos, 'estudiante': estudiantes, 'periodo': periodos}
+    return {ambito: {identificador(valor) for valor in valores} - {None} for ambito, valores in pedidos.items()}
+
+
+def consultar_versiones(cursos=(), estudiantes=(), periodos=()):
+    """{(ambito, id): (version, fecha_modificacion)} en una sola consulta; acepta ids o instancias"""
+    pedidos = dependencias(cursos, estudiantes, periodos)
+    resultado = {(ambito, i): (0, None) for ambito, ids in pedidos.items() for i in ids}
+
+    filtro = Q()
+    for ambito, ids in pedidos.items():
+        if ids:
+            filtro |= Q(ambito=ambito, objeto_id__in=ids)
+    if resultado:
+        filas = VersionDatos.objects.filter(filtro).values_list('ambito', 'objeto_id', 'version', 'fecha_modificacion')
+        for ambito, objeto_id, version, fecha in filas:
+            resultado[(ambito, objeto_id)] = (version, fecha)
+    return resultado
+
+
+def versiones(cursos=(), estudiantes=(), periodos=()):
+    """{(ambito, id): version}"""
+    return {clave: version for clave, (version, _) in consultar_versiones(cursos, estudiantes, periodos).items()}
+
+
+def validadores(cursos=(), estudiantes=(), periodos=(), **partes):
+    """(ETag, última modificación) de los datos de los que depende una respuesta, en una sola consulta"""
+    actuales = consultar_versiones(cursos, estudiantes, periodos)
+    firma = repr((sorted(partes.items()), sorted((clave, version) for clave, (version, _) in actuales.items())))
+    fechas = [fecha for _, fecha in actuales.values() if fecha is not None]
+    return hashlib.sha1(firma.encode()).hexdigest(), max(fechas, default=None)
+
+
+def clave_cache(nombre, cursos=(), estudiantes=(), periodos=(), **partes):
+    """Clave de caché que incluye la versión actual de cada curso, estudiante y periodo del que depende"""
+    actuales = versiones(cursos, estudiantes, periodos)
+    version = ','.join(f'{ambito[0]}{i}v{v}' for (ambito, i), v in sorted(actuales.items()))
+    extra = ','.join(f'{k}={v}' for k, v in sorted(partes.items()))
+    clave = f'gestion_notas:{nombre}:{extra}:{version}'
+    if len(clave) > 200:
+        # Memcached no admite claves de más de 250 caracteres
+        clave = f'gestion_notas:{nombre}:{hashlib.sha1(clave.encode()).hexdigest()}'
+    return clave
+
+
+def cacheado(nombre, calcular, cursos=(), estudiantes=(), periodos=(), timeout=DEFAULT_TIMEOUT, **partes):
+    """Valor cacheado para las versiones actuales de los datos, o `calcular()` si no existe"""
+    clave = clave_cache(nombre, cursos, estudiantes, periodos, **partes)
+    valor = cache.get(clave, FALTANTE)
+    registrar_cache(nombre, valor is not FALTANTE)
+    if valor is FALTANTE:
+        valor = calcular()
+        cache.set(clave, valor, timeout)
+    return valor
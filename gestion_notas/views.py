@@ -3,21 +3,20 @@ from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
 from django.http import HttpResponse, JsonResponse
-from django.db.models import Q, Avg, Count
-from django.utils import timezone
+from django.conf import settings
+from django.db.models import Q, F, Avg, Count, OuterRef, Subquery, Prefetch
+from django.db.models.functions import Coalesce
 from django.views.decorators.http import require_http_methods
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
 from django.core.paginator import Paginator
 from .models import *
-import io
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.lib import colors
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib.units import inch
-import openpyxl
-from openpyxl.styles import Font, Alignment, PatternFill
-from datetime import datetime
+from .forms import GenericArchiveForm, BulkArchiveForm, archive_queryset
+from . import metricas
+from .versiones import cacheado, validadores
+import hashlib
+from calendar import timegm
+from decimal import Decimal
 import json
 
 
@@ -32,6 +31,28 @@ def es_profesor(user):
 def es_administrador(user):
     return user.is_authenticated and user.rol == 'administrador'
 
+def subconsulta_conteo(queryset, campo):
+    """COUNT(*) correlacionado con la fila externa a través de `campo` (evita una consulta por fila)"""
+    conteo = (queryset.filter(**{campo: OuterRef('pk')})
+              .order_by().values(campo).annotate(total=Count('*')).values('total'))
+    return Coalesce(Subquery(conteo), 0)
+
+def respuesta_no_modificada(request, etag, ultima_modificacion=None):
+    """Respuesta 304 si el cliente ya tiene esta versión (If-None-Match / If-Modified-Since); si no, None"""
+    respuesta = get_conditional_response(
+        request, etag=quote_etag(etag),
+        last_modified=timegm(ultima_modificacion.utctimetuple()) if ultima_modificacion else None,
+    )
+    return con_validadores(respuesta, etag, ultima_modificacion) if respuesta is not None else None
+
+def con_validadores(response, etag, ultima_modificacion=None):
+    """Añade ETag/Last-Modified y obliga a revalidar (datos privados de cada usuario)"""
+    response['ETag'] = quote_etag(etag)
+    if ultima_modificacion:
+        response['Last-Modified'] = http_date(timegm(ultima_modificacion.utctimetuple()))
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
 def registrar_actividad(request, accion, modelo, objeto_id, descripcion):
     """Registra actividad en el log"""
     LogActividad.objects.create(
@@ -92,10 +113,10 @@ def dashboard(request):
         periodo_actual = PeriodoAcademico.objects.filter(activo=True).first()
         
         # Inscripciones del periodo actual
-        inscripciones = estudiante.inscripciones.filter(curso__periodo=periodo_actual)
+        inscripciones = list(estudiante.inscripciones.filter(curso__periodo=periodo_actual).con_notas())
         
         # Calcular promedio general
-        promedios = [insc.calcular_promedio() for insc in inscripciones if insc.calcular_promedio() is not None]
+        promedios = [p for p in (insc.calcular_promedio() for insc in inscripciones) if p is not None]
         promedio_general = sum(promedios) / len(promedios) if promedios else 0.0
         
         # Materias aprobadas/reprobadas
@@ -105,15 +126,20 @@ def dashboard(request):
         # Total de créditos
         total_creditos = sum(insc.curso.materia.creditos for insc in inscripciones)
         
+        # Acumulado de los periodos cerrados (se mantiene al cerrar cada periodo)
+        acumulado = RegistroAcumulado.objects.filter(estudiante=estudiante).first()
+        
         context.update({
             'estudiante': estudiante,
             'inscripciones': inscripciones,
             'promedio_general': round(promedio_general, 2),
             'periodo_actual': periodo_actual,
-            'total_materias': inscripciones.count(),
+            'total_materias': len(inscripciones),
             'materias_aprobadas': materias_aprobadas,
             'materias_reprobadas': materias_reprobadas,
             'total_creditos': total_creditos,
+            'acumulado': acumulado,
+            'puesto_programa': acumulado.calcular_puesto() if acumulado else None,
         })
         return render(request, 'estudiante/dashboard.html', context)
     
@@ -121,21 +147,19 @@ def dashboard(request):
         profesor = user.perfil_profesor
         periodo_actual = PeriodoAcademico.objects.filter(activo=True).first()
         
-        # Cursos del profesor en el periodo actual
-        cursos = profesor.cursos.filter(periodo=periodo_actual)
+        # Cursos del profesor en el periodo actual, con sus conteos en la misma consulta
+        cursos = list(profesor.cursos.filter(periodo=periodo_actual).select_related('materia', 'periodo').annotate(
+            total_tipos=subconsulta_conteo(ConfiguracionEvaluacion.objects.all(), 'curso'),
+            total_calificaciones=subconsulta_conteo(Calificacion.objects.all(), 'inscripcion__curso'),
+        ))
         
         # Estadísticas
-        total_estudiantes = sum(curso.estudiantes_inscritos() for curso in cursos)
+        total_estudiantes = sum(curso.inscritos for curso in cursos)
         calificaciones_pendientes = 0
         
         for curso in cursos:
-            inscripciones = curso.inscripciones.count()
-            tipos_eval = ConfiguracionEvaluacion.objects.filter(curso=curso).count()
-            calificaciones_registradas = Calificacion.objects.filter(
-                inscripcion__curso=curso
-            ).count()
-            calificaciones_esperadas = inscripciones * tipos_eval
-            calificaciones_pendientes += max(0, calificaciones_esperadas - calificaciones_registradas)
+            calificaciones_esperadas = curso.inscritos * curso.total_tipos
+            calificaciones_pendientes += max(0, calificaciones_esperadas - curso.total_calificaciones)
         
         context.update({
             'profesor': profesor,
@@ -155,19 +179,26 @@ def dashboard(request):
         total_profesores = Profesor.objects.count()
         total_cursos = Curso.objects.filter(periodo=periodo_actual).count()
         
-        # Promedio institucional
-        cursos = Curso.objects.filter(periodo=periodo_actual)
-        promedios_cursos = []
-        for curso in cursos:
-            inscripciones = curso.inscripciones.all()
-            promedios = [insc.calcular_promedio() for insc in inscripciones if insc.calcular_promedio() is not None]
-            if promedios:
-                promedios_cursos.append(sum(promedios) / len(promedios))
+        # Promedio institucional (promedio de los promedios de cada curso)
+        promedios_por_curso = {}
+        for insc in InscripcionCurso.objects.filter(curso__periodo=periodo_actual).con_pesos():
+            promedio = insc.calcular_promedio()
+            if promedio is not None:
+                promedios_por_curso.setdefault(insc.curso_id, []).append(promedio)
+        promedios_cursos = [sum(p) / len(p) for p in promedios_por_curso.values()]
         
         promedio_institucional = sum(promedios_cursos) / len(promedios_cursos) if promedios_cursos else 0.0
         
         # Actividad reciente
-        actividades_recientes = LogActividad.objects.all().order_by('-fecha')[:10]
+        actividades_recientes = LogActividad.objects.select_related('usuario').order_by('-fecha')[:10]
+        
+        ranking_programas = []
+        if periodo_actual:
+            from .ranking import ranking_periodo
+            ranking = ranking_periodo(periodo_actual.id)
+            for programa in Programa.objects.filter(activo=True).order_by('nombre'):
+                ranking_programas.append({'programa': programa, 'mejores': ranking.mejores(programa.id, 5)})
+            ranking_programas = con_estudiantes(ranking_programas)
         
         context.update({
             'administrador': administrador,
@@ -177,11 +208,24 @@ def dashboard(request):
             'promedio_institucional': round(promedio_institucional, 2),
             'periodo_actual': periodo_actual,
             'actividades_recientes': actividades_recientes,
+            'ranking_programas': ranking_programas,
         })
         return render(request, 'administrador/dashboard.html', context)
     
     return redirect('login')
 
+def con_estudiantes(grupos):
+    """Reemplaza los (puesto, estudiante_id, promedio) de cada grupo por dicts con el estudiante, en una consulta"""
+    ids = {estudiante_id for grupo in grupos for _, estudiante_id, _ in grupo['mejores']}
+    estudiantes = Estudiante.objects.select_related('usuario').in_bulk(ids)
+    for grupo in grupos:
+        # Un estudiante borrado puede seguir en la lista hasta la próxima reconstrucción
+        grupo['mejores'] = [
+            {'puesto': puesto, 'estudiante': estudiantes[estudiante_id], 'promedio': promedio}
+            for puesto, estudiante_id, promedio in grupo['mejores'] if estudiante_id in estudiantes
+        ]
+    return grupos
+
 
 # ==================== ESTUDIANTE ====================
 
@@ -198,11 +242,12 @@ def mis_notas(request):
     else:
         periodo_actual = PeriodoAcademico.objects.filter(activo=True).first()
         inscripciones = estudiante.inscripciones.filter(curso__periodo=periodo_actual)
+    inscripciones = list(inscripciones.con_notas())
     
     periodos = PeriodoAcademico.objects.all()
     
     # Calcular promedio general del periodo
-    promedios = [insc.calcular_promedio() for insc in inscripciones if insc.calcular_promedio() is not None]
+    promedios = [p for p in (insc.calcular_promedio() for insc in inscripciones) if p is not None]
     promedio_general = sum(promedios) / len(promedios) if promedios else 0.0
     
     # Preparar datos para cada inscripción
@@ -229,11 +274,12 @@ def mis_notas(request):
 @user_passes_test(es_estudiante)
 def detalle_materia(request, inscripcion_id):
     """Detalle completo de una materia específica"""
-    inscripcion = get_object_or_404(InscripcionCurso, id=inscripcion_id, estudiante=request.user.perfil_estudiante)
-    calificaciones = inscripcion.calificaciones.all().order_by('-fecha_registro')
+    inscripcion = get_object_or_404(InscripcionCurso.objects.con_notas(), id=inscripcion_id,
+                                    estudiante=request.user.perfil_estudiante)
+    calificaciones = inscripcion.calificaciones.select_related('tipo_evaluacion').order_by('-fecha_registro')
     
     # Obtener configuración de evaluaciones
-    configuraciones = ConfiguracionEvaluacion.objects.filter(curso=inscripcion.curso)
+    configuraciones = inscripcion.curso.configuracion_evaluaciones.all()
     
     context = {
         'inscripcion': inscripcion,
@@ -270,96 +316,16 @@ def actualizar_perfil(request):
 
 @login_required
 @user_passes_test(es_estudiante)
+@metricas.BOLETIN_SEGUNDOS.cronometrado
 def descargar_boletin(request, periodo_id):
     """Descargar boletín de notas en PDF"""
     estudiante = request.user.perfil_estudiante
     periodo = get_object_or_404(PeriodoAcademico, id=periodo_id)
-    inscripciones = estudiante.inscripciones.filter(curso__periodo=periodo)
-    
-    # Crear PDF
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter)
-    elements = []
-    styles = getSampleStyleSheet()
-    
-    # Encabezado
-    titulo = Paragraph(f"<b>BOLETÍN DE NOTAS ACADÉMICAS</b>", styles['Title'])
-    elements.append(titulo)
-    elements.append(Spacer(1, 0.3*inch))
-    
-    # Información del estudiante
-    info_estudiante = Paragraph(f"""
-        <b>Estudiante:</b> {estudiante.usuario.get_full_name()}<br/>
-        <b>Código:</b> {estudiante.codigo_estudiantil}<br/>
-        <b>Programa:</b> {estudiante.programa.nombre}<br/>
-        <b>Semestre:</b> {estudiante.semestre}<br/>
-        <b>Periodo:</b> {periodo.nombre}<br/>
-        <b>Fecha de emisión:</b> {datetime.now().strftime('%d/%m/%Y')}
-    """, styles['Normal'])
-    elements.append(info_estudiante)
-    elements.append(Spacer(1, 0.3*inch))
-    
-    # Tabla de notas
-    data = [['Código', 'Materia', 'Créditos', 'Promedio', 'Estado']]
-    
-    total_creditos = 0
-    promedios_list = []
+    # Periodo cerrado: lectura directa del historial congelado
+    registros = HistorialAcademico.objects.de_estudiante(estudiante, periodo)
     
-    for insc in inscripciones:
-        promedio = insc.calcular_promedio() or 0.0
-        estado = insc.estado_aprobacion()
-        creditos = insc.curso.materia.creditos
-        
-        data.append([
-            insc.curso.materia.codigo,
-            insc.curso.materia.nombre,
-            str(creditos),
-            f"{promedio:.2f}",
-            estado
-        ])
-        
-        total_creditos += creditos
-        if promedio > 0:
-            promedios_list.append(promedio)
-    
-    # Calcular promedio general
-    promedio_general = sum(promedios_list) / len(promedios_list) if promedios_list else 0.0
-    
-    table = Table(data, colWidths=[1*inch, 3*inch, 1*inch, 1*inch, 1.2*inch])
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#0D47A1')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 11),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), 9),
-    ]))
-    elements.append(table)
-    
-    # Resumen
-    elements.append(Spacer(1, 0.3*inch))
-    resumen = Paragraph(f"""
-        <b>RESUMEN ACADÉMICO</b><br/>
-        Total de Créditos: {total_creditos}<br/>
-        Promedio General del Periodo: <b>{promedio_general:.2f}</b><br/>
-        Estado: <b>{'APROBADO' if promedio_general >= 3.0 else 'REPROBADO'}</b>
-    """, styles['Normal'])
-    elements.append(resumen)
-    
-    # Pie de página
-    elements.append(Spacer(1, 0.5*inch))
-    pie = Paragraph("""
-        <i>Este es un documento oficial emitido por el Sistema de Gestión Académica<br/>
-        Universidad Cooperativa de Colombia - Campus Pasto</i>
-    """, styles['Normal'])
-    elements.append(pie)
-    
-    doc.build(elements)
-    buffer.seek(0)
+    from .exportacion import boletin_pdf
+    buffer = boletin_pdf(estudiante, periodo, registros)
     
     registrar_actividad(request, 'consultar', 'Boletin', periodo_id, f'Descarga de boletín - {periodo.nombre}')
     
@@ -376,19 +342,20 @@ def mis_cursos(request):
     """Lista de cursos del profesor con estadísticas"""
     profesor = request.user.perfil_profesor
     periodo_actual = PeriodoAcademico.objects.filter(activo=True).first()
-    cursos = profesor.cursos.filter(periodo=periodo_actual)
+    # Inscritos del contador del curso y promedio sobre los promedios almacenados, en una consulta
+    cursos = profesor.cursos.filter(periodo=periodo_actual).select_related('materia', 'periodo').annotate(
+        promedio_curso=Avg('inscripciones__promedio_almacenado', filter=Q(
+            inscripciones__archived=False, inscripciones__promedio_almacenado__isnull=False,
+        )),
+    )
     
     # Agregar estadísticas a cada curso
     cursos_data = []
     for curso in cursos:
-        inscripciones = curso.inscripciones.all()
-        promedios = [insc.calcular_promedio() for insc in inscripciones if insc.calcular_promedio() is not None]
-        promedio_curso = sum(promedios) / len(promedios) if promedios else 0.0
-        
         cursos_data.append({
             'curso': curso,
-            'total_estudiantes': inscripciones.count(),
-            'promedio_curso': round(promedio_curso, 2),
+            'total_estudiantes': curso.inscritos,
+            'promedio_curso': round(float(curso.promedio_curso or 0), 2),
         })
     
     context = {
@@ -402,8 +369,9 @@ def mis_cursos(request):
 @user_passes_test(es_profesor)
 def estudiantes_curso(request, curso_id):
     """Lista de estudiantes de un curso con sus notas"""
-    curso = get_object_or_404(Curso, id=curso_id, profesor=request.user.perfil_profesor)
-    inscripciones = curso.inscripciones.all().order_by('estudiante__usuario__last_name')
+    curso = get_object_or_404(Curso.objects.select_related('materia', 'periodo'), id=curso_id,
+                              profesor=request.user.perfil_profesor)
+    inscripciones = curso.inscripciones.con_notas().order_by('estudiante__usuario__last_name')
     
     # Preparar datos de estudiantes con sus promedios
     estudiantes_data = []
@@ -418,7 +386,7 @@ def estudiantes_curso(request, curso_id):
         })
     
     # Tipos de evaluación configurados
-    tipos_evaluacion = ConfiguracionEvaluacion.objects.filter(curso=curso)
+    tipos_evaluacion = ConfiguracionEvaluacion.objects.filter(curso=curso).select_related('tipo_evaluacion')
     
     context = {
         'curso': curso,
@@ -432,13 +400,21 @@ def estudiantes_curso(request, curso_id):
 @user_passes_test(es_profesor)
 def registrar_calificacion(request, inscripcion_id):
     """Registrar o editar calificación (FUNCIONALIDAD PRINCIPAL 1)"""
-    inscripcion = get_object_or_404(InscripcionCurso, id=inscripcion_id)
+    inscripcion = get_object_or_404(
+        InscripcionCurso.objects.select_related('curso__materia', 'curso__periodo', 'curso__profesor',
+                                                'estudiante__usuario'),
+        id=inscripcion_id
+    )
     
     # Verificar que el profesor pertenece al curso
     if inscripcion.curso.profesor != request.user.perfil_profesor:
         messages.error(request, 'No tiene permiso para calificar este curso')
         return redirect('mis_cursos')
     
+    if request.method == 'POST' and inscripcion.curso.periodo.cerrado:
+        messages.error(request, 'El periodo está cerrado: sus notas ya no pueden modificarse')
+        return redirect('estudiantes_curso', curso_id=inscripcion.curso.id)
+    
     if request.method == 'POST':
         tipo_evaluacion_id = request.POST.get('tipo_evaluacion')
         nota = request.POST.get('nota')
@@ -474,6 +450,7 @@ def registrar_calificacion(request, inscripcion_id):
         )
         
         accion = 'crear' if created else 'editar'
+        metricas.CALIFICACIONES_GUARDADAS.inc(accion=accion)
         registrar_actividad(request, accion, 'Calificacion', calificacion.id, 
                           f"{accion.capitalize()} calificación para {inscripcion.estudiante.usuario.get_full_name()}")
         
@@ -481,8 +458,8 @@ def registrar_calificacion(request, inscripcion_id):
         return redirect('estudiantes_curso', curso_id=inscripcion.curso.id)
     
     tipos_evaluacion = TipoEvaluacion.objects.all()
-    calificaciones_existentes = inscripcion.calificaciones.all()
-    configuraciones = ConfiguracionEvaluacion.objects.filter(curso=inscripcion.curso)
+    calificaciones_existentes = inscripcion.calificaciones.select_related('tipo_evaluacion')
+    configuraciones = ConfiguracionEvaluacion.objects.filter(curso=inscripcion.curso).select_related('tipo_evaluacion')
     
     context = {
         'inscripcion': inscripcion,
@@ -498,11 +475,17 @@ def registrar_calificacion(request, inscripcion_id):
 @require_http_methods(["POST"])
 def eliminar_calificacion(request, calificacion_id):
     """Eliminar una calificación (Modal/AJAX)"""
-    calificacion = get_object_or_404(Calificacion, id=calificacion_id)
+    calificacion = get_object_or_404(
+        Calificacion.objects.select_related('tipo_evaluacion', 'inscripcion__curso__profesor',
+                                            'inscripcion__curso__periodo', 'inscripcion__estudiante__usuario'),
+        id=calificacion_id
+    )
     
     # Verificar permisos
     if calificacion.inscripcion.curso.profesor != request.user.perfil_profesor:
         return JsonResponse({'success': False, 'error': 'Sin permisos'}, status=403)
+    if calificacion.inscripcion.curso.periodo.cerrado:
+        return JsonResponse({'success': False, 'error': 'El periodo está cerrado'}, status=409)
     
     estudiante = calificacion.inscripcion.estudiante.usuario.get_full_name()
     tipo_eval = calificacion.tipo_evaluacion.nombre
@@ -540,7 +523,7 @@ def gestion_cursos(request):
             Q(profesor__usuario__last_name__icontains=busqueda)
         )
     
-    cursos = cursos.order_by('materia__nombre')
+    cursos = cursos.select_related('materia', 'periodo', 'profesor__usuario').order_by('materia__nombre')
     
     # Paginación
     paginator = Paginator(cursos, 10)
@@ -558,13 +541,23 @@ def gestion_cursos(request):
     
     return render(request, 'administrador/gestion_cursos.html', context)
 
+TIPOS_REPORTE = ('rendimiento_general', 'estudiantes_riesgo', 'notas_por_materia', 'paquete')
+FORMATOS_REPORTE = ('pdf', 'excel', 'csv', 'zip')
+TIPOS_CONTENIDO = {
+    'pdf': ('application/pdf', 'pdf'),
+    'excel': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx'),
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+}
+
 @login_required
 @user_passes_test(es_administrador)
 def generar_reporte(request):
     """Generar reportes académicos (FUNCIONALIDAD PRINCIPAL 3)"""
     if request.method == 'POST':
         tipo_reporte = request.POST.get('tipo_reporte')
-        formato = request.POST.get('formato')  # pdf o excel
+        formato = request.POST.get('formato')  # pdf, excel o csv
+        if tipo_reporte == 'paquete':
+            formato = 'zip'  # los formatos de cada documento llegan en 'formatos'
         periodo_id = request.POST.get('periodo')
         programa_id = request.POST.get('programa', None)
         materia_id = request.POST.get('materia', None)
@@ -578,13 +571,20 @@ def generar_reporte(request):
         if materia_id:
             cursos = cursos.filter(materia_id=materia_id)
         
-        if tipo_reporte == 'rendimiento_general':
-            return generar_reporte_rendimiento_general(request, cursos, periodo, formato)
-        elif tipo_reporte == 'estudiantes_riesgo':
-            return generar_reporte_estudiantes_riesgo(request, periodo, formato)
-        elif tipo_reporte == 'notas_por_materia':
-            if materia_id:
-                return generar_reporte_notas_materia(request, materia_id, periodo, formato)
+        # Las etiquetas de la métrica se limitan a valores conocidos
+        with metricas.REPORTE_SEGUNDOS.cronometrar(
+            tipo_reporte=tipo_reporte if tipo_reporte in TIPOS_REPORTE else 'otro',
+            formato=formato if formato in FORMATOS_REPORTE else 'otro',
+        ):
+            if tipo_reporte == 'rendimiento_general':
+                return generar_reporte_rendimiento_general(request, cursos, periodo, formato)
+            elif tipo_reporte == 'estudiantes_riesgo':
+                return generar_reporte_estudiantes_riesgo(request, periodo, formato, programa_id)
+            elif tipo_reporte == 'notas_por_materia':
+                if materia_id:
+                    return generar_reporte_notas_materia(request, materia_id, periodo, formato)
+            elif tipo_reporte == 'paquete':
+                return generar_paquete_reportes(request, cursos, periodo, programa_id)
     
     periodos = PeriodoAcademico.objects.all()
     programas = Programa.objects.filter(activo=True)
@@ -600,87 +600,13 @@ def generar_reporte(request):
 
 def generar_reporte_rendimiento_general(request, cursos, periodo, formato):
     """Reporte de rendimiento académico general"""
+    cursos = cursos.select_related('materia', 'profesor__usuario').prefetch_related(
+        'configuracion_evaluaciones', 'inscripciones__calificaciones'
+    )
     
     if formato == 'pdf':
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=A4)
-        elements = []
-        styles = getSampleStyleSheet()
-        
-        # Título
-        titulo = Paragraph(f"<b>REPORTE DE RENDIMIENTO ACADÉMICO GENERAL</b>", styles['Title'])
-        elements.append(titulo)
-        elements.append(Spacer(1, 0.2*inch))
-        
-        # Información del reporte
-        info = Paragraph(f"""
-            <b>Periodo:</b> {periodo.nombre}<br/>
-            <b>Fecha de generación:</b> {datetime.now().strftime('%d/%m/%Y %H:%M')}<br/>
-            <b>Generado por:</b> {request.user.get_full_name()}
-        """, styles['Normal'])
-        elements.append(info)
-        elements.append(Spacer(1, 0.3*inch))
-        
-        # Tabla de datos
-        data = [['Curso', 'Grupo', 'Profesor', 'Inscritos', 'Promedio', 'Aprobados']]
-        
-        total_estudiantes = 0
-        total_aprobados = 0
-        promedios_generales = []
-        
-        for curso in cursos:
-            inscripciones = curso.inscripciones.all()
-            total_inscritos = inscripciones.count()
-            total_estudiantes += total_inscritos
-            
-            promedios = [insc.calcular_promedio() for insc in inscripciones if insc.calcular_promedio() is not None]
-            promedio_curso = sum(promedios) / len(promedios) if promedios else 0.0
-            
-            aprobados = sum(1 for p in promedios if p >= 3.0)
-            total_aprobados += aprobados
-            
-            if promedio_curso > 0:
-                promedios_generales.append(promedio_curso)
-            
-            data.append([
-                f"{curso.materia.codigo}",
-                curso.grupo,
-                curso.profesor.usuario.last_name,
-                str(total_inscritos),
-                f"{promedio_curso:.2f}",
-                f"{aprobados}/{total_inscritos}"
-            ])
-        
-        table = Table(data, colWidths=[1.5*inch, 0.7*inch, 1.3*inch, 0.8*inch, 0.8*inch, 0.9*inch])
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#0D47A1')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('FONTSIZE', (0, 1), (-1, -1), 8),
-        ]))
-        elements.append(table)
-        
-        # Resumen estadístico
-        promedio_institucional = sum(promedios_generales) / len(promedios_generales) if promedios_generales else 0.0
-        tasa_aprobacion = (total_aprobados / total_estudiantes * 100) if total_estudiantes > 0 else 0.0
-        
-        elements.append(Spacer(1, 0.3*inch))
-        resumen = Paragraph(f"""
-            <b>RESUMEN ESTADÍSTICO</b><br/>
-            Total de Estudiantes: {total_estudiantes}<br/>
-            Total de Aprobados: {total_aprobados}<br/>
-            Tasa de Aprobación: {tasa_aprobacion:.1f}%<br/>
-            Promedio Institucional: <b>{promedio_institucional:.2f}</b>
-        """, styles['Normal'])
-        elements.append(resumen)
-        
-        doc.build(elements)
-        buffer.seek(0)
+        from .exportacion import reporte_rendimiento_pdf
+        buffer = reporte_rendimiento_pdf(cursos, periodo, request.user.get_full_name())
         
         registrar_actividad(request, 'consultar', 'Reporte', periodo.id, 'Generación de reporte PDF')
         
@@ -689,63 +615,8 @@ def generar_reporte_rendimiento_general(request, cursos, periodo, formato):
         return response
     
     elif formato == 'excel':
-        # Crear archivo Excel
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = "Rendimiento Académico"
-        
-        # Estilos
-        header_font = Font(bold=True, color="FFFFFF", size=12)
-        header_fill = PatternFill(start_color="0D47A1", end_color="0D47A1", fill_type="solid")
-        center_aligned = Alignment(horizontal="center", vertical="center")
-        
-        # Encabezados
-        headers = ['Curso', 'Grupo', 'Profesor', 'Inscritos', 'Promedio', 'Aprobados', 'Reprobados']
-        for col, header in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col)
-            cell.value = header
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = center_aligned
-        
-        # Datos
-        row = 2
-        for curso in cursos:
-            inscripciones = curso.inscripciones.all()
-            total_inscritos = inscripciones.count()
-            
-            promedios = [insc.calcular_promedio() for insc in inscripciones if insc.calcular_promedio() is not None]
-            promedio_curso = sum(promedios) / len(promedios) if promedios else 0.0
-            
-            aprobados = sum(1 for p in promedios if p >= 3.0)
-            reprobados = len(promedios) - aprobados
-            
-            ws.cell(row=row, column=1).value = f"{curso.materia.codigo} - {curso.materia.nombre}"
-            ws.cell(row=row, column=2).value = curso.grupo
-            ws.cell(row=row, column=3).value = curso.profesor.usuario.get_full_name()
-            ws.cell(row=row, column=4).value = total_inscritos
-            ws.cell(row=row, column=5).value = round(promedio_curso, 2)
-            ws.cell(row=row, column=6).value = aprobados
-            ws.cell(row=row, column=7).value = reprobados
-            
-            for col in range(1, 8):
-                ws.cell(row=row, column=col).alignment = center_aligned
-            
-            row += 1
-        
-        # Ajustar ancho de columnas
-        ws.column_dimensions['A'].width = 40
-        ws.column_dimensions['B'].width = 10
-        ws.column_dimensions['C'].width = 25
-        ws.column_dimensions['D'].width = 12
-        ws.column_dimensions['E'].width = 12
-        ws.column_dimensions['F'].width = 12
-        ws.column_dimensions['G'].width = 12
-        
-        # Guardar en buffer
-        buffer = io.BytesIO()
-        wb.save(buffer)
-        buffer.seek(0)
+        from .exportacion import reporte_rendimiento_excel
+        buffer = reporte_rendimiento_excel(cursos)
         
         registrar_actividad(request, 'consultar', 'Reporte', periodo.id, 'Generación de reporte Excel')
         
@@ -753,114 +624,62 @@ def generar_reporte_rendimiento_general(request, cursos, periodo, formato):
         response['Content-Disposition'] = f'attachment; filename="reporte_rendimiento_{periodo.nombre}.xlsx"'
         return response
 
-def generar_reporte_estudiantes_riesgo(request, periodo, formato):
-    """Reporte de estudiantes en riesgo académico"""
-    estudiantes_riesgo = []
-    
-    inscripciones = InscripcionCurso.objects.filter(curso__periodo=periodo)
-    
-    for insc in inscripciones:
-        promedio = insc.calcular_promedio()
-        if promedio and promedio < 3.0:
-            estudiantes_riesgo.append({
-                'estudiante': insc.estudiante,
-                'curso': insc.curso,
-                'promedio': promedio,
-            })
-    
-    if formato == 'pdf':
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=A4)
-        elements = []
-        styles = getSampleStyleSheet()
-        
-        titulo = Paragraph("<b>REPORTE DE ESTUDIANTES EN RIESGO ACADÉMICO</b>", styles['Title'])
-        elements.append(titulo)
-        elements.append(Spacer(1, 0.2*inch))
-        
-        info = Paragraph(f"""
-            <b>Periodo:</b> {periodo.nombre}<br/>
-            <b>Fecha:</b> {datetime.now().strftime('%d/%m/%Y')}<br/>
-            <b>Total en riesgo:</b> {len(estudiantes_riesgo)} estudiantes
-        """, styles['Normal'])
-        elements.append(info)
-        elements.append(Spacer(1, 0.3*inch))
-        
-        data = [['Código', 'Estudiante', 'Materia', 'Promedio']]
-        
-        for item in estudiantes_riesgo:
-            data.append([
-                item['estudiante'].codigo_estudiantil,
-                item['estudiante'].usuario.get_full_name(),
-                item['curso'].materia.nombre,
-                f"{item['promedio']:.2f}"
-            ])
-        
-        table = Table(data, colWidths=[1.2*inch, 2*inch, 2.5*inch, 1*inch])
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#C62828')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ]))
-        elements.append(table)
-        
-        doc.build(elements)
-        buffer.seek(0)
-        
-        response = HttpResponse(buffer, content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="estudiantes_riesgo_{periodo.nombre}.pdf"'
-        return response
+def generar_reporte_estudiantes_riesgo(request, periodo, formato, programa_id=None):
+    """Reporte de estudiantes en riesgo académico a partir de los puntajes precalculados (calcular_riesgo)"""
+    if formato not in TIPOS_CONTENIDO:
+        messages.error(request, 'Formato de reporte no válido')
+        return redirect('generar_reporte')
+    estudiantes_riesgo = PuntajeRiesgo.objects.en_riesgo(periodo, programa_id)
+    if estudiantes_riesgo is None:
+        messages.warning(request, f'Los puntajes de riesgo de {periodo.nombre} aún no se han calculado '
+                                  '(comando calcular_riesgo)')
+        return redirect('generar_reporte')
+    
+    from . import exportacion
+    renderizar = {
+        'pdf': exportacion.reporte_riesgo_pdf,
+        'excel': exportacion.reporte_riesgo_excel,
+        'csv': exportacion.reporte_riesgo_csv,
+    }[formato]
+    buffer = renderizar(periodo, estudiantes_riesgo)
+    
+    tipo_contenido, extension = TIPOS_CONTENIDO[formato]
+    response = HttpResponse(buffer, content_type=tipo_contenido)
+    response['Content-Disposition'] = f'attachment; filename="estudiantes_riesgo_{periodo.nombre}.{extension}"'
+    return response
 
 def generar_reporte_notas_materia(request, materia_id, periodo, formato):
     """Reporte detallado de notas por materia"""
     materia = Materia.objects.get(id=materia_id)
-    cursos = Curso.objects.filter(materia=materia, periodo=periodo)
-    
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4)
-    elements = []
-    styles = getSampleStyleSheet()
-    
-    titulo = Paragraph(f"<b>REPORTE DE NOTAS - {materia.nombre}</b>", styles['Title'])
-    elements.append(titulo)
-    elements.append(Spacer(1, 0.2*inch))
+    cursos = Curso.objects.filter(materia=materia, periodo=periodo).select_related('profesor__usuario').prefetch_related(
+        'configuracion_evaluaciones',
+        Prefetch('inscripciones', queryset=InscripcionCurso.objects.select_related('estudiante__usuario')
+                 .prefetch_related('calificaciones')),
+    )
     
-    for curso in cursos:
-        elements.append(Paragraph(f"<b>Grupo: {curso.grupo} - Profesor: {curso.profesor.usuario.get_full_name()}</b>", styles['Heading2']))
-        elements.append(Spacer(1, 0.1*inch))
-        
-        inscripciones = curso.inscripciones.all()
-        data = [['Código', 'Estudiante', 'Promedio', 'Estado']]
-        
-        for insc in inscripciones:
-            promedio = insc.calcular_promedio()
-            data.append([
-                insc.estudiante.codigo_estudiantil,
-                insc.estudiante.usuario.get_full_name(),
-                f"{promedio:.2f}" if promedio else "N/A",
-                insc.estado_aprobacion()
-            ])
-        
-        table = Table(data)
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ]))
-        elements.append(table)
-        elements.append(Spacer(1, 0.3*inch))
-    
-    doc.build(elements)
-    buffer.seek(0)
+    from .exportacion import reporte_notas_materia_pdf
+    buffer = reporte_notas_materia_pdf(materia, cursos)
     
     response = HttpResponse(buffer, content_type='application/pdf')
     response['Content-Disposition'] = f'attachment; filename="notas_{materia.codigo}_{periodo.nombre}.pdf"'
     return response
 
+def generar_paquete_reportes(request, cursos, periodo, programa_id=None):
+    """Varios reportes del periodo en un ZIP, todos a partir de una sola carga de datos"""
+    from .paquete_reportes import EXTENSIONES, REPORTES_PAQUETE, DatosPeriodo, generar_paquete
+    reportes = [r for r in request.POST.getlist('reportes') if r in REPORTES_PAQUETE] or REPORTES_PAQUETE
+    formatos = [f for f in dict.fromkeys(request.POST.getlist('formatos')) if f in EXTENSIONES] or ['pdf']
+    
+    datos = DatosPeriodo(periodo, cursos, programa_id, generado_por=request.user.get_full_name())
+    buffer = generar_paquete(datos, reportes, formatos)
+    
+    registrar_actividad(request, 'consultar', 'Reporte', periodo.id,
+                        f'Generación de paquete de reportes ({", ".join(formatos)})')
+    
+    response = HttpResponse(buffer, content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="reportes_{periodo.nombre}.zip"'
+    return response
+
 
 # ==================== NOTIFICACIONES ====================
 
@@ -898,21 +717,98 @@ def marcar_todas_leidas(request):
     return JsonResponse({'success': True, 'message': 'Todas las notificaciones marcadas como leídas'})
 
 
+# ==================== ARCHIVO ====================
+
+MODELOS_ARCHIVABLES = {
+    'periodo': PeriodoAcademico,
+    'curso': Curso,
+    'inscripcion': InscripcionCurso,
+    'notificacion': Notificacion,
+}
+
+@login_required
+@user_passes_test(es_administrador)
+@require_http_methods(["POST"])
+def archivar_registro(request, modelo):
+    """Archivar o desarchivar un registro (AJAX)"""
+    model = MODELOS_ARCHIVABLES.get(modelo)
+    if model is None:
+        return JsonResponse({'success': False, 'error': 'Modelo no archivable'}, status=404)
+    
+    form = GenericArchiveForm(request.POST)
+    if not form.is_valid():
+        return JsonResponse({'success': False, 'errors': form.errors}, status=400)
+    
+    archivar = form.cleaned_data['archived']
+    try:
+        queryset = model.con_archivados.filter(pk=form.cleaned_data['object_id'], archived=not archivar)
+        actualizados = archive_queryset(queryset, archived=archivar, by_user=request.user,
+                                        reason=form.cleaned_data['reason'],
+                                        timestamp=form.cleaned_data['archived_at'])
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Identificador inválido'}, status=400)
+    
+    registrar_actividad(request, 'editar', model.__name__, form.cleaned_data['object_id'],
+                       f"{'Archivó' if archivar else 'Desarchivó'} {model._meta.verbose_name}")
+    
+    return JsonResponse({'success': True, 'actualizados': actualizados})
+
+@login_required
+@user_passes_test(es_administrador)
+@require_http_methods(["POST"])
+def archivar_masivo(request, modelo):
+    """Archivar o desarchivar varios registros en una sola actualización (AJAX)"""
+    model = MODELOS_ARCHIVABLES.get(modelo)
+    if model is None:
+        return JsonResponse({'success': False, 'error': 'Modelo no archivable'}, status=404)
+    
+    form = BulkArchiveForm(request.POST, queryset=model.con_archivados.all(),
+                           queryset_label=model._meta.verbose_name_plural)
+    if not form.is_valid():
+        return JsonResponse({'success': False, 'errors': form.errors}, status=400)
+    
+    ids = form.selected_ids()
+    if not ids:
+        return JsonResponse({'success': False, 'error': 'No se seleccionaron registros'}, status=400)
+    
+    archivar = form.cleaned_data['archived']
+    try:
+        queryset = model.con_archivados.filter(pk__in=ids, archived=not archivar)
+        actualizados = archive_queryset(queryset, archived=archivar, by_user=request.user,
+                                        reason=form.cleaned_data['reason'])
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Identificadores inválidos'}, status=400)
+    
+    registrar_actividad(request, 'editar', model.__name__, 0,
+                       f"{'Archivó' if archivar else 'Desarchivó'} {actualizados} {model._meta.verbose_name_plural}")
+    
+    return JsonResponse({'success': True, 'actualizados': actualizados})
+
+
 # ==================== VISTAS MODALES/AJAX ====================
 
 @login_required
 def obtener_calificaciones_estudiante(request, inscripcion_id):
     """Obtener calificaciones de un estudiante en formato JSON (para modal)"""
-    inscripcion = get_object_or_404(InscripcionCurso, id=inscripcion_id)
+    inscripcion = get_object_or_404(InscripcionCurso.objects.select_related('estudiante', 'curso__profesor'),
+                                    id=inscripcion_id)
     
     # Verificar permisos
     if request.user.rol == 'estudiante':
-        if inscripcion.estudiante.usuario != request.user:
+        if inscripcion.estudiante.usuario_id != request.user.id:
             return JsonResponse({'error': 'Sin permisos'}, status=403)
     elif request.user.rol == 'profesor':
-        if inscripcion.curso.profesor.usuario != request.user:
+        if inscripcion.curso.profesor.usuario_id != request.user.id:
             return JsonResponse({'error': 'Sin permisos'}, status=403)
     
+    # Las notas y los pesos del curso cambian la versión del curso y del estudiante
+    etag, ultima_modificacion = validadores(cursos=[inscripcion.curso_id], estudiantes=[inscripcion.estudiante_id],
+                                            inscripcion=inscripcion.id)
+    no_modificada = respuesta_no_modificada(request, etag, ultima_modificacion)
+    if no_modificada:
+        return no_modificada
+    
+    inscripcion = InscripcionCurso.objects.con_notas().get(id=inscripcion_id)
     calificaciones = inscripcion.calificaciones.all()
     promedio = inscripcion.calcular_promedio()
     
@@ -933,7 +829,176 @@ def obtener_calificaciones_estudiante(request, inscripcion_id):
         ]
     }
     
-    return JsonResponse(data)
+    return con_validadores(JsonResponse(data), etag, ultima_modificacion)
+
+MAX_INSCRIPCIONES_LOTE = 500
+
+@login_required
+def calificaciones_lote(request):
+    """
+    Matriz estudiantes x tipos de evaluación con promedios, para varias inscripciones
+    (?inscripciones=1,2,3) o para todo un curso (?curso=ID) en una sola petición
+    """
+    curso_id = request.GET.get('curso')
+    try:
+        ids = [int(i) for i in request.GET.get('inscripciones', '').split(',') if i.strip()]
+        curso_id = int(curso_id) if curso_id else None
+    except ValueError:
+        return JsonResponse({'error': 'Identificadores inválidos'}, status=400)
+    if bool(ids) == bool(curso_id):
+        return JsonResponse({'error': 'Indique "inscripciones" o "curso"'}, status=400)
+    if len(ids) > MAX_INSCRIPCIONES_LOTE:
+        return JsonResponse({'error': f'Máximo {MAX_INSCRIPCIONES_LOTE} inscripciones por petición'}, status=400)
+
+    if curso_id:
+        # El permiso se comprueba sobre el curso: un curso sin inscripciones no deja la lista vacía como prueba
+        duenos = list(Curso.objects.filter(id=curso_id).values_list('profesor__usuario_id', flat=True))
+        if not duenos:
+            return JsonResponse({'error': 'Curso no encontrado'}, status=404)
+        if request.user.rol == 'estudiante' or (request.user.rol == 'profesor' and duenos[0] != request.user.id):
+            return JsonResponse({'error': 'Sin permisos'}, status=403)
+
+    inscripciones = InscripcionCurso.objects.filter(
+        **({'curso_id': curso_id} if curso_id else {'id__in': ids})
+    ).order_by('estudiante__usuario__last_name', 'estudiante__usuario__first_name').values(
+        'id', 'curso_id', 'estudiante__codigo_estudiantil', 'estudiante__usuario_id', 'curso__profesor__usuario_id',
+        'estudiante__usuario__first_name', 'estudiante__usuario__last_name',
+    )
+    inscripciones = list(inscripciones)
+    if ids and len(inscripciones) != len(set(ids)):
+        return JsonResponse({'error': 'Inscripción no encontrada'}, status=404)
+    
+    # Verificar permisos una sola vez para todo el lote
+    campo = {'estudiante': 'estudiante__usuario_id', 'profesor': 'curso__profesor__usuario_id'}.get(request.user.rol)
+    if campo and any(insc[campo] != request.user.id for insc in inscripciones):
+        return JsonResponse({'error': 'Sin permisos'}, status=403)
+    
+    cursos = sorted({insc['curso_id'] for insc in inscripciones} | ({curso_id} if curso_id else set()))
+    etag, ultima_modificacion = validadores(cursos=cursos, inscripciones=tuple(sorted(ids)))
+    no_modificada = respuesta_no_modificada(request, etag, ultima_modificacion)
+    if no_modificada:
+        return no_modificada
+    
+    # Dos consultas: todas las notas del lote y todos los pesos de sus cursos
+    notas = {}
+    tipos = {}
+    for inscripcion_id, tipo_id, tipo, nota in Calificacion.objects.filter(
+        inscripcion_id__in=[insc['id'] for insc in inscripciones]
+    ).values_list('inscripcion_id', 'tipo_evaluacion_id', 'tipo_evaluacion__nombre', 'nota'):
+        notas.setdefault(inscripcion_id, {})[tipo_id] = nota
+        tipos[tipo_id] = tipo
+    pesos = {curso: {} for curso in cursos}
+    for curso, tipo_id, tipo, porcentaje in ConfiguracionEvaluacion.objects.filter(curso_id__in=cursos).values_list(
+        'curso_id', 'tipo_evaluacion_id', 'tipo_evaluacion__nombre', 'porcentaje'
+    ):
+        pesos[curso][tipo_id] = porcentaje
+        tipos[tipo_id] = tipo
+    columnas = sorted(tipos)
+    
+    filas = []
+    for insc in inscripciones:
+        notas_inscripcion = notas.get(insc['id'], {})
+        promedio = promedio_ponderado(notas_inscripcion, pesos[insc['curso_id']])
+        filas.append({
+            'inscripcion': insc['id'],
+            'curso': insc['curso_id'],
+            'codigo': insc['estudiante__codigo_estudiantil'],
+            'estudiante': ' '.join(filter(None, [insc['estudiante__usuario__first_name'],
+                                                 insc['estudiante__usuario__last_name']])),
+            'notas': [float(notas_inscripcion[t]) if t in notas_inscripcion else None for t in columnas],
+            'promedio': promedio,
+            'estado': estado_segun_promedio(promedio),
+        })
+    
+    data = {
+        'tipos': [{'id': t, 'nombre': tipos[t]} for t in columnas],
+        'pesos': {curso: [float(p[t]) if t in p else None for t in columnas] for curso, p in pesos.items()},
+        'filas': filas,
+    }
+    return con_validadores(JsonResponse(data), etag, ultima_modificacion)
+
+@login_required
+@user_passes_test(es_administrador)
+@require_http_methods(["POST"])
+def inscripcion_masiva(request):
+    """Inscribe muchos pares {"inscripciones": [{"estudiante": id, "curso": id}, ...]} respetando el cupo"""
+    from .inscripciones import inscribir, resumen
+    try:
+        filas = json.loads(request.body or b'{}')['inscripciones']
+        resultados = inscribir((fila['estudiante'], fila['curso']) for fila in filas)
+    except (KeyError, TypeError, ValueError) as error:
+        return JsonResponse({'error': f'Solicitud inválida: {error}'}, status=400)
+    
+    registrar_actividad(request, 'crear', 'InscripcionCurso', 0,
+                        f"Inscripción masiva: {resumen(resultados).get('inscrito', 0)} de {len(resultados)} pares")
+    return JsonResponse({'resumen': resumen(resultados), 'resultados': resultados})
+
+@login_required
+@user_passes_test(es_administrador)
+def choques_horario(request, periodo_id):
+    """Choques de aula y de estudiante de un periodo (JSON)"""
+    from .horarios import choques_periodo
+    periodo = get_object_or_404(PeriodoAcademico.con_archivados, id=periodo_id)
+    
+    etag, ultima_modificacion = validadores(periodos=[periodo], vista='choques_horario')
+    no_modificada = respuesta_no_modificada(request, etag, ultima_modificacion)
+    if no_modificada:
+        return no_modificada
+    
+    choques = choques_periodo(periodo)
+    data = {
+        'periodo': periodo.nombre,
+        'aulas': sum(1 for choque in choques if choque['tipo'] == 'aula'),
+        'estudiantes': sum(1 for choque in choques if choque['tipo'] == 'estudiante'),
+        'choques': choques,
+    }
+    return con_validadores(JsonResponse(data), etag, ultima_modificacion)
+
+@login_required
+@user_passes_test(es_administrador)
+def ocupacion_aulas(request, periodo_id):
+    """Matriz de ocupación aula x día x bloque con utilización; ?formato=excel para descargarla"""
+    from .ocupacion import MapaOcupacion
+    periodo = get_object_or_404(PeriodoAcademico.con_archivados, id=periodo_id)
+    formato = request.GET.get('formato', 'json')
+    
+    etag, ultima_modificacion = validadores(periodos=[periodo], vista='ocupacion_aulas', formato=formato)
+    no_modificada = respuesta_no_modificada(request, etag, ultima_modificacion)
+    if no_modificada:
+        return no_modificada
+    
+    matriz = {'periodo': periodo.nombre, **MapaOcupacion.de_periodo(periodo).como_dict()}
+    if formato == 'excel':
+        from .exportacion import ocupacion_aulas_excel
+        response = HttpResponse(ocupacion_aulas_excel(periodo, matriz),
+                                content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+        response['Content-Disposition'] = f'attachment; filename="ocupacion_aulas_{periodo.nombre}.xlsx"'
+    else:
+        response = JsonResponse(matriz)
+    return con_validadores(response, etag, ultima_modificacion)
+
+@login_required
+@user_passes_test(es_administrador)
+def aulas_libres(request, periodo_id):
+    """Ventanas libres de al menos ?duracion= minutos (opcional: dia, desde, hasta, aula repetible)"""
+    from .horarios import DIAS, normalizar
+    from .ocupacion import HORA_FIN, HORA_INICIO, MapaOcupacion, parsear_minutos
+    periodo = get_object_or_404(PeriodoAcademico.con_archivados, id=periodo_id)
+    try:
+        duracion = int(request.GET.get('duracion', 120))
+        dia = request.GET.get('dia')
+        dia = DIAS.index(normalizar(dia)[:3]) if dia else None
+        desde = parsear_minutos(request.GET['desde']) if request.GET.get('desde') else HORA_INICIO
+        hasta = parsear_minutos(request.GET['hasta']) if request.GET.get('hasta') else HORA_FIN
+        if duracion < 1:
+            raise ValueError('duracion debe ser positiva')
+    except ValueError as error:
+        return JsonResponse({'error': f'Parámetros inválidos: {error}'}, status=400)
+    
+    mapa = MapaOcupacion.de_periodo(periodo)
+    ventanas = mapa.libres(duracion, dia=dia, desde=desde, hasta=hasta, aulas=request.GET.getlist('aula') or None)
+    return JsonResponse({'periodo': periodo.nombre, 'duracion': duracion, 'total': len(ventanas),
+                         'ventanas': ventanas})
 
 @login_required
 @user_passes_test(es_administrador)
@@ -942,39 +1007,228 @@ def estadisticas_dashboard(request):
     periodo_id = request.GET.get('periodo')
     periodo = PeriodoAcademico.objects.get(id=periodo_id) if periodo_id else PeriodoAcademico.objects.filter(activo=True).first()
     
+    dependencias = {'periodos': [periodo] if periodo else [], 'periodo': periodo.id if periodo else None}
+    etag, ultima_modificacion = validadores(**dependencias)
+    no_modificada = respuesta_no_modificada(request, etag, ultima_modificacion)
+    if no_modificada:
+        return no_modificada
+    
+    # Se recalcula solo cuando cambia la versión de datos del periodo
+    data = cacheado('estadisticas_periodo', lambda: calcular_estadisticas_periodo(periodo), **dependencias)
+    
+    return con_validadores(JsonResponse(data), etag, ultima_modificacion)
+
+def calcular_estadisticas_periodo(periodo):
+    """Totales, promedio institucional y tasa de aprobación de un periodo"""
     cursos = Curso.objects.filter(periodo=periodo)
     
     # Calcular estadísticas
     total_cursos = cursos.count()
     total_inscripciones = InscripcionCurso.objects.filter(curso__periodo=periodo).count()
     
-    promedios = []
-    aprobados = 0
-    reprobados = 0
-    
-    for curso in cursos:
-        inscripciones = curso.inscripciones.all()
-        for insc in inscripciones:
-            promedio = insc.calcular_promedio()
-            if promedio:
-                promedios.append(promedio)
-                if promedio >= 3.0:
-                    aprobados += 1
-                else:
-                    reprobados += 1
-    
-    promedio_institucional = sum(promedios) / len(promedios) if promedios else 0.0
+    # Una sola agregación sobre los promedios almacenados (los que tienen notas con peso)
+    totales = InscripcionCurso.objects.filter(curso__periodo=periodo, promedio_almacenado__gt=0).aggregate(
+        promedio=Avg('promedio_almacenado'),
+        con_promedio=Count('id'),
+        aprobados=Count('id', filter=Q(promedio_almacenado__gte=3)),
+    )
+    con_promedio = totales['con_promedio']
+    aprobados = totales['aprobados']
     
     data = {
         'total_cursos': total_cursos,
         'total_inscripciones': total_inscripciones,
-        'promedio_institucional': round(promedio_institucional, 2),
+        'promedio_institucional': round(float(totales['promedio'] or 0.0), 2),
         'aprobados': aprobados,
-        'reprobados': reprobados,
-        'tasa_aprobacion': round((aprobados / len(promedios) * 100) if promedios else 0, 1),
+        'reprobados': con_promedio - aprobados,
+        'tasa_aprobacion': round((aprobados / con_promedio * 100) if con_promedio else 0, 1),
     }
     
-    return JsonResponse(data)
+    return data
+
+ORDENES_RIESGO = {
+    'puntaje': [F('puntaje').desc()],
+    'tendencia': [F('tendencia').asc(nulls_last=True)],
+    'promedio': [F('promedio_parcial').asc(nulls_last=True)],
+    'cursos': [F('cursos_en_riesgo').desc(), F('puntaje').desc()],
+}
+
+@login_required
+def alertas_riesgo(request, periodo_id):
+    """
+    Puntajes de riesgo precalculados del periodo, para consejeros: el administrador ve todos y el profesor
+    los de sus estudiantes. Filtros ?nivel= y ?programa= (repetibles), ?orden= y ?limite=
+    """
+    if request.user.rol == 'estudiante':
+        return JsonResponse({'error': 'Sin permisos'}, status=403)
+    periodo = get_object_or_404(PeriodoAcademico.con_archivados, id=periodo_id)
+    orden = request.GET.get('orden', 'puntaje')
+    try:
+        limite = min(int(request.GET.get('limite', 50)), 500)
+        programas = [int(p) for p in request.GET.getlist('programa')]
+        if orden not in ORDENES_RIESGO or limite < 1:
+            raise ValueError
+    except ValueError:
+        return JsonResponse({'error': f'Parámetros inválidos (orden: {", ".join(ORDENES_RIESGO)})'}, status=400)
+    
+    puntajes = PuntajeRiesgo.objects.filter(periodo=periodo)
+    if request.user.rol == 'profesor':
+        puntajes = puntajes.filter(estudiante__in=InscripcionCurso.objects.filter(
+            curso__periodo=periodo, curso__profesor__usuario=request.user
+        ).values('estudiante_id'))
+    if request.GET.getlist('nivel'):
+        puntajes = puntajes.filter(nivel__in=request.GET.getlist('nivel'))
+    if programas:
+        puntajes = puntajes.filter(programa_id__in=programas)
+    
+    filas = puntajes.select_related('estudiante__usuario').order_by(*ORDENES_RIESGO[orden], 'estudiante_id')[:limite]
+    return JsonResponse({
+        'periodo': periodo.nombre,
+        'calculado': max((p.fecha_calculo for p in filas), default=None),
+        'estudiantes': [
+            {
+                'estudiante': p.estudiante_id, 'codigo': p.estudiante.codigo_estudiantil,
+                'nombre': p.estudiante.usuario.get_full_name(), 'puntaje': p.puntaje, 'nivel': p.nivel,
+                'promedio_parcial': p.promedio_parcial, 'promedio_anterior': p.promedio_anterior,
+                'tendencia': p.tendencia, 'evaluaciones_faltantes': p.evaluaciones_faltantes,
+                'cursos': p.cursos, 'cursos_en_riesgo': p.cursos_en_riesgo,
+            }
+            for p in filas
+        ],
+    })
+
+@login_required
+@user_passes_test(es_administrador)
+def ranking_programa(request, periodo_id):
+    """Los ?limite= mejores promedios del periodo en ?programa= (opcional: ?semestre=)"""
+    from .ranking import ranking_periodo
+    periodo = get_object_or_404(PeriodoAcademico.con_archivados, id=periodo_id)
+    try:
+        programa_id = int(request.GET['programa'])
+        semestre = int(request.GET['semestre']) if request.GET.get('semestre') else None
+        limite = min(int(request.GET.get('limite', 10)), 100)
+        if limite < 1:
+            raise ValueError
+    except (KeyError, ValueError):
+        return JsonResponse({'error': 'Parámetros inválidos: programa (requerido), semestre y limite'}, status=400)
+    programa = get_object_or_404(Programa, id=programa_id)
+    
+    ranking = ranking_periodo(periodo.id)
+    grupo, = con_estudiantes([{'mejores': ranking.mejores(programa.id, limite, semestre)}])
+    return JsonResponse({
+        'periodo': periodo.nombre,
+        'programa': programa.nombre,
+        'semestre': semestre,
+        'total': ranking.total(programa.id, semestre),
+        'mejores': [
+            {'puesto': fila['puesto'], 'estudiante': fila['estudiante'].id,
+             'codigo': fila['estudiante'].codigo_estudiantil,
+             'nombre': fila['estudiante'].usuario.get_full_name(), 'promedio': fila['promedio']}
+            for fila in grupo['mejores']
+        ],
+    })
+
+@login_required
+def puesto_ranking(request, periodo_id, estudiante_id):
+    """Puesto del estudiante en su programa y en su programa y semestre; el propio estudiante o un administrador"""
+    from .ranking import ranking_periodo
+    if request.user.rol != 'administrador' and not (
+        request.user.rol == 'estudiante' and request.user.perfil_estudiante.id == estudiante_id
+    ):
+        return JsonResponse({'error': 'Sin permisos'}, status=403)
+    periodo = get_object_or_404(PeriodoAcademico.con_archivados, id=periodo_id)
+    
+    ranking = ranking_periodo(periodo.id)
+    programa, semestre = ranking.puesto(estudiante_id), ranking.puesto(estudiante_id, por_semestre=True)
+    ubicacion = ranking.ubicacion.get(estudiante_id)
+    return JsonResponse({
+        'periodo': periodo.nombre,
+        'estudiante': estudiante_id,
+        'promedio': ubicacion[2] if ubicacion else None,
+        'programa': {'puesto': programa[0], 'total': programa[1]} if programa else None,
+        'semestre': {'puesto': semestre[0], 'total': semestre[1]} if semestre else None,
+    })
+
+@login_required
+@user_passes_test(es_administrador)
+def cubo_rendimiento(request):
+    """
+    Agregados del cubo por ?dimensiones= (programa, semestre, materia, periodo; separadas por coma),
+    filtrados por ?programa=, ?semestre=, ?materia= o ?periodo= (repetibles)
+    """
+    dimensiones = [d for d in request.GET.get('dimensiones', 'programa').split(',') if d]
+    invalidas = set(dimensiones) - set(DIMENSIONES_CUBO)
+    if invalidas:
+        return JsonResponse({'error': f'Dimensiones no válidas: {", ".join(sorted(invalidas))}'}, status=400)
+    try:
+        filtros = {f'{campo}__in': [int(v) for v in request.GET.getlist(campo)]
+                   for campo in DIMENSIONES_CUBO if request.GET.getlist(campo)}
+    except ValueError:
+        return JsonResponse({'error': 'Los filtros deben ser identificadores numéricos'}, status=400)
+    
+    filas = CuboRendimiento.objects.filter(**filtros).resumen(*dimensiones)
+    return JsonResponse({'dimensiones': dimensiones, 'total': len(filas), 'filas': filas})
+
+@login_required
+def analitica_curso(request, curso_id):
+    """Histograma de promedios (intervalos de 0.5), cuartiles, desviación, medias por tipo y percentiles"""
+    curso = get_object_or_404(Curso.objects.select_related('profesor'), id=curso_id)
+    if request.user.rol == 'estudiante' or (request.user.rol == 'profesor'
+                                            and curso.profesor.usuario_id != request.user.id):
+        return JsonResponse({'error': 'Sin permisos'}, status=403)
+    
+    etag, ultima_modificacion = validadores(cursos=[curso], vista='analitica_curso')
+    no_modificada = respuesta_no_modificada(request, etag, ultima_modificacion)
+    if no_modificada:
+        return no_modificada
+    
+    def calcular():
+        from .analitica import analitica_curso as calcular_analitica
+        return calcular_analitica(curso.id)
+    
+    # Se recalcula solo cuando cambia la versión de datos del curso
+    data = cacheado('analitica_curso', calcular, cursos=[curso], curso=curso.id)
+    return con_validadores(JsonResponse(data), etag, ultima_modificacion)
+
+@login_required
+@require_http_methods(["POST"])
+def impacto_pesos(request, curso_id):
+    """
+    Vista previa de un cambio de pesos: recalcula en memoria los promedios del curso con los pesos
+    propuestos ({"pesos": {tipo_evaluacion_id: porcentaje}}) y cuenta quién cambia de estado. No guarda nada.
+    """
+    curso = get_object_or_404(Curso.objects.select_related('profesor'), id=curso_id)
+    if request.user.rol == 'estudiante' or (request.user.rol == 'profesor'
+                                            and curso.profesor.usuario_id != request.user.id):
+        return JsonResponse({'error': 'Sin permisos'}, status=403)
+    
+    try:
+        propuestos = json.loads(request.body or b'{}').get('pesos', {})
+        pesos = {int(tipo_id): Decimal(str(porcentaje)) for tipo_id, porcentaje in propuestos.items()}
+    except (ValueError, TypeError, AttributeError, ArithmeticError):
+        return JsonResponse({'error': 'Formato de pesos inválido'}, status=400)
+    if not pesos or any(not 0 <= porcentaje <= 100 for porcentaje in pesos.values()):
+        return JsonResponse({'error': 'Los porcentajes deben estar entre 0 y 100'}, status=400)
+    
+    promedios = curso.inscripciones.all().promedios_calculados(pesos={curso.id: pesos})
+    cambios = []
+    for inscripcion_id, (antes, despues) in sorted(promedios.items()):
+        antes = float(antes) if antes is not None else None
+        estado_antes, estado_despues = estado_segun_promedio(antes), estado_segun_promedio(despues)
+        if estado_antes != estado_despues:
+            cambios.append({'inscripcion': inscripcion_id, 'antes': antes, 'despues': despues,
+                            'estado_antes': estado_antes, 'estado_despues': estado_despues})
+    
+    return JsonResponse({
+        'curso': curso.id,
+        'suma_pesos': float(sum(pesos.values())),
+        'inscripciones': len(promedios),
+        'cambian_promedio': sum(1 for antes, despues in promedios.values() if antes != decimal_promedio(despues)),
+        'cambian_estado': len(cambios),
+        'aprueban': sum(1 for c in cambios if c['estado_despues'] == 'Aprobado'),
+        'reprueban': sum(1 for c in cambios if c['estado_antes'] == 'Aprobado'),
+        'detalle': cambios,
+    })
 
 @login_required
 @require_http_methods(["POST"])
@@ -995,6 +1249,15 @@ def validar_nota(request):
 @login_required
 def busqueda_global(request):
     """Búsqueda global en el sistema"""
+    with metricas.BUSQUEDA_SEGUNDOS.cronometrar(rol=request.user.rol):
+        response = _busqueda_global(request)
+    
+    # A diferencia de las APIs con validadores(), aquí el ETag es un hash del JSON ya generado: nombres y
+    # códigos no tienen versión ni fecha de modificación. El 304 ahorra la transferencia, no las consultas
+    etag = hashlib.md5(response.content).hexdigest()
+    return respuesta_no_modificada(request, etag) or con_validadores(response, etag)
+
+def _busqueda_global(request):
     query = request.GET.get('q', '')
     
     if len(query) < 3:
@@ -1010,7 +1273,7 @@ def busqueda_global(request):
             Q(estudiante__usuario__first_name__icontains=query) |
             Q(estudiante__usuario__last_name__icontains=query) |
             Q(estudiante__codigo_estudiantil__icontains=query)
-        )[:10]
+        ).select_related('estudiante__usuario')[:10]
         
         for insc in inscripciones:
             results.append({
@@ -1025,7 +1288,7 @@ def busqueda_global(request):
         cursos = Curso.objects.filter(
             Q(materia__nombre__icontains=query) |
             Q(materia__codigo__icontains=query)
-        )[:5]
+        ).select_related('materia')[:5]
         
         for curso in cursos:
             results.append({
@@ -1039,7 +1302,7 @@ def busqueda_global(request):
             Q(usuario__first_name__icontains=query) |
             Q(usuario__last_name__icontains=query) |
             Q(codigo_estudiantil__icontains=query)
-        )[:5]
+        ).select_related('usuario', 'programa')[:5]
         
         for est in estudiantes:
             results.append({
@@ -1052,6 +1315,23 @@ def busqueda_global(request):
     return JsonResponse({'results': results})
 
 
+# ==================== MÉTRICAS ====================
+
+def metricas_autorizadas(request):
+    """Con METRICAS_TOKEN, solo con ese token; sin él, staff o administradores (cualquiera si DEBUG)"""
+    token = getattr(settings, 'METRICAS_TOKEN', None)
+    if token:
+        return request.headers.get('Authorization') == f'Bearer {token}'
+    usuario = request.user
+    return settings.DEBUG or usuario.is_staff or (usuario.is_authenticated and usuario.rol == 'administrador')
+
+def exponer_metricas(request):
+    """Métricas en formato de texto de Prometheus (ver metricas_autorizadas)"""
+    if not metricas_autorizadas(request):
+        return HttpResponse('No autorizado', status=401, content_type='text/plain')
+    return HttpResponse(metricas.REGISTRO.exponer(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
 # ==================== EXPORTAR DATOS ====================
 
 @login_required
@@ -1059,48 +1339,11 @@ def busqueda_global(request):
 def exportar_historial_notas(request):
     """Exportar historial completo de notas del estudiante"""
     estudiante = request.user.perfil_estudiante
-    inscripciones = estudiante.inscripciones.all().order_by('-curso__periodo__fecha_inicio')
-    
-    # Crear Excel
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Historial de Notas"
-    
-    # Información del estudiante
-    ws['A1'] = "HISTORIAL ACADÉMICO"
-    ws['A2'] = f"Estudiante: {estudiante.usuario.get_full_name()}"
-    ws['A3'] = f"Código: {estudiante.codigo_estudiantil}"
-    ws['A4'] = f"Programa: {estudiante.programa.nombre}"
-    
-    # Encabezados
-    headers = ['Periodo', 'Código', 'Materia', 'Créditos', 'Promedio', 'Estado']
-    for col, header in enumerate(headers, 1):
-        ws.cell(row=6, column=col).value = header
-        ws.cell(row=6, column=col).font = Font(bold=True)
-    
-    # Datos
-    row = 7
-    for insc in inscripciones:
-        promedio = insc.calcular_promedio()
-        ws.cell(row=row, column=1).value = insc.curso.periodo.nombre
-        ws.cell(row=row, column=2).value = insc.curso.materia.codigo
-        ws.cell(row=row, column=3).value = insc.curso.materia.nombre
-        ws.cell(row=row, column=4).value = insc.curso.materia.creditos
-        ws.cell(row=row, column=5).value = round(promedio, 2) if promedio else "N/A"
-        ws.cell(row=row, column=6).value = insc.estado_aprobacion()
-        row += 1
-    
-    # Ajustar anchos
-    ws.column_dimensions['A'].width = 12
-    ws.column_dimensions['B'].width = 12
-    ws.column_dimensions['C'].width = 35
-    ws.column_dimensions['D'].width = 10
-    ws.column_dimensions['E'].width = 12
-    ws.column_dimensions['F'].width = 12
-    
-    buffer = io.BytesIO()
-    wb.save(buffer)
-    buffer.seek(0)
+    registros = HistorialAcademico.objects.de_estudiante(estudiante)
+    acumulado = RegistroAcumulado.objects.filter(estudiante=estudiante).first()
+    
+    from .exportacion import historial_excel
+    buffer = historial_excel(estudiante, registros, acumulado)
     
     response = HttpResponse(buffer, content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
     response['Content-Disposition'] = f'attachment; filename="historial_notas_{estudiante.codigo_estudiantil}.xlsx"'
@@ -1112,47 +1355,12 @@ def descargar_boletin_periodo(request, periodo_id):
     """Descargar boletín de notas en PDF para un periodo específico"""
     estudiante = request.user.perfil_estudiante
     periodo = get_object_or_404(PeriodoAcademico, id=periodo_id)
+    # Como descargar_boletin: historial congelado si el periodo está cerrado, notas al vuelo si no
+    registros = HistorialAcademico.objects.de_estudiante(estudiante, periodo)
     
-    inscripciones = estudiante.inscripciones.filter(curso__periodo=periodo)
-    
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4)
-    elements = []
-    styles = getSampleStyleSheet()
-    
-    # Título
-    titulo = Paragraph(f"<b>BOLETÍN DE NOTAS - {periodo.nombre}</b>", styles['Title'])
-    elements.append(titulo)
-    elements.append(Spacer(1, 0.2*inch))
-    
-    # Información del estudiante
-    info = Paragraph(f"""
-        <b>Estudiante:</b> {estudiante.usuario.get_full_name()}<br/>
-        <b>Código:</b> {estudiante.codigo_estudiantil}<br/>
-        <b>Programa:</b> {estudiante.programa.nombre}<br/>
-        <b>Fecha de generación:</b> {datetime.now().strftime('%d/%m/%Y %H:%M')}
-    """, styles['Normal'])
-    elements.append(info)
-    elements.append(Spacer(1, 0.3*inch))
-    
-    # Tabla de calificaciones
-    data = [['Código', 'Materia', 'Créditos', 'Promedio', 'Estado']]
-    total_creditos = 0
-    promedios_list = []
+    from .exportacion import boletin_pdf
+    buffer = boletin_pdf(estudiante, periodo, registros)
     
-    for insc in inscripciones:
-        promedio = insc.calcular_promedio()
-        estado = insc.estado_aprobacion()
-        creditos = insc.curso.materia.creditos
-        total_creditos += creditos
-        
-        data.append([
-            insc.curso.materia.codigo,
-            insc.curso.materia.nombre,
-            str(creditos),
-            f"{promedio:.2f}" if promedio else "N/A",
-            estado
-        ])
-        
-        if promedio is not None:
-            promedios_list.append(promedio)
\ No newline at end of file
+    response = HttpResponse(buffer, content_type='application/pdf')
+    response['Content-Disposition'] = f'attachment; filename="boletin_{periodo.nombre}_{estudiante.codigo_estudiantil}.pdf"'
+    return response